@@ -0,0 +1 @@
+"""Benchmarks for crawl2md."""
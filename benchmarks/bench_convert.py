@@ -0,0 +1,101 @@
+"""Measure per-page time saved by converting cleaned HTML in-process.
+
+Compares the former second ``arun("raw:...")`` pass, which also built a
+fresh ``CrawlerRunConfig`` per call, with
+``html_to_markdown`` on the golden test pages. When no browser can be
+launched, the old path is measured through ``AsyncWebCrawler.aprocess_html``
+(the part of ``arun`` that runs for ``raw:`` URLs), which understates the
+saving because browser strategy and hook overhead are skipped.
+
+Run with::
+
+    python -m benchmarks.bench_convert --repeat 50
+"""
+
+import argparse
+import asyncio
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, List
+
+from crawl4ai import AsyncWebCrawler, CacheMode, CrawlerRunConfig
+
+from crawl2md.converter import html_to_markdown
+from crawl2md.html_cleaner import HtmlCleaner
+
+GOLDEN_DIR = Path(__file__).parent.parent / "tests" / "fixtures" / "golden"
+
+
+def load_pages() -> List[str]:
+    cleaner = HtmlCleaner.from_file(str(GOLDEN_DIR / "selectors.txt"))
+    return [cleaner.clean(p.read_text()) for p in sorted(GOLDEN_DIR.glob("*.html"))]
+
+
+async def time_per_page(
+    convert: Callable[[str], Awaitable[str]], pages: List[str], repeat: int
+) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for html in pages:
+            await convert(html)
+    return (time.perf_counter() - start) / (repeat * len(pages))
+
+
+async def run(repeat: int) -> None:
+    pages = load_pages()
+
+    async def in_process(html: str) -> str:
+        return html_to_markdown(html)
+
+    crawler = AsyncWebCrawler()
+    try:
+        await crawler.start()
+
+        async def old_path(html: str) -> str:
+            result = await crawler.arun(
+                url=f"raw:{html}",
+                config=CrawlerRunConfig(cache_mode=CacheMode.BYPASS),
+            )
+            return result.markdown.raw_markdown
+
+        label = "arun(raw:)"
+    except Exception:
+        crawler = AsyncWebCrawler()
+
+        async def old_path(html: str) -> str:
+            result = await crawler.aprocess_html(
+                url=f"raw:{html}",
+                html=html,
+                extracted_content=None,
+                config=CrawlerRunConfig(cache_mode=CacheMode.BYPASS),
+                screenshot_data=None,
+                pdf_data=None,
+                verbose=False,
+                is_raw_html=True,
+            )
+            return result.markdown.raw_markdown
+
+        label = "aprocess_html(raw:) [no browser]"
+
+    try:
+        old = await time_per_page(old_path, pages, repeat)
+        new = await time_per_page(in_process, pages, repeat)
+    finally:
+        if crawler.ready:
+            await crawler.close()
+
+    print(f"{len(pages)} pages x {repeat} repeats")
+    print(f"  {label:<36} {old * 1000:8.2f} ms/page")
+    print(f"  {'html_to_markdown':<36} {new * 1000:8.2f} ms/page")
+    print(f"  saved {(old - new) * 1000:.2f} ms/page ({(1 - new / old) * 100:.0f}%)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Micro-benchmark for link discovery.
+
+Measures link extraction from a page, SeenSet adds and lookups with the
+memory the set holds, and LinkQueue inserts and batches, against a plain
+Python set of the same URLs.
+
+Run with::
+
+    python -m benchmarks.bench_discovery --urls 1000000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from crawl2md.discovery import LinkQueue, SeenSet, extract_links
+
+BASE_URL = "https://example.com"
+LINKS_PER_PAGE = 200
+QUEUE_BATCH = 500
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--urls", type=int, default=1_000_000)
+    parser.add_argument("--pages", type=int, default=2000)
+    args = parser.parse_args()
+
+    html = "<html><body>" + "".join(
+        f'<p>Text <a class="link" href="/docs/section-{i % 20}/page-{i}.html#top">'
+        f"Page {i}</a></p>"
+        for i in range(LINKS_PER_PAGE)
+    )
+    start = time.perf_counter()
+    for _ in range(args.pages):
+        extract_links(html, f"{BASE_URL}/docs/index.html")
+    elapsed = time.perf_counter() - start
+    print(
+        f"extract_links  {args.pages / elapsed:10.0f} pages/s "
+        f"({LINKS_PER_PAGE} links each)"
+    )
+
+    urls = [
+        f"{BASE_URL}/docs/section-{i // 500}/page-{i}.html" for i in range(args.urls)
+    ]
+    print(f"{args.urls} URLs")
+
+    seen = SeenSet()
+    start = time.perf_counter()
+    for url in urls:
+        seen.add(url)
+    add_elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    for url in urls:
+        seen.add(url)
+    lookup_elapsed = time.perf_counter() - start
+    print(
+        f"  {'SeenSet':<10} {args.urls / add_elapsed:10.0f} adds/s, "
+        f"{args.urls / lookup_elapsed:10.0f} repeat adds/s, "
+        f"{seen.nbytes / 2**20:7.1f} MB held"
+    )
+
+    plain = set()
+    start = time.perf_counter()
+    for url in urls:
+        plain.add(url)
+    add_elapsed = time.perf_counter() - start
+    # The URL strings are counted as well, since a set must keep them
+    size = sys.getsizeof(plain) + sum(sys.getsizeof(url) for url in urls)
+    print(
+        f"  {'set':<10} {args.urls / add_elapsed:10.0f} adds/s, "
+        f"{size / 2**20:7.1f} MB held with the URL strings"
+    )
+    del plain
+
+    with tempfile.TemporaryDirectory() as directory:
+        queue = LinkQueue(os.path.join(directory, "links.sqlite"))
+        start = time.perf_counter()
+        for i in range(0, len(urls), QUEUE_BATCH):
+            queue.add((url, 1, None) for url in urls[i : i + QUEUE_BATCH])
+        add_elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        while queue.next_batch(QUEUE_BATCH):
+            pass
+        take_elapsed = time.perf_counter() - start
+        queue.close()
+        disk = os.path.getsize(os.path.join(directory, "links.sqlite"))
+    print(
+        f"  {'LinkQueue':<10} {args.urls / add_elapsed:10.0f} queued/s, "
+        f"{args.urls / take_elapsed:10.0f} taken/s, {disk / 2**20:7.1f} MB on disk"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Compare page throughput of the http fetcher with the headless browser.
+
+Serves a server-rendered golden test page from a local stub server and
+crawls it with each fetcher. The browser run needs a Playwright Chromium
+install and is skipped when none can be launched.
+
+Run with::
+
+    python -m benchmarks.bench_fetcher --pages 200 --concurrency 10
+"""
+
+import argparse
+import asyncio
+import time
+from pathlib import Path
+
+from benchmarks.stub_server import StubServer
+from crawl2md.crawler import Crawler
+from crawl2md.http_fetcher import FETCHERS
+
+GOLDEN_PAGE = (
+    Path(__file__).parent.parent / "tests" / "fixtures" / "golden" / "docs_page.html"
+)
+
+
+async def crawl(fetcher: str, urls, concurrency: int) -> int:
+    crawler = Crawler(max_concurrent=concurrency, rate_limit=None, fetcher=fetcher)
+    results = [r async for r in crawler.crawl_many(urls)]
+    failed = [r for r in results if not r["success"]]
+    if failed:
+        raise RuntimeError(failed[0].get("error"))
+    return len(results)
+
+
+def run(pages: int, concurrency: int) -> None:
+    latencies = {f"/page/{i}": 0.0 for i in range(pages)}
+    with StubServer(latencies, page_html=GOLDEN_PAGE.read_text()) as server:
+        urls = server.urls()
+        print(f"{pages} pages, concurrency {concurrency}")
+        for fetcher in FETCHERS:
+            start = time.perf_counter()
+            try:
+                count = asyncio.run(crawl(fetcher, urls, concurrency))
+            except Exception as e:
+                print(f"  {fetcher:<10} skipped ({str(e).splitlines()[0][:60]})")
+                continue
+            elapsed = time.perf_counter() - start
+            print(f"  {fetcher:<10} {elapsed:7.2f}s  {count / elapsed:7.1f} pages/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    run(args.pages, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Micro-benchmark for FileHandler and the archive output writers.
+
+Measures URL-to-path planning and lookups, and markdown saves per second
+for the per-file tree and each shard format, in a temporary directory.
+
+Run with::
+
+    python -m benchmarks.bench_file_handler --files 5000 --size-kb 20
+"""
+
+import argparse
+import tempfile
+import time
+
+from crawl2md.archive import OUTPUT_FORMATS, open_output
+from crawl2md.file_handler import FileHandler
+
+BASE_URL = "https://example.com"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=5000)
+    parser.add_argument("--size-kb", type=float, default=20.0)
+    args = parser.parse_args()
+
+    urls = [
+        f"{BASE_URL}/docs/section-{i // 50}/page-{i}.html" for i in range(args.files)
+    ]
+    markdown = "# Title\n\n" + "word " * int(args.size_kb * 1024 / 5)
+
+    print(f"{args.files} pages of {args.size_kb:g} KiB")
+    start = time.perf_counter()
+    for url in urls:
+        FileHandler.default_path(url)
+    elapsed = time.perf_counter() - start
+    print(f"  {'default_path':<12} {args.files / elapsed:12.0f} URLs/s")
+
+    handler = FileHandler(BASE_URL)
+    start = time.perf_counter()
+    handler.plan(urls)
+    elapsed = time.perf_counter() - start
+    print(f"  {'plan':<12} {args.files / elapsed:12.0f} URLs/s")
+    start = time.perf_counter()
+    for url in urls:
+        handler.url_to_path(url)
+    elapsed = time.perf_counter() - start
+    print(f"  {'url_to_path':<12} {args.files / elapsed:12.0f} URLs/s (planned)")
+
+    for output_format in OUTPUT_FORMATS:
+        with tempfile.TemporaryDirectory() as output:
+            try:
+                backend = open_output(output_format, BASE_URL, output)
+            except RuntimeError as e:
+                print(f"  {output_format:<12} skipped ({e})")
+                continue
+            start = time.perf_counter()
+            backend.plan(urls)
+            backend.make_directories()
+            for url in urls:
+                backend.save_markdown(url, markdown)
+            backend.close()
+            elapsed = time.perf_counter() - start
+        print(
+            f"  {output_format:<12} {args.files / elapsed:12.0f} saves/s"
+            f"  {args.files * args.size_kb / 1024 / elapsed:8.1f} MB/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Micro-benchmark for HtmlCleaner.clean on large documentation pages.
+
+Compares the former one-``soup.select``-per-selector loop with the
+compiled single-pass matcher, for both parser backends, using the bundled
+``selectors_kentico.txt``.
+
+Run with::
+
+    python -m benchmarks.bench_html_cleaner --sections 400 --repeat 5
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from crawl2md.html_cleaner import PARSERS, HtmlCleaner
+
+SELECTORS_FILE = Path(__file__).parent.parent / "selectors_kentico.txt"
+
+
+def make_page(sections: int) -> str:
+    """Build a large documentation-style page with removable chrome."""
+    body = []
+    for i in range(sections):
+        body.append(
+            f"<section><h2 id='s{i}'>Section {i}</h2>"
+            f"<p>Paragraph with <a href='/docs/{i}'>a link</a> and <code>code</code>.</p>"
+            "<ul>" + "".join(f"<li>Item {j}</li>" for j in range(10)) + "</ul>"
+            f"<pre><code>var x = {i};\nconsole.log(x);</code></pre>"
+            "<div class='page-metadata'>Updated yesterday</div>"
+            "<footer>Article footer</footer></section>"
+        )
+    return (
+        "<html><head><title>Docs</title></head><body>"
+        "<div id='ht-headerbar'><nav>Header</nav></div>"
+        "<div class='ht-layout-sidebar'>"
+        + "".join(f"<a href='/nav/{i}'>Nav {i}</a>" for i in range(500))
+        + "</div><main>"
+        + "".join(body)
+        + "</main><footer>Page footer</footer>"
+        "<div id='docsbotai-root'></div><div id='cookie-banner'>Cookies</div>"
+        "</body></html>"
+    )
+
+
+def legacy_clean(selectors, html: str) -> str:
+    """The pre-compiled-matcher implementation of HtmlCleaner.clean."""
+    soup = BeautifulSoup(html, "html.parser")
+    for selector in selectors:
+        try:
+            for element in soup.select(selector):
+                element.decompose()
+        except Exception:
+            pass
+    return str(soup)
+
+
+def timed(func, html: str, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(html)
+    return (time.perf_counter() - start) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sections", type=int, default=400)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    html = make_page(args.sections)
+    cleaner = HtmlCleaner.from_file(str(SELECTORS_FILE))
+    print(f"page size {len(html) / 1024:.0f} KiB, {len(cleaner.selectors)} selectors")
+
+    legacy = timed(lambda h: legacy_clean(cleaner.selectors, h), html, args.repeat)
+    print(f"  {'per-selector select (old)':<32} {legacy * 1000:8.1f} ms")
+    for name in PARSERS:
+        compiled = HtmlCleaner(cleaner.selectors, parser=name)
+        elapsed = timed(compiled.clean, html, args.repeat)
+        print(
+            f"  {'single pass, ' + name:<32} {elapsed * 1000:8.1f} ms"
+            f"  ({legacy / elapsed:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""End-to-end benchmark of the crawl2md CLI against a local fixture site.
+
+Starts a synthetic documentation site (see fixture_site.py), runs the full
+``crawl2md`` pipeline on its sitemap index in a subprocess and writes a JSON
+report with pages/sec, peak RSS and per-stage timings. Pass ``--compare``
+with an earlier report (e.g. from another commit) to print the change.
+The default ``http`` fetcher needs no browser install.
+
+Run with::
+
+    python -m benchmarks.bench_pipeline --pages 500 --report bench.json
+    python -m benchmarks.bench_pipeline --pages 500 --compare bench.json
+"""
+
+import argparse
+import csv
+import json
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from benchmarks.fixture_site import (
+    DEFAULT_LATENCY_MIX_MS,
+    DEFAULT_SIZE_MIX_KB,
+    FixtureSite,
+    parse_mix,
+)
+from crawl2md.metrics import PHASES
+
+REPO_ROOT = Path(__file__).parent.parent
+SELECTORS_FILE = REPO_ROOT / "selectors_kentico.txt"
+REPORT_VERSION = 1
+
+
+def format_mix(mix) -> str:
+    return ",".join(f"{p:g}:{v:g}" for p, v in mix)
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def peak_child_rss_mb() -> float:
+    """Largest RSS of any finished child process, in MB."""
+    maxrss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def stage_summary(result_file: str) -> Dict[str, dict]:
+    """Summarize the --profile timing columns of a result CSV by stage."""
+    values: Dict[str, List[float]] = {f"{stage}_ms": [] for stage in PHASES}
+    values.update({f"{stage}_cpu_ms": [] for stage in PHASES})
+    with open(result_file, newline="") as f:
+        for row in csv.DictReader(f):
+            for column, samples in values.items():
+                if row.get(column):
+                    samples.append(float(row[column]))
+    summary = {}
+    for stage in PHASES:
+        wall = values[f"{stage}_ms"]
+        if not wall:
+            continue
+        cpu = values[f"{stage}_cpu_ms"]
+        summary[stage] = {
+            "pages": len(wall),
+            "avg_ms": statistics.fmean(wall),
+            "p95_ms": sorted(wall)[int(0.95 * (len(wall) - 1))],
+            "total_s": sum(wall) / 1000,
+            "cpu_total_s": sum(cpu) / 1000 if cpu else None,
+        }
+    return summary
+
+
+def run_pipeline(site: FixtureSite, args, workdir: str) -> dict:
+    output = f"{workdir}/output"
+    result_file = f"{workdir}/result.csv"
+    stats_file = f"{workdir}/stats.json"
+    command = [
+        sys.executable,
+        "-m",
+        "crawl2md.cli",
+        site.sitemap_url,
+        "--output",
+        output,
+        "--result-file",
+        result_file,
+        "--fetcher",
+        args.fetcher,
+        "--concurrency",
+        str(args.concurrency),
+        "--processes",
+        str(args.processes),
+        "--rate-limit",
+        "0",
+        "--cpu-workers",
+        str(args.cpu_workers),
+        "--output-format",
+        args.output_format,
+        "--stats-file",
+        stats_file,
+        "--no-progress",
+        "--profile",
+    ]
+    if args.clean:
+        command += ["--clean-selectors-file", str(SELECTORS_FILE)]
+    if args.lean_browser:
+        command.append("--lean-browser")
+    started = time.perf_counter()
+    completed = subprocess.run(command, cwd=REPO_ROOT, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+    with open(stats_file) as f:
+        stats = json.load(f)
+    return {
+        "elapsed_s": elapsed,
+        "pages": stats["completed"],
+        "failed": stats["outcomes"].get("failed", 0),
+        "pages_per_s": stats["completed"] / elapsed,
+        "mb_per_s": stats["bytes"] / elapsed / (1024 * 1024),
+        "peak_rss_mb": peak_child_rss_mb(),
+        # Only reported for browser fetchers
+        "blocked_requests": stats["gauges"].get("blocked_requests"),
+        "browser_bytes": stats["gauges"].get("browser_bytes"),
+        "stages": stage_summary(result_file),
+    }
+
+
+def compare(report: dict, baseline: dict) -> None:
+    """Print the change of the headline numbers against a baseline report."""
+    print(f"compared with {baseline.get('revision') or 'baseline'}:")
+    for key, better in (
+        ("pages_per_s", "higher"),
+        ("peak_rss_mb", "lower"),
+        ("elapsed_s", "lower"),
+    ):
+        old, new = baseline["results"][key], report["results"][key]
+        change = (new - old) / old if old else 0.0
+        print(
+            f"  {key:<12} {old:9.1f} -> {new:9.1f}  ({change:+.1%}, {better} is better)"
+        )
+    for stage, timing in report["results"]["stages"].items():
+        old = baseline["results"]["stages"].get(stage)
+        if old:
+            print(
+                f"  {stage + ' avg':<12} {old['avg_ms']:7.1f}ms -> "
+                f"{timing['avg_ms']:7.1f}ms"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument(
+        "--sizes",
+        default=format_mix(DEFAULT_SIZE_MIX_KB),
+        help="Page size mix as probability:KiB pairs",
+    )
+    parser.add_argument(
+        "--latency",
+        default=format_mix(DEFAULT_LATENCY_MIX_MS),
+        help="Latency mix as probability:milliseconds pairs",
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--fetcher", default="http")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--cpu-workers", type=int, default=0)
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--output-format", default="files")
+    parser.add_argument(
+        "--lean-browser",
+        action="store_true",
+        help="Crawl with --lean-browser (compare browser bytes with and without)",
+    )
+    parser.add_argument(
+        "--no-clean",
+        dest="clean",
+        action="store_false",
+        help="Skip HTML cleaning with selectors_kentico.txt",
+    )
+    parser.add_argument("--report", help="Write the JSON report to this file")
+    parser.add_argument("--compare", help="Earlier JSON report to compare with")
+    args = parser.parse_args()
+
+    config = {
+        "pages": args.pages,
+        "sizes_kb": args.sizes,
+        "latency_ms": args.latency,
+        "seed": args.seed,
+        "fetcher": args.fetcher,
+        "concurrency": args.concurrency,
+        "cpu_workers": args.cpu_workers,
+        "processes": args.processes,
+        "output_format": args.output_format,
+        "clean": args.clean,
+        "lean_browser": args.lean_browser,
+    }
+    site = FixtureSite(
+        pages=args.pages,
+        size_mix_kb=parse_mix(args.sizes),
+        latency_mix_ms=parse_mix(args.latency),
+        seed=args.seed,
+        # Pages only load a stylesheet, font and image in the browser
+        assets=args.fetcher != "http",
+    )
+    print(
+        f"{args.pages} pages, {site.total_bytes / (1024 * 1024):.1f} MB, "
+        f"fetcher {args.fetcher}, concurrency {args.concurrency}, "
+        f"cpu workers {args.cpu_workers}, processes {args.processes}"
+    )
+    with site, tempfile.TemporaryDirectory() as workdir:
+        results = run_pipeline(site, args, workdir)
+
+    report = {
+        "version": REPORT_VERSION,
+        "revision": git_revision(),
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config,
+        "results": results,
+    }
+    print(
+        f"  {results['pages']} pages ({results['failed']} failed) in "
+        f"{results['elapsed_s']:.2f}s: {results['pages_per_s']:.1f} pages/s, "
+        f"{results['mb_per_s']:.2f} MB/s, peak RSS {results['peak_rss_mb']:.0f} MB"
+    )
+    if results["browser_bytes"] is not None:
+        print(
+            f"  browser received {results['browser_bytes'] / (1024 * 1024):.1f} MB, "
+            f"{results['blocked_requests']} requests blocked"
+        )
+    for stage, timing in results["stages"].items():
+        print(
+            f"  {stage:<8} avg {timing['avg_ms']:7.1f} ms  p95 {timing['p95_ms']:7.1f} ms"
+        )
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"report written to {args.report}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != config:
+            print("warning: baseline was run with a different configuration")
+        compare(report, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Compare the sliding-window scheduler with the old batch-and-sleep loop.
+
+Run with::
+
+    python -m benchmarks.bench_scheduling --pages 200 --concurrency 10
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import urllib.request
+from types import SimpleNamespace
+from typing import List
+
+from benchmarks.stub_server import StubServer, assign_latencies
+from crawl2md.crawler import Crawler, DEFAULT_BURST, DEFAULT_RATE_LIMIT
+
+LEGACY_BATCH_MIN_DELAY = 1.0
+LEGACY_BATCH_MAX_DELAY = 3.0
+
+
+class _StubBrowser:
+    """Stand-in for AsyncWebCrawler that fetches pages over plain HTTP."""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return None
+
+    async def arun(self, url, config=None):
+        def fetch():
+            with urllib.request.urlopen(url) as response:
+                return response.read().decode("utf-8")
+
+        html = await asyncio.to_thread(fetch)
+        return SimpleNamespace(success=True, html=html, markdown=html)
+
+
+class StubCrawler(Crawler):
+    def _new_browser(self):
+        return _StubBrowser()
+
+
+async def legacy_batches(crawler: Crawler, urls: List[str], delays: bool) -> int:
+    """The pre-sliding-window crawl_many: fixed batches plus sleeps."""
+    count = 0
+    step = crawler.max_concurrent
+    async with crawler:
+        for i in range(0, len(urls), step):
+            batch = [crawler.crawl_single(url) for url in urls[i : i + step]]
+            for completed in asyncio.as_completed(batch):
+                await completed
+                count += 1
+            if delays and i + step < len(urls):
+                await asyncio.sleep(
+                    random.uniform(LEGACY_BATCH_MIN_DELAY, LEGACY_BATCH_MAX_DELAY)
+                )
+    return count
+
+
+async def sliding_window(crawler: Crawler, urls: List[str]) -> int:
+    return len([r async for r in crawler.crawl_many(urls)])
+
+
+def run(pages: int, concurrency: int) -> None:
+    with StubServer(assign_latencies(pages)) as server:
+        urls = server.urls()
+        scenarios = [
+            (
+                "batches + 1-3s sleeps (old)",
+                lambda c: legacy_batches(c, urls, True),
+                None,
+            ),
+            ("batches, no sleeps", lambda c: legacy_batches(c, urls, False), None),
+            (
+                f"sliding window, {DEFAULT_RATE_LIMIT:g} req/s",
+                lambda c: sliding_window(c, urls),
+                DEFAULT_RATE_LIMIT,
+            ),
+            ("sliding window, unlimited", lambda c: sliding_window(c, urls), None),
+        ]
+        print(f"{pages} pages, concurrency {concurrency}")
+        for name, scenario, rate in scenarios:
+            crawler = StubCrawler(
+                max_concurrent=concurrency, rate_limit=rate, burst=DEFAULT_BURST
+            )
+            start = time.perf_counter()
+            count = asyncio.run(scenario(crawler))
+            elapsed = time.perf_counter() - start
+            print(f"  {name:<32} {elapsed:7.2f}s  {count / elapsed:7.1f} pages/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    run(args.pages, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
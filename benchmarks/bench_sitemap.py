@@ -0,0 +1,55 @@
+"""Micro-benchmark for streaming SitemapParser.iter_entries.
+
+Serves a sitemap index over the fixture site's child sitemaps (pages are
+not generated beyond what the sitemaps list) and measures entries parsed
+per second, with and without URL normalization.
+
+Run with::
+
+    python -m benchmarks.bench_sitemap --urls 100000
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.fixture_site import FixtureSite
+from crawl2md.dedup import normalize_url
+from crawl2md.sitemap import SitemapParser
+
+
+async def count_entries(parser: SitemapParser) -> int:
+    count = 0
+    async for _ in parser.iter_entries():
+        count += 1
+    return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--urls", type=int, default=100_000)
+    parser.add_argument("--per-sitemap", type=int, default=10_000)
+    args = parser.parse_args()
+
+    # Tiny pages and no latency: only the sitemaps matter here
+    site = FixtureSite(
+        pages=args.urls,
+        size_mix_kb=[(1.0, 0.0)],
+        latency_mix_ms=[(1.0, 0.0)],
+        urls_per_sitemap=args.per_sitemap,
+    )
+    with site:
+        print(f"{args.urls} URLs in sitemaps of {args.per_sitemap}")
+        for name, normalizer in (("plain", None), ("normalized", normalize_url)):
+            start = time.perf_counter()
+            count = asyncio.run(
+                count_entries(
+                    SitemapParser(site.sitemap_url, url_normalizer=normalizer)
+                )
+            )
+            elapsed = time.perf_counter() - start
+            print(f"  {name:<12} {elapsed:7.2f}s  {count / elapsed:10.0f} entries/s")
+
+
+if __name__ == "__main__":
+    main()
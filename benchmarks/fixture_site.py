@@ -0,0 +1,258 @@
+"""Local synthetic documentation site for end-to-end benchmarks.
+
+Serves a reproducible site of generated documentation pages, with a
+sitemap index split into child sitemaps, a robots.txt and per-page
+latencies and sizes drawn from configurable distributions.
+"""
+
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+
+# (probability, value) pairs
+DEFAULT_LATENCY_MIX_MS: List[Tuple[float, float]] = [
+    (0.80, 20.0),
+    (0.15, 150.0),
+    (0.05, 800.0),
+]
+DEFAULT_SIZE_MIX_KB: List[Tuple[float, float]] = [
+    (0.70, 20.0),
+    (0.25, 60.0),
+    (0.05, 250.0),
+]
+DEFAULT_URLS_PER_SITEMAP = 500
+PAGES_PER_SECTION = 50
+# Images shared by the pages when the site has assets
+FIGURES = 20
+CONTENT_TYPES = {
+    ".xml": "application/xml",
+    ".txt": "text/plain",
+    ".css": "text/css",
+    ".woff2": "font/woff2",
+    ".png": "image/png",
+}
+
+WORDS = (
+    "crawler sitemap markdown browser request response header cache index "
+    "page section config option value default timeout retry queue worker "
+    "process thread memory output format shard archive token limit rate"
+).split()
+
+
+def parse_mix(spec: str) -> List[Tuple[float, float]]:
+    """Parse "0.8:20,0.2:300" into [(0.8, 20.0), (0.2, 300.0)]."""
+    mix = []
+    for part in spec.split(","):
+        probability, value = part.split(":")
+        mix.append((float(probability), float(value)))
+    return mix
+
+
+def page_path(index: int) -> str:
+    """Path of the index-th page, grouped into sections like real docs."""
+    return f"/docs/section-{index // PAGES_PER_SECTION}/page-{index}"
+
+
+def make_page(
+    index: int, size_kb: float, pages: int, rng: random.Random, assets: bool = False
+) -> str:
+    """Build a documentation page of about ``size_kb`` KiB with site chrome.
+
+    The chrome (header, sidebar, footer, cookie banner) matches the
+    bundled selectors_kentico.txt, so HTML cleaning has work to do. With
+    ``assets``, the page also loads a stylesheet, a web font and an image,
+    as a browser rendering it would.
+    """
+    target = int(size_kb * 1024)
+    sidebar = "".join(
+        f"<li><a href='{page_path(i)}'>Page {i}</a></li>"
+        for i in range(max(0, index - 20), min(pages, index + 20))
+    )
+    head = (
+        f"<html><head><title>Page {index}</title>"
+        f"<link rel='canonical' href='{page_path(index)}'>"
+        + ("<link rel='stylesheet' href='/assets/site.css'>" if assets else "")
+        + "</head><body>"
+        "<div id='ht-headerbar'><nav>Docs header</nav></div>"
+        f"<div class='ht-layout-sidebar'><ul>{sidebar}</ul></div><main>"
+        f"<h1>Page {index}</h1>"
+        + (f"<img src='/assets/figure-{index % FIGURES}.png'>" if assets else "")
+    )
+    tail = (
+        "</main><footer>Site footer</footer>"
+        "<div id='cookie-banner'>We use cookies</div></body></html>"
+    )
+    body = []
+    size = len(head) + len(tail)
+    section = 0
+    while size < target:
+        words = " ".join(rng.choice(WORDS) for _ in range(60))
+        link = page_path(rng.randrange(pages))
+        block = (
+            f"<h2 id='s{section}'>Section {section}</h2>"
+            f"<p>{words} <a href='{link}'>related</a> <code>option_{section}</code>.</p>"
+            "<ul>"
+            + "".join(f"<li>{rng.choice(WORDS)} {j}</li>" for j in range(5))
+            + "</ul>"
+            f"<pre><code>config.{rng.choice(WORDS)} = {section}\n</code></pre>"
+        )
+        body.append(block)
+        size += len(block)
+        section += 1
+    return head + "".join(body) + tail
+
+
+def make_assets(rng: random.Random) -> Dict[str, bytes]:
+    """Build the stylesheet, web font and figures pages with assets load."""
+    rules = "".join(
+        f".{rng.choice(WORDS)}-{i} {{ margin: {i}px; color: #{i:06x}; }}\n"
+        for i in range(1500)
+    )
+    assets = {
+        "/assets/site.css": (
+            "@font-face { font-family: Docs; src: url(/assets/docs.woff2); }\n"
+            "body { font-family: Docs, sans-serif; }\n" + rules
+        ).encode("utf-8"),
+        "/assets/docs.woff2": rng.randbytes(60 * 1024),
+    }
+    for n in range(FIGURES):
+        assets[f"/assets/figure-{n}.png"] = rng.randbytes(120 * 1024)
+    return assets
+
+
+def draw(mix: List[Tuple[float, float]], rng: random.Random) -> float:
+    """Draw a value from a (probability, value) mix."""
+    return rng.choices([v for _, v in mix], weights=[p for p, _ in mix])[0]
+
+
+class FixtureSite:
+    """Threaded HTTP server for a synthetic documentation site.
+
+    ``/sitemap.xml`` is a sitemap index over ``/sitemaps/part-N.xml``
+    children (or a plain urlset with ``sitemap_index=False``). Pages are
+    generated up front, so serving them costs no CPU during a benchmark.
+    """
+
+    def __init__(
+        self,
+        pages: int = 500,
+        size_mix_kb: List[Tuple[float, float]] = DEFAULT_SIZE_MIX_KB,
+        latency_mix_ms: List[Tuple[float, float]] = DEFAULT_LATENCY_MIX_MS,
+        urls_per_sitemap: int = DEFAULT_URLS_PER_SITEMAP,
+        sitemap_index: bool = True,
+        seed: int = 42,
+        assets: bool = False,
+    ):
+        rng = random.Random(seed)
+        self.pages = pages
+        self.urls_per_sitemap = urls_per_sitemap
+        self.sitemap_index = sitemap_index
+        self.documents: Dict[str, bytes] = {}
+        self.latencies: Dict[str, float] = {}
+        for index in range(pages):
+            path = page_path(index)
+            html = make_page(index, draw(size_mix_kb, rng), pages, rng, assets)
+            self.documents[path] = html.encode("utf-8")
+            self.latencies[path] = draw(latency_mix_ms, rng) / 1000
+        self.documents["/robots.txt"] = b"User-agent: *\nAllow: /\n"
+        if assets:
+            self.documents.update(make_assets(random.Random(seed + 1)))
+
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                body = site.documents.get(path)
+                if body is None and path.endswith(".xml"):
+                    body = site.sitemap(path)
+                if body is None:
+                    self.send_error(404)
+                    return
+                time.sleep(site.latencies.get(path, 0.0))
+                self.send_response(200)
+                suffix = path[path.rfind(".") :] if "." in path else ""
+                content_type = CONTENT_TYPES.get(suffix, "text/html; charset=utf-8")
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_HEAD(self):
+                self.send_response(200 if self.path in site.documents else 404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def sitemap_url(self) -> str:
+        return f"{self.base_url}/sitemap.xml"
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(
+            len(body)
+            for path, body in self.documents.items()
+            if path.startswith("/docs")
+        )
+
+    def page_urls(self) -> List[str]:
+        return [self.base_url + page_path(i) for i in range(self.pages)]
+
+    def sitemap(self, path: str):
+        """Render /sitemap.xml or a /sitemaps/part-N.xml child, or None."""
+        urls = self.page_urls()
+        parts = range(0, len(urls), self.urls_per_sitemap)
+        if path == "/sitemap.xml" and self.sitemap_index:
+            children = "".join(
+                f"<sitemap><loc>{self.base_url}/sitemaps/part-{n}.xml</loc></sitemap>"
+                for n in range(len(parts))
+            )
+            return (
+                '<?xml version="1.0" encoding="UTF-8"?>'
+                '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                f"{children}</sitemapindex>"
+            ).encode("utf-8")
+        if path == "/sitemap.xml":
+            chunk = urls
+        elif path.startswith("/sitemaps/part-"):
+            try:
+                n = int(path[len("/sitemaps/part-") : -len(".xml")])
+            except ValueError:
+                return None
+            if n >= len(parts):
+                return None
+            chunk = urls[n * self.urls_per_sitemap : (n + 1) * self.urls_per_sitemap]
+        else:
+            return None
+        entries = "".join(
+            f"<url><loc>{url}</loc><lastmod>2025-01-01</lastmod></url>" for url in chunk
+        )
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+            f"{entries}</urlset>"
+        ).encode("utf-8")
+
+    def __enter__(self) -> "FixtureSite":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,71 @@
+"""Local stub HTTP server with configurable page latencies."""
+
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+# (probability, seconds) pairs: mostly fast pages with a slow tail
+DEFAULT_LATENCY_MIX: List[Tuple[float, float]] = [
+    (0.80, 0.05),
+    (0.15, 0.30),
+    (0.05, 1.50),
+]
+
+
+def assign_latencies(
+    pages: int, mix: List[Tuple[float, float]] = DEFAULT_LATENCY_MIX, seed: int = 42
+) -> Dict[str, float]:
+    """Assign a latency from the mix to each page path, reproducibly."""
+    rng = random.Random(seed)
+    weights = [p for p, _ in mix]
+    values = [v for _, v in mix]
+    return {f"/page/{i}": rng.choices(values, weights=weights)[0] for i in range(pages)}
+
+
+class StubServer:
+    """Threaded HTTP server serving HTML pages after a delay.
+
+    Pages are a tiny generated document unless ``page_html`` is given.
+    """
+
+    def __init__(self, latencies: Dict[str, float], page_html: Optional[str] = None):
+        self.latencies = latencies
+        latencies_ref = latencies
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(latencies_ref.get(self.path, 0.0))
+                body = (
+                    page_html
+                    or f"<html><body><h1>{self.path}</h1><p>Content</p></body></html>"
+                ).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def urls(self) -> List[str]:
+        return [self.base_url + path for path in self.latencies]
+
+    def __enter__(self) -> "StubServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,390 @@
+"""Sharded archive output module: JSONL, zstd-compressed JSONL and tar.
+
+With many thousands of pages, one small file per URL strains inodes,
+``rsync`` and ingestion. The writers here append pages to a few large
+shards instead, rotated by size, and keep an index mapping each URL to
+its shard, byte offset, length and page path for random access. They
+implement the same ``save_markdown``/``relative_link``/``plan``/``close``
+interface as FileHandler, so OutputWriter can use either.
+"""
+
+import csv
+import glob
+import json
+import os
+import re
+import tarfile
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from crawl2md.cleaner import MarkdownCleaner
+from crawl2md.file_handler import FileHandler
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+
+OUTPUT_FILES = "files"
+OUTPUT_JSONL = "jsonl"
+OUTPUT_JSONL_ZST = "jsonl.zst"
+OUTPUT_TAR = "tar"
+OUTPUT_FORMATS = (OUTPUT_FILES, OUTPUT_JSONL, OUTPUT_JSONL_ZST, OUTPUT_TAR)
+DEFAULT_OUTPUT_FORMAT = OUTPUT_FILES
+DEFAULT_SHARD_SIZE_MB = 100
+ZSTD_LEVEL = 3
+SHARD_PREFIX = "pages"
+INDEX_FILENAME = "index.csv"
+INDEX_HEADER = ["url", "shard", "offset", "length", "path"]
+TAR_BLOCK = 512
+
+_SHARD_NUMBER_RE = re.compile(rf"{SHARD_PREFIX}-(\d+)\.")
+
+
+class ShardWriter:
+    """Append pages to size-rotated shards and index them by URL.
+
+    Encoding (and compression) runs in the calling thread; only the append
+    to the current shard and the index is serialized, so OutputWriter's
+    threads still compress in parallel. Each run starts a new shard after
+    the highest existing one and appends to the index, where the last
+    entry of a URL wins. This base class writes plain JSONL, one page per
+    line.
+    """
+
+    extension = OUTPUT_JSONL
+
+    def __init__(
+        self,
+        base_url: str,
+        output_dir: str = "./output",
+        shard_size_mb: float = DEFAULT_SHARD_SIZE_MB,
+    ):
+        """Initialize the writer.
+
+        Args:
+            base_url: Base URL of the website, used to derive page paths
+            output_dir: Directory for the shards and the index
+            shard_size_mb: Size in MB after which a new shard is started
+        """
+        self.paths = FileHandler(base_url, output_dir)
+        self.output_dir = output_dir
+        self.max_shard_bytes = int(shard_size_mb * 1024 * 1024)
+        self.shards_written = 0
+        self._cleaner = MarkdownCleaner()
+        self._lock = threading.Lock()
+        self._shard_number = self._last_shard_number()
+        self._shard = None
+        self._shard_name: Optional[str] = None
+        self._shard_bytes = 0
+        self._index = None
+        self._index_writer = None
+
+    @property
+    def renamed(self) -> int:
+        """URLs given a suffixed path, as FileHandler counts them."""
+        return self.paths.renamed
+
+    def relative_link(self, from_url: str, to_url: str) -> str:
+        """Return the relative path between two pages, as FileHandler does."""
+        return self.paths.relative_link(from_url, to_url)
+
+    def plan(self, urls) -> None:
+        """Assign page paths to URLs, as FileHandler does."""
+        self.paths.plan(urls)
+
+    def assign(self, url: str, path: str) -> None:
+        """Use a path assigned elsewhere, as FileHandler does."""
+        self.paths.assign(url, path)
+
+    def take_assigned(self) -> List[Tuple[str, str]]:
+        """Return the paths assigned since the last call, as FileHandler does."""
+        return self.paths.take_assigned()
+
+    def make_directories(self) -> None:
+        """Nothing to create: pages go into shards."""
+
+    def save_markdown(self, url: str, markdown: str, frontmatter: str = "") -> str:
+        """Append a page to the current shard and index it.
+
+        Safe to call from several threads.
+
+        Args:
+            url: Source URL
+            markdown: Markdown content, with its frontmatter unless that is
+                given separately
+            frontmatter: Optional frontmatter header of the page
+
+        Returns:
+            Location of the page, as ``<shard>@<offset>``
+
+        Raises:
+            OSError: If unable to write the shard or the index
+        """
+        chunks, data_start, data_length = self._encode(url, markdown, frontmatter)
+        record_length = sum(len(chunk) for chunk in chunks)
+        with self._lock:
+            if (
+                self._shard is not None
+                and self._shard_bytes
+                and self._shard_bytes + record_length + len(self._trailer())
+                > self.max_shard_bytes
+            ):
+                self._close_shard()
+            if self._shard is None:
+                self._open_shard()
+            offset = self._shard_bytes + data_start
+            self._shard.writelines(chunks)
+            self._shard.flush()
+            self._shard_bytes += record_length
+            self._index_writer.writerow(
+                [
+                    url,
+                    self._shard_name,
+                    offset,
+                    data_length,
+                    self.paths.url_to_path(url),
+                ]
+            )
+            self._index.flush()
+            return f"{self._shard_name}@{offset}"
+
+    def close(self) -> None:
+        """Finish the current shard and close the index."""
+        with self._lock:
+            self._close_shard()
+            if self._index is not None:
+                self._index.close()
+                self._index = None
+
+    def _encode(
+        self, url: str, markdown: str, frontmatter: str = ""
+    ) -> Tuple[List[bytes], int, int]:
+        """Return the chunks to append, and where the indexed data lies in them.
+
+        Chunks are written one after the other rather than joined, to avoid
+        another copy of the page.
+        """
+        if frontmatter:
+            metadata = self._cleaner.split_metadata(frontmatter)[0]
+        else:
+            metadata, markdown = self._cleaner.split_metadata(markdown)
+        line = json.dumps(
+            {
+                "url": url,
+                "path": self.paths.url_to_path(url),
+                "metadata": metadata,
+                "markdown": markdown,
+            },
+            ensure_ascii=False,
+        ).encode("utf-8")
+        return [line, b"\n"], 0, len(line) + 1
+
+    def _trailer(self) -> bytes:
+        """Return the bytes that end a shard."""
+        return b""
+
+    def _last_shard_number(self) -> int:
+        numbers = [
+            int(match.group(1))
+            for path in glob.glob(os.path.join(self.output_dir, f"{SHARD_PREFIX}-*"))
+            for match in [_SHARD_NUMBER_RE.match(os.path.basename(path))]
+            if match
+        ]
+        return max(numbers, default=-1)
+
+    def _open_shard(self) -> None:
+        os.makedirs(self.output_dir, exist_ok=True)
+        if self._index is None:
+            index_path = os.path.join(self.output_dir, INDEX_FILENAME)
+            new_index = not os.path.exists(index_path)
+            self._index = open(index_path, "a", newline="", encoding="utf-8")
+            self._index_writer = csv.writer(self._index)
+            if new_index:
+                self._index_writer.writerow(INDEX_HEADER)
+        self._shard_number += 1
+        self._shard_name = f"{SHARD_PREFIX}-{self._shard_number:05d}.{self.extension}"
+        self._shard = open(os.path.join(self.output_dir, self._shard_name), "xb")
+        self._shard_bytes = 0
+        self.shards_written += 1
+
+    def _close_shard(self) -> None:
+        if self._shard is None:
+            return
+        self._shard.write(self._trailer())
+        self._shard.close()
+        self._shard = None
+
+
+class ZstdShardWriter(ShardWriter):
+    """Write JSONL shards compressed with zstd.
+
+    Every page is compressed as its own zstd frame. Concatenated frames are
+    a valid ``.zst`` stream (``zstd -dc`` yields the plain JSONL), while the
+    indexed offset of a frame can be decompressed on its own.
+    """
+
+    extension = OUTPUT_JSONL_ZST
+
+    def __init__(self, *args, level: int = ZSTD_LEVEL, **kwargs):
+        """Initialize the writer.
+
+        Args:
+            *args: Passed to ShardWriter
+            level: zstd compression level
+            **kwargs: Passed to ShardWriter
+
+        Raises:
+            RuntimeError: If the zstandard package is not installed
+        """
+        if zstandard is None:
+            raise RuntimeError(
+                "jsonl.zst output requires the zstandard package "
+                "(pip install 'crawl2md[zstd]')"
+            )
+        super().__init__(*args, **kwargs)
+        self.level = level
+        # Compressors are not thread-safe; each writer thread gets its own
+        self._local = threading.local()
+
+    def _encode(
+        self, url: str, markdown: str, frontmatter: str = ""
+    ) -> Tuple[List[bytes], int, int]:
+        chunks, _, _ = super()._encode(url, markdown, frontmatter)
+        compressor = getattr(self._local, "compressor", None)
+        if compressor is None:
+            compressor = self._local.compressor = zstandard.ZstdCompressor(
+                level=self.level
+            )
+        # The content size in the frame header lets readers decompress it
+        # in one call
+        stream = compressor.compressobj(size=sum(len(chunk) for chunk in chunks))
+        frame = [stream.compress(chunk) for chunk in chunks]
+        frame.append(stream.flush())
+        return frame, 0, sum(len(part) for part in frame)
+
+
+class TarShardWriter(ShardWriter):
+    """Write pages as members of uncompressed tar shards.
+
+    Members are named after the page paths, so extracting the shards gives
+    the same tree as the per-file output. Shards stay uncompressed so the
+    indexed offset points straight at a member's markdown.
+    """
+
+    extension = OUTPUT_TAR
+
+    def _encode(
+        self, url: str, markdown: str, frontmatter: str = ""
+    ) -> Tuple[List[bytes], int, int]:
+        head = frontmatter.encode("utf-8")
+        data = markdown.encode("utf-8")
+        size = len(head) + len(data)
+        info = tarfile.TarInfo(self.paths.url_to_path(url))
+        info.size = size
+        info.mtime = int(time.time())
+        info.mode = 0o644
+        info.pax_headers = {"crawl2md.url": url}
+        header = info.tobuf(format=tarfile.PAX_FORMAT)
+        padding = b"\0" * (-size % TAR_BLOCK)
+        return [header, head, data, padding], len(header), size
+
+    def _trailer(self) -> bytes:
+        return b"\0" * (2 * TAR_BLOCK)
+
+
+_WRITERS = {
+    OUTPUT_JSONL: ShardWriter,
+    OUTPUT_JSONL_ZST: ZstdShardWriter,
+    OUTPUT_TAR: TarShardWriter,
+}
+
+
+def open_output(
+    output_format: str,
+    base_url: str,
+    output_dir: str,
+    shard_size_mb: float = DEFAULT_SHARD_SIZE_MB,
+):
+    """Create the output backend for a format.
+
+    Args:
+        output_format: One of OUTPUT_FORMATS
+        base_url: Base URL of the website
+        output_dir: Output directory
+        shard_size_mb: Shard rotation size, for the archive formats
+
+    Returns:
+        FileHandler for "files", otherwise a ShardWriter
+
+    Raises:
+        ValueError: If the format is unknown
+    """
+    if output_format == OUTPUT_FILES:
+        return FileHandler(base_url, output_dir)
+    if output_format not in _WRITERS:
+        raise ValueError(f"Unknown output format: {output_format}")
+    return _WRITERS[output_format](base_url, output_dir, shard_size_mb=shard_size_mb)
+
+
+class ArchiveReader:
+    """Look pages up by URL in archive output, using the index."""
+
+    def __init__(self, output_dir: str):
+        """Load the index of an archive output directory.
+
+        Args:
+            output_dir: Directory holding the shards and the index
+        """
+        self.output_dir = output_dir
+        self._cleaner = MarkdownCleaner()
+        self._entries: Dict[str, Tuple[str, int, int, Optional[str]]] = {}
+        with open(
+            os.path.join(output_dir, INDEX_FILENAME), newline="", encoding="utf-8"
+        ) as f:
+            for row in csv.DictReader(f):
+                self._entries[row["url"]] = (
+                    row["shard"],
+                    int(row["offset"]),
+                    int(row["length"]),
+                    row["path"],
+                )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._entries
+
+    def get(self, url: str) -> Optional[dict]:
+        """Read one page.
+
+        Args:
+            url: Page URL
+
+        Returns:
+            Dict with url, path, metadata and markdown, or None if the URL
+            is not in the index
+        """
+        entry = self._entries.get(url)
+        if entry is None:
+            return None
+        shard, offset, length, path = entry
+        with open(os.path.join(self.output_dir, shard), "rb") as f:
+            f.seek(offset)
+            data = f.read(length)
+        if shard.endswith(f".{OUTPUT_TAR}"):
+            metadata, content = self._cleaner.split_metadata(data.decode("utf-8"))
+            return {
+                "url": url,
+                "path": path,
+                "metadata": metadata,
+                "markdown": content,
+            }
+        if shard.endswith(f".{OUTPUT_JSONL_ZST}"):
+            if zstandard is None:
+                raise RuntimeError("Reading jsonl.zst output requires zstandard")
+            data = zstandard.ZstdDecompressor().decompress(data)
+        return json.loads(data)
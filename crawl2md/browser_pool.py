@@ -0,0 +1,241 @@
+"""Browser pool module for reusing crawl4ai browsers across a run."""
+
+import asyncio
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Iterable, List, Optional, Set
+
+import psutil
+from crawl4ai import AsyncWebCrawler
+
+
+DEFAULT_BROWSERS = 1
+DEFAULT_MAX_PAGES_PER_BROWSER = 500
+
+
+class _BrowserSlot:
+    """A single long-lived browser and its usage counters."""
+
+    def __init__(self, factory: Callable[[], Any]):
+        self.factory = factory
+        self.crawler = None
+        self.active = 0
+        self.pages = 0
+        self.retiring = False
+        # Processes started by this browser's launch (the Playwright driver,
+        # which runs the browser), see browser_memory_mb
+        self.pids: Set[int] = set()
+        self._stack: Optional[AsyncExitStack] = None
+
+    async def launch(self) -> None:
+        before = _child_pids()
+        self._stack = AsyncExitStack()
+        self.crawler = await self._stack.enter_async_context(self.factory())
+        self.pids = _launched_processes(before)
+        self.pages = 0
+
+    async def close(self) -> None:
+        if self._stack is not None:
+            stack, self._stack = self._stack, None
+            self.crawler = None
+            self.pids = set()
+            await stack.aclose()
+
+
+class BrowserPool:
+    """Hand out pages (tabs) from a fixed set of long-lived browsers.
+
+    Browsers are launched once per run and recycled after serving
+    ``max_pages_per_browser`` pages, or when the combined memory of the
+    browser processes exceeds ``max_memory_mb``.
+    """
+
+    def __init__(
+        self,
+        browsers: int = DEFAULT_BROWSERS,
+        pages_per_browser: int = 10,
+        max_pages_per_browser: Optional[int] = DEFAULT_MAX_PAGES_PER_BROWSER,
+        max_memory_mb: Optional[float] = None,
+        crawler_factory: Callable[[], Any] = AsyncWebCrawler,
+    ):
+        """Initialize the pool.
+
+        Args:
+            browsers: Number of browsers to keep open
+            pages_per_browser: Maximum concurrent pages per browser
+            max_pages_per_browser: Restart a browser after this many pages
+                (None disables page-count recycling)
+            max_memory_mb: Restart browsers when their combined RSS exceeds
+                this many megabytes (None disables memory recycling)
+            crawler_factory: Callable returning a new, unstarted
+                AsyncWebCrawler (used for every launch)
+        """
+        if browsers < 1:
+            raise ValueError("browsers must be at least 1")
+        if pages_per_browser < 1:
+            raise ValueError("pages_per_browser must be at least 1")
+        self.browsers = browsers
+        self.pages_per_browser = pages_per_browser
+        self.max_pages_per_browser = max_pages_per_browser
+        self.max_memory_mb = max_memory_mb
+        self.crawler_factory = crawler_factory
+        self.launches = 0
+        self.pages_crawled = 0
+        self._slots: List[_BrowserSlot] = []
+        self._cond: Optional[asyncio.Condition] = None
+
+    @property
+    def started(self) -> bool:
+        """Whether the pool currently has browsers running."""
+        return bool(self._slots)
+
+    async def start(self) -> None:
+        """Launch all browsers in the pool."""
+        if self.started:
+            return
+        self._cond = asyncio.Condition()
+        slots = [_BrowserSlot(self.crawler_factory) for _ in range(self.browsers)]
+        try:
+            for slot in slots:
+                await slot.launch()
+                self.launches += 1
+        except BaseException:
+            for slot in slots:
+                await slot.close()
+            raise
+        self._slots = slots
+
+    async def close(self) -> None:
+        """Close all browsers in the pool."""
+        slots, self._slots = self._slots, []
+        for slot in slots:
+            await slot.close()
+
+    async def __aenter__(self) -> "BrowserPool":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    @asynccontextmanager
+    async def page(self) -> AsyncIterator[AsyncWebCrawler]:
+        """Borrow a browser for one page crawl.
+
+        Yields:
+            The AsyncWebCrawler of the least-loaded browser
+        """
+        if not self.started:
+            raise RuntimeError("BrowserPool is not started")
+        slot = await self._checkout()
+        try:
+            yield slot.crawler
+        finally:
+            await self._checkin(slot)
+
+    def stats(self) -> dict:
+        """Return browser launch and page counters for this run."""
+        return {
+            "browsers": self.browsers,
+            "launches": self.launches,
+            "pages": self.pages_crawled,
+        }
+
+    async def _checkout(self) -> _BrowserSlot:
+        async with self._cond:
+            while True:
+                if not self._slots:
+                    raise RuntimeError("BrowserPool has no running browsers")
+                slot = self._pick_slot()
+                if slot is not None:
+                    slot.active += 1
+                    return slot
+                await self._cond.wait()
+
+    async def _checkin(self, slot: _BrowserSlot) -> None:
+        async with self._cond:
+            slot.active -= 1
+            slot.pages += 1
+            self.pages_crawled += 1
+            if not slot.retiring and self._needs_recycle(slot):
+                slot.retiring = True
+            restart = slot.retiring and slot.active == 0
+            if not restart:
+                self._cond.notify_all()
+        if not restart:
+            return
+        try:
+            await slot.close()
+            if slot in self._slots:
+                await slot.launch()
+                self.launches += 1
+        finally:
+            async with self._cond:
+                slot.retiring = False
+                if slot.crawler is None and slot in self._slots:
+                    self._slots.remove(slot)
+                self._cond.notify_all()
+
+    def _pick_slot(self) -> Optional[_BrowserSlot]:
+        candidates = [
+            s
+            for s in self._slots
+            if not s.retiring and s.active < self.pages_per_browser
+        ]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda s: s.active)
+
+    def _needs_recycle(self, slot: _BrowserSlot) -> bool:
+        if self.max_pages_per_browser and slot.pages >= self.max_pages_per_browser:
+            return True
+        if self.max_memory_mb:
+            pids = {pid for s in self._slots for pid in s.pids}
+            return browser_memory_mb(pids) > self.max_memory_mb
+        return False
+
+
+def _child_pids() -> Set[int]:
+    return {child.pid for child in psutil.Process().children()}
+
+
+def _launched_processes(before: Set[int]) -> Set[int]:
+    """Return the PIDs of this process's children started since ``before``.
+
+    Python children are left out: those are conversion workers
+    (--cpu-workers), which may start while a browser is launching.
+    """
+    own = psutil.Process()
+    python = own.exe()
+    pids = set()
+    for child in own.children():
+        if child.pid in before:
+            continue
+        try:
+            if child.exe() == python:
+                continue
+        except psutil.Error:
+            continue
+        pids.add(child.pid)
+    return pids
+
+
+def browser_memory_mb(pids: Iterable[int]) -> float:
+    """Return the combined RSS of processes and their descendants in megabytes.
+
+    Args:
+        pids: Processes launched for the browsers; the browser and its
+            renderers run under them
+    """
+    total = 0
+    for pid in pids:
+        try:
+            root = psutil.Process(pid)
+            processes = [root, *root.children(recursive=True)]
+        except psutil.Error:
+            continue
+        for process in processes:
+            try:
+                total += process.memory_info().rss
+            except psutil.Error:
+                continue
+    return total / (1024 * 1024)
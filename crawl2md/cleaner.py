@@ -2,7 +2,10 @@
 
 import re
 from datetime import datetime
-from typing import Optional
+from typing import Dict, Optional, Tuple
+
+
+_FRONTMATTER_RE = re.compile(r"---\n(.*?)\n?---\n\n?", re.DOTALL)
 
 
 class MarkdownCleaner:
@@ -24,27 +27,62 @@ class MarkdownCleaner:
         #     markdown = self.convert_links_to_relative(markdown, url)
         return markdown
 
-    def add_metadata(self, markdown: str, source_url: str) -> str:
+    def add_metadata(
+        self, markdown: str, source_url: str, duplicate_of: Optional[str] = None
+    ) -> str:
         """Prepend frontmatter metadata to markdown.
 
         Args:
             markdown: Markdown content
             source_url: Original URL that was crawled
+            duplicate_of: URL holding the same content, for pointer files
 
         Returns:
             Markdown with frontmatter header containing metadata
         """
-        from datetime import datetime
+        return self.frontmatter(source_url, duplicate_of) + markdown
+
+    def frontmatter(self, source_url: str, duplicate_of: Optional[str] = None) -> str:
+        """Return the frontmatter header that add_metadata prepends.
+
+        Output backends accept it separately from the content and write
+        both in turn, which saves a full copy of large pages.
 
+        Args:
+            source_url: Original URL that was crawled
+            duplicate_of: URL holding the same content, for pointer files
+
+        Returns:
+            Frontmatter block, ending with a blank line
+        """
         scrape_date = datetime.now().strftime("%Y-%m-%d")
 
-        frontmatter = f"""---
+        duplicate_line = f"duplicate_of: {duplicate_of}\n" if duplicate_of else ""
+        return f"""---
 source: {source_url}
 scrape_date: {scrape_date}
----
+{duplicate_line}---
 
 """
-        return frontmatter + markdown
+
+    def split_metadata(self, markdown: str) -> Tuple[Dict[str, str], str]:
+        """Split frontmatter written by add_metadata from the content.
+
+        Args:
+            markdown: Markdown, optionally starting with frontmatter
+
+        Returns:
+            Tuple of (frontmatter fields, markdown content)
+        """
+        match = _FRONTMATTER_RE.match(markdown)
+        if not match:
+            return {}, markdown
+        metadata = {}
+        for line in match.group(1).splitlines():
+            key, sep, value = line.partition(":")
+            if sep:
+                metadata[key.strip()] = value.strip()
+        return metadata, markdown[match.end() :]
 
     def remove_headers_footers_menus(self, markdown: str) -> str:
         """Remove headers, footers, and navigation menus.
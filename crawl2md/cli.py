@@ -1,19 +1,622 @@
 """CLI module for crawl2md."""
 
 import asyncio
-import csv
+import cProfile
+import functools
+import hashlib
+import os
+import re
+import sys
+import time
+from typing import AsyncIterator, Callable, Dict, NamedTuple, Optional
 from urllib.parse import urlparse
 
 import click
 
-from crawl2md.crawler import Crawler, MAX_CONCURRENT_CRAWLS
+from crawl2md.archive import (
+    DEFAULT_OUTPUT_FORMAT,
+    DEFAULT_SHARD_SIZE_MB,
+    INDEX_FILENAME,
+    OUTPUT_FILES,
+    OUTPUT_FORMATS,
+    open_output,
+)
+from crawl2md.browser_pool import DEFAULT_BROWSERS, DEFAULT_MAX_PAGES_PER_BROWSER
+from crawl2md.crawler import (
+    Crawler,
+    DEFAULT_BURST,
+    DEFAULT_RATE_LIMIT,
+    MAX_CONCURRENT_CRAWLS,
+)
+from crawl2md.dedup import DEFAULT_IGNORED_PARAMS, ContentIndex, normalize_url
+from crawl2md.discovery import LinkDiscovery, LinkQueue
 from crawl2md.file_handler import FileHandler
-from crawl2md.html_cleaner import HtmlCleaner
-from crawl2md.sitemap import SitemapParser
+from crawl2md.frontier import UrlFilter, prioritize as prioritize_entries
+from crawl2md.distributed import (
+    Coordinator,
+    Worker,
+    default_worker_id,
+)
+from crawl2md.host_scheduler import host_of
+from crawl2md.html_cache import (
+    DEFAULT_CACHE_MAX_MB,
+    DEFAULT_CACHE_TTL_HOURS,
+    HtmlCache,
+)
+from crawl2md.html_cleaner import DEFAULT_PARSER, PARSERS, HtmlCleaner
+from crawl2md.memory import DEFAULT_MAX_INFLIGHT_MB, peak_rss_mb
+from crawl2md.metrics import (
+    DEFAULT_STATS_INTERVAL,
+    METRICS_HOST,
+    PHASES,
+    Metrics,
+    MetricsReporter,
+    ProgressDisplay,
+    format_bytes,
+    format_duration,
+)
+from crawl2md.http_fetcher import (
+    DEFAULT_FETCHER,
+    DEFAULT_JS_MARKERS,
+    DEFAULT_MIN_TEXT_LENGTH,
+    FETCHER_BROWSER,
+    FETCHER_HTTP,
+    FETCHERS,
+    HttpFetcher,
+)
+from crawl2md.profiling import (
+    TIMING_COLUMNS,
+    StageProfile,
+    merge_profiles,
+    timed,
+    timing_row,
+)
+from crawl2md.reprocess import reprocess as reprocess_pages
+from crawl2md.resource_blocking import (
+    DEFAULT_PAGE_TIMEOUT,
+    DEFAULT_WAIT_UNTIL,
+    LEAN_BLOCKED_PATTERNS,
+    LEAN_BLOCKED_TYPES,
+    WAIT_UNTIL,
+    ResourceBlocker,
+    parse_resource_types,
+)
+from crawl2md.sharding import SHARD_ITEMS_AHEAD, SHARD_POLL_INTERVAL, ProcessShards
+from crawl2md.sitemap import SitemapEntry, SitemapParser
+from crawl2md.retry import (
+    DEFAULT_BASE_DELAY,
+    ERROR_PERMANENT,
+    DEFAULT_MAX_ATTEMPTS,
+    DEFAULT_RETRY_BUDGET,
+    RetryPolicy,
+)
+from crawl2md.state import STATE_FILENAME, CrawlState
+from crawl2md.work_queue import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_LEASE_SECONDS,
+    DEFAULT_MAX_LEASES,
+    DEFAULT_QUEUE_NAME,
+    QUEUE_FILENAME,
+    open_queue,
+)
+from crawl2md.writer import OutputWriter
 from crawl2md.cleaner import MarkdownCleaner
 
+# URLs registered in the state store per transaction while streaming
+STATE_BATCH_SIZE = 500
+# URL paths --discover reads as a sitemap rather than a start page
+SITEMAP_SUFFIXES = (".xml", ".xml.gz")
+DEFAULT_COMMAND = "crawl"
+
+
+def _build_crawler(
+    max_concurrent: int,
+    fetcher: str,
+    max_attempts: int,
+    retry_base_delay: float,
+    retry_budget: float,
+    min_text_length: int,
+    js_markers: tuple,
+    html_cache_dir: Optional[str] = None,
+    cache_ttl_hours: float = DEFAULT_CACHE_TTL_HOURS,
+    cache_max_mb: float = DEFAULT_CACHE_MAX_MB,
+    block_resources: tuple = (),
+    block_urls: tuple = (),
+    **options,
+) -> Crawler:
+    """Build the crawl command's Crawler from option values.
+
+    Module-level, so that a functools.partial of it can be sent to the
+    processes of a --processes crawl.
+    """
+    return Crawler(
+        html_cache=HtmlCache(
+            html_cache_dir,
+            max_size_mb=cache_max_mb or None,
+            ttl_seconds=cache_ttl_hours * 3600,
+        )
+        if html_cache_dir
+        else None,
+        resource_blocker=ResourceBlocker(block_resources, block_urls)
+        if block_resources or block_urls
+        else None,
+        max_concurrent=max_concurrent,
+        retry_policy=RetryPolicy(
+            max_attempts=max_attempts,
+            base_delay=retry_base_delay,
+            budget=retry_budget,
+        ),
+        fetcher=fetcher,
+        http_fetcher=HttpFetcher(
+            max_connections=max_concurrent,
+            min_text_length=min_text_length,
+            js_markers=js_markers or DEFAULT_JS_MARKERS,
+        )
+        if fetcher != FETCHER_BROWSER
+        else None,
+        **options,
+    )
+
+
+def _resource_types_option(ctx, param, value: str) -> tuple:
+    """Click callback turning --block-resources into a tuple of types."""
+    try:
+        return parse_resource_types(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+
+class CrawlerOptions(NamedTuple):
+    """Crawler option values shared by the crawl and worker commands.
+
+    ``block_resources`` and ``block_urls`` include the --lean-browser
+    blocks.
+    """
+
+    concurrency: int
+    rate_limit: float
+    burst: int
+    per_host_concurrency: int
+    per_host_rate: float
+    adaptive: bool
+    respect_crawl_delay: bool
+    max_attempts: int
+    retry_base_delay: float
+    retry_budget: float
+    fetcher: str
+    min_text_length: int
+    js_markers: tuple
+    browsers: int
+    max_pages_per_browser: int
+    max_browser_memory: Optional[float]
+    block_resources: tuple
+    block_urls: tuple
+    lean_browser: bool
+    wait_until: str
+    page_timeout: float
+    cpu_workers: int
+    max_inflight_mb: float
+    clean_selectors_file: Optional[str]
+    html_parser: str
+    html_cache_dir: Optional[str]
+    cache_ttl: float
+    cache_max_mb: float
+
+
+_CRAWLER_OPTIONS = (
+    click.option(
+        "--concurrency",
+        default=MAX_CONCURRENT_CRAWLS,
+        help=f"Max concurrent crawls (default: {MAX_CONCURRENT_CRAWLS})",
+    ),
+    click.option(
+        "--rate-limit",
+        default=DEFAULT_RATE_LIMIT,
+        help="Max requests started per second, 0 to disable "
+        f"(default: {DEFAULT_RATE_LIMIT})",
+    ),
+    click.option(
+        "--burst",
+        default=DEFAULT_BURST,
+        help=f"Requests allowed back to back before rate limiting (default: {DEFAULT_BURST})",
+    ),
+    click.option(
+        "--per-host-concurrency",
+        default=0,
+        help="Max concurrent requests to one host, 0 for the --concurrency value "
+        "(default: 0)",
+    ),
+    click.option(
+        "--per-host-rate",
+        default=0.0,
+        help="Max requests started per second per host, 0 to disable (default: 0)",
+    ),
+    click.option(
+        "--adaptive/--no-adaptive",
+        default=True,
+        help="Adapt each host's concurrency: back off on 429/503 or rising "
+        "latency, ramp up while it stays healthy (default: on)",
+    ),
+    click.option(
+        "--respect-crawl-delay/--ignore-crawl-delay",
+        default=True,
+        help="Honor robots.txt Crawl-delay of each host (default: on)",
+    ),
+    click.option(
+        "--max-attempts",
+        default=DEFAULT_MAX_ATTEMPTS,
+        help="Attempts per URL for transient failures (timeouts, 429, 5xx, "
+        f"browser crashes), 1 to disable retries (default: {DEFAULT_MAX_ATTEMPTS})",
+    ),
+    click.option(
+        "--retry-base-delay",
+        default=DEFAULT_BASE_DELAY,
+        help="Backoff of the first retry in seconds, doubled per retry, with "
+        f"jitter (default: {DEFAULT_BASE_DELAY})",
+    ),
+    click.option(
+        "--retry-budget",
+        default=DEFAULT_RETRY_BUDGET,
+        help="Retries allowed per crawled URL across the run, on top of a small "
+        f"fixed allowance (default: {DEFAULT_RETRY_BUDGET})",
+    ),
+    click.option(
+        "--fetcher",
+        default=DEFAULT_FETCHER,
+        type=click.Choice(FETCHERS),
+        help="How pages are fetched: 'browser' renders every page, 'http' uses "
+        "plain GET requests, 'auto' uses GET and falls back to the browser for "
+        f"JavaScript-rendered pages (default: {DEFAULT_FETCHER})",
+    ),
+    click.option(
+        "--min-text-length",
+        default=DEFAULT_MIN_TEXT_LENGTH,
+        help="In auto mode, render pages with less visible text than this in the "
+        f"browser (default: {DEFAULT_MIN_TEXT_LENGTH})",
+    ),
+    click.option(
+        "--js-marker",
+        "js_markers",
+        multiple=True,
+        help="In auto mode, render pages whose <noscript> contains this phrase in "
+        "the browser. Can be repeated; replaces the built-in phrases.",
+    ),
+    click.option(
+        "--browsers",
+        default=DEFAULT_BROWSERS,
+        help=f"Number of browsers shared by all crawls (default: {DEFAULT_BROWSERS})",
+    ),
+    click.option(
+        "--max-pages-per-browser",
+        default=DEFAULT_MAX_PAGES_PER_BROWSER,
+        help="Restart a browser after this many pages, 0 to disable "
+        f"(default: {DEFAULT_MAX_PAGES_PER_BROWSER})",
+    ),
+    click.option(
+        "--max-browser-memory",
+        default=None,
+        type=float,
+        help="Restart browsers when their combined memory exceeds this many MB",
+    ),
+    click.option(
+        "--block-resources",
+        default="",
+        callback=_resource_types_option,
+        help="Comma-separated resource types the browser does not load, e.g. "
+        "image,font,media,stylesheet",
+    ),
+    click.option(
+        "--block-url",
+        "block_urls",
+        multiple=True,
+        help="Abort browser requests whose URL contains this text or matches this "
+        "glob pattern (repeatable)",
+    ),
+    click.option(
+        "--lean-browser",
+        is_flag=True,
+        help=f"Block {', '.join(LEAN_BLOCKED_TYPES)} and common analytics and "
+        "chat widgets in the browser",
+    ),
+    click.option(
+        "--wait-until",
+        default=DEFAULT_WAIT_UNTIL,
+        type=click.Choice(WAIT_UNTIL),
+        help="Page-load event the browser waits for before reading the page "
+        f"(default: {DEFAULT_WAIT_UNTIL})",
+    ),
+    click.option(
+        "--page-timeout",
+        default=DEFAULT_PAGE_TIMEOUT,
+        type=click.FloatRange(min=0, min_open=True),
+        help=f"Seconds a page may take to load in the browser (default: "
+        f"{DEFAULT_PAGE_TIMEOUT:g})",
+    ),
+    click.option(
+        "--cpu-workers",
+        default=0,
+        help="Processes for HTML cleaning and markdown conversion, "
+        "0 to convert inline (default: 0)",
+    ),
+    click.option(
+        "--max-inflight-mb",
+        default=DEFAULT_MAX_INFLIGHT_MB,
+        type=float,
+        help="Page content held in memory (fetched, converting or waiting to be "
+        "written) before new fetches wait, 0 for no limit "
+        f"(default: {DEFAULT_MAX_INFLIGHT_MB})",
+    ),
+    click.option(
+        "--clean-selectors-file",
+        default=None,
+        help="File with HTML elements to remove (e.g., 'nav', 'footer'). "
+        "One selector per line. Lines starting with // or -- are comments.",
+    ),
+    click.option(
+        "--html-parser",
+        default=DEFAULT_PARSER,
+        type=click.Choice(PARSERS),
+        help=(
+            "Parser used to clean HTML, lxml is faster and needs "
+            f"crawl2md[lxml] (default: {DEFAULT_PARSER})"
+        ),
+    ),
+    click.option(
+        "--html-cache",
+        "html_cache_dir",
+        default=None,
+        help="Keep the raw HTML of fetched pages in this directory, for "
+        "'crawl2md reprocess' and to skip fetching recently cached pages",
+    ),
+    click.option(
+        "--cache-ttl",
+        default=DEFAULT_CACHE_TTL_HOURS,
+        type=float,
+        help="Hours a cached page is used instead of fetching it again, 0 to "
+        f"always fetch (default: {DEFAULT_CACHE_TTL_HOURS:g})",
+    ),
+    click.option(
+        "--cache-max-mb",
+        default=DEFAULT_CACHE_MAX_MB,
+        type=float,
+        help="Compressed cache size before least recently used pages are "
+        f"evicted, 0 for no limit (default: {DEFAULT_CACHE_MAX_MB})",
+    ),
+)
+
+
+def _crawler_options(command):
+    """Add the crawler options to a command, passed as one CrawlerOptions.
+
+    The command receives them as ``options`` instead of one argument each,
+    so every command building a Crawler offers the same options.
+    """
+
+    @functools.wraps(command)
+    def run(**kwargs):
+        options = CrawlerOptions(
+            **{name: kwargs.pop(name) for name in CrawlerOptions._fields}
+        )
+        if options.lean_browser:
+            options = options._replace(
+                block_resources=tuple(
+                    dict.fromkeys(options.block_resources + LEAN_BLOCKED_TYPES)
+                ),
+                block_urls=options.block_urls + LEAN_BLOCKED_PATTERNS,
+            )
+        return command(options=options, **kwargs)
+
+    for option in reversed(_CRAWLER_OPTIONS):
+        run = option(run)
+    return run
+
+
+def _echo_politeness(options: CrawlerOptions) -> None:
+    click.echo(
+        f"Rate limit: {options.rate_limit or 'off'} req/s (burst {options.burst})"
+    )
+    click.echo(
+        f"Per host: {options.per_host_concurrency or options.concurrency} "
+        f"concurrent, {options.per_host_rate or 'no'} req/s limit, "
+        f"adaptive {'on' if options.adaptive else 'off'}, "
+        f"crawl-delay {'respected' if options.respect_crawl_delay else 'ignored'}"
+    )
+
+
+def _crawler_factory(
+    options: CrawlerOptions,
+    processes: int = 1,
+    profile_prefix: Optional[str] = None,
+    **extra,
+) -> Callable[[], Crawler]:
+    """Return a picklable function building the Crawler for ``options``.
+
+    Args:
+        options: Crawler option values
+        processes: Processes the crawl is split over; the global and
+            per-host rate limits are shared between them
+        profile_prefix: Path prefix for cProfile stats of the conversion
+            processes, or None
+        **extra: Further Crawler arguments, such as discover_links
+
+    Returns:
+        functools.partial of _build_crawler, which shard processes can
+        call to build their own crawler
+    """
+    try:
+        html_cleaner = (
+            HtmlCleaner.from_file(
+                options.clean_selectors_file, parser=options.html_parser
+            )
+            if options.clean_selectors_file
+            else None
+        )
+    except RuntimeError as e:
+        raise click.UsageError(str(e))
+    if html_cleaner:
+        for selector in html_cleaner.invalid_selectors:
+            click.echo(f"Warning: ignoring invalid selector: {selector}", err=True)
+    return functools.partial(
+        _build_crawler,
+        max_concurrent=options.concurrency,
+        html_cleaner=html_cleaner,
+        rate_limit=(options.rate_limit / processes) if options.rate_limit else None,
+        burst=options.burst,
+        browsers=options.browsers,
+        max_pages_per_browser=options.max_pages_per_browser or None,
+        max_browser_memory_mb=options.max_browser_memory,
+        cpu_workers=options.cpu_workers,
+        per_host_concurrency=options.per_host_concurrency or None,
+        per_host_rate=(options.per_host_rate / processes)
+        if options.per_host_rate
+        else None,
+        adaptive_concurrency=options.adaptive,
+        respect_crawl_delay=options.respect_crawl_delay,
+        profile_prefix=profile_prefix if options.cpu_workers else None,
+        max_inflight_mb=options.max_inflight_mb or None,
+        max_attempts=options.max_attempts,
+        retry_base_delay=options.retry_base_delay,
+        retry_budget=options.retry_budget,
+        fetcher=options.fetcher,
+        min_text_length=options.min_text_length,
+        js_markers=options.js_markers,
+        html_cache_dir=options.html_cache_dir,
+        cache_ttl_hours=options.cache_ttl,
+        cache_max_mb=options.cache_max_mb,
+        block_resources=options.block_resources,
+        block_urls=options.block_urls,
+        wait_until=options.wait_until,
+        page_timeout=options.page_timeout,
+        **extra,
+    )
+
+
+class _CrawlFrontier:
+    """URLs a crawl hands to the crawler, with the counts it reports.
+
+    Entries are filtered, skipped when done (--resume) or unchanged
+    (--incremental), ordered (--prioritize) and cut at --max-pages. A batch
+    at a time, their URLs are registered in the state store and their
+    paths recorded, and the directories of the paths are created.
+    """
+
+    def __init__(
+        self,
+        state: CrawlState,
+        file_handler,
+        output_writer: OutputWriter,
+        metrics: Metrics,
+        url_filter: UrlFilter,
+        resume: bool = False,
+        incremental: bool = False,
+        prioritize: bool = False,
+        max_pages: int = 0,
+    ):
+        self.state = state
+        self.file_handler = file_handler
+        self.output_writer = output_writer
+        self.metrics = metrics
+        self.url_filter = url_filter
+        self.resume = resume
+        self.incremental = incremental
+        self.prioritize = prioritize
+        self.max_pages = max_pages
+        self.found = 0
+        self.skipped = 0
+        self.resumed = 0
+        # URLs left to crawl after skips and filters, and those handed to
+        # the crawler, for the budget summary
+        self.candidates = 0
+        self.queued = 0
+        self.sitemap_read = False
+        # Sitemap metadata of URLs that are queued or in flight
+        self.lastmods: Dict[str, Optional[str]] = {}
+        self.validators: Dict[str, dict] = {}
+
+    async def _candidates(
+        self, entries: AsyncIterator[SitemapEntry]
+    ) -> AsyncIterator[SitemapEntry]:
+        async for entry in entries:
+            self.found += 1
+            # Every URL, skipped or not, so each keeps its file in later
+            # runs (see CrawlState.saved_paths)
+            self.file_handler.plan([entry.loc])
+            if not self.url_filter(entry.loc):
+                continue
+            if self.incremental:
+                crawl, validator = self.state.plan_entry(entry)
+                if not crawl:
+                    self.output_writer.write_row("SKIPPED", entry.loc)
+                    self.skipped += 1
+                    continue
+                if validator:
+                    self.validators[entry.loc] = validator
+            elif self.resume and self.state.is_done(entry.loc):
+                self.resumed += 1
+                continue
+            self.candidates += 1
+            yield entry
+        self.sitemap_read = True
+
+    async def urls(self, entries: AsyncIterator[SitemapEntry]) -> AsyncIterator[str]:
+        """Yield the URLs to crawl out of sitemap or discovery entries."""
+        batch = []
+        candidates = self._candidates(entries)
+        if self.prioritize:
+            candidates = prioritize_entries(candidates, self.state.get)
+        async for entry in candidates:
+            if self.max_pages and self.queued >= self.max_pages:
+                break
+            self.queued += 1
+            batch.append(entry.loc)
+            if len(batch) >= STATE_BATCH_SIZE:
+                self._register(batch)
+                batch = []
+                await asyncio.to_thread(self.file_handler.make_directories)
+            self.lastmods[entry.loc] = entry.lastmod
+            self.metrics.expect()
+            yield entry.loc
+        self._register(batch)
+        await asyncio.to_thread(self.file_handler.make_directories)
+        self.metrics.expect(0, final=True)
+
+    def _register(self, urls: list) -> None:
+        self.state.add_urls(urls)
+        self.state.save_paths(self.file_handler.take_assigned())
+
+    def finish(self, url: str) -> Optional[str]:
+        """Forget a crawled URL's metadata; return its sitemap lastmod."""
+        self.validators.pop(url, None)
+        return self.lastmods.pop(url, None)
+
+
+class _DefaultCommandGroup(click.Group):
+    """Group that runs the crawl command unless another command is named.
+
+    Keeps ``crawl2md SITEMAP_URL [OPTIONS]`` working next to the
+    ``coordinator`` and ``worker`` commands.
+    """
+
+    def parse_args(self, ctx: click.Context, args: list) -> list:
+        if (
+            args
+            and args[0] not in self.commands
+            and args[0] not in (ctx.help_option_names)
+        ):
+            args = [DEFAULT_COMMAND, *args]
+        return super().parse_args(ctx, args)
+
+
+@click.group(cls=_DefaultCommandGroup)
+def main() -> None:
+    """Crawl a website from its sitemap and convert pages to markdown.
+
+    Without a command name, runs crawl. To spread a crawl over several
+    machines, start one coordinator and any number of workers.
+    """
 
-@click.command()
+
+@main.command(DEFAULT_COMMAND)
 @click.argument("sitemap_url")
 @click.option(
     "--output",
@@ -21,97 +624,1166 @@ from crawl2md.cleaner import MarkdownCleaner
     help="Output directory (default: ./output)",
 )
 @click.option(
-    "--concurrency",
-    default=MAX_CONCURRENT_CRAWLS,
-    help=f"Max concurrent crawls (default: {MAX_CONCURRENT_CRAWLS})",
+    "--processes",
+    default=1,
+    type=click.IntRange(min=1),
+    help="Crawl processes, each with its own event loop and browsers. URLs "
+    "are split between them by hash; --concurrency applies per process, "
+    "--rate-limit and --per-host-rate to all together (default: 1)",
 )
 @click.option(
-    "--clean-selectors-file",
+    "--output-format",
+    default=DEFAULT_OUTPUT_FORMAT,
+    type=click.Choice(OUTPUT_FORMATS),
+    help="One markdown file per page, or size-rotated jsonl, jsonl.zst or tar "
+    f"shards with a URL index (default: {DEFAULT_OUTPUT_FORMAT})",
+)
+@click.option(
+    "--shard-size",
+    default=DEFAULT_SHARD_SIZE_MB,
+    type=float,
+    help="Shard size in MB before a new shard is started "
+    f"(default: {DEFAULT_SHARD_SIZE_MB})",
+)
+@click.option(
+    "--progress/--no-progress",
+    default=None,
+    help="Show a live status line with rates and ETA (default: when stderr "
+    "is a terminal)",
+)
+@click.option(
+    "--stats-file",
+    default=None,
+    help="Rewrite this JSON file with crawl metrics every --stats-interval seconds",
+)
+@click.option(
+    "--stats-interval",
+    default=DEFAULT_STATS_INTERVAL,
+    type=float,
+    help=f"Seconds between stats file updates (default: {DEFAULT_STATS_INTERVAL:g})",
+)
+@click.option(
+    "--metrics-port",
+    default=None,
+    type=int,
+    help=f"Serve Prometheus metrics on http://{METRICS_HOST}:PORT/metrics",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    default=False,
+    help="Add per-stage wall and CPU times to the result file and print a "
+    "per-stage breakdown",
+)
+@click.option(
+    "--profile-file",
     default=None,
-    help="File with HTML elements to remove (e.g., 'nav', 'footer'). "
-    "One selector per line. Lines starting with # are comments.",
+    help="Also write cProfile stats of the crawl and the conversion "
+    "processes to this pstats file (implies --profile)",
 )
 @click.option(
     "--result-file",
     default="result.csv",
     help="CSV file to write crawl results (default: result.csv)",
 )
-def main(
+@click.option(
+    "--resume",
+    is_flag=True,
+    default=False,
+    help="Skip URLs already crawled successfully by a previous run "
+    "into the same output directory, and append to the result file",
+)
+@click.option(
+    "--incremental",
+    is_flag=True,
+    default=False,
+    help="Re-sync a previous crawl: skip URLs whose sitemap lastmod has not "
+    "changed and send conditional requests (ETag/Last-Modified) for the rest",
+)
+@click.option(
+    "--dedup/--no-dedup",
+    default=True,
+    help="Merge URL variants (tracking parameters, trailing slashes, "
+    "index.html), honour rel=canonical and save repeated content once "
+    "(default: on)",
+)
+@click.option(
+    "--ignore-param",
+    "ignore_params",
+    multiple=True,
+    help="Query parameter (shell-style pattern) dropped when normalizing "
+    "URLs, in addition to "
+    f"{', '.join(DEFAULT_IGNORED_PARAMS)} (repeatable)",
+)
+@click.option(
+    "--include",
+    multiple=True,
+    help="Only crawl URLs matching this pattern: a shell-style pattern "
+    "matched against the whole URL, or a regular expression prefixed "
+    "with re: (repeatable)",
+)
+@click.option(
+    "--exclude",
+    multiple=True,
+    help="Do not crawl URLs matching this pattern (same syntax as "
+    "--include, repeatable)",
+)
+@click.option(
+    "--prioritize",
+    is_flag=True,
+    default=False,
+    help="Read the whole sitemap first, then crawl the highest sitemap "
+    "priority and stalest pages first (by changefreq and the previous run), "
+    "taking turns between hosts",
+)
+@click.option(
+    "--max-pages",
+    default=0,
+    type=click.IntRange(min=0),
+    help="Stop after starting this many URLs, 0 for no limit (default: 0)",
+)
+@click.option(
+    "--time-budget",
+    default=0.0,
+    type=click.FloatRange(min=0),
+    help="Start no new crawl after this many seconds, 0 for no limit; "
+    "crawls in progress finish (default: 0)",
+)
+@click.option(
+    "--discover",
+    is_flag=True,
+    default=False,
+    help="Also crawl pages linked from crawled pages on the same hosts. "
+    "SITEMAP_URL may then be a start page instead of a sitemap",
+)
+@click.option(
+    "--max-depth",
+    default=0,
+    type=click.IntRange(min=0),
+    help="With --discover, follow at most this many links from a sitemap "
+    "URL or the start page, 0 for no limit (default: 0)",
+)
+@_crawler_options
+def crawl(
     sitemap_url: str,
     output: str,
-    concurrency: int,
-    clean_selectors_file: str,
+    options: CrawlerOptions,
+    processes: int,
+    output_format: str,
+    shard_size: float,
+    progress: Optional[bool],
+    stats_file: Optional[str],
+    stats_interval: float,
+    metrics_port: Optional[int],
+    profile: bool,
+    profile_file: Optional[str],
     result_file: str,
+    resume: bool,
+    incremental: bool,
+    dedup: bool,
+    ignore_params: tuple,
+    include: tuple,
+    exclude: tuple,
+    prioritize: bool,
+    max_pages: int,
+    time_budget: float,
+    discover: bool,
+    max_depth: int,
 ) -> None:
     """Crawl a website and convert pages to markdown.
 
     Downloads all pages from a sitemap.xml and saves them as markdown files.
     """
+    profile = profile or bool(profile_file)
+    if processes > 1 and output_format != OUTPUT_FILES:
+        raise click.UsageError("--processes only supports --output-format files")
+    if processes > 1 and profile_file:
+        raise click.UsageError("--profile-file is not supported with --processes")
+    if processes > 1 and (prioritize or max_pages or time_budget or discover):
+        raise click.UsageError(
+            "--prioritize, --max-pages, --time-budget and --discover are not "
+            "supported with --processes"
+        )
+    if discover and prioritize:
+        raise click.UsageError("--prioritize is not supported with --discover")
+    try:
+        url_filter = UrlFilter(include, exclude)
+    except re.error as e:
+        raise click.UsageError(f"Invalid --include/--exclude pattern: {e}")
+    profile_prefix = f"{profile_file}.worker" if profile_file else None
     parsed_sitemap = urlparse(sitemap_url)
     base_url = f"{parsed_sitemap.scheme}://{parsed_sitemap.netloc}"
+    # With --discover, a URL that is not a sitemap is where crawling starts
+    start_page = (
+        None
+        if not discover or parsed_sitemap.path.lower().endswith(SITEMAP_SUFFIXES)
+        else sitemap_url
+    )
 
-    click.echo(f"Sitemap: {sitemap_url}")
-    click.echo(f"Output: {output}")
+    if start_page:
+        click.echo(f"Start page: {start_page}")
+    else:
+        click.echo(f"Sitemap: {sitemap_url}")
+    click.echo(f"Output: {output} ({output_format})")
     click.echo(f"Result file: {result_file}")
-    click.echo(f"Concurrency: {concurrency}")
-    if clean_selectors_file:
-        click.echo(f"Clean selectors file: {clean_selectors_file}")
+    click.echo(f"Concurrency: {options.concurrency}")
+    if processes > 1:
+        click.echo(f"Processes: {processes} (concurrency and browsers per process)")
+    _echo_politeness(options)
+    click.echo(f"Fetcher: {options.fetcher}")
+    if processes > 1 and dedup:
+        click.echo(
+            "Dedup: URL variants only (content is not compared across processes)"
+        )
+    else:
+        click.echo(f"Dedup: {'on' if dedup else 'off'}")
+    click.echo(f"Browsers: {options.browsers}")
+    if options.fetcher != FETCHER_HTTP:
+        blocking = ", ".join(options.block_resources) or "no resource types"
+        if options.block_urls:
+            blocking += f" and {len(options.block_urls)} URL patterns"
+        click.echo(
+            f"Browser pages: wait for {options.wait_until}, {options.page_timeout:g}s timeout, "
+            f"blocking {blocking}"
+        )
+    if options.cpu_workers:
+        click.echo(f"CPU workers: {options.cpu_workers}")
+    click.echo(f"In-flight page limit: {options.max_inflight_mb or 'off'} MB")
+    if options.clean_selectors_file:
+        click.echo(f"Clean selectors file: {options.clean_selectors_file}")
+    if options.html_cache_dir:
+        click.echo(
+            f"HTML cache: {options.html_cache_dir} (TTL {options.cache_ttl:g} h)"
+        )
+    if url_filter.active:
+        click.echo(
+            f"URL filter: {len(include)} include, {len(exclude)} exclude patterns"
+        )
+    if prioritize:
+        click.echo("Order: sitemap priority and staleness")
+    if max_pages or time_budget:
+        click.echo(
+            f"Budget: {max_pages or 'no'} page limit, "
+            f"{f'{time_budget:g}s' if time_budget else 'no'} time limit"
+        )
+    if discover:
+        click.echo(
+            f"Discovery: following links on the same hosts, "
+            f"{max_depth or 'no'} depth limit"
+        )
     click.echo("-" * 50)
 
-    sitemap_parser = SitemapParser(sitemap_url)
-    html_cleaner = (
-        HtmlCleaner.from_file(clean_selectors_file) if clean_selectors_file else None
+    url_normalizer = (
+        functools.partial(
+            normalize_url, ignored_params=DEFAULT_IGNORED_PARAMS + ignore_params
+        )
+        if dedup
+        else None
     )
-    crawler = Crawler(max_concurrent=concurrency, html_cleaner=html_cleaner)
-    file_handler = FileHandler(base_url, output)
+    sitemap_parser = SitemapParser(sitemap_url, url_normalizer=url_normalizer)
+    # Picklable, so shard processes can build their own crawler
+    make_crawler = _crawler_factory(
+        options,
+        processes=processes,
+        profile_prefix=profile_prefix,
+        discover_links=discover,
+    )
+    if processes > 1:
+        _crawl_in_processes(
+            sitemap_parser,
+            make_crawler,
+            url_filter=url_filter,
+            processes=processes,
+            base_url=base_url,
+            output=output,
+            result_file=result_file,
+            resume=resume,
+            incremental=incremental,
+            progress=progress,
+            stats_file=stats_file,
+            stats_interval=stats_interval,
+            metrics_port=metrics_port,
+            profile=profile,
+        )
+        return
+    crawler = make_crawler()
+    try:
+        file_handler = open_output(
+            output_format, base_url, output, shard_size_mb=shard_size
+        )
+    except RuntimeError as e:
+        raise click.UsageError(str(e))
     cleaner = MarkdownCleaner()
+    state = CrawlState.in_directory(output)
+    # URLs keep the paths of earlier runs, whatever order they come in
+    for url, path in state.saved_paths():
+        file_handler.assign(url, path)
+    content_index = ContentIndex(state)
+    # Links are fetched as written; variants of one URL are seen as one
+    discovery = (
+        LinkDiscovery(
+            LinkQueue.in_directory(output, resume=resume),
+            url_key=url_normalizer,
+            max_depth=max_depth,
+            batch_size=STATE_BATCH_SIZE,
+        )
+        if discover
+        else None
+    )
 
     try:
-        click.echo("Fetching sitemap...")
-        urls = sitemap_parser.get_urls()
-        click.echo(f"Found {len(urls)} URLs in sitemap")
-        click.echo("-" * 50)
-
-        click.echo("Crawling pages...")
+        if prioritize:
+            click.echo("Reading sitemap, then crawling pages...")
+        elif start_page:
+            click.echo("Crawling the start page and the pages it leads to...")
+        else:
+            click.echo(
+                "Streaming sitemap and crawling pages"
+                + (" and their links..." if discover else "...")
+            )
 
+        # URLs with a result, for the budget summary
+        finished_count = 0
         success_count = 0
         fail_count = 0
+        not_modified_count = 0
+        canonical_count = 0
+        duplicate_count = 0
+
+        metrics = Metrics()
+        stage_profile = StageProfile() if profile else None
+        output_writer = OutputWriter(
+            file_handler,
+            result_file,
+            append=resume and os.path.exists(result_file),
+            metrics=metrics,
+            extra_columns=TIMING_COLUMNS if profile else (),
+            memory_budget=crawler.memory_budget,
+        )
+        frontier = _CrawlFrontier(
+            state,
+            file_handler,
+            output_writer,
+            metrics,
+            url_filter,
+            resume=resume,
+            incremental=incremental,
+            prioritize=prioritize,
+            max_pages=max_pages,
+        )
+        for name in ("queued", "in_flight", "retrying"):
+            metrics.gauge(name, lambda name=name: crawler.queue_stats()[name])
+        metrics.gauge("write_queue", lambda: output_writer.stats()["queue_depth"])
+        if crawler.memory_budget is not None:
+            metrics.gauge("inflight_bytes", lambda: crawler.memory_budget.in_use)
+        if crawler.resource_blocker is not None:
+            blocker = crawler.resource_blocker
+            metrics.gauge("blocked_requests", lambda: sum(blocker.blocked.values()))
+            metrics.gauge("browser_bytes", lambda: blocker.bytes_received)
+        if progress is None:
+            progress = sys.stderr.isatty()
+        progress_display = ProgressDisplay(metrics) if progress else None
+        # Per-URL lines go above the live status line when there is one
+        log = progress_display.echo if progress_display else click.echo
+        reporter = MetricsReporter(
+            metrics,
+            progress=progress_display,
+            stats_file=stats_file,
+            stats_interval=stats_interval,
+            port=metrics_port,
+        )
+
+        # Canonical URLs saved from another page's content during this run
+        canonicals_saved = set()
+
+        def timing_columns(result: dict) -> list:
+            """Add a finished URL to the stage profile; return its CSV columns."""
+            if stage_profile is None:
+                return []
+            timings = result.get("timings") or {}
+            stage_profile.record(timings)
+            return timing_row(timings)
+
+        def record_saved(
+            result: dict,
+            lastmod,
+            content_hash: str,
+            duplicate_of,
+            path: str,
+        ) -> None:
+            nonlocal success_count
+            state.mark_done(
+                result["url"],
+                content_hash,
+                lastmod=lastmod,
+                etag=result.get("etag"),
+                last_modified=result.get("last_modified"),
+                attempts=result["attempts"],
+                duplicate_of=duplicate_of,
+            )
+            if duplicate_of:
+                log(f"✓ {result['url']} (duplicate of {duplicate_of})")
+                output_writer.write_row(
+                    "DUPLICATE", result["url"], timing_columns(result)
+                )
+            else:
+                log(f"✓ {result['url']}")
+                output_writer.write_row("OK", result["url"], timing_columns(result))
+            success_count += 1
+
+        def record_canonical(url: str, content_hash: str, path: str) -> None:
+            # Saved from a page naming it as canonical; it was not fetched
+            state.mark_done(url, content_hash, attempts=0)
+            log(f"✓ {url} (canonical)")
+            output_writer.write_row("CANONICAL", url)
+
+        def record_failed(result: dict) -> None:
+            nonlocal fail_count
+            log(
+                f"✗ {result['url']} - {result.get('error', 'Unknown error')}"
+                f" ({result.get('error_class')}, "
+                f"{result['attempts']} attempts)"
+            )
+            output_writer.write_row("ERROR", result["url"], timing_columns(result))
+            state.mark_failed(
+                result["url"],
+                result.get("error"),
+                error_class=result.get("error_class"),
+                attempts=result["attempts"],
+            )
+            fail_count += 1
+
+        def record_write_error(result: dict, error: Exception) -> None:
+            metrics.record_error("write")
+            record_failed(
+                {
+                    **result,
+                    "error": f"Could not save markdown: {error}",
+                    "error_class": ERROR_PERMANENT,
+                }
+            )
+
+        def canonical_of(result: dict):
+            canonical = result.get("canonical_url")
+            if not dedup or not canonical:
+                return None
+            # Cross-host canonicals are not followed; the page is kept as is
+            if url_normalizer(canonical) == url_normalizer(result["url"]) or host_of(
+                canonical
+            ) != host_of(result["url"]):
+                return None
+            return canonical
+
+        async def save_page(result: dict, lastmod) -> None:
+            nonlocal canonical_count, duplicate_count
+            url = result["url"]
+            timings = result.setdefault("timings", {})
+            on_error = functools.partial(record_write_error, result)
+            canonical_frontmatter = None
+
+            with timed(timings, "process"):
+                # The result stays referenced by the on_saved callback until
+                # the write, so only the local name keeps the content
+                cleaned_markdown = cleaner.clean(result.pop("markdown"), base_url)
+                content_hash = hashlib.sha256(
+                    cleaned_markdown.encode("utf-8")
+                ).hexdigest()
+                owner = canonical_of(result)
+                if owner is not None:
+                    if owner not in canonicals_saved and not state.is_done(owner):
+                        canonicals_saved.add(owner)
+                        content_index.claim(content_hash, owner)
+                        canonical_count += 1
+                        canonical_frontmatter = cleaner.frontmatter(owner)
+                elif dedup and cleaned_markdown.strip():
+                    owner = content_index.claim(content_hash, url)
+
+                if owner is not None:
+                    duplicate_count += 1
+                    frontmatter = cleaner.frontmatter(url, duplicate_of=owner)
+                    markdown = (
+                        f"Duplicate of [{owner}]"
+                        f"({file_handler.relative_link(url, owner)})\n"
+                    )
+                else:
+                    frontmatter = cleaner.frontmatter(url)
+                    markdown = cleaned_markdown
+            metrics.observe("process", timings["process"])
+
+            # Frontmatter and content are written one after the other, so
+            # large pages are never copied to prepend the header
+            if canonical_frontmatter is not None:
+                await output_writer.write_markdown(
+                    owner,
+                    cleaned_markdown,
+                    on_saved=functools.partial(record_canonical, owner, content_hash),
+                    on_error=on_error,
+                    frontmatter=canonical_frontmatter,
+                )
+            del cleaned_markdown
+            # The state is only marked done once the file is on disk
+            await output_writer.write_markdown(
+                url,
+                markdown,
+                on_saved=functools.partial(
+                    record_saved, result, lastmod, content_hash, owner
+                ),
+                on_error=on_error,
+                timings=timings,
+                frontmatter=frontmatter,
+            )
 
         async def process_results():
-            nonlocal success_count, fail_count
-
-            with open(result_file, "w", newline="") as csvfile:
-                writer = csv.writer(csvfile)
-                writer.writerow(["status", "url"])
-
-                async for result in crawler.crawl_many(urls):
-                    if result["success"]:
-                        markdown = result["markdown"]
-                        cleaned_markdown = cleaner.clean(markdown, base_url)
-                        marked_with_metadata = cleaner.add_metadata(
-                            cleaned_markdown, result["url"]
+            nonlocal not_modified_count, finished_count
+
+            # The writer closes first, so the last stats include every write
+            async with reporter, output_writer:
+                if reporter.address:
+                    host, port = reporter.address
+                    click.echo(f"Metrics: http://{host}:{port}/metrics")
+
+                if discovery is None:
+                    entries = sitemap_parser.iter_entries()
+                else:
+                    if start_page:
+                        discovery.seed([(start_page, None)])
+                    entries = discovery.entries(
+                        lambda: frontier.queued > finished_count,
+                        sitemap=None if start_page else sitemap_parser.iter_entries(),
+                    )
+                deadline = time.monotonic() + time_budget if time_budget else None
+                async for result in crawler.crawl_many(
+                    frontier.urls(entries), frontier.validators, deadline=deadline
+                ):
+                    finished_count += 1
+                    if discovery is not None:
+                        discovery.follow(result["url"], result.pop("links", None))
+                    lastmod = frontier.finish(result["url"])
+                    metrics.record_result(result)
+                    if result.get("not_modified"):
+                        state.mark_not_modified(
+                            result["url"], lastmod, attempts=result["attempts"]
                         )
-                        file_handler.save_markdown(result["url"], marked_with_metadata)
-                        click.echo(f"✓ {result['url']}")
-                        writer.writerow(["OK", result["url"]])
-                        success_count += 1
-                    else:
-                        click.echo(
-                            f"✗ {result['url']} - {result.get('error', 'Unknown error')}"
+                        log(f"= {result['url']} (not modified)")
+                        output_writer.write_row(
+                            "NOT_MODIFIED", result["url"], timing_columns(result)
                         )
-                        writer.writerow(["ERROR", result["url"]])
-                        fail_count += 1
+                        not_modified_count += 1
+                    elif result["success"]:
+                        await save_page(result, lastmod)
+                    else:
+                        record_failed(result)
 
-        asyncio.run(process_results())
+        main_profiler = cProfile.Profile() if profile_file else None
+        if main_profiler is not None:
+            main_profiler.enable()
+        try:
+            asyncio.run(process_results())
+        finally:
+            if main_profiler is not None:
+                main_profiler.disable()
 
         click.echo("-" * 50)
+        if discover:
+            seen = discovery.seen
+            click.echo(
+                f"Found {frontier.found} URLs, {discovery.discovered} of them from "
+                f"links ({len(seen)} URLs seen, {format_bytes(seen.nbytes)} seen-set)"
+            )
+        else:
+            click.echo(f"Found {frontier.found} URLs in sitemap")
+        if url_filter.active:
+            click.echo(f"Filtered: {url_filter.excluded} URLs excluded")
+        if resume:
+            click.echo(f"Resumed: {frontier.resumed} already done")
         click.echo(f"Complete! Success: {success_count}, Failed: {fail_count}")
-        click.echo(f"Markdown files saved to: {output}")
+        if (max_pages or time_budget) and (
+            frontier.candidates > finished_count or not frontier.sitemap_read
+        ):
+            click.echo(
+                f"Budget reached: {frontier.candidates - finished_count} URLs not "
+                "crawled"
+                + ("" if frontier.sitemap_read else ", rest of the sitemap not read")
+                + "; run again with --resume to continue"
+            )
+        if incremental:
+            click.echo(
+                f"Skipped: {frontier.skipped}, Not modified (304): {not_modified_count}, "
+                f"Re-rendered: {success_count}"
+            )
+        _report_failed_sitemaps(sitemap_parser)
+        if dedup:
+            click.echo(
+                f"Dedup: {sitemap_parser.duplicates} URL variants merged, "
+                f"{duplicate_count} pages saved as pointers "
+                f"({canonical_count} canonical pages saved from them)"
+            )
+        if file_handler.renamed:
+            click.echo(
+                f"File names: {file_handler.renamed} URLs saved with a suffix, "
+                "as an earlier URL maps to the same file"
+            )
+        retry_stats = crawler.retry_stats()
+        if retry_stats["retries"] or retry_stats["budget_exhausted"]:
+            click.echo(
+                f"Retries: {retry_stats['retries']}, "
+                f"refused (retry budget exhausted): {retry_stats['budget_exhausted']}"
+            )
+        if options.fetcher != FETCHER_BROWSER:
+            fetch_stats = crawler.fetch_stats()
+            click.echo(
+                f"Fetched over HTTP: {fetch_stats['http']}, "
+                f"rendered in browser: {fetch_stats['browser']}"
+            )
+        for host, stats in crawler.host_stats().items():
+            click.echo(
+                f"Host {host}: concurrency {stats['limit']}, "
+                f"{stats['backoffs']} backoffs, "
+                f"latency {stats['latency_ms']} ms"
+                + (
+                    f", crawl-delay {stats['crawl_delay']:g}s"
+                    if stats["crawl_delay"]
+                    else ""
+                )
+            )
+        snapshot = metrics.snapshot()
+        click.echo(
+            f"Throughput: {snapshot['completed'] / snapshot['elapsed_seconds']:.1f} "
+            f"pages/s, {format_bytes(snapshot['bytes'])} fetched "
+            f"in {format_duration(snapshot['elapsed_seconds'])}"
+        )
+        for phase in PHASES:
+            timing = snapshot["phases"][phase]
+            if timing["count"]:
+                click.echo(
+                    f"  {phase:<8} p50 {timing['p50_ms']:.0f} ms, "
+                    f"p95 {timing['p95_ms']:.0f} ms, max {timing['max_ms']:.0f} ms "
+                    f"({timing['count']} pages)"
+                )
+        writer_stats = output_writer.stats()
+        click.echo(
+            f"Writer: {writer_stats['files']} files, "
+            f"avg {writer_stats['avg_write_ms']:.1f} ms, "
+            f"max {writer_stats['max_write_ms']:.1f} ms per write, "
+            f"peak queue {writer_stats['peak_queue_depth']}/{writer_stats['max_queue']}"
+        )
+        memory_stats = crawler.memory_stats()
+        memory_parts = []
+        if memory_stats:
+            memory_parts.append(
+                f"peak in flight {format_bytes(memory_stats['peak'])} "
+                f"of {format_bytes(memory_stats['limit'])}, "
+                f"{memory_stats['waits']} fetches waited"
+            )
+        rss = peak_rss_mb()
+        if rss:
+            memory_parts.append(f"peak RSS {rss:.0f} MB")
+        if memory_parts:
+            click.echo(f"Memory: {', '.join(memory_parts)}")
+        cache_stats = crawler.cache_stats()
+        if cache_stats:
+            click.echo(
+                f"HTML cache: {cache_stats['hits']} pages served from cache, "
+                f"{cache_stats['stores']} stored, {cache_stats['evicted']} "
+                f"evicted; {cache_stats['pages']} pages in "
+                f"{format_bytes(cache_stats['bytes'])}"
+            )
+        browser_stats = crawler.browser_stats()
+        click.echo(
+            f"Browser launches: {browser_stats['launches']} "
+            f"for {browser_stats['pages']} pages"
+        )
+        resource_stats = crawler.resource_stats()
+        if resource_stats and browser_stats["pages"]:
+            by_type = ", ".join(
+                f"{resource_type} {count}"
+                for resource_type, count in sorted(
+                    resource_stats["blocked_by_type"].items(),
+                    key=lambda item: -item[1],
+                )
+            )
+            click.echo(
+                f"Blocked requests: {resource_stats['blocked']}"
+                + (f" ({by_type})" if by_type else "")
+                + f", {resource_stats['allowed']} allowed, "
+                f"{format_bytes(resource_stats['bytes_received'])} received "
+                f"by the browser "
+                f"({format_bytes(resource_stats['bytes_received'] / browser_stats['pages'])}"
+                f" per page)"
+            )
+        if output_format == OUTPUT_FILES:
+            click.echo(f"Markdown files saved to: {output}")
+        else:
+            click.echo(
+                f"{file_handler.shards_written} {output_format} shards saved to: "
+                f"{output} (index: {os.path.join(output, INDEX_FILENAME)})"
+            )
         click.echo(f"Results written to: {result_file}")
+        if stage_profile is not None:
+            click.echo("-" * 50)
+            click.echo("Stage breakdown (wall and CPU time summed over pages):")
+            for line in stage_profile.report():
+                click.echo(f"  {line}")
+        if profile_file:
+            processes = merge_profiles(profile_file, profile_prefix, main_profiler)
+            click.echo(
+                f"cProfile stats of {processes} processes written to: "
+                f"{profile_file} (view with: python -m pstats {profile_file})"
+            )
 
     except Exception as e:
         click.echo(f"Error: {e}", err=True)
         raise
+    finally:
+        # Including paths first used for canonical and duplicate links
+        state.save_paths(file_handler.take_assigned())
+        state.close()
+        if discovery is not None:
+            discovery.link_queue.close()
+        if crawler.html_cache is not None:
+            crawler.html_cache.close()
+
+
+def _crawl_in_processes(
+    sitemap_parser: SitemapParser,
+    make_crawler,
+    url_filter: UrlFilter,
+    processes: int,
+    base_url: str,
+    output: str,
+    result_file: str,
+    resume: bool,
+    incremental: bool,
+    progress: Optional[bool],
+    stats_file: Optional[str],
+    stats_interval: float,
+    metrics_port: Optional[int],
+    profile: bool,
+) -> None:
+    """Run the crawl command over shard processes (--processes).
+
+    This process reads the sitemap and keeps the state store, result file
+    and progress; the shard processes crawl and write the pages (see
+    sharding.ProcessShards).
+    """
+    shards = ProcessShards(processes, make_crawler, base_url, output)
+    state = CrawlState.in_directory(output)
+    metrics = Metrics()
+    if progress is None:
+        progress = sys.stderr.isatty()
+    progress_display = ProgressDisplay(metrics) if progress else None
+    reporter = MetricsReporter(
+        metrics,
+        progress=progress_display,
+        stats_file=stats_file,
+        stats_interval=stats_interval,
+        port=metrics_port,
+    )
+    stage_profile = StageProfile() if profile else None
+    # Plans every page path for the shards
+    file_handler = FileHandler(base_url, output)
+
+    def timing_columns(outcome: dict) -> list:
+        timings = outcome.get("timings") or {}
+        stage_profile.record(timings)
+        return timing_row(timings)
+
+    async def run() -> dict:
+        async with (
+            reporter,
+            OutputWriter(
+                file_handler,
+                result_file,
+                append=resume and os.path.exists(result_file),
+                extra_columns=TIMING_COLUMNS if profile else (),
+            ) as output_writer,
+        ):
+            if reporter.address:
+                host, port = reporter.address
+                click.echo(f"Metrics: http://{host}:{port}/metrics")
+            return await Coordinator(
+                shards,
+                state,
+                output_writer,
+                # Split again by shard, so each gets items of about this size
+                batch_size=DEFAULT_BATCH_SIZE * processes,
+                resume=resume,
+                incremental=incremental,
+                poll_interval=SHARD_POLL_INTERVAL,
+                log=progress_display.echo if progress_display else click.echo,
+                metrics=metrics,
+                row_columns=timing_columns if profile else None,
+                # Items wait in memory, in the shards' pipes and here
+                max_outstanding=SHARD_ITEMS_AHEAD * processes,
+            ).run(url_filter.entries(sitemap_parser.iter_entries()))
+
+    click.echo("Streaming sitemap and crawling pages...")
+    shards.start()
+    try:
+        counts = asyncio.run(run())
+    finally:
+        shards.close()
+        state.close()
+
+    click.echo("-" * 50)
+    click.echo(f"Found {counts['found'] + url_filter.excluded} URLs in sitemap")
+    if url_filter.active:
+        click.echo(f"Filtered: {url_filter.excluded} URLs excluded")
+    if resume:
+        click.echo(f"Resumed: {counts['resumed']} already done")
+    click.echo(f"Complete! Success: {counts['OK']}, Failed: {counts['ERROR']}")
+    if incremental:
+        click.echo(
+            f"Skipped: {counts['skipped']}, "
+            f"Not modified (304): {counts['NOT_MODIFIED']}, "
+            f"Re-rendered: {counts['OK']}"
+        )
+    _report_failed_sitemaps(sitemap_parser)
+    if sitemap_parser.duplicates:
+        click.echo(f"Dedup: {sitemap_parser.duplicates} URL variants merged")
+    if file_handler.renamed:
+        click.echo(
+            f"File names: {file_handler.renamed} URLs saved with a suffix, "
+            "as an earlier URL maps to the same file"
+        )
+    click.echo("URLs per process: " + ", ".join(str(n) for n in shards.urls_per_shard))
+    snapshot = metrics.snapshot()
+    click.echo(
+        f"Throughput: {snapshot['completed'] / snapshot['elapsed_seconds']:.1f} "
+        f"pages/s, {format_bytes(snapshot['bytes'])} fetched "
+        f"in {format_duration(snapshot['elapsed_seconds'])}"
+    )
+    for phase in PHASES:
+        timing = snapshot["phases"][phase]
+        if timing["count"]:
+            click.echo(
+                f"  {phase:<8} p50 {timing['p50_ms']:.0f} ms, "
+                f"p95 {timing['p95_ms']:.0f} ms, max {timing['max_ms']:.0f} ms "
+                f"({timing['count']} pages)"
+            )
+    click.echo(f"Markdown files saved to: {output}")
+    click.echo(f"Results written to: {result_file}")
+    if stage_profile is not None:
+        click.echo("-" * 50)
+        click.echo("Stage breakdown (wall and CPU time summed over pages):")
+        for line in stage_profile.report():
+            click.echo(f"  {line}")
+
+
+def _report_failed_sitemaps(sitemap_parser: SitemapParser) -> None:
+    for url, error in sitemap_parser.failed_sitemaps:
+        reason = str(error).splitlines()[0] if str(error) else type(error).__name__
+        click.echo(f"Warning: skipped sitemap {url}: {reason}", err=True)
+
+
+def _open_queue(queue: Optional[str], queue_name: str, output: str, **kwargs):
+    try:
+        return open_queue(
+            queue or os.path.join(output, QUEUE_FILENAME), name=queue_name, **kwargs
+        )
+    except RuntimeError as e:
+        raise click.UsageError(str(e))
+
+
+QUEUE_HELP = (
+    "Work queue shared by the coordinator and workers: an SQLite file for "
+    "workers on this machine, or a redis:// URL "
+    f"(default: <output>/{QUEUE_FILENAME})"
+)
+
+
+@main.command()
+@click.argument("sitemap_url")
+@click.option("--queue", default=None, help=QUEUE_HELP)
+@click.option(
+    "--queue-name",
+    default=DEFAULT_QUEUE_NAME,
+    help="Key prefix in Redis, so several crawls can share a server "
+    f"(default: {DEFAULT_QUEUE_NAME})",
+)
+@click.option(
+    "--output",
+    default="./output",
+    help="Output directory holding the state store (default: ./output)",
+)
+@click.option(
+    "--result-file",
+    default="result.csv",
+    help="CSV file collecting every worker's results (default: result.csv)",
+)
+@click.option(
+    "--batch-size",
+    default=DEFAULT_BATCH_SIZE,
+    help=f"URLs per work item (default: {DEFAULT_BATCH_SIZE})",
+)
+@click.option(
+    "--max-leases",
+    default=DEFAULT_MAX_LEASES,
+    help="Give up a work item after this many workers leased it without "
+    f"finishing (default: {DEFAULT_MAX_LEASES})",
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    default=False,
+    help="Skip URLs already crawled successfully and append to the result file",
+)
+@click.option(
+    "--incremental",
+    is_flag=True,
+    default=False,
+    help="Skip URLs whose sitemap lastmod has not changed and have workers "
+    "send conditional requests for the rest",
+)
+@click.option(
+    "--dedup/--no-dedup",
+    default=True,
+    help="Merge URL variants before queueing them (default: on)",
+)
+@click.option(
+    "--ignore-param",
+    "ignore_params",
+    multiple=True,
+    help="Extra query parameter pattern dropped when normalizing URLs (repeatable)",
+)
+def coordinator(
+    sitemap_url: str,
+    queue: Optional[str],
+    queue_name: str,
+    output: str,
+    result_file: str,
+    batch_size: int,
+    max_leases: int,
+    resume: bool,
+    incremental: bool,
+    dedup: bool,
+    ignore_params: tuple,
+) -> None:
+    """Queue a sitemap's URLs for workers and merge their results.
+
+    Streams the sitemap into work items of --batch-size URLs. Workers
+    lease the items, crawl them and report back. The coordinator records
+    every URL in one state store and one result file, and exits once all
+    items are done. Items of workers that stop renewing their lease are
+    handed to other workers.
+    """
+    url_normalizer = (
+        functools.partial(
+            normalize_url, ignored_params=DEFAULT_IGNORED_PARAMS + ignore_params
+        )
+        if dedup
+        else None
+    )
+    sitemap_parser = SitemapParser(sitemap_url, url_normalizer=url_normalizer)
+    work_queue = _open_queue(queue, queue_name, output, max_leases=max_leases)
+    state = CrawlState.in_directory(output)
+    click.echo(f"Sitemap: {sitemap_url}")
+    click.echo(f"Queue: {queue or os.path.join(output, QUEUE_FILENAME)}")
+    click.echo(f"Result file: {result_file}")
+    click.echo("Waiting for workers...")
+
+    async def run() -> dict:
+        async with OutputWriter(
+            FileHandler(sitemap_url, output),
+            result_file,
+            append=resume and os.path.exists(result_file),
+        ) as output_writer:
+            return await Coordinator(
+                work_queue,
+                state,
+                output_writer,
+                batch_size=batch_size,
+                resume=resume,
+                incremental=incremental,
+                log=click.echo,
+            ).run(sitemap_parser.iter_entries())
+
+    try:
+        counts = asyncio.run(run())
+    finally:
+        work_queue.close()
+        state.close()
+    click.echo("-" * 50)
+    click.echo(
+        f"Found {counts['found']} URLs in sitemap, queued {counts['items']} work items"
+    )
+    _report_failed_sitemaps(sitemap_parser)
+    if resume:
+        click.echo(f"Resumed: {counts['resumed']} already done")
+    if incremental:
+        click.echo(
+            f"Skipped: {counts['skipped']}, "
+            f"Not modified (304): {counts['NOT_MODIFIED']}"
+        )
+    click.echo(f"Complete! Success: {counts['OK']}, Failed: {counts['ERROR']}")
+    click.echo(f"Results written to: {result_file}")
+
+
+@main.command()
+@click.option("--queue", default=None, help=QUEUE_HELP)
+@click.option(
+    "--queue-name",
+    default=DEFAULT_QUEUE_NAME,
+    help=f"Key prefix in Redis (default: {DEFAULT_QUEUE_NAME})",
+)
+@click.option(
+    "--output",
+    default="./output",
+    help="Output directory for markdown files, shared by all workers "
+    "(default: ./output)",
+)
+@click.option(
+    "--worker-id",
+    default=None,
+    help="Name of this worker in leases and logs (default: hostname-pid)",
+)
+@click.option(
+    "--lease-seconds",
+    default=DEFAULT_LEASE_SECONDS,
+    help="Seconds without a heartbeat after which this worker's items go to "
+    f"other workers (default: {DEFAULT_LEASE_SECONDS:g})",
+)
+@_crawler_options
+def worker(
+    queue: Optional[str],
+    queue_name: str,
+    output: str,
+    worker_id: Optional[str],
+    lease_seconds: float,
+    options: CrawlerOptions,
+) -> None:
+    """Crawl work items leased from a coordinator's queue.
+
+    Markdown files are written to --output, which should be storage shared
+    by all workers. Results go back to the coordinator. The worker exits
+    once the coordinator has queued everything and all items are done.
+    """
+    worker_id = worker_id or default_worker_id()
+    work_queue = _open_queue(queue, queue_name, output)
+    crawler = _crawler_factory(options)()
+    click.echo(f"Worker {worker_id}")
+    click.echo(f"Queue: {queue or os.path.join(output, QUEUE_FILENAME)}")
+    click.echo(f"Output: {output}")
+    _echo_politeness(options)
+    try:
+        counts = asyncio.run(
+            Worker(
+                work_queue,
+                crawler,
+                FileHandler("", output),
+                worker_id=worker_id,
+                lease_seconds=lease_seconds,
+                log=click.echo,
+            ).run()
+        )
+    finally:
+        work_queue.close()
+    click.echo("-" * 50)
+    click.echo(
+        f"Done: {counts['items']} work items ({counts['lost']} taken over), "
+        f"Success: {counts['OK']}, Not modified: {counts['NOT_MODIFIED']}, "
+        f"Failed: {counts['ERROR']}"
+    )
+
+
+@main.command()
+@click.option(
+    "--html-cache",
+    "html_cache_dir",
+    required=True,
+    help="HTML cache directory filled by 'crawl2md ... --html-cache'",
+)
+@click.option(
+    "--output",
+    default="./output",
+    help="Output directory for markdown files (default: ./output)",
+)
+@click.option(
+    "--clean-selectors-file",
+    default=None,
+    help="File with HTML elements to remove, one selector per line",
+)
+@click.option(
+    "--html-parser",
+    default=DEFAULT_PARSER,
+    type=click.Choice(PARSERS),
+    help=(
+        "Parser used to clean HTML, lxml needs crawl2md[lxml] "
+        f"(default: {DEFAULT_PARSER})"
+    ),
+)
+@click.option(
+    "--workers",
+    default=0,
+    help="Processes to convert pages with, 0 for one per CPU core (default: 0)",
+)
+def reprocess(
+    html_cache_dir: str,
+    output: str,
+    clean_selectors_file: Optional[str],
+    html_parser: str,
+    workers: int,
+) -> None:
+    """Rebuild markdown files from cached HTML, without fetching anything.
+
+    Re-runs HTML cleaning, markdown conversion and saving over every page
+    in the HTML cache, across all CPU cores. Use it to try new
+    --clean-selectors-file rules without crawling the site again.
+    """
+    if not os.path.isdir(html_cache_dir):
+        raise click.UsageError(f"No HTML cache at {html_cache_dir}")
+    try:
+        html_cleaner = (
+            HtmlCleaner.from_file(clean_selectors_file, parser=html_parser)
+            if clean_selectors_file
+            else None
+        )
+    except RuntimeError as e:
+        raise click.UsageError(str(e))
+    if html_cleaner:
+        for selector in html_cleaner.invalid_selectors:
+            click.echo(f"Warning: ignoring invalid selector: {selector}", err=True)
+    cache = HtmlCache(html_cache_dir, max_size_mb=None)
+    try:
+        pages = list(cache.pages())
+    finally:
+        cache.close()
+    # Pages keep the files the crawl of this output directory gave them
+    saved_paths = []
+    if os.path.exists(os.path.join(output, STATE_FILENAME)):
+        with CrawlState.in_directory(output) as state:
+            saved_paths = list(state.saved_paths())
+    click.echo(f"HTML cache: {html_cache_dir} ({len(pages)} pages)")
+    click.echo(f"Output: {output}")
+    click.echo(f"Workers: {workers or os.cpu_count()}")
+    click.echo("-" * 50)
+
+    stage_profile = StageProfile()
+    fail_count = 0
+    started = time.perf_counter()
+    for url, error, timings in reprocess_pages(
+        pages,
+        output,
+        html_cleaner=html_cleaner,
+        workers=workers or None,
+        saved_paths=saved_paths,
+    ):
+        if error:
+            fail_count += 1
+            click.echo(f"✗ {url} - {error}")
+        else:
+            stage_profile.record(timings)
+    elapsed = time.perf_counter() - started
+
+    click.echo("-" * 50)
+    click.echo(
+        f"Complete! Success: {len(pages) - fail_count}, Failed: {fail_count} "
+        f"in {format_duration(elapsed)} "
+        f"({len(pages) / elapsed if elapsed else 0:.0f} pages/s)"
+    )
+    for line in stage_profile.report():
+        click.echo(f"  {line}")
+    click.echo(f"Markdown files saved to: {output}")
 
 
 if __name__ == "__main__":
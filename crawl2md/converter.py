@@ -0,0 +1,125 @@
+"""HTML to markdown conversion module using crawl4ai, without a browser."""
+
+from typing import Dict, Optional, Tuple
+
+from crawl4ai import CrawlerRunConfig, DefaultMarkdownGenerator
+
+from crawl2md.profiling import start_worker_profile, timed
+
+
+# Base URL crawl4ai sees for "raw:" input. Relative links are kept as-is,
+# matching the output of the previous "raw:" round-trip through arun.
+RAW_BASE_URL = "raw:"
+
+# CrawlerRunConfig() takes tens of milliseconds to build, so share one
+_default_config: Optional[CrawlerRunConfig] = None
+# HtmlCleaner of a conversion worker process, set once by start_worker
+_worker_cleaner = None
+
+
+def default_config() -> CrawlerRunConfig:
+    """Return the shared default CrawlerRunConfig used for conversion."""
+    global _default_config
+    if _default_config is None:
+        _default_config = CrawlerRunConfig()
+    return _default_config
+
+
+def html_to_markdown(
+    html: str,
+    base_url: Optional[str] = None,
+    config: Optional[CrawlerRunConfig] = None,
+) -> str:
+    """Convert HTML to markdown in-process.
+
+    Runs the same scraping strategy and markdown generator that
+    ``AsyncWebCrawler.arun`` applies to a ``raw:`` URL, but without going
+    through the crawler.
+
+    Args:
+        html: HTML to convert
+        base_url: URL to resolve relative links against (None keeps them
+            relative)
+        config: Optional CrawlerRunConfig supplying the scraping strategy
+            and markdown generator
+
+    Returns:
+        Raw markdown string
+    """
+    config = config or default_config()
+    url = base_url or RAW_BASE_URL
+
+    params = config.__dict__.copy()
+    params.pop("url", None)
+    scraped = config.scraping_strategy.scrap(url, html, **params)
+    cleaned_html = (
+        scraped.get("cleaned_html", "")
+        if isinstance(scraped, dict)
+        else scraped.cleaned_html
+    )
+    # Links, media and metadata are not needed; free them before generating
+    del scraped
+
+    generator = config.markdown_generator or DefaultMarkdownGenerator()
+    result = generator.generate_markdown(input_html=cleaned_html, base_url=url)
+    return result.raw_markdown
+
+
+def clean_and_convert(html: str, html_cleaner=None) -> str:
+    """Clean HTML with an optional HtmlCleaner and convert it to markdown.
+
+    Module-level so it can be sent to a ProcessPoolExecutor.
+
+    Args:
+        html: Raw HTML of the rendered page
+        html_cleaner: Optional HtmlCleaner instance
+
+    Returns:
+        Raw markdown string
+    """
+    return clean_and_convert_timed(html, html_cleaner)[0]
+
+
+def clean_and_convert_timed(
+    html: str, html_cleaner=None
+) -> Tuple[str, Dict[str, float]]:
+    """Like clean_and_convert, but also time the clean and convert phases.
+
+    Args:
+        html: Raw HTML of the rendered page
+        html_cleaner: Optional HtmlCleaner instance
+
+    Returns:
+        Tuple of (raw markdown, seconds by phase), with wall time under
+        'clean' and 'convert' and CPU time under 'clean_cpu' and
+        'convert_cpu'
+    """
+    timings: Dict[str, float] = {}
+    with timed(timings, "clean"):
+        if html_cleaner is not None:
+            # Rebinding drops this frame's reference to the raw HTML
+            html = html_cleaner.clean(html)
+    with timed(timings, "convert"):
+        markdown = html_to_markdown(html)
+    return markdown, timings
+
+
+def start_worker(html_cleaner=None, profile_prefix: Optional[str] = None) -> None:
+    """Set up a conversion process (ProcessPoolExecutor initializer).
+
+    The cleaner is sent, and its selectors compiled, once per process
+    instead of with every page; see convert_in_worker.
+
+    Args:
+        html_cleaner: Optional HtmlCleaner used for every page
+        profile_prefix: Optional prefix for start_worker_profile
+    """
+    global _worker_cleaner
+    _worker_cleaner = html_cleaner
+    if profile_prefix:
+        start_worker_profile(profile_prefix)
+
+
+def convert_in_worker(html: str) -> Tuple[str, Dict[str, float]]:
+    """clean_and_convert_timed with the cleaner given to start_worker."""
+    return clean_and_convert_timed(html, _worker_cleaner)
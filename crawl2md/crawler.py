@@ -1,15 +1,61 @@
 """Crawler module using crawl4ai."""
 
 import asyncio
-import random
-from typing import AsyncGenerator, List
+import math
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from typing import (
+    AsyncGenerator,
+    AsyncIterable,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Mapping,
+    Optional,
+    Union,
+)
 
+import httpx
 from crawl4ai import AsyncWebCrawler, CacheMode, CrawlerRunConfig
 
+from crawl2md.browser_pool import (
+    BrowserPool,
+    DEFAULT_BROWSERS,
+    DEFAULT_MAX_PAGES_PER_BROWSER,
+)
+from crawl2md.converter import (
+    clean_and_convert_timed,
+    convert_in_worker,
+    start_worker,
+)
+from crawl2md.dedup import extract_canonical
+from crawl2md.discovery import extract_links, page_links
+from crawl2md.host_scheduler import HostScheduler
+from crawl2md.html_cache import HtmlCache
+from crawl2md.http_fetcher import (
+    DEFAULT_FETCHER,
+    FETCHER_AUTO,
+    FETCHER_BROWSER,
+    FETCHERS,
+    HttpFetcher,
+    conditional_headers,
+)
+from crawl2md.memory import MB, ByteBudget, DEFAULT_MAX_INFLIGHT_MB
+from crawl2md.rate_limit import TokenBucket
+from crawl2md.resource_blocking import (
+    DEFAULT_PAGE_TIMEOUT,
+    DEFAULT_WAIT_UNTIL,
+    ResourceBlocker,
+)
+from crawl2md.retry import RetryPolicy, classify_failure
+
 
 MAX_CONCURRENT_CRAWLS = 10
-BATCH_MIN_DELAY = 1.0
-BATCH_MAX_DELAY = 3.0
+DEFAULT_RATE_LIMIT = 5.0
+DEFAULT_BURST = 10
+REVALIDATE_TIMEOUT = 30.0
 
 
 class Crawler:
@@ -19,90 +65,636 @@ class Crawler:
         self,
         max_concurrent: int = MAX_CONCURRENT_CRAWLS,
         html_cleaner=None,
+        browsers: int = DEFAULT_BROWSERS,
+        max_pages_per_browser: Optional[int] = DEFAULT_MAX_PAGES_PER_BROWSER,
+        max_browser_memory_mb: Optional[float] = None,
+        rate_limit: Optional[float] = DEFAULT_RATE_LIMIT,
+        burst: int = DEFAULT_BURST,
+        cpu_workers: int = 0,
+        fetcher: str = DEFAULT_FETCHER,
+        http_fetcher: Optional[HttpFetcher] = None,
+        per_host_concurrency: Optional[int] = None,
+        per_host_rate: Optional[float] = None,
+        adaptive_concurrency: bool = False,
+        respect_crawl_delay: bool = False,
+        retry_policy: Optional[RetryPolicy] = None,
+        profile_prefix: Optional[str] = None,
+        max_inflight_mb: Optional[float] = DEFAULT_MAX_INFLIGHT_MB,
+        html_cache: Optional[HtmlCache] = None,
+        resource_blocker: Optional[ResourceBlocker] = None,
+        wait_until: str = DEFAULT_WAIT_UNTIL,
+        page_timeout: float = DEFAULT_PAGE_TIMEOUT,
+        discover_links: bool = False,
     ):
         """Initialize the crawler.
 
         Args:
             max_concurrent: Maximum number of concurrent crawl operations
             html_cleaner: Optional HtmlCleaner instance for preprocessing HTML
+            browsers: Number of long-lived browsers shared by all crawls
+            max_pages_per_browser: Restart a browser after this many pages
+            max_browser_memory_mb: Restart browsers above this combined RSS
+            rate_limit: Maximum requests started per second (None disables)
+            burst: Requests allowed back to back before rate limiting kicks in
+            cpu_workers: Processes for HTML cleaning and markdown conversion
+                (0 converts inline on the event loop)
+            fetcher: "browser" renders every page, "http" fetches pages with
+                plain GET requests, "auto" uses GET and falls back to the
+                browser for pages that look JavaScript-rendered
+            http_fetcher: HttpFetcher for the "http" and "auto" modes
+                (created with default heuristics if omitted)
+            per_host_concurrency: Maximum concurrent requests to one host
+                (defaults to max_concurrent)
+            per_host_rate: Maximum requests started per second per host
+                (None disables)
+            adaptive_concurrency: Adapt each host's concurrency to 429/503
+                answers and latency (AIMD)
+            respect_crawl_delay: Honor robots.txt Crawl-delay per host
+            retry_policy: RetryPolicy for transient failures in crawl_many
+                (defaults to 3 attempts with exponential backoff)
+            profile_prefix: Run cProfile in each conversion process and
+                write its stats to ``<profile_prefix>.<pid>.prof`` on close
+                (see profiling.merge_profiles)
+            max_inflight_mb: Fetched HTML that crawl_many holds at once, in
+                MB, before workers wait to start new fetches (None disables);
+                see ``memory_budget``
+            html_cache: HtmlCache that keeps the raw HTML of fetched pages
+                and serves pages cached within its TTL without a request
+            resource_blocker: ResourceBlocker installed on every browser
+                page, to skip images, fonts, trackers and the like
+            wait_until: Page-load event the browser waits for before
+                reading the HTML (see resource_blocking.WAIT_UNTIL)
+            page_timeout: Seconds a browser page may take to load
+            discover_links: Add the page URLs each page links to under
+                'links' (see discovery.page_links)
         """
+        if fetcher not in FETCHERS:
+            raise ValueError(f"Unknown fetcher {fetcher!r}, expected one of {FETCHERS}")
         self.max_concurrent = max_concurrent
         self.html_cleaner = html_cleaner
+        self.cpu_workers = cpu_workers
+        self.profile_prefix = profile_prefix
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._http: Optional[httpx.AsyncClient] = None
+        self._started = False
+        self._browser_lock: Optional[asyncio.Lock] = None
+        self.fetcher = fetcher
+        self.html_cache = html_cache
+        self.discover_links = discover_links
+        self.http_fetcher = None
+        if fetcher != FETCHER_BROWSER:
+            self.http_fetcher = http_fetcher or HttpFetcher(
+                max_connections=max_concurrent
+            )
+        self.http_pages = 0
+        # Building a CrawlerRunConfig is slow, so share one across pages
+        self.run_config = CrawlerRunConfig(
+            cache_mode=CacheMode.BYPASS,
+            wait_until=wait_until,
+            page_timeout=int(page_timeout * 1000),
+        )
+        self.resource_blocker = resource_blocker
+        self.rate_limiter = TokenBucket(rate_limit, burst) if rate_limit else None
+        self.retry_policy = retry_policy or RetryPolicy()
+        # Shared with the OutputWriter so queued writes count as well
+        self.memory_budget = (
+            ByteBudget(int(max_inflight_mb * MB)) if max_inflight_mb else None
+        )
+        self.scheduler = HostScheduler(
+            max_per_host=per_host_concurrency or max_concurrent,
+            rate=per_host_rate,
+            adaptive=adaptive_concurrency,
+            respect_crawl_delay=respect_crawl_delay,
+        )
+        self.pool = BrowserPool(
+            browsers=browsers,
+            pages_per_browser=max(1, math.ceil(max_concurrent / browsers)),
+            max_pages_per_browser=max_pages_per_browser,
+            max_memory_mb=max_browser_memory_mb,
+            crawler_factory=self._new_browser,
+        )
+
+    def _new_browser(self) -> AsyncWebCrawler:
+        crawler = AsyncWebCrawler()
+        if self.resource_blocker is not None:
+            crawler.crawler_strategy.set_hook(
+                "on_page_context_created", self.resource_blocker.install
+            )
+        return crawler
+
+    @property
+    def started(self) -> bool:
+        """Whether the crawler is started and ready to fetch pages."""
+        return self._started
+
+    async def start(self) -> None:
+        """Launch the browser pool and the conversion process pool.
+
+        In "auto" mode browsers are only launched once a page needs one,
+        and in "http" mode never.
+        """
+        if self.fetcher == FETCHER_BROWSER:
+            await self.pool.start()
+        if self.cpu_workers and self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.cpu_workers,
+                # The cleaner goes to each process once, not with every page
+                initializer=start_worker,
+                initargs=(self.html_cleaner, self.profile_prefix),
+            )
+        self._started = True
+
+    async def close(self) -> None:
+        """Shut down the browser pool and the conversion process pool."""
+        executor, self._executor = self._executor, None
+        http, self._http = self._http, None
+        self._started = False
+        try:
+            await self.pool.close()
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+            if http is not None:
+                await http.aclose()
+            if self.http_fetcher is not None:
+                await self.http_fetcher.close()
+            await self.scheduler.aclose()
+
+    async def __aenter__(self) -> "Crawler":
+        await self.start()
+        return self
 
-    async def crawl_single(self, url: str) -> dict:
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    @asynccontextmanager
+    async def _running(self) -> AsyncIterator[None]:
+        """Keep the crawler running, starting it only if nobody else has."""
+        if self.started:
+            yield
+            return
+        async with self:
+            yield
+
+    def browser_stats(self) -> dict:
+        """Return browser launches versus pages crawled for this run."""
+        return self.pool.stats()
+
+    def host_stats(self) -> Dict[str, dict]:
+        """Return per-host in-flight requests, concurrency cap and rate."""
+        return self.scheduler.stats()
+
+    def retry_stats(self) -> dict:
+        """Return retries granted and refused for lack of retry budget."""
+        return self.retry_policy.stats()
+
+    def fetch_stats(self) -> dict:
+        """Return how many pages were fetched over HTTP and in the browser."""
+        return {"http": self.http_pages, "browser": self.pool.pages_crawled}
+
+    async def crawl_single(self, url: str, validator: Optional[dict] = None) -> dict:
         """Crawl a single URL and extract markdown.
 
         Args:
             url: URL to crawl
+            validator: Optional dict with 'etag' and 'last_modified' from a
+                previous crawl; the page is only rendered if it changed
 
         Returns:
-            Dictionary with 'url', 'markdown', and 'success' keys
+            Dictionary with 'url', 'markdown', and 'success' keys, plus
+            'etag' and 'last_modified' response headers and the page's
+            'canonical_url' (<link rel="canonical">) when available, and
+            with ``discover_links`` the page's 'links'. Unchanged pages
+            have 'not_modified' set and no markdown.
+            'timings' holds the wall seconds spent by phase ('fetch', and
+            'clean' and 'convert' when HTML was converted here, with their
+            CPU seconds under 'clean_cpu' and 'convert_cpu') and 'bytes'
+            the size of the fetched HTML. Pages served from the HTML cache
+            have 'cached' set.
         """
+        async with self._running():
+            fetched = await self._cached(url) if not validator else None
+            if fetched is None:
+                fetched = await self._timed_fetch(url, validator)
+            return await self._convert(fetched)
+
+    def queue_stats(self) -> dict:
+        """Return URLs queued, in flight and waiting for a retry."""
+        return self.scheduler.totals()
+
+    def cache_stats(self) -> Optional[dict]:
+        """Return the HTML cache's size and hit counters, if there is a cache."""
+        return self.html_cache.stats() if self.html_cache else None
+
+    def resource_stats(self) -> Optional[dict]:
+        """Return the browser requests blocked and bytes received, if any."""
+        return self.resource_blocker.stats() if self.resource_blocker else None
+
+    def memory_stats(self) -> Optional[dict]:
+        """Return the in-flight byte budget's usage, if there is a budget."""
+        return self.memory_budget.stats() if self.memory_budget else None
+
+    async def _not_modified(self, url: str, validator: dict) -> bool:
+        """Send a conditional HEAD request and report a 304 answer."""
+        headers = conditional_headers(validator)
+        if not headers:
+            return False
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                timeout=REVALIDATE_TIMEOUT, follow_redirects=True
+            )
         try:
-            async with AsyncWebCrawler() as crawler:
-                result = await crawler.arun(
-                    url=url, config=CrawlerRunConfig(cache_mode=CacheMode.BYPASS)
-                )
+            response = await self._http.head(url, headers=headers)
+        except httpx.HTTPError:
+            return False
+        return response.status_code == 304
 
-                if result.success:
-                    raw_html = result.html
-                    if self.html_cleaner and raw_html:
-                        cleaned_html = self.html_cleaner.clean(raw_html)
-                        raw_result = await crawler.arun(
-                            url=f"raw:{cleaned_html}",
-                            config=CrawlerRunConfig(cache_mode=CacheMode.BYPASS),
-                        )
-                        if raw_result.success:
-                            markdown = (
-                                raw_result.markdown
-                                if isinstance(raw_result.markdown, str)
-                                else raw_result.markdown.raw_markdown
-                            )
-                            return {"url": url, "markdown": markdown, "success": True}
-                    markdown = (
-                        result.markdown
-                        if isinstance(result.markdown, str)
-                        else result.markdown.raw_markdown
-                    )
-                    return {"url": url, "markdown": markdown, "success": True}
-                else:
-                    return {
-                        "url": url,
-                        "markdown": None,
-                        "success": False,
-                        "error": result.error_message,
-                    }
+    async def _cached(self, url: str) -> Optional[dict]:
+        """Return a page from the HTML cache as a fetch result, or None.
+
+        Cache hits come back with 'cached' set and their HTML still to be
+        converted, like pages fetched over HTTP.
+        """
+        if self.html_cache is None:
+            return None
+        started = time.perf_counter()
+        html = await asyncio.to_thread(self.html_cache.get, url)
+        if html is None:
+            return None
+        return {
+            "url": url,
+            "success": True,
+            "cached": True,
+            "canonical_url": extract_canonical(html, url),
+            **self._links(html, url),
+            # Characters rather than bytes, to avoid encoding a copy
+            "bytes": len(html),
+            "html": html,
+            "timings": {"fetch": time.perf_counter() - started},
+        }
+
+    def _links(self, html: str, url: str, links=None) -> dict:
+        """Return a page's links as a result entry, if links are wanted.
+
+        ``links`` are crawl4ai's, used instead of parsing the HTML.
+        """
+        if not self.discover_links:
+            return {}
+        if isinstance(links, dict):
+            hrefs = (
+                link.get("href")
+                for group in links.values()
+                for link in group
+                if isinstance(link, dict)
+            )
+            return {"links": page_links(hrefs, url)}
+        return {"links": extract_links(html, url)}
+
+    async def _store(self, url: str, html: str) -> None:
+        """Keep a fetched page's raw HTML in the cache, if there is one."""
+        if self.html_cache is None or not html:
+            return
+        try:
+            await asyncio.to_thread(self.html_cache.put, url, html)
+        except (OSError, sqlite3.Error):
+            # A full or unwritable cache must not fail the crawl
+            pass
+
+    async def _timed_fetch(self, url: str, validator: Optional[dict] = None) -> dict:
+        """Fetch a page, recording the elapsed time under 'timings'."""
+        started = time.perf_counter()
+        fetched = await self._fetch(url, validator)
+        fetched["timings"] = {"fetch": time.perf_counter() - started}
+        return fetched
+
+    async def _fetch(self, url: str, validator: Optional[dict] = None) -> dict:
+        """Fetch a page over HTTP or render it in the browser.
+
+        Pages that still need cleaning come back with an 'html' key instead
+        of 'markdown'; pass them to _convert to finish them.
+        """
+        if self.http_fetcher is not None:
+            fetched = await self._fetch_http(url, validator)
+            if fetched is not None:
+                return fetched
+        elif validator and await self._not_modified(url, validator):
+            return _not_modified_result(url)
+        try:
+            if not self.pool.started:
+                await self._start_browsers()
+            async with self.pool.page() as crawler:
+                result = await crawler.arun(url=url, config=self.run_config)
         except Exception as e:
             return {"url": url, "markdown": None, "success": False, "error": str(e)}
 
-    async def crawl_many(self, urls: List[str]) -> AsyncGenerator[dict, None]:
+        status = _status_code(result)
+        if not result.success:
+            return {
+                "url": url,
+                "markdown": None,
+                "success": False,
+                "error": result.error_message,
+                **status,
+            }
+        fetched = {"url": url, "success": True, **status, **_validators(result)}
+        if isinstance(result.html, str):
+            await self._store(url, result.html)
+            fetched["canonical_url"] = extract_canonical(result.html, url)
+            fetched.update(self._links(result.html, url, result.links))
+            fetched["bytes"] = len(result.html.encode("utf-8"))
+        if self.html_cleaner and result.html:
+            fetched["html"] = result.html
+            return fetched
+        fetched["markdown"] = (
+            result.markdown
+            if isinstance(result.markdown, str)
+            else result.markdown.raw_markdown
+        )
+        return fetched
+
+    async def _fetch_http(self, url: str, validator: Optional[dict]) -> Optional[dict]:
+        """Fetch a page with a plain GET.
+
+        Returns None when the browser should render the page instead, which
+        only happens in "auto" mode for pages that look JavaScript-rendered.
+        Errors and non-HTML responses fail as in "http" mode, so they cost
+        no browser request.
+        """
+        try:
+            response = await self.http_fetcher.get(url, validator)
+        except httpx.HTTPError as e:
+            return {"url": url, "markdown": None, "success": False, "error": str(e)}
+
+        if response.status_code == 304:
+            return _not_modified_result(url)
+        content_type = response.headers.get("content-type", "")
+        if response.status_code >= 400 or "html" not in content_type:
+            error = (
+                f"HTTP {response.status_code}"
+                if response.status_code >= 400
+                else f"Unsupported content type {content_type!r}"
+            )
+            failed = {
+                "url": url,
+                "markdown": None,
+                "success": False,
+                "error": error,
+                "status_code": response.status_code,
+            }
+            retry_after = response.headers.get("retry-after", "")
+            if retry_after.isdigit():
+                failed["retry_after"] = int(retry_after)
+            return failed
+
+        html = response.text
+        if self.fetcher == FETCHER_AUTO and self.http_fetcher.looks_js_rendered(html):
+            return None
+        self.http_pages += 1
+        await self._store(url, html)
+        return {
+            "url": url,
+            "success": True,
+            "status_code": response.status_code,
+            **_header_validators(response.headers),
+            "canonical_url": extract_canonical(html, url),
+            **self._links(html, url),
+            "bytes": len(response.content),
+            "html": html,
+        }
+
+    async def _start_browsers(self) -> None:
+        """Launch the browser pool on first use ("auto" mode)."""
+        if self._browser_lock is None:
+            self._browser_lock = asyncio.Lock()
+        async with self._browser_lock:
+            await self.pool.start()
+
+    async def _convert(self, fetched: dict) -> dict:
+        """Clean and convert fetched HTML, in the process pool if configured."""
+        if "html" not in fetched:
+            return fetched
+        url = fetched["url"]
+        # Popped and passed straight on, so the raw HTML is freed as soon
+        # as the cleaner has replaced it
+        try:
+            if self._executor is not None:
+                loop = asyncio.get_running_loop()
+                markdown, timings = await loop.run_in_executor(
+                    self._executor, convert_in_worker, fetched.pop("html")
+                )
+            else:
+                markdown, timings = clean_and_convert_timed(
+                    fetched.pop("html"), self.html_cleaner
+                )
+        except Exception as e:
+            return {
+                "url": url,
+                "markdown": None,
+                "success": False,
+                "error": str(e),
+                "timings": fetched.get("timings", {}),
+            }
+        converted = dict(fetched)
+        converted["markdown"] = markdown
+        converted["timings"] = {**fetched.get("timings", {}), **timings}
+        return converted
+
+    async def crawl_many(
+        self,
+        urls: Union[Iterable[str], AsyncIterable[str]],
+        validators: Optional[Dict[str, dict]] = None,
+        deadline: Optional[float] = None,
+    ) -> AsyncGenerator[dict, None]:
         """Crawl multiple URLs concurrently, yielding results as they complete.
 
+        A fixed set of ``max_concurrent`` workers pulls URLs from the host
+        scheduler, so a new crawl starts as soon as any slot frees up.
+        The scheduler hands out URLs round robin across hosts, within each
+        host's concurrency cap, rate limit and robots.txt Crawl-delay, so a
+        slow host cannot hold up the others. Global politeness is enforced
+        by the token-bucket rate limit rather than fixed sleeps.
+
+        With ``cpu_workers`` set, fetching and conversion run as separate
+        stages: a worker hands fetched HTML to the process pool and moves on
+        to the next URL, but blocks once ``2 * cpu_workers`` pages are waiting
+        for conversion, so fetched HTML cannot pile up without limit.
+
+        With ``memory_budget`` set, a fetched page's HTML size is held
+        against the budget from the fetch until the consumer moves on to
+        the next result. A worker whose page does not fit waits before
+        starting another fetch, so a run of multi-MB pages slows the crawl
+        instead of growing memory with ``max_concurrent``.
+
+        ``urls`` may be an async iterable, such as a streaming sitemap, so
+        crawling starts before the whole URL list is known. URLs are read
+        only as fast as the scheduler's buffer drains.
+
+        Transient failures (timeouts, browser crashes, 429, 5xx) are retried
+        according to ``retry_policy``: the URL is re-queued at the back of
+        its host's queue after a jittered backoff, so it never holds a slot
+        while waiting. Only the final outcome of a URL is yielded.
+
+        With ``deadline`` set, workers start no new fetch once it has
+        passed: crawls in progress finish, and queued URLs, URLs waiting
+        for a retry and the rest of ``urls`` are dropped without a result.
+
         Args:
-            urls: List of URLs to crawl
+            urls: URLs to crawl (iterable or async iterable)
+            validators: Optional validators by URL (see crawl_single) for
+                conditional re-crawls
+            deadline: Optional ``time.monotonic()`` time after which no
+                new crawl is started
 
         Yields:
-            Result dictionaries one at a time as crawls complete
+            Result dictionaries one at a time as crawls complete, with
+            'attempts' and 'timings' (of the last attempt) set, and
+            'error_class' ("transient" or "permanent") on failures
         """
-        semaphore = asyncio.Semaphore(self.max_concurrent)
+        validators = validators if validators is not None else {}
+        scheduler = self.scheduler
+        retry_policy = self.retry_policy
+        attempts: Dict[str, int] = {}
+        results: asyncio.Queue = asyncio.Queue()
+        done = object()
+        convert_slots = asyncio.Semaphore(max(1, 2 * self.cpu_workers))
+        budget = self.memory_budget
+        # Bytes held against the budget by URL, until the result is consumed
+        reserved: Dict[str, int] = {}
+
+        async def convert(fetched: dict) -> None:
+            try:
+                await results.put(await self._convert(fetched))
+            finally:
+                convert_slots.release()
+
+        async def feed() -> None:
+            try:
+                if isinstance(urls, AsyncIterable):
+                    async for url in urls:
+                        await scheduler.put(url)
+                else:
+                    for url in urls:
+                        await scheduler.put(url)
+            finally:
+                scheduler.close()
+
+        async def worker() -> None:
+            pending = set()
+            try:
+                # Each worker pulls the next URL as soon as its slot frees up
+                while True:
+                    if deadline is None:
+                        url = await scheduler.get()
+                    else:
+                        time_left = deadline - time.monotonic()
+                        if time_left <= 0:
+                            break
+                        try:
+                            url = await asyncio.wait_for(scheduler.get(), time_left)
+                        except asyncio.TimeoutError:
+                            break
+                    if url is None:
+                        break
+                    attempt = attempts.get(url, 0) + 1
+                    attempts[url] = attempt
+                    retry_policy.record_attempt(attempt)
+                    # Conditional re-crawls need the server's answer
+                    fetched = await self._cached(url) if url not in validators else None
+                    if fetched is None:
+                        if self.rate_limiter:
+                            await self.rate_limiter.acquire()
+                        fetched = await self._timed_fetch(url, validators.get(url))
+                    scheduler.done(
+                        url,
+                        fetched.get("status_code"),
+                        # A cache hit says nothing about the server's latency
+                        None if fetched.get("cached") else fetched["timings"]["fetch"],
+                    )
+                    if not fetched["success"]:
+                        delay = retry_policy.next_delay(fetched, attempt)
+                        if delay is not None:
+                            scheduler.put_later(url, delay)
+                            continue
+                    if budget is not None and fetched.get("bytes"):
+                        await budget.acquire(fetched["bytes"])
+                        reserved[url] = reserved.get(url, 0) + fetched["bytes"]
+                    if "html" not in fetched or self._executor is None:
+                        await results.put(await self._convert(fetched))
+                        continue
+                    await convert_slots.acquire()
+                    task = asyncio.ensure_future(convert(fetched))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+                if pending:
+                    await asyncio.gather(*pending)
+            except Exception as e:
+                # Other workers may wait on this worker's URL forever, so
+                # hand the error to the consumer to stop the whole run
+                results.put_nowait(e)
+                raise
+            finally:
+                for task in pending:
+                    task.cancel()
+                results.put_nowait(done)
+
+        async with self._running():
+            feeder = asyncio.ensure_future(feed())
+            workers = [
+                asyncio.ensure_future(worker()) for _ in range(self.max_concurrent)
+            ]
+            try:
+                remaining = len(workers)
+                while remaining:
+                    result = await results.get()
+                    if result is done:
+                        remaining -= 1
+                        continue
+                    if isinstance(result, Exception):
+                        raise result
+                    result["attempts"] = attempts.pop(result["url"], 1)
+                    if not result["success"]:
+                        result["error_class"] = classify_failure(result)
+                    yield result
+                    if budget is not None:
+                        budget.release(reserved.pop(result["url"], 0))
+                # Surface URL source and worker errors instead of dropping
+                # them; past the deadline the feeder may still be running
+                if deadline is None or feeder.done():
+                    feeder.result()
+                for task in workers:
+                    task.result()
+            finally:
+                for task in [feeder, *workers]:
+                    task.cancel()
+                await asyncio.gather(feeder, *workers, return_exceptions=True)
+                scheduler.clear()
+                if budget is not None:
+                    budget.release(sum(reserved.values()))
+
+
+def _not_modified_result(url: str) -> dict:
+    return {"url": url, "markdown": None, "success": True, "not_modified": True}
+
 
-        async def crawl_with_limit(url: str) -> dict:
-            async with semaphore:
-                return await self.crawl_single(url)
+def _status_code(result) -> dict:
+    """Return the HTTP status of a crawl4ai result as a dict entry, if known."""
+    status = getattr(result, "status_code", None)
+    return {"status_code": status} if isinstance(status, int) else {}
 
-        # Process URLs in batches
-        for i in range(0, len(urls), self.max_concurrent):
-            batch = urls[i : i + self.max_concurrent]
 
-            # Create tasks for this batch
-            batch_tasks = [crawl_with_limit(url) for url in batch]
+def _validators(result) -> dict:
+    """Extract ETag and Last-Modified from a crawl4ai result's headers."""
+    headers = getattr(result, "response_headers", None)
+    if not isinstance(headers, dict):
+        return {}
+    return _header_validators(headers)
 
-            # Run batch concurrently and yield results as they complete
-            for completed_task in asyncio.as_completed(batch_tasks):
-                result = await completed_task
-                yield result
 
-            # Add random delay between batches (except after last batch)
-            if i + self.max_concurrent < len(urls):
-                delay = random.uniform(BATCH_MIN_DELAY, BATCH_MAX_DELAY)
-                await asyncio.sleep(delay)
+def _header_validators(headers: Mapping[str, str]) -> dict:
+    """Extract ETag and Last-Modified from response headers."""
+    lowered = {str(k).lower(): v for k, v in headers.items()}
+    return {
+        key: lowered[header]
+        for key, header in (("etag", "etag"), ("last_modified", "last-modified"))
+        if lowered.get(header)
+    }
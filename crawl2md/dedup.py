@@ -0,0 +1,138 @@
+"""URL normalization and content deduplication module."""
+
+import re
+from fnmatch import fnmatchcase
+from typing import Dict, Iterable, Optional
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+
+# Query parameters that never change the content (shell-style patterns)
+DEFAULT_IGNORED_PARAMS = (
+    "utm_*",
+    "gclid",
+    "fbclid",
+    "msclkid",
+    "mc_cid",
+    "mc_eid",
+)
+INDEX_PAGES = ("index.html", "index.htm")
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+_HEAD_END_RE = re.compile(r"</head\s*>|<body\b", re.IGNORECASE)
+_LINK_RE = re.compile(r"<link\b[^>]*>", re.IGNORECASE)
+_ATTR_RE = re.compile(
+    r"""([a-zA-Z-]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>"']+))""", re.IGNORECASE
+)
+
+
+def normalize_url(
+    url: str, ignored_params: Iterable[str] = DEFAULT_IGNORED_PARAMS
+) -> str:
+    """Reduce URL variants of the same page to one form.
+
+    Lowercases the scheme and host, drops default ports, fragments, trailing
+    slashes, ``index.html`` and ignored query parameters, and sorts the
+    remaining parameters.
+
+    Args:
+        url: Absolute URL
+        ignored_params: Shell-style patterns of query parameters to drop
+
+    Returns:
+        Normalized URL
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if ":" in host:
+        host = f"[{host}]"
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host
+    if port and DEFAULT_PORTS.get(scheme) != port:
+        netloc = f"{host}:{port}"
+    if parts.username:
+        userinfo = parts.username
+        if parts.password:
+            userinfo += f":{parts.password}"
+        netloc = f"{userinfo}@{netloc}"
+
+    path = parts.path or "/"
+    last_segment = path.rsplit("/", 1)[-1]
+    if last_segment.lower() in INDEX_PAGES:
+        path = path[: -len(last_segment)]
+    path = path.rstrip("/") or "/"
+
+    patterns = tuple(ignored_params)
+    params = [
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not any(fnmatchcase(key.lower(), pattern) for pattern in patterns)
+    ]
+    query = urlencode(sorted(params))
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+def extract_canonical(html: str, url: str) -> Optional[str]:
+    """Return the absolute URL of the page's <link rel="canonical">, if any.
+
+    Only the document head is searched.
+
+    Args:
+        html: Page HTML
+        url: URL the page was fetched from, to resolve relative links
+
+    Returns:
+        Absolute canonical URL, or None
+    """
+    head_end = _HEAD_END_RE.search(html)
+    head = html[: head_end.start()] if head_end else html
+    for tag in _LINK_RE.findall(head):
+        attrs = {
+            name.lower(): next(v for v in values if v is not None)
+            for name, *values in _ATTR_RE.findall(tag)
+        }
+        if "canonical" in attrs.get("rel", "").lower().split() and attrs.get("href"):
+            return urljoin(url, attrs["href"].strip())
+    return None
+
+
+class ContentIndex:
+    """Map hashes of saved content to the URL whose file holds it.
+
+    Hashes from earlier runs are looked up in the state store, so a page
+    whose content was already saved under another URL is detected across
+    runs too.
+    """
+
+    def __init__(self, state=None):
+        """Initialize the index.
+
+        Args:
+            state: Optional CrawlState to consult for hashes of earlier runs
+        """
+        self.state = state
+        self.duplicates = 0
+        self._owners: Dict[str, str] = {}
+
+    def claim(self, content_hash: str, url: str) -> Optional[str]:
+        """Register ``url`` as holding some content, unless another URL does.
+
+        Args:
+            content_hash: Hash of the cleaned markdown
+            url: URL about to be saved with that content
+
+        Returns:
+            The URL already holding the content, or None if ``url`` now does
+        """
+        owner = self._owners.get(content_hash)
+        if owner is None and self.state is not None:
+            owner = self.state.find_content(content_hash)
+        if owner is None or owner == url:
+            self._owners[content_hash] = url
+            return None
+        self._owners[content_hash] = owner
+        self.duplicates += 1
+        return owner
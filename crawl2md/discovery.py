@@ -0,0 +1,404 @@
+"""Link discovery module: find pages a sitemap does not list.
+
+In discovery mode the links of every crawled page are followed within the
+crawl's hosts. URLs already seen are recognised by a SeenSet of 8-byte
+hashes in a sorted array, so a million-URL site takes about 8 MB. URLs
+waiting to be crawled are kept on disk in a LinkQueue, together with the
+number of links followed to reach them (their depth). LinkDiscovery ties
+them together: it hands queued URLs to the crawl and queues the links of
+the pages crawled.
+"""
+
+import asyncio
+import bisect
+import hashlib
+import os
+import re
+import sqlite3
+from array import array
+from typing import (
+    AsyncIterator,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+from urllib.parse import urldefrag, urljoin, urlsplit
+
+from crawl2md.host_scheduler import host_of
+from crawl2md.sitemap import SitemapEntry
+
+
+LINKS_FILENAME = ".crawl2md-links.sqlite"
+# URLs taken from the link queue, or seeds read from the sitemap, at a time
+DISCOVERY_BATCH_SIZE = 500
+# Hashes buffered in a set before they are merged into the sorted array
+SEEN_MERGE_EVERY = 65536
+# Paths of links that are not pages, skipped before they are queued
+NON_PAGE_EXTENSIONS = (
+    ".7z",
+    ".avi",
+    ".bmp",
+    ".css",
+    ".csv",
+    ".dmg",
+    ".doc",
+    ".docx",
+    ".exe",
+    ".gif",
+    ".gz",
+    ".ico",
+    ".jpeg",
+    ".jpg",
+    ".js",
+    ".json",
+    ".mov",
+    ".mp3",
+    ".mp4",
+    ".pdf",
+    ".png",
+    ".ppt",
+    ".pptx",
+    ".rar",
+    ".svg",
+    ".tar",
+    ".tgz",
+    ".wav",
+    ".webm",
+    ".webp",
+    ".woff",
+    ".woff2",
+    ".xls",
+    ".xlsx",
+    ".xml",
+    ".zip",
+)
+
+_ANCHOR_RE = re.compile(r"<a\b[^>]*>", re.IGNORECASE)
+_ATTR_RE = re.compile(
+    r"""([a-zA-Z-]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>"']+))""", re.IGNORECASE
+)
+
+
+def page_links(hrefs: Iterable[Optional[str]], url: str) -> List[str]:
+    """Resolve link targets into absolute page URLs.
+
+    Fragments are dropped; non-HTTP links and links to files that are not
+    pages (see NON_PAGE_EXTENSIONS) are skipped, as are repeats.
+
+    Args:
+        hrefs: Link targets as written in the page
+        url: URL of the page, to resolve relative links
+
+    Returns:
+        Absolute URLs in page order
+    """
+    links = {}
+    for href in hrefs:
+        if not href:
+            continue
+        link = urldefrag(urljoin(url, href.strip()))[0]
+        parts = urlsplit(link)
+        if parts.scheme not in ("http", "https") or not parts.netloc:
+            continue
+        if parts.path.lower().endswith(NON_PAGE_EXTENSIONS):
+            continue
+        links[link] = None
+    return list(links)
+
+
+def extract_links(html: str, url: str) -> List[str]:
+    """Return the absolute URLs of a page's ``<a href>`` links.
+
+    Links marked ``rel="nofollow"`` are skipped.
+
+    Args:
+        html: Page HTML
+        url: URL the page was fetched from, to resolve relative links
+
+    Returns:
+        Absolute page URLs, see page_links
+    """
+    hrefs = []
+    for tag in _ANCHOR_RE.findall(html):
+        attrs = {
+            # Unmatched quoting alternatives come back as empty strings
+            name.lower(): next((v for v in values if v), "")
+            for name, *values in _ATTR_RE.findall(tag)
+        }
+        if "nofollow" in attrs.get("rel", "").lower().split():
+            continue
+        hrefs.append(attrs.get("href"))
+    return page_links(hrefs, url)
+
+
+def _url_hash(url: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "little"
+    )
+
+
+class SeenSet:
+    """Compact set of URLs, stored as 64-bit hashes.
+
+    Hashes live in a sorted array (8 bytes per URL), with the latest ones
+    in a small set until ``merge_every`` of them are merged in. Two URLs
+    sharing a hash are taken as one, which is vanishingly unlikely below
+    billions of URLs.
+    """
+
+    def __init__(self, merge_every: int = SEEN_MERGE_EVERY):
+        self.merge_every = merge_every
+        self._sorted = array("Q")
+        self._recent: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._sorted) + len(self._recent)
+
+    def __contains__(self, url: str) -> bool:
+        return self._has(_url_hash(url))
+
+    def _has(self, key: int) -> bool:
+        if key in self._recent:
+            return True
+        index = bisect.bisect_left(self._sorted, key)
+        return index < len(self._sorted) and self._sorted[index] == key
+
+    def add(self, url: str) -> bool:
+        """Add a URL; return whether it was new."""
+        key = _url_hash(url)
+        if self._has(key):
+            return False
+        self._recent.add(key)
+        if len(self._recent) >= self.merge_every:
+            self._merge()
+        return True
+
+    def _merge(self) -> None:
+        # Runs of the old array are copied between the new hashes, so the
+        # merge costs one bisect per new hash plus a memory copy
+        old = self._sorted
+        merged = array("Q")
+        start = 0
+        for key in sorted(self._recent):
+            index = bisect.bisect_left(old, key, start)
+            merged += old[start:index]
+            merged.append(key)
+            start = index
+        merged += old[start:]
+        self._sorted = merged
+        self._recent.clear()
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the hashes."""
+        # A set entry and its int take about 60 bytes
+        return self._sorted.itemsize * len(self._sorted) + 60 * len(self._recent)
+
+
+class LinkQueue:
+    """First-in first-out queue of URLs to crawl, kept in SQLite.
+
+    Every URL ever queued stays in the table, with its depth, so the
+    queue can be replayed by a resumed run and a URL is only queued once.
+    """
+
+    def __init__(self, path: str, resume: bool = False):
+        """Open (or create) the queue.
+
+        Args:
+            path: Path of the SQLite database file
+            resume: Keep the URLs queued by an earlier run; they are
+                handed out again from the start
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS links (
+                id INTEGER PRIMARY KEY,
+                url TEXT NOT NULL UNIQUE,
+                depth INTEGER NOT NULL,
+                lastmod TEXT
+            )
+            """
+        )
+        if not resume:
+            self._conn.execute("DELETE FROM links")
+        self._conn.commit()
+        self._cursor = 0
+
+    @classmethod
+    def in_directory(cls, output_dir: str, resume: bool = False) -> "LinkQueue":
+        """Open the link queue kept in an output directory."""
+        return cls(os.path.join(output_dir, LINKS_FILENAME), resume=resume)
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        self._conn.close()
+
+    def add(self, links: Iterable[Tuple[str, int, Optional[str]]]) -> int:
+        """Queue URLs not queued before.
+
+        Args:
+            links: (url, depth, sitemap lastmod or None) tuples
+
+        Returns:
+            Number of URLs queued
+        """
+        with self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO links (url, depth, lastmod) VALUES (?, ?, ?)",
+                links,
+            )
+            return self._conn.total_changes - before
+
+    def next_batch(self, size: int) -> List[SitemapEntry]:
+        """Take up to ``size`` URLs from the front of the queue."""
+        rows = self._conn.execute(
+            "SELECT id, url, lastmod FROM links WHERE id > ? ORDER BY id LIMIT ?",
+            (self._cursor, size),
+        ).fetchall()
+        if rows:
+            self._cursor = rows[-1][0]
+        return [SitemapEntry(url, lastmod) for _, url, lastmod in rows]
+
+    def depth(self, url: str) -> Optional[int]:
+        """Return the depth a URL was queued at, or None if it was not."""
+        row = self._conn.execute(
+            "SELECT depth FROM links WHERE url = ?", (url,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def urls(self) -> Iterator[str]:
+        """Yield every URL queued, taken or not."""
+        yield from (row[0] for row in self._conn.execute("SELECT url FROM links"))
+
+    def __len__(self) -> int:
+        """Return the number of URLs not taken yet."""
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM links WHERE id > ?", (self._cursor,)
+        ).fetchone()[0]
+
+
+class LinkDiscovery:
+    """Crawl order of discovery mode: the seeds, then the links found.
+
+    URLs come out of a LinkQueue, breadth first. Links are followed on the
+    hosts of the seeds only, up to ``max_depth`` links away from them, and
+    every URL is queued once, variants recognised by ``url_key``.
+    """
+
+    def __init__(
+        self,
+        link_queue: LinkQueue,
+        url_key: Optional[Callable[[str], str]] = None,
+        max_depth: int = 0,
+        batch_size: int = DISCOVERY_BATCH_SIZE,
+    ):
+        """Start discovery over a link queue.
+
+        Args:
+            link_queue: Queue the URLs are kept in; a resumed queue is
+                replayed and its URLs are not queued again
+            url_key: Function giving the key URLs are seen under, e.g. a
+                URL normalizer; URLs are queued and fetched as written
+            max_depth: Links followed at most from a seed, 0 for no limit
+            batch_size: URLs taken from the queue, or sitemap entries read,
+                at a time
+        """
+        self.link_queue = link_queue
+        self.url_key = url_key or (lambda url: url)
+        self.max_depth = max_depth
+        self.batch_size = batch_size
+        self.seen = SeenSet()
+        # Hosts links are followed on
+        self.hosts: Set[str] = set()
+        # URLs queued from links rather than as seeds
+        self.discovered = 0
+        self._links_found: Optional[asyncio.Event] = None
+        for url in link_queue.urls():
+            self.seen.add(self.url_key(url))
+
+    def seed(self, urls: Iterable[Tuple[str, Optional[str]]]) -> None:
+        """Queue start URLs and follow links on their hosts.
+
+        Args:
+            urls: (url, sitemap lastmod or None) pairs
+        """
+        seeds = []
+        for url, lastmod in urls:
+            self.hosts.add(host_of(url))
+            if self.seen.add(self.url_key(url)):
+                seeds.append((url, 0, lastmod))
+        self.link_queue.add(seeds)
+
+    async def entries(
+        self,
+        crawling: Callable[[], bool],
+        sitemap: Optional[AsyncIterator[SitemapEntry]] = None,
+    ) -> AsyncIterator[SitemapEntry]:
+        """Yield queued URLs until none are left.
+
+        The sitemap is read into the queue a batch at a time, whenever the
+        queue runs empty. Ends once the queue is empty and no page being
+        crawled can add to it.
+
+        Args:
+            crawling: Returns whether URLs handed out are still being
+                crawled, so their links may yet be followed
+            sitemap: Sitemap entries to seed the queue with
+        """
+        self._links_found = asyncio.Event()
+        while True:
+            batch = self.link_queue.next_batch(self.batch_size)
+            for entry in batch:
+                yield entry
+            if batch:
+                continue
+            if sitemap is not None:
+                seeds = []
+                async for entry in sitemap:
+                    seeds.append((entry.loc, entry.lastmod))
+                    if len(seeds) >= self.batch_size:
+                        break
+                else:
+                    sitemap = None
+                self.seed(seeds)
+                continue
+            if not crawling():
+                return
+            self._links_found.clear()
+            await self._links_found.wait()
+
+    def follow(self, url: str, links: Optional[List[str]]) -> None:
+        """Queue a crawled page's new links, within the hosts and depth.
+
+        Called for every URL handed out by ``entries`` once it is crawled,
+        links or not, so ``entries`` can tell when the crawl is over.
+
+        Args:
+            url: URL of the crawled page
+            links: URLs the page links to
+        """
+        if self._links_found is not None:
+            self._links_found.set()
+        if not links:
+            return
+        depth = self.link_queue.depth(url) or 0
+        if self.max_depth and depth >= self.max_depth:
+            return
+        new_links = []
+        for link in links:
+            if host_of(link) in self.hosts and self.seen.add(self.url_key(link)):
+                new_links.append((link, depth + 1, None))
+        self.discovered += self.link_queue.add(new_links)
@@ -0,0 +1,429 @@
+"""Distributed crawl module: a coordinator and workers sharing a work queue.
+
+The coordinator streams the sitemap, applies --resume/--incremental against
+its state store and puts batches of URLs on the work queue. Workers lease
+batches, run them through the usual Crawler and output pipeline, and report
+an outcome per URL; the coordinator merges those into its one state store
+and result CSV. See work_queue for leases and their expiry.
+"""
+
+import asyncio
+import hashlib
+import os
+import socket
+from typing import AsyncIterator, Callable, Dict, List, Optional, Sequence, Set
+
+from crawl2md.cleaner import MarkdownCleaner
+from crawl2md.crawler import Crawler
+from crawl2md.metrics import Metrics
+from crawl2md.profiling import timed
+from crawl2md.sitemap import SitemapEntry
+from crawl2md.state import CrawlState
+from crawl2md.work_queue import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_LEASE_SECONDS,
+    OUTCOME_ERROR,
+    OUTCOME_NOT_MODIFIED,
+    OUTCOME_OK,
+    WorkItem,
+    WorkQueue,
+)
+from crawl2md.writer import OutputWriter
+
+
+DEFAULT_POLL_INTERVAL = 1.0
+# Items a worker holds at once: one being crawled, one to start on next
+DEFAULT_ITEMS_PER_WORKER = 2
+
+
+def default_worker_id() -> str:
+    """Return a worker id unique across machines: ``<hostname>-<pid>``."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class Coordinator:
+    """Split sitemap entries into work items and merge the workers' outcomes."""
+
+    def __init__(
+        self,
+        queue: WorkQueue,
+        state: CrawlState,
+        output_writer: OutputWriter,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        resume: bool = False,
+        incremental: bool = False,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        log: Callable[[str], None] = print,
+        metrics: Optional[Metrics] = None,
+        row_columns: Optional[Callable[[dict], Sequence[str]]] = None,
+        max_outstanding: Optional[int] = None,
+    ):
+        """Initialize the coordinator.
+
+        Args:
+            queue: Work queue shared with the workers
+            state: State store receiving every URL's outcome
+            output_writer: Started OutputWriter for the result CSV rows
+            batch_size: URLs per work item
+            resume: Skip URLs the state store has as done
+            incremental: Skip unchanged URLs and send validators for the
+                rest (see CrawlState.plan_entry)
+            poll_interval: Seconds between checks for new outcomes
+            log: Called with a line per merged URL
+            metrics: Metrics to count queued URLs and merged outcomes in,
+                for progress and stats reporting
+            row_columns: Called with each outcome to add extra result CSV
+                columns (e.g. stage timings)
+            max_outstanding: Work items queued or leased and not done yet
+                at which reading the sitemap pauses, so a queue held in
+                memory stays small; None reads it all at once
+        """
+        self.queue = queue
+        self.state = state
+        self.output_writer = output_writer
+        self.batch_size = batch_size
+        self.resume = resume
+        self.incremental = incremental
+        self.poll_interval = poll_interval
+        self.log = log
+        self.metrics = metrics
+        self.row_columns = row_columns
+        self.max_outstanding = max_outstanding
+        self.counts = {
+            "found": 0,
+            "skipped": 0,
+            "resumed": 0,
+            "items": 0,
+            OUTCOME_OK: 0,
+            OUTCOME_NOT_MODIFIED: 0,
+            OUTCOME_ERROR: 0,
+        }
+        self._lastmods: Dict[str, Optional[str]] = {}
+
+    async def run(self, entries: AsyncIterator[SitemapEntry]) -> dict:
+        """Queue all entries and merge outcomes until every item is done.
+
+        The queue is cleared first. Outcomes are merged while the sitemap
+        is still being read, so workers can start right away.
+
+        Args:
+            entries: Sitemap entries, e.g. SitemapParser.iter_entries()
+
+        Returns:
+            Counts of URLs found, skipped, resumed, items queued and URLs
+            by outcome
+        """
+        self.queue.clear()
+        # URLs keep the paths of earlier runs, whatever the sitemap order
+        file_handler = self.output_writer.file_handler
+        for url, path in self.state.saved_paths():
+            file_handler.assign(url, path)
+        feeder = asyncio.ensure_future(self._feed(entries))
+        try:
+            while True:
+                fed = feeder.done()
+                self._merge()
+                if fed:
+                    feeder.result()
+                    if self.queue.finished():
+                        break
+                await asyncio.sleep(self.poll_interval)
+            self._merge()
+        finally:
+            feeder.cancel()
+            await asyncio.gather(feeder, return_exceptions=True)
+        return dict(self.counts)
+
+    async def _feed(self, entries: AsyncIterator[SitemapEntry]) -> None:
+        batch: List[dict] = []
+        file_handler = self.output_writer.file_handler
+        async for entry in entries:
+            self.counts["found"] += 1
+            # Paths are planned here, in sitemap order, since no worker sees
+            # every URL that could map to the same file
+            file_handler.plan([entry.loc])
+            task = {"url": entry.loc, "path": file_handler.url_to_path(entry.loc)}
+            if self.incremental:
+                crawl, validator = self.state.plan_entry(entry)
+                if not crawl:
+                    self.output_writer.write_row("SKIPPED", entry.loc)
+                    self.counts["skipped"] += 1
+                    continue
+                if validator:
+                    task["validator"] = validator
+            elif self.resume and self.state.is_done(entry.loc):
+                self.counts["resumed"] += 1
+                continue
+            self._lastmods[entry.loc] = entry.lastmod
+            batch.append(task)
+            if len(batch) >= self.batch_size:
+                await self._wait_for_room()
+                self._put(batch)
+                batch = []
+        if batch:
+            await self._wait_for_room()
+            self._put(batch)
+        self.state.save_paths(file_handler.take_assigned())
+        self.queue.close_input()
+        if self.metrics is not None:
+            self.metrics.expect(0, final=True)
+
+    async def _wait_for_room(self) -> None:
+        # run merges outcomes meanwhile, which is what frees room
+        while self.max_outstanding is not None:
+            counts = self.queue.counts()
+            if counts["pending"] + counts["leased"] < self.max_outstanding:
+                return
+            await asyncio.sleep(self.poll_interval)
+
+    def _put(self, batch: List[dict]) -> None:
+        self.state.add_urls(task["url"] for task in batch)
+        self.state.save_paths(self.output_writer.file_handler.take_assigned())
+        self.queue.put(batch)
+        self.counts["items"] += 1
+        if self.metrics is not None:
+            self.metrics.expect(len(batch))
+
+    def _merge(self) -> None:
+        for _, outcomes in self.queue.pop_results():
+            for outcome in outcomes:
+                self._record(outcome)
+
+    def _record(self, outcome: dict) -> None:
+        url = outcome["url"]
+        status = outcome["status"]
+        lastmod = self._lastmods.pop(url, None)
+        attempts = outcome.get("attempts", 1)
+        if status == OUTCOME_OK:
+            self.state.mark_done(
+                url,
+                outcome.get("content_hash"),
+                lastmod=lastmod,
+                etag=outcome.get("etag"),
+                last_modified=outcome.get("last_modified"),
+                attempts=attempts,
+            )
+            self.log(f"✓ {url} ({outcome.get('worker')})")
+        elif status == OUTCOME_NOT_MODIFIED:
+            self.state.mark_not_modified(url, lastmod, attempts=attempts)
+            self.log(f"= {url} (not modified)")
+        else:
+            status = OUTCOME_ERROR
+            self.state.mark_failed(
+                url,
+                outcome.get("error"),
+                error_class=outcome.get("error_class"),
+                attempts=attempts,
+            )
+            self.log(f"✗ {url} - {outcome.get('error', 'Unknown error')}")
+        self.output_writer.write_row(
+            status, url, self.row_columns(outcome) if self.row_columns else ()
+        )
+        self.counts[status] += 1
+        if self.metrics is not None:
+            self.metrics.record_result(
+                {
+                    **outcome,
+                    "success": status == OUTCOME_OK,
+                    "not_modified": status == OUTCOME_NOT_MODIFIED,
+                }
+            )
+
+
+class Worker:
+    """Lease work items and crawl them with the regular pipeline.
+
+    URLs of the leased items are streamed into one ``crawl_many`` run, so
+    the crawler stays busy across item boundaries. A new item is only
+    leased while fewer than ``items_per_worker`` are held, which keeps a
+    worker from hoarding work. Held leases are renewed every third of
+    ``lease_seconds``; an item is completed once all its pages are written.
+    """
+
+    def __init__(
+        self,
+        queue: WorkQueue,
+        crawler: Crawler,
+        file_handler,
+        worker_id: Optional[str] = None,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        items_per_worker: int = DEFAULT_ITEMS_PER_WORKER,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        log: Callable[[str], None] = print,
+    ):
+        """Initialize the worker.
+
+        Args:
+            queue: Work queue shared with the coordinator
+            crawler: Crawler to fetch and convert pages with
+            file_handler: FileHandler writing into the shared output
+                directory
+            worker_id: Id recorded with leases (defaults to hostname-pid)
+            lease_seconds: Lease duration; a worker silent for this long
+                is presumed dead and its items are handed out again
+            items_per_worker: Work items held at once
+            poll_interval: Seconds between lease attempts on an empty queue
+            log: Called with a line per crawled URL
+        """
+        self.queue = queue
+        self.crawler = crawler
+        self.file_handler = file_handler
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self.items_per_worker = items_per_worker
+        self.poll_interval = poll_interval
+        self.log = log
+        self.cleaner = MarkdownCleaner()
+        self.counts = {
+            "items": 0,
+            "lost": 0,
+            OUTCOME_OK: 0,
+            OUTCOME_NOT_MODIFIED: 0,
+            OUTCOME_ERROR: 0,
+        }
+        self._held: Dict[int, WorkItem] = {}
+        self._remaining: Dict[int, Set[str]] = {}
+        self._outcomes: Dict[int, List[dict]] = {}
+        self._item_of: Dict[str, int] = {}
+        self._validators: Dict[str, dict] = {}
+        self._released: Optional[asyncio.Event] = None
+
+    async def run(self) -> dict:
+        """Crawl leased items until the coordinator's queue is finished.
+
+        Returns:
+            Counts of items completed and lost (taken over by another
+            worker) and URLs by outcome
+        """
+        self._released = asyncio.Event()
+        heartbeat = asyncio.ensure_future(self._heartbeat())
+        try:
+            async with OutputWriter(
+                self.file_handler,
+                None,
+                memory_budget=self.crawler.memory_budget,
+            ) as writer:
+                async for result in self.crawler.crawl_many(
+                    self._urls(), self._validators
+                ):
+                    await self._handle(writer, result)
+        finally:
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+        return dict(self.counts)
+
+    async def _urls(self) -> AsyncIterator[str]:
+        while True:
+            if len(self._held) >= self.items_per_worker:
+                self._released.clear()
+                await self._released.wait()
+                continue
+            item = self.queue.lease(self.worker_id, self.lease_seconds)
+            if item is None:
+                if self.queue.finished():
+                    return
+                await asyncio.sleep(self.poll_interval)
+                continue
+            if item.id in self._held:
+                # Our own lease lapsed and was granted to us again
+                continue
+            self._hold(item)
+            for task in item.tasks:
+                yield task["url"]
+
+    def _hold(self, item: WorkItem) -> None:
+        self._held[item.id] = item
+        self._remaining[item.id] = {task["url"] for task in item.tasks}
+        self._outcomes[item.id] = []
+        for task in item.tasks:
+            self._item_of[task["url"]] = item.id
+            if task.get("path"):
+                self.file_handler.assign(task["url"], task["path"])
+            if task.get("validator"):
+                self._validators[task["url"]] = task["validator"]
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            for item_id in list(self._held):
+                if not self.queue.renew(item_id, self.worker_id, self.lease_seconds):
+                    # Still finished and reported; the first completion wins
+                    self.log(f"Lease of work item {item_id} was taken over")
+
+    async def _handle(self, writer: OutputWriter, result: dict) -> None:
+        url = result["url"]
+        outcome = {
+            "url": url,
+            "worker": self.worker_id,
+            "attempts": result.get("attempts", 1),
+            "bytes": result.get("bytes"),
+            # Seconds by stage; the writer adds the write time in place
+            "timings": result.setdefault("timings", {}),
+        }
+        if result.get("not_modified"):
+            self._finish(url, {**outcome, "status": OUTCOME_NOT_MODIFIED})
+            return
+        if not result["success"]:
+            self._finish(
+                url,
+                {
+                    **outcome,
+                    "status": OUTCOME_ERROR,
+                    "error": result.get("error"),
+                    "error_class": result.get("error_class"),
+                },
+            )
+            return
+
+        with timed(outcome["timings"], "process"):
+            markdown = self.cleaner.clean(result.pop("markdown"), url)
+            content_hash = hashlib.sha256(markdown.encode("utf-8")).hexdigest()
+        outcome.update(
+            status=OUTCOME_OK,
+            content_hash=content_hash,
+            etag=result.get("etag"),
+            last_modified=result.get("last_modified"),
+        )
+
+        def on_error(error: Exception) -> None:
+            self._finish(
+                url,
+                {
+                    **outcome,
+                    "status": OUTCOME_ERROR,
+                    "error": f"Could not save markdown: {error}",
+                    "error_class": "permanent",
+                },
+            )
+
+        await writer.write_markdown(
+            url,
+            markdown,
+            on_saved=lambda path: self._finish(url, outcome),
+            on_error=on_error,
+            timings=outcome["timings"],
+            frontmatter=self.cleaner.frontmatter(url),
+        )
+
+    def _finish(self, url: str, outcome: dict) -> None:
+        """Record a URL's outcome; complete its item once all are in."""
+        status = outcome["status"]
+        self.counts[status] += 1
+        if status == OUTCOME_ERROR:
+            self.log(f"✗ {url} - {outcome.get('error', 'Unknown error')}")
+        else:
+            self.log(f"{'✓' if status == OUTCOME_OK else '='} {url}")
+        item_id = self._item_of.pop(url)
+        self._validators.pop(url, None)
+        self._outcomes[item_id].append(outcome)
+        remaining = self._remaining[item_id]
+        remaining.discard(url)
+        if remaining:
+            return
+        outcomes = self._outcomes.pop(item_id)
+        del self._remaining[item_id], self._held[item_id]
+        if self.queue.complete(item_id, self.worker_id, outcomes):
+            self.counts["items"] += 1
+        else:
+            self.counts["lost"] += 1
+        self._released.set()
@@ -1,11 +1,33 @@
 """File handler module for saving markdown files."""
 
+import hashlib
 import os
+import posixpath
+import threading
+import uuid
+from typing import Dict, Iterable, List, Set, Tuple
 from urllib.parse import urlparse
 
 
+# Characters encoded and written at a time, so a large page is never held
+# twice in memory (as a str and as its UTF-8 encoding)
+WRITE_CHUNK_CHARS = 1024 * 1024
+# Hex digits of the URL hash that tells apart URLs sharing a file name
+COLLISION_SUFFIX_CHARS = 8
+
+
 class FileHandler:
-    """Handle conversion of URLs to file paths and saving markdown files."""
+    """Handle conversion of URLs to file paths and saving markdown files.
+
+    Distinct URLs can map to the same file (``/a``, ``/a/``, ``/a.html``,
+    or URLs differing only in their query). Paths are therefore assigned
+    once per URL, in the order URLs are planned: the first URL gets the
+    plain path and later ones get a suffix from a hash of the URL, so no
+    page overwrites another. ``plan`` assigns paths as the sitemap is
+    read; afterwards ``url_to_path`` is a dictionary lookup. Paths of
+    earlier runs are given back with ``assign`` before planning, so a URL
+    keeps its file when the sitemap order changes.
+    """
 
     def __init__(self, base_url: str, output_dir: str = "./output"):
         """Initialize the file handler.
@@ -16,9 +38,22 @@ class FileHandler:
         """
         self.base_url = base_url.rstrip("/")
         self.output_dir = output_dir
-
-    def url_to_path(self, url: str) -> str:
-        """Convert a URL to a relative file path.
+        # Directories known to exist (relative to output_dir), so makedirs
+        # runs once per directory
+        self._created_dirs: Set[str] = set()
+        # Directories of planned paths, created by make_directories
+        self._planned_dirs: Set[str] = set()
+        self._paths: Dict[str, str] = {}
+        self._taken: Set[str] = set()
+        # Paths assigned here since the last take_assigned call
+        self._new_paths: List[Tuple[str, str]] = []
+        self._lock = threading.Lock()
+        # URLs given a suffixed path because another URL had the plain one
+        self.renamed = 0
+
+    @staticmethod
+    def default_path(url: str) -> str:
+        """Return the plain relative file path of a URL.
 
         Args:
             url: Absolute URL to convert
@@ -40,6 +75,99 @@ class FileHandler:
 
         return f"{path}.md"
 
+    def url_to_path(self, url: str) -> str:
+        """Return the relative file path of a URL, assigning it if needed.
+
+        Args:
+            url: Absolute URL to convert
+
+        Returns:
+            Relative path from base URL, with .md extension; suffixed with
+            a hash of the URL if an earlier URL has the plain path
+        """
+        path = self._paths.get(url)
+        if path is None:
+            with self._lock:
+                path = self._paths.get(url) or self._assign(url)
+        return path
+
+    def plan(self, urls: Iterable[str]) -> None:
+        """Assign output paths to URLs before they are crawled.
+
+        Call with URLs in sitemap order, so a rerun of the same sitemap
+        (e.g. with --resume) assigns the same paths. The directories of
+        the paths are created by the next ``make_directories`` call.
+
+        Args:
+            urls: URLs to assign paths to; known URLs are skipped
+        """
+        with self._lock:
+            for url in urls:
+                if url not in self._paths:
+                    directory = posixpath.dirname(self._assign(url))
+                    if directory not in self._created_dirs:
+                        self._planned_dirs.add(directory)
+
+    def assign(self, url: str, path: str) -> None:
+        """Use a path assigned elsewhere.
+
+        For example by a distributed coordinator, or by an earlier run (see
+        CrawlState.saved_paths).
+
+        Args:
+            url: Page URL
+            path: Relative path planned for the URL
+        """
+        with self._lock:
+            self._paths[url] = path
+            self._taken.add(path)
+
+    def take_assigned(self) -> List[Tuple[str, str]]:
+        """Return the (url, path) pairs assigned since the last call.
+
+        Paths given with ``assign`` are not included. The caller records
+        the pairs (CrawlState.save_paths) for later runs to ``assign``.
+        """
+        with self._lock:
+            paths, self._new_paths = self._new_paths, []
+        return paths
+
+    def make_directories(self) -> None:
+        """Create the directories of all planned paths, in one pass.
+
+        Only the deepest new directories are passed to makedirs, which
+        creates their parents.
+
+        Raises:
+            OSError: If a directory cannot be created
+        """
+        with self._lock:
+            planned, self._planned_dirs = self._planned_dirs, set()
+        for directory in sorted(planned, key=lambda d: -d.count("/")):
+            if directory in self._created_dirs:
+                continue
+            os.makedirs(os.path.join(self.output_dir, directory), exist_ok=True)
+            while directory not in self._created_dirs:
+                self._created_dirs.add(directory)
+                directory = posixpath.dirname(directory)
+
+    def _assign(self, url: str) -> str:
+        """Give a URL its path; the caller holds the lock."""
+        path = self.default_path(url)
+        if path in self._taken:
+            stem = path[: -len(".md")]
+            digest = hashlib.blake2b(url.encode("utf-8"), digest_size=8).hexdigest()
+            path = f"{stem}-{digest[:COLLISION_SUFFIX_CHARS]}.md"
+            count = 1
+            while path in self._taken:
+                count += 1
+                path = f"{stem}-{digest[:COLLISION_SUFFIX_CHARS]}-{count}.md"
+            self.renamed += 1
+        self._paths[url] = path
+        self._taken.add(path)
+        self._new_paths.append((url, path))
+        return path
+
     def get_output_path(self, url: str) -> str:
         """Get the full output path for a URL.
 
@@ -52,12 +180,32 @@ class FileHandler:
         relative_path = self.url_to_path(url)
         return os.path.join(self.output_dir, relative_path)
 
-    def save_markdown(self, url: str, markdown: str) -> str:
+    def relative_link(self, from_url: str, to_url: str) -> str:
+        """Return the relative path from one URL's file to another's.
+
+        Args:
+            from_url: URL of the file containing the link
+            to_url: URL of the linked file
+
+        Returns:
+            POSIX relative path, usable as a markdown link target
+        """
+        return posixpath.relpath(
+            self.url_to_path(to_url), posixpath.dirname(self.url_to_path(from_url))
+        )
+
+    def save_markdown(self, url: str, markdown: str, frontmatter: str = "") -> str:
         """Save markdown content to a file.
 
+        The file is written to a temporary name and renamed into place, so
+        an interrupted write never leaves a truncated file behind. Safe to
+        call from several threads.
+
         Args:
             url: Source URL
             markdown: Markdown content to save
+            frontmatter: Optional header written before the content, so the
+                caller does not have to build a concatenated copy
 
         Returns:
             Path where the file was saved
@@ -65,10 +213,31 @@ class FileHandler:
         Raises:
             OSError: If unable to create directories or write file
         """
-        output_path = self.get_output_path(url)
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(markdown)
+        relative_path = self.url_to_path(url)
+        output_path = os.path.join(self.output_dir, relative_path)
+        directory = os.path.dirname(output_path)
+        relative_dir = posixpath.dirname(relative_path)
+        if relative_dir not in self._created_dirs:
+            os.makedirs(directory, exist_ok=True)
+            self._created_dirs.add(relative_dir)
+
+        # A unique name in the same directory, created with the usual
+        # permissions (mkstemp would make it private)
+        temp_path = os.path.join(
+            directory, f".{os.path.basename(output_path)}.{uuid.uuid4().hex}.tmp"
+        )
+        try:
+            with open(temp_path, "x", encoding="utf-8") as f:
+                f.write(frontmatter)
+                for start in range(0, len(markdown), WRITE_CHUNK_CHARS):
+                    f.write(markdown[start : start + WRITE_CHUNK_CHARS])
+            os.replace(temp_path, output_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
 
         return output_path
+
+    def close(self) -> None:
+        """Release resources; files are complete once saved, so a no-op."""
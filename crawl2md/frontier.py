@@ -0,0 +1,209 @@
+"""Crawl frontier module: decide which sitemap URLs to crawl first.
+
+By default URLs are crawled in sitemap order, so a run cut short by a
+page or time budget may miss the pages that matter most. A Frontier holds
+every URL of the sitemap with a score, from its sitemap ``<priority>``
+and how stale the copy from the previous run is given its
+``<changefreq>``, and hands URLs out best first while taking turns
+between hosts. UrlFilter applies include and exclude patterns.
+"""
+
+import fnmatch
+import heapq
+import re
+from datetime import datetime, timezone
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+
+from crawl2md.host_scheduler import host_of
+from crawl2md.sitemap import SitemapEntry
+from crawl2md.state import STATUS_DONE
+
+
+# Sitemap protocol default for entries without <priority>
+DEFAULT_PRIORITY = 0.5
+# Seconds after which a page with this <changefreq> is fully stale
+CHANGEFREQ_SECONDS = {
+    "always": 0.0,
+    "hourly": 3600.0,
+    "daily": 86400.0,
+    "weekly": 7 * 86400.0,
+    "monthly": 30 * 86400.0,
+    "yearly": 365 * 86400.0,
+}
+# Assumed for entries without (or with an unknown) <changefreq>
+DEFAULT_CHANGE_SECONDS = CHANGEFREQ_SECONDS["weekly"]
+# Weight of staleness (0 to 1) against priority (0 to 1) in the score
+STALENESS_WEIGHT = 1.0
+REGEX_PREFIX = "re:"
+
+
+def staleness(entry: SitemapEntry, record: Optional[dict], now: datetime) -> float:
+    """Return how out of date the copy of a page is, from 0 to 1.
+
+    Pages not crawled successfully before, and pages whose sitemap
+    <lastmod> moved since, are fully stale. Otherwise staleness grows
+    with the time since the last crawl, reaching 1 after the
+    <changefreq> period; ``never`` pages stay fresh.
+
+    Args:
+        entry: Sitemap entry of the current run
+        record: CrawlState record of the URL from earlier runs, or None
+        now: Current time (timezone-aware)
+    """
+    if record is None or record["status"] != STATUS_DONE:
+        return 1.0
+    if entry.lastmod and entry.lastmod != record["lastmod"]:
+        return 1.0
+    if entry.changefreq == "never":
+        return 0.0
+    period = CHANGEFREQ_SECONDS.get(
+        (entry.changefreq or "").lower(), DEFAULT_CHANGE_SECONDS
+    )
+    try:
+        age = (now - datetime.fromisoformat(record["updated_at"])).total_seconds()
+    except (TypeError, ValueError):
+        return 1.0
+    if period <= 0:
+        return 1.0
+    return min(1.0, max(0.0, age / period))
+
+
+def score_entry(entry: SitemapEntry, record: Optional[dict], now: datetime) -> float:
+    """Return a sitemap entry's crawl score; higher is crawled first.
+
+    The score adds the entry's <priority> (0.5 when missing) and its
+    staleness, so never-crawled and changed pages come before fresh
+    ones of the same priority.
+    """
+    priority = DEFAULT_PRIORITY if entry.priority is None else entry.priority
+    return priority + STALENESS_WEIGHT * staleness(entry, record, now)
+
+
+class Frontier:
+    """URLs ordered by score, taking turns between hosts.
+
+    Each host has its own heap. ``pop`` serves the host that has had the
+    fewest URLs so far (the best next score breaking ties), so one large
+    host does not push the other hosts' pages to the end.
+    """
+
+    def __init__(self):
+        self._heaps: Dict[str, List[Tuple[float, int, str]]] = {}
+        self._served: Dict[str, int] = {}
+        self._count = 0
+
+    def __len__(self) -> int:
+        return sum(len(heap) for heap in self._heaps.values())
+
+    def push(self, url: str, score: float) -> None:
+        """Add a URL; among equal scores, URLs come out in push order."""
+        host = host_of(url)
+        if host not in self._heaps:
+            self._heaps[host] = []
+            self._served[host] = 0
+        self._count += 1
+        heapq.heappush(self._heaps[host], (-score, self._count, url))
+
+    def pop(self) -> Optional[str]:
+        """Remove and return the next URL, or None when empty."""
+        best = None
+        for host, heap in self._heaps.items():
+            if not heap:
+                continue
+            key = (self._served[host], heap[0])
+            if best is None or key < best[0]:
+                best = (key, host)
+        if best is None:
+            return None
+        host = best[1]
+        self._served[host] += 1
+        return heapq.heappop(self._heaps[host])[2]
+
+    def __iter__(self):
+        while True:
+            url = self.pop()
+            if url is None:
+                return
+            yield url
+
+
+async def prioritize(
+    entries: AsyncIterator[SitemapEntry],
+    record_of: Callable[[str], Optional[dict]],
+    now: Optional[datetime] = None,
+) -> AsyncIterator[SitemapEntry]:
+    """Read every sitemap entry, then yield them in Frontier order.
+
+    Nothing is yielded before the last entry is read, and all entries are
+    held in memory meanwhile.
+
+    Args:
+        entries: Sitemap entries
+        record_of: Returns the CrawlState record of a URL, or None (e.g.
+            CrawlState.get)
+        now: Time staleness is measured at (defaults to now)
+
+    Yields:
+        The entries, best score first, taking turns between hosts
+    """
+    now = now or datetime.now(timezone.utc)
+    frontier = Frontier()
+    by_url: Dict[str, SitemapEntry] = {}
+    async for entry in entries:
+        frontier.push(entry.loc, score_entry(entry, record_of(entry.loc), now))
+        by_url[entry.loc] = entry
+    for url in frontier:
+        yield by_url.pop(url)
+
+
+def _compile(patterns: Iterable[str]) -> Optional[re.Pattern]:
+    """Compile globs (whole URL) and ``re:`` regexes (searched) into one."""
+    parts = [
+        p[len(REGEX_PREFIX) :] if p.startswith(REGEX_PREFIX) else fnmatch.translate(p)
+        for p in patterns
+    ]
+    return re.compile("|".join(f"(?:{part})" for part in parts)) if parts else None
+
+
+class UrlFilter:
+    """Keep URLs matching any include pattern and no exclude pattern.
+
+    Patterns are globs matched against the whole URL (``*/docs/*``), or
+    regular expressions searched in it when prefixed with ``re:``.
+    """
+
+    def __init__(self, include: Iterable[str] = (), exclude: Iterable[str] = ()):
+        """Initialize the filter.
+
+        Args:
+            include: Patterns a URL must match one of (none keeps all)
+            exclude: Patterns of URLs to drop
+
+        Raises:
+            re.error: If a regular expression is invalid
+        """
+        self._include = _compile(include)
+        self._exclude = _compile(exclude)
+        self.excluded = 0
+
+    @property
+    def active(self) -> bool:
+        """Whether any pattern is set."""
+        return bool(self._include or self._exclude)
+
+    def __call__(self, url: str) -> bool:
+        """Return whether a URL is kept, counting the dropped ones."""
+        if (self._include and not self._include.search(url)) or (
+            self._exclude and self._exclude.search(url)
+        ):
+            self.excluded += 1
+            return False
+        return True
+
+    async def entries(
+        self, entries: AsyncIterator[SitemapEntry]
+    ) -> AsyncIterator[SitemapEntry]:
+        """Yield the sitemap entries whose URL is kept."""
+        async for entry in entries:
+            if self(entry.loc):
+                yield entry
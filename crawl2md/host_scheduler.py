@@ -0,0 +1,403 @@
+"""Per-host politeness scheduling module."""
+
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set
+from urllib.parse import urlsplit
+
+import httpx
+
+from crawl2md.rate_limit import TokenBucket
+
+
+DEFAULT_MAX_QUEUED = 1000
+ROBOTS_TIMEOUT = 10.0
+ROBOTS_USER_AGENT = "*"
+# Statuses that mean the server wants us to slow down
+BACKOFF_STATUSES = frozenset({429, 503})
+# AIMD: start low, add about one slot per window of successes, halve on trouble
+INITIAL_HOST_CONCURRENCY = 2
+DECREASE_FACTOR = 0.5
+# Back off when the latency average exceeds the host's baseline by this factor
+LATENCY_BACKOFF_FACTOR = 2.0
+LATENCY_ALPHA = 0.3
+# Let the baseline creep up so a permanently slower server is not punished
+BASELINE_DRIFT = 0.01
+MIN_LATENCY_SAMPLES = 5
+RATE_WINDOW = 10.0
+_RATE_UNITS = {"s": 1, "m": 60, "h": 3600}
+
+
+def host_of(url: str) -> str:
+    """Return the lowercased host (with port) a URL is scheduled under."""
+    return urlsplit(url).netloc.lower()
+
+
+def parse_crawl_delay(
+    robots_txt: str, user_agent: str = ROBOTS_USER_AGENT
+) -> Optional[float]:
+    """Return the seconds to wait between requests asked for by robots.txt.
+
+    Reads the ``Crawl-delay`` and ``Request-rate`` lines of the group that
+    applies to ``user_agent`` (or to ``*``), accepting fractional delays,
+    which urllib.robotparser ignores.
+
+    Returns:
+        The larger of the two intervals, or None if neither is set
+    """
+    groups: Dict[str, List[float]] = {}
+    agents: List[str] = []
+    in_agents = False
+    for line in robots_txt.splitlines():
+        key, _, value = line.split("#", 1)[0].partition(":")
+        key, value = key.strip().lower(), value.strip()
+        if key == "user-agent":
+            if not in_agents:
+                agents = []
+            agents.append(value.lower())
+            in_agents = True
+            continue
+        in_agents = False
+        interval = None
+        try:
+            if key == "crawl-delay":
+                interval = float(value)
+            elif key == "request-rate":
+                requests, _, period = value.split()[0].partition("/")
+                unit = _RATE_UNITS.get(period[-1:].lower(), 1)
+                interval = float(period.rstrip("smhSMH")) * unit / float(requests)
+        except (ValueError, ZeroDivisionError):
+            continue
+        if interval is not None and interval > 0:
+            for agent in agents:
+                groups.setdefault(agent, []).append(interval)
+
+    intervals = groups.get(user_agent.lower()) or groups.get("*")
+    return max(intervals) if intervals else None
+
+
+class _HostState:
+    """Queue, limits and congestion signals of one host."""
+
+    def __init__(self, host: str, max_concurrency: int, adaptive: bool):
+        self.host = host
+        self.max_concurrency = max_concurrency
+        self.limit = float(
+            min(INITIAL_HOST_CONCURRENCY, max_concurrency)
+            if adaptive
+            else max_concurrency
+        )
+        self.queue: Deque[str] = deque()
+        self.in_flight = 0
+        self.bucket: Optional[TokenBucket] = None
+        self.crawl_delay: Optional[float] = None
+        self.robots_ready = True
+        self.latency: Optional[float] = None
+        self.baseline: Optional[float] = None
+        self.samples = 0
+        self.last_decrease = 0.0
+        self.backoffs = 0
+        self.started: Deque[float] = deque()
+
+    def can_start(self) -> bool:
+        return self.robots_ready and self.in_flight < max(1, int(self.limit))
+
+    def record_start(self) -> None:
+        now = time.monotonic()
+        self.in_flight += 1
+        self.started.append(now)
+        while self.started and now - self.started[0] > RATE_WINDOW:
+            self.started.popleft()
+
+    def record_done(
+        self, status_code: Optional[int], latency: Optional[float], adaptive: bool
+    ) -> None:
+        self.in_flight -= 1
+        if latency is not None:
+            self.samples += 1
+            if self.latency is None:
+                self.latency = latency
+            else:
+                self.latency += LATENCY_ALPHA * (latency - self.latency)
+            if self.baseline is None:
+                self.baseline = self.latency
+            else:
+                self.baseline = min(self.latency, self.baseline * (1 + BASELINE_DRIFT))
+        if not adaptive:
+            return
+
+        slow = (
+            self.samples >= MIN_LATENCY_SAMPLES
+            and self.latency > self.baseline * LATENCY_BACKOFF_FACTOR
+        )
+        if status_code in BACKOFF_STATUSES or slow:
+            # Decrease at most once per round trip, like TCP congestion control
+            now = time.monotonic()
+            if now - self.last_decrease >= (self.latency or 0.0):
+                self.limit = max(1.0, self.limit * DECREASE_FACTOR)
+                self.last_decrease = now
+                self.backoffs += 1
+        else:
+            self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+
+    def rate(self) -> float:
+        now = time.monotonic()
+        recent = sum(1 for started in self.started if now - started <= RATE_WINDOW)
+        return recent / RATE_WINDOW
+
+
+class HostScheduler:
+    """Hand out URLs so that no host gets more than its fair share.
+
+    Each host has its own queue, concurrency cap and optional rate limit.
+    ``get`` returns a URL from the next host (round robin) that has a free
+    slot and a rate-limit token, so a slow or throttled host never blocks
+    the others. robots.txt ``Crawl-delay`` and ``Request-rate`` tighten a
+    host's rate limit when ``respect_crawl_delay`` is set.
+
+    With ``adaptive`` set, each host's concurrency follows AIMD: it starts
+    at 2, grows by about one slot per window of healthy responses up to
+    ``max_per_host``, and halves on 429/503 answers or when latency climbs
+    to twice its baseline.
+    """
+
+    def __init__(
+        self,
+        max_per_host: int = 10,
+        rate: Optional[float] = None,
+        burst: int = 1,
+        adaptive: bool = False,
+        respect_crawl_delay: bool = False,
+        max_queued: int = DEFAULT_MAX_QUEUED,
+    ):
+        """Initialize the scheduler.
+
+        Args:
+            max_per_host: Maximum concurrent requests to one host
+            rate: Maximum requests started per second per host (None disables)
+            burst: Requests a host may get back to back before its rate applies
+            adaptive: Adjust each host's concurrency to its responses (AIMD)
+            respect_crawl_delay: Fetch robots.txt of each host and honor its
+                Crawl-delay and Request-rate
+            max_queued: URLs buffered across all hosts before put() waits
+        """
+        if max_per_host < 1:
+            raise ValueError("max_per_host must be at least 1")
+        self.max_per_host = max_per_host
+        self.rate = rate
+        self.burst = burst
+        self.adaptive = adaptive
+        self.respect_crawl_delay = respect_crawl_delay
+        self.max_queued = max_queued
+        self._hosts: Dict[str, _HostState] = {}
+        self._queued = 0
+        self._in_flight = 0
+        self._closed = False
+        self._turn = 0
+        self._changed: Optional[asyncio.Event] = None
+        self._robots_tasks: Set[asyncio.Task] = set()
+        self._timers: Set[asyncio.TimerHandle] = set()
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _event(self) -> asyncio.Event:
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        return self._changed
+
+    def _notify(self) -> None:
+        self._event().set()
+
+    def _host(self, url: str) -> _HostState:
+        host = host_of(url)
+        state = self._hosts.get(host)
+        if state is None:
+            state = _HostState(host, self.max_per_host, self.adaptive)
+            if self.rate:
+                state.bucket = TokenBucket(self.rate, self.burst)
+            self._hosts[host] = state
+            if self.respect_crawl_delay:
+                state.robots_ready = False
+                task = asyncio.ensure_future(self._load_robots(state, url))
+                self._robots_tasks.add(task)
+                task.add_done_callback(self._robots_tasks.discard)
+        return state
+
+    async def put(self, url: str) -> None:
+        """Queue a URL, waiting while ``max_queued`` URLs are buffered."""
+        while self._queued >= self.max_queued:
+            self._event().clear()
+            await self._event().wait()
+        self.put_nowait(url)
+
+    def put_nowait(self, url: str) -> None:
+        """Queue a URL at the back of its host's queue, ignoring the bound."""
+        self._host(url).queue.append(url)
+        self._queued += 1
+        self._notify()
+
+    def put_later(self, url: str, delay: float) -> None:
+        """Queue a URL at the back of its host's queue after ``delay`` seconds.
+
+        Delayed URLs count as outstanding work, so ``get`` does not report
+        the end of the run while any are waiting.
+        """
+
+        def ready() -> None:
+            self._timers.discard(handle)
+            self.put_nowait(url)
+
+        handle = asyncio.get_running_loop().call_later(delay, ready)
+        self._timers.add(handle)
+
+    def close(self) -> None:
+        """Signal that no new URLs will be put, apart from re-queued ones."""
+        self._closed = True
+        self._notify()
+
+    async def get(self) -> Optional[str]:
+        """Wait for a URL whose host can take another request.
+
+        The caller must report the outcome with ``done``.
+
+        Returns:
+            The next URL, or None once the scheduler is closed and every
+            queued and in-flight URL is finished
+        """
+        while True:
+            self._event().clear()
+            url, wait = self._pop_ready()
+            if url is not None:
+                return url
+            if (
+                self._closed
+                and not self._queued
+                and not self._in_flight
+                and not self._timers
+            ):
+                return None
+            try:
+                await asyncio.wait_for(self._event().wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    def _pop_ready(self):
+        hosts = [state for state in self._hosts.values() if state.queue]
+        wait = None
+        for i in range(len(hosts)):
+            state = hosts[(self._turn + i) % len(hosts)]
+            if not state.can_start():
+                continue
+            if state.bucket is not None:
+                delay = state.bucket.try_acquire()
+                if delay:
+                    wait = delay if wait is None else min(wait, delay)
+                    continue
+            self._turn += i + 1
+            url = state.queue.popleft()
+            self._queued -= 1
+            self._in_flight += 1
+            state.record_start()
+            # Wake up put() callers waiting for buffer space
+            self._notify()
+            return url, None
+        return None, wait
+
+    def done(
+        self,
+        url: str,
+        status_code: Optional[int] = None,
+        latency: Optional[float] = None,
+    ) -> None:
+        """Release the slot taken by ``get`` and feed the congestion signals.
+
+        Args:
+            url: URL returned by get
+            status_code: HTTP status of the response, if known
+            latency: Seconds the request took
+        """
+        self._in_flight -= 1
+        self._hosts[host_of(url)].record_done(status_code, latency, self.adaptive)
+        self._notify()
+
+    def clear(self) -> None:
+        """Drop queued URLs and reopen the scheduler, keeping host state."""
+        for handle in self._timers:
+            handle.cancel()
+        self._timers.clear()
+        for state in self._hosts.values():
+            state.queue.clear()
+            state.in_flight = 0
+        self._queued = 0
+        self._in_flight = 0
+        self._closed = False
+        # The event belongs to the event loop of the finished run
+        self._changed = None
+
+    def totals(self) -> Dict[str, int]:
+        """Return URLs queued, in flight and waiting for a retry, all hosts."""
+        return {
+            "queued": self._queued,
+            "in_flight": self._in_flight,
+            "retrying": len(self._timers),
+        }
+
+    def stats(self) -> Dict[str, dict]:
+        """Return the live per-host counters.
+
+        Returns:
+            Dict by host of 'in_flight', 'limit' (current concurrency cap),
+            'queued', 'rate' (requests started per second over the last
+            10 seconds), 'rate_limit' (None if unlimited), 'crawl_delay',
+            'latency_ms' (moving average) and 'backoffs'
+        """
+        return {
+            host: {
+                "in_flight": state.in_flight,
+                "limit": max(1, int(state.limit)),
+                "queued": len(state.queue),
+                "rate": state.rate(),
+                "rate_limit": state.bucket.rate if state.bucket else None,
+                "crawl_delay": state.crawl_delay,
+                "latency_ms": (
+                    round(state.latency * 1000) if state.latency is not None else None
+                ),
+                "backoffs": state.backoffs,
+            }
+            for host, state in self._hosts.items()
+        }
+
+    async def _load_robots(self, state: _HostState, url: str) -> None:
+        try:
+            parts = urlsplit(url)
+            if self._client is None:
+                self._client = httpx.AsyncClient(
+                    timeout=ROBOTS_TIMEOUT, follow_redirects=True
+                )
+            try:
+                response = await self._client.get(
+                    f"{parts.scheme}://{parts.netloc}/robots.txt"
+                )
+            except httpx.HTTPError:
+                return
+            if response.status_code != 200:
+                return
+            delay = parse_crawl_delay(response.text)
+            if not delay:
+                return
+            state.crawl_delay = delay
+            robots_rate = 1 / state.crawl_delay
+            if state.bucket is None or robots_rate < state.bucket.rate:
+                state.bucket = TokenBucket(robots_rate, 1)
+        finally:
+            state.robots_ready = True
+            self._notify()
+
+    async def aclose(self) -> None:
+        """Cancel robots.txt lookups and close their HTTP client."""
+        for task in list(self._robots_tasks):
+            task.cancel()
+        await asyncio.gather(*self._robots_tasks, return_exceptions=True)
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
@@ -0,0 +1,270 @@
+"""Raw HTML cache module: fetched pages kept on disk for reprocessing.
+
+Pages are stored gzip-compressed and content-addressed (by SHA-256 of the
+HTML), so identical pages share one file, with an SQLite index from
+normalized URL to content. The cache is bounded in size: once it grows
+past its limit, the least recently used pages are evicted. Entries older
+than the TTL are not served to the crawler, which fetches and replaces
+them, but stay available to ``crawl2md reprocess`` until evicted.
+"""
+
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Iterator, List, NamedTuple, Optional
+
+from crawl2md.dedup import normalize_url
+
+
+DEFAULT_CACHE_MAX_MB = 2048
+DEFAULT_CACHE_TTL_HOURS = 24.0
+INDEX_FILENAME = "index.sqlite"
+BLOB_DIRNAME = "blobs"
+# Evict down to this share of the limit, so eviction does not run per page
+EVICT_TO = 0.9
+
+
+class CachedPage(NamedTuple):
+    """A page in the cache index."""
+
+    url: str
+    digest: str
+    fetched_at: float
+    path: str
+
+
+def read_blob(path: str) -> str:
+    """Read and decompress a cached page's HTML.
+
+    Module-level, so reprocessing workers can read pages without opening
+    the index.
+    """
+    with gzip.open(path, "rb") as f:
+        return f.read().decode("utf-8")
+
+
+class HtmlCache:
+    """Content-addressed, size-bounded on-disk cache of raw page HTML.
+
+    Methods are synchronous and safe to call from several threads (the
+    crawler runs them in a thread so compression stays off the event
+    loop). Several processes may share one cache directory.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_size_mb: Optional[float] = DEFAULT_CACHE_MAX_MB,
+        ttl_seconds: Optional[float] = DEFAULT_CACHE_TTL_HOURS * 3600,
+    ):
+        """Open (or create) the cache.
+
+        Args:
+            directory: Cache directory
+            max_size_mb: Compressed size above which least recently used
+                pages are evicted (None for no limit)
+            ttl_seconds: Age after which ``get`` no longer returns a page
+                (None never expires pages, 0 never serves them)
+        """
+        self.directory = directory
+        self.max_bytes = int(max_size_mb * 1024 * 1024) if max_size_mb else None
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(os.path.join(directory, BLOB_DIRNAME), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            os.path.join(directory, INDEX_FILENAME),
+            timeout=30,
+            check_same_thread=False,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS blobs (
+                digest TEXT PRIMARY KEY,
+                size INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS pages_digest ON pages (digest);
+            CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed_at);
+            """
+        )
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evicted = 0
+        # Compressed bytes as of this process's last look; other processes
+        # sharing the cache are caught up with before evicting
+        self._bytes = self._size()
+
+    def blob_path(self, digest: str) -> str:
+        """Return the file holding the content with this digest."""
+        return os.path.join(
+            self.directory, BLOB_DIRNAME, digest[:2], f"{digest}.html.gz"
+        )
+
+    def get(self, url: str) -> Optional[str]:
+        """Return the cached HTML of a URL, or None.
+
+        Args:
+            url: Page URL (normalized before lookup)
+
+        Returns:
+            The page's HTML, or None if it is not cached or older than the
+            TTL
+        """
+        max_age = self.ttl_seconds
+        key = normalize_url(url)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT digest, fetched_at FROM pages WHERE url = ?", (key,)
+            ).fetchone()
+            if row is None or (max_age is not None and now - row[1] >= max_age):
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE pages SET accessed_at = ? WHERE url = ?", (now, key)
+            )
+            self._conn.commit()
+        try:
+            html = read_blob(self.blob_path(row[0]))
+        except (OSError, EOFError, UnicodeDecodeError):
+            # Deleted or damaged on disk; forget it and fetch again
+            with self._lock:
+                self._conn.execute("DELETE FROM pages WHERE url = ?", (key,))
+                self._conn.commit()
+            self.misses += 1
+            return None
+        self.hits += 1
+        return html
+
+    def put(self, url: str, html: str) -> None:
+        """Store a page's HTML, replacing what was cached for the URL."""
+        key = normalize_url(url)
+        data = html.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(digest)
+        if os.path.exists(path):
+            size = os.path.getsize(path)
+        else:
+            compressed = gzip.compress(data, compresslevel=6, mtime=0)
+            del data
+            size = len(compressed)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Written under a unique name and renamed, so readers never see
+            # a partial file
+            temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(compressed)
+            os.replace(temp_path, path)
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                inserted = self._conn.execute(
+                    "INSERT OR IGNORE INTO blobs VALUES (?, ?)", (digest, size)
+                ).rowcount
+                self._bytes += size * inserted
+                row = self._conn.execute(
+                    "SELECT digest FROM pages WHERE url = ?", (key,)
+                ).fetchone()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)",
+                    (key, digest, now, now),
+                )
+                if row is not None and row[0] != digest:
+                    self._drop_orphans([row[0]])
+            self.stores += 1
+            if self.max_bytes is not None and self._bytes > self.max_bytes:
+                self._bytes = self._size()
+                if self._bytes > self.max_bytes:
+                    self._evict(int(self.max_bytes * EVICT_TO))
+
+    def _size(self) -> int:
+        return self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM blobs"
+        ).fetchone()[0]
+
+    def _evict(self, target_bytes: int) -> None:
+        """Drop least recently used pages until the cache fits the target."""
+        size = self._bytes
+        with self._conn:
+            rows = self._conn.execute(
+                "SELECT url, digest FROM pages ORDER BY accessed_at"
+            )
+            evicted: List[str] = []
+            digests = set()
+            for url, digest in rows:
+                if size <= target_bytes:
+                    break
+                evicted.append(url)
+                if digest not in digests:
+                    digests.add(digest)
+                    # Counted as freed even if a newer page shares the
+                    # content; close enough for a size cap
+                    size -= self._blob_size(digest)
+            self._conn.executemany(
+                "DELETE FROM pages WHERE url = ?", [(url,) for url in evicted]
+            )
+            self._drop_orphans(digests)
+        self.evicted += len(evicted)
+
+    def _blob_size(self, digest: str) -> int:
+        row = self._conn.execute(
+            "SELECT size FROM blobs WHERE digest = ?", (digest,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def _drop_orphans(self, digests) -> None:
+        """Delete content no page refers to anymore."""
+        for digest in digests:
+            used = self._conn.execute(
+                "SELECT 1 FROM pages WHERE digest = ? LIMIT 1", (digest,)
+            ).fetchone()
+            if used:
+                continue
+            self._bytes -= self._blob_size(digest)
+            self._conn.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+            try:
+                os.remove(self.blob_path(digest))
+            except FileNotFoundError:
+                pass
+
+    def pages(self) -> Iterator[CachedPage]:
+        """Yield every cached page, expired or not, in URL order."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url, digest, fetched_at FROM pages ORDER BY url"
+            ).fetchall()
+        for url, digest, fetched_at in rows:
+            yield CachedPage(url, digest, fetched_at, self.blob_path(digest))
+
+    def stats(self) -> dict:
+        """Return the cache's size and this run's hits, misses and evictions."""
+        with self._lock:
+            pages = self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            blobs, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs"
+            ).fetchone()
+        return {
+            "pages": pages,
+            "contents": blobs,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evicted": self.evicted,
+        }
+
+    def close(self) -> None:
+        """Close the index."""
+        self._conn.close()
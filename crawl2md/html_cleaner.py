@@ -1,32 +1,97 @@
-"""HTML cleaning module using BeautifulSoup."""
+"""HTML cleaning module using BeautifulSoup or lxml."""
 
 from pathlib import Path
 from typing import List, Optional
 
+import soupsieve
 from bs4 import BeautifulSoup
 
+try:
+    import lxml.html
+    from cssselect import HTMLTranslator, SelectorError
+    from lxml import etree
+except ImportError:  # pragma: no cover - optional dependency
+    lxml = None
+
+
+DEFAULT_PARSER = "html.parser"
+PARSERS = ("html.parser", "lxml")
+
 
 class HtmlCleaner:
     """Remove HTML elements based on CSS selectors before markdown conversion."""
 
-    def __init__(self, selectors: Optional[List[str]] = None):
+    def __init__(
+        self, selectors: Optional[List[str]] = None, parser: str = DEFAULT_PARSER
+    ):
         """Initialize the cleaner.
 
+        Selectors are validated and compiled once into a single matcher.
+        Invalid selectors are skipped and listed in ``invalid_selectors``.
+
         Args:
             selectors: List of CSS selectors to remove (with their content)
+            parser: "html.parser" (BeautifulSoup) or "lxml", which parses with
+                lxml.html and matches with one compiled XPath expression
         """
+        if parser not in PARSERS:
+            raise ValueError(f"Unknown parser {parser!r}, expected one of {PARSERS}")
+        if parser == "lxml" and lxml is None:
+            raise RuntimeError(
+                "The lxml parser requires the lxml and cssselect packages "
+                "(pip install 'crawl2md[lxml]')"
+            )
         self.selectors = selectors or []
+        self.parser = parser
+        self.invalid_selectors: List[str] = []
+        self._compile()
+
+    def _compile(self) -> None:
+        self.invalid_selectors = []
+        self._matcher = None
+        self._xpath = None
+
+        valid = []
+        for selector in self.selectors:
+            if self.parser == "lxml":
+                try:
+                    valid.append(HTMLTranslator().css_to_xpath(selector))
+                except SelectorError:
+                    self.invalid_selectors.append(selector)
+            else:
+                try:
+                    soupsieve.compile(selector)
+                    valid.append(selector)
+                except soupsieve.SelectorSyntaxError:
+                    self.invalid_selectors.append(selector)
+
+        if not valid:
+            return
+        if self.parser == "lxml":
+            self._xpath = etree.XPath(" | ".join(valid))
+        else:
+            self._matcher = soupsieve.compile(", ".join(valid))
+
+    def __getstate__(self) -> dict:
+        # Compiled XPath objects cannot be pickled for worker processes
+        return {"selectors": self.selectors, "parser": self.parser}
+
+    def __setstate__(self, state: dict) -> None:
+        self.selectors = state["selectors"]
+        self.parser = state["parser"]
+        self._compile()
 
     @classmethod
-    def from_file(cls, file_path: str) -> "HtmlCleaner":
+    def from_file(cls, file_path: str, parser: str = DEFAULT_PARSER) -> "HtmlCleaner":
         """Load selectors from a text file.
 
         Each non-empty, non-comment line is treated as a CSS selector.
-        Lines starting with "# " (with space) or "--" are comments.
-        Lines starting with "#" without space (e.g., "#header") are ID selectors.
+        Lines starting with "//" or "--" are comments.
+        Lines starting with "#" (e.g., "#header") are ID selectors.
 
         Args:
             file_path: Path to the selectors file
+            parser: "html.parser" or "lxml"
 
         Returns:
             HtmlCleaner instance with loaded selectors
@@ -39,27 +104,57 @@ class HtmlCleaner:
                 stripped.startswith("//") or stripped.startswith("--")
             ):
                 selectors.append(stripped)
-        return cls(selectors=selectors)
+        return cls(selectors=selectors, parser=parser)
 
     def clean(self, html: str) -> str:
         """Remove elements matching configured selectors from HTML.
 
+        All selectors are matched in a single pass over the tree.
+
         Args:
             html: Raw HTML string
 
         Returns:
             Cleaned HTML with matching elements removed
         """
-        if not self.selectors:
+        if self._xpath is not None and html.strip():
+            return self._clean_lxml(html)
+        if self._matcher is None:
             return html
 
-        soup = BeautifulSoup(html, "html.parser")
-
-        for selector in self.selectors:
-            try:
-                for element in soup.select(selector):
-                    element.decompose()
-            except Exception:
-                pass
-
-        return str(soup)
+        soup = BeautifulSoup(html, self.parser)
+
+        # Matches come in document order, so a removed element's matching
+        # descendants are already decomposed by the time we reach them
+        for element in self._matcher.select(soup):
+            if not element.decomposed:
+                element.decompose()
+
+        cleaned = str(soup)
+        _release_tree(soup)
+        return cleaned
+
+    def _clean_lxml(self, html: str) -> str:
+        doc = lxml.html.document_fromstring(html)
+        for element in self._xpath(doc):
+            # drop_tree keeps the element's tail text in place
+            element.drop_tree()
+        return lxml.html.tostring(
+            doc, encoding="unicode", doctype=doc.getroottree().docinfo.doctype
+        )
+
+
+def _release_tree(soup: BeautifulSoup) -> None:
+    """Break the reference cycles of a parsed tree so it is freed right away.
+
+    Tags and strings point at their parent and neighbours, so a dropped
+    tree is only reclaimed by the cyclic garbage collector, which may not
+    run a full collection for many pages. Parse trees are 10-20 times the
+    size of the HTML, so with several large pages in flight the memory
+    held by dead trees adds up quickly. Clearing every node's attributes
+    lets reference counting free the tree immediately; ``decompose``
+    alone leaves cycles behind.
+    """
+    for node in list(soup.descendants):
+        node.__dict__.clear()
+    soup.__dict__.clear()
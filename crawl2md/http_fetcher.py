@@ -0,0 +1,157 @@
+"""Plain HTTP fetching module for server-rendered pages."""
+
+import re
+from typing import Dict, Iterable, Optional
+
+import httpx
+
+
+FETCHER_BROWSER = "browser"
+FETCHER_HTTP = "http"
+FETCHER_AUTO = "auto"
+FETCHERS = (FETCHER_BROWSER, FETCHER_HTTP, FETCHER_AUTO)
+DEFAULT_FETCHER = FETCHER_BROWSER
+
+HTTP_TIMEOUT = 30.0
+KEEPALIVE_EXPIRY = 30.0
+# Pages with less visible body text than this are assumed to need JavaScript
+DEFAULT_MIN_TEXT_LENGTH = 200
+# Text inside <noscript> that signals a client-rendered app (lowercase)
+DEFAULT_JS_MARKERS = (
+    "enable javascript",
+    "javascript is required",
+    "javascript is disabled",
+    "requires javascript",
+    "need javascript",
+)
+
+_BODY_RE = re.compile(r"<body\b[^>]*>(.*)</body\s*>", re.IGNORECASE | re.DOTALL)
+_NOSCRIPT_RE = re.compile(
+    r"<noscript\b[^>]*>(.*?)</noscript\s*>", re.IGNORECASE | re.DOTALL
+)
+_INVISIBLE_RE = re.compile(
+    r"<(script|style|noscript|template)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL
+)
+_TAG_RE = re.compile(r"<[^>]*>")
+_WHITESPACE_RE = re.compile(r"\s+")
+# Empty mount points of common single-page app frameworks
+_EMPTY_APP_ROOT_RE = re.compile(
+    r"<div\b[^>]*\bid=[\"'](?:root|app|__next|__nuxt)[\"'][^>]*>\s*</div>",
+    re.IGNORECASE,
+)
+
+
+def conditional_headers(validator: Optional[dict]) -> Dict[str, str]:
+    """Build If-None-Match / If-Modified-Since headers from a validator."""
+    headers = {}
+    if validator and validator.get("etag"):
+        headers["If-None-Match"] = validator["etag"]
+    if validator and validator.get("last_modified"):
+        headers["If-Modified-Since"] = validator["last_modified"]
+    return headers
+
+
+def visible_text_length(html: str) -> int:
+    """Count the non-whitespace characters of text in the page body."""
+    match = _BODY_RE.search(html)
+    body = match.group(1) if match else html
+    text = _TAG_RE.sub(" ", _INVISIBLE_RE.sub(" ", body))
+    return len(_WHITESPACE_RE.sub("", text))
+
+
+def looks_js_rendered(
+    html: str,
+    min_text_length: int = DEFAULT_MIN_TEXT_LENGTH,
+    js_markers: Iterable[str] = DEFAULT_JS_MARKERS,
+) -> bool:
+    """Guess whether a page needs a browser to render its content.
+
+    Args:
+        html: HTML returned by a plain GET
+        min_text_length: Minimum visible body text for a static page
+        js_markers: Lowercase phrases that, found inside <noscript>, mark
+            a client-rendered page
+
+    Returns:
+        True if the page should be rendered in the browser
+    """
+    if visible_text_length(html) < min_text_length:
+        return True
+    if _EMPTY_APP_ROOT_RE.search(html):
+        return True
+    for noscript in _NOSCRIPT_RE.findall(html):
+        lowered = noscript.lower()
+        if any(marker in lowered for marker in js_markers):
+            return True
+    return False
+
+
+class HttpFetcher:
+    """Fetch pages with plain GET requests over a pooled HTTP client.
+
+    Connections are kept alive and, when the server supports it, requests
+    are multiplexed over HTTP/2, so no browser is needed for static pages.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 10,
+        timeout: float = HTTP_TIMEOUT,
+        http2: bool = True,
+        min_text_length: int = DEFAULT_MIN_TEXT_LENGTH,
+        js_markers: Iterable[str] = DEFAULT_JS_MARKERS,
+    ):
+        """Initialize the fetcher.
+
+        Args:
+            max_connections: Maximum open connections across all hosts
+            timeout: Request timeout in seconds
+            http2: Negotiate HTTP/2 where the server offers it
+            min_text_length: See looks_js_rendered
+            js_markers: See looks_js_rendered
+        """
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.http2 = http2
+        self.min_text_length = min_text_length
+        self.js_markers = tuple(marker.lower() for marker in js_markers)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=self.http2,
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=KEEPALIVE_EXPIRY,
+                ),
+            )
+        return self._client
+
+    async def get(self, url: str, validator: Optional[dict] = None) -> httpx.Response:
+        """GET a page, conditionally if a validator is given.
+
+        Args:
+            url: URL to fetch
+            validator: Optional dict with 'etag' and 'last_modified' keys
+
+        Returns:
+            The response; 304 if the page did not change
+
+        Raises:
+            httpx.HTTPError: If the request fails
+        """
+        return await self._get_client().get(url, headers=conditional_headers(validator))
+
+    def looks_js_rendered(self, html: str) -> bool:
+        """Apply looks_js_rendered with this fetcher's settings."""
+        return looks_js_rendered(html, self.min_text_length, self.js_markers)
+
+    async def close(self) -> None:
+        """Close the pooled HTTP client."""
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
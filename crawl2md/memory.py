@@ -0,0 +1,101 @@
+"""Memory backpressure module: a byte budget for pages held in memory."""
+
+import asyncio
+import sys
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+
+DEFAULT_MAX_INFLIGHT_MB = 256
+MB = 1024 * 1024
+
+
+class ByteBudget:
+    """Cap the bytes of page content held in memory across the pipeline.
+
+    Like a semaphore counted in bytes: ``acquire`` waits until the
+    requested bytes fit, ``release`` returns them. Waiters are served in
+    order, so a large page is not starved by a stream of small ones, and a
+    page larger than the whole budget is still let through once nothing
+    else is held, so it cannot block the crawl forever. ``charge`` takes
+    bytes without waiting, for stages that must not block (such as the
+    output writer, which frees memory itself); it only makes later
+    ``acquire`` calls wait longer.
+    """
+
+    def __init__(self, limit_bytes: int):
+        """Initialize the budget.
+
+        Args:
+            limit_bytes: Bytes that may be held at once
+        """
+        self.limit = limit_bytes
+        self.in_use = 0
+        self.peak = 0
+        self.waits = 0
+        self._waiters: Deque[Tuple[int, asyncio.Future]] = deque()
+
+    def _fits(self, size: int) -> bool:
+        return self.in_use == 0 or self.in_use + size <= self.limit
+
+    async def acquire(self, size: int) -> None:
+        """Take ``size`` bytes, waiting while they would exceed the limit."""
+        if not self._waiters and self._fits(size):
+            self.charge(size)
+            return
+        self.waits += 1
+        future = asyncio.get_running_loop().create_future()
+        entry = (size, future)
+        self._waiters.append(entry)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just before the cancellation; give it back
+                self.release(size)
+            else:
+                # A release may have dropped the cancelled entry already
+                if entry in self._waiters:
+                    self._waiters.remove(entry)
+                self._wake()
+            raise
+
+    def charge(self, size: int) -> None:
+        """Take ``size`` bytes without waiting, even beyond the limit."""
+        self.in_use += size
+        self.peak = max(self.peak, self.in_use)
+
+    def release(self, size: int) -> None:
+        """Return bytes taken by acquire or charge."""
+        self.in_use -= size
+        self._wake()
+
+    def stats(self) -> dict:
+        """Return bytes held, the peak and how often acquire had to wait."""
+        return {
+            "in_use": self.in_use,
+            "peak": self.peak,
+            "limit": self.limit,
+            "waits": self.waits,
+        }
+
+    def _wake(self) -> None:
+        while self._waiters and self._fits(self._waiters[0][0]):
+            size, future = self._waiters.popleft()
+            if not future.done():
+                self.charge(size)
+                future.set_result(None)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Return the peak resident set size of this process in MB, if known."""
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return maxrss / (MB if sys.platform == "darwin" else 1024)
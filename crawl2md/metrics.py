@@ -0,0 +1,504 @@
+"""Crawl metrics module: counters, phase latencies, progress and exporters."""
+
+import asyncio
+import bisect
+import json
+import os
+import sys
+import time
+from collections import Counter, deque
+from typing import Callable, Deque, Dict, Optional, TextIO, Tuple
+
+import click
+
+
+# Stages of a page: fetched, HTML cleaned, converted to markdown, processed
+# (markdown cleanup, hashing, dedup) and written
+PHASES = ("fetch", "clean", "convert", "process", "write")
+# Upper bounds in seconds of the phase latency histogram buckets
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+RATE_WINDOW = 10.0
+DEFAULT_STATS_INTERVAL = 5.0
+PROGRESS_INTERVAL = 0.5
+METRICS_HOST = "127.0.0.1"
+
+OUTCOME_OK = "ok"
+OUTCOME_FAILED = "failed"
+OUTCOME_NOT_MODIFIED = "not_modified"
+
+
+class Histogram:
+    """Fixed-bucket latency histogram, in the Prometheus style."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        """Initialize an empty histogram.
+
+        Args:
+            buckets: Sorted bucket upper bounds in seconds; an overflow
+                bucket catches anything above the last one
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        """Record one duration."""
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile as the upper bound of the bucket holding it.
+
+        Args:
+            q: Quantile between 0 and 1
+
+        Returns:
+            Estimated duration in seconds (0.0 when empty; the maximum seen
+            when the quantile falls in the overflow bucket)
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self) -> dict:
+        """Return count, average, maximum and p50/p95/p99 in milliseconds."""
+        return {
+            "count": self.count,
+            "avg_ms": self.sum / self.count * 1000 if self.count else 0.0,
+            "max_ms": self.max * 1000,
+            "p50_ms": self.quantile(0.5) * 1000,
+            "p95_ms": self.quantile(0.95) * 1000,
+            "p99_ms": self.quantile(0.99) * 1000,
+        }
+
+
+class Metrics:
+    """Collect throughput, latency and error metrics of a crawl.
+
+    Counters are updated from the event loop as results come in; gauges
+    such as in-flight requests are read on demand from registered
+    callables, so reading metrics never touches the crawl's hot path.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        """Initialize empty metrics.
+
+        Args:
+            clock: Monotonic clock in seconds (replaceable in tests)
+        """
+        self.clock = clock
+        self.started = clock()
+        self.expected = 0
+        self.expected_final = False
+        self.outcomes: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.bytes = 0
+        self.phases: Dict[str, Histogram] = {phase: Histogram() for phase in PHASES}
+        self._gauges: Dict[str, Callable[[], float]] = {}
+        self._recent: Deque[Tuple[float, int]] = deque()
+
+    @property
+    def completed(self) -> int:
+        """Pages finished, whatever the outcome."""
+        return sum(self.outcomes.values())
+
+    def expect(self, count: int = 1, final: bool = False) -> None:
+        """Add pages to the expected total used for the ETA.
+
+        Args:
+            count: Pages queued for crawling
+            final: Whether the total is now complete (sitemap fully read)
+        """
+        self.expected += count
+        self.expected_final = self.expected_final or final
+
+    def gauge(self, name: str, read: Callable[[], float]) -> None:
+        """Register a gauge read on demand, e.g. in-flight requests."""
+        self._gauges[name] = read
+
+    def observe(self, phase: str, seconds: float) -> None:
+        """Record the duration of one phase of one page."""
+        self.phases[phase].observe(seconds)
+
+    def record_result(self, result: dict) -> None:
+        """Count a final crawl result and its phase timings.
+
+        Args:
+            result: Result dict from Crawler.crawl_many, with optional
+                'timings' (seconds by phase) and 'bytes' (response size)
+        """
+        if result.get("not_modified"):
+            outcome = OUTCOME_NOT_MODIFIED
+        elif result["success"]:
+            outcome = OUTCOME_OK
+        else:
+            outcome = OUTCOME_FAILED
+            self.errors[result.get("error_class") or "unknown"] += 1
+        self.outcomes[outcome] += 1
+        size = result.get("bytes") or 0
+        self.bytes += size
+        for phase, seconds in (result.get("timings") or {}).items():
+            if phase in self.phases:
+                self.observe(phase, seconds)
+        now = self.clock()
+        self._recent.append((now, size))
+        self._prune(now)
+
+    def record_error(self, error_class: str) -> None:
+        """Count an error that happened after the page was crawled."""
+        self.errors[error_class] += 1
+
+    def rates(self) -> Tuple[float, float]:
+        """Return pages and bytes per second over the last RATE_WINDOW."""
+        now = self.clock()
+        self._prune(now)
+        span = min(RATE_WINDOW, now - self.started)
+        if span <= 0:
+            return 0.0, 0.0
+        return len(self._recent) / span, sum(size for _, size in self._recent) / span
+
+    def eta(self) -> Optional[float]:
+        """Return the estimated seconds left, or None without a rate yet.
+
+        While the sitemap is still being read the expected total keeps
+        growing, so the estimate is a lower bound until it is final.
+        """
+        pages_per_second, _ = self.rates()
+        if not pages_per_second:
+            return None
+        return max(0, self.expected - self.completed) / pages_per_second
+
+    def snapshot(self) -> dict:
+        """Return all metrics as a JSON-serializable dict."""
+        pages_per_second, bytes_per_second = self.rates()
+        return {
+            "elapsed_seconds": self.clock() - self.started,
+            "expected": self.expected,
+            "expected_final": self.expected_final,
+            "completed": self.completed,
+            "outcomes": dict(self.outcomes),
+            "errors": dict(self.errors),
+            "bytes": self.bytes,
+            "pages_per_second": pages_per_second,
+            "bytes_per_second": bytes_per_second,
+            "eta_seconds": self.eta(),
+            "gauges": {name: read() for name, read in self._gauges.items()},
+            "phases": {
+                phase: histogram.snapshot() for phase, histogram in self.phases.items()
+            },
+        }
+
+    def prometheus(self) -> str:
+        """Return the metrics in the Prometheus text exposition format."""
+        pages_per_second, bytes_per_second = self.rates()
+        lines = [
+            "# HELP crawl2md_pages_total Pages finished, by outcome",
+            "# TYPE crawl2md_pages_total counter",
+        ]
+        for outcome in (OUTCOME_OK, OUTCOME_FAILED, OUTCOME_NOT_MODIFIED):
+            lines.append(
+                f'crawl2md_pages_total{{outcome="{outcome}"}} {self.outcomes[outcome]}'
+            )
+        lines += [
+            "# HELP crawl2md_errors_total Errors, by class",
+            "# TYPE crawl2md_errors_total counter",
+        ]
+        for error_class, count in sorted(self.errors.items()):
+            lines.append(f'crawl2md_errors_total{{class="{error_class}"}} {count}')
+        lines += [
+            "# HELP crawl2md_bytes_total Bytes of page content fetched",
+            "# TYPE crawl2md_bytes_total counter",
+            f"crawl2md_bytes_total {self.bytes}",
+            "# HELP crawl2md_pages_expected Pages queued for crawling so far",
+            "# TYPE crawl2md_pages_expected gauge",
+            f"crawl2md_pages_expected {self.expected}",
+            "# HELP crawl2md_pages_per_second Pages finished per second, "
+            f"over {RATE_WINDOW:g}s",
+            "# TYPE crawl2md_pages_per_second gauge",
+            f"crawl2md_pages_per_second {pages_per_second:.3f}",
+            "# HELP crawl2md_bytes_per_second Bytes fetched per second, "
+            f"over {RATE_WINDOW:g}s",
+            "# TYPE crawl2md_bytes_per_second gauge",
+            f"crawl2md_bytes_per_second {bytes_per_second:.1f}",
+        ]
+        eta = self.eta()
+        if eta is not None:
+            lines += [
+                "# HELP crawl2md_eta_seconds Estimated seconds left",
+                "# TYPE crawl2md_eta_seconds gauge",
+                f"crawl2md_eta_seconds {eta:.1f}",
+            ]
+        for name, read in self._gauges.items():
+            lines += [f"# TYPE crawl2md_{name} gauge", f"crawl2md_{name} {read()}"]
+        lines += [
+            "# HELP crawl2md_phase_seconds Duration of each phase of a page",
+            "# TYPE crawl2md_phase_seconds histogram",
+        ]
+        for phase, histogram in self.phases.items():
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(
+                    f'crawl2md_phase_seconds_bucket{{phase="{phase}",le="{bound:g}"}} '
+                    f"{cumulative}"
+                )
+            lines += [
+                f'crawl2md_phase_seconds_bucket{{phase="{phase}",le="+Inf"}} '
+                f"{histogram.count}",
+                f'crawl2md_phase_seconds_sum{{phase="{phase}"}} {histogram.sum:.6f}',
+                f'crawl2md_phase_seconds_count{{phase="{phase}"}} {histogram.count}',
+            ]
+        return "\n".join(lines) + "\n"
+
+    def _prune(self, now: float) -> None:
+        while self._recent and self._recent[0][0] < now - RATE_WINDOW:
+            self._recent.popleft()
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    """Format seconds as e.g. "1h02m", "5m04s" or "42s"; "?" when unknown."""
+    if seconds is None:
+        return "?"
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+def format_bytes(count: float) -> str:
+    """Format a byte count with a binary unit, e.g. "1.5 MB"."""
+    if count < 1024:
+        return f"{count:.0f} B"
+    for unit in ("KB", "MB"):
+        count /= 1024
+        if count < 1024:
+            return f"{count:.1f} {unit}"
+    return f"{count / 1024:.1f} GB"
+
+
+def format_status(metrics: Metrics) -> str:
+    """Return a one-line progress summary of a crawl."""
+    snapshot = metrics.snapshot()
+    completed, expected = snapshot["completed"], snapshot["expected"]
+    if snapshot["expected_final"] and expected:
+        progress = f"{completed}/{expected} {completed / expected:6.1%}"
+    else:
+        progress = f"{completed}/{expected}+"
+    parts = [
+        progress,
+        f"{snapshot['pages_per_second']:.1f} pages/s",
+        f"{format_bytes(snapshot['bytes_per_second'])}/s",
+    ]
+    gauges = snapshot["gauges"]
+    if "in_flight" in gauges:
+        parts.append(f"in flight {gauges['in_flight']}")
+    if "queued" in gauges:
+        parts.append(f"queued {gauges['queued']}")
+    errors = sum(snapshot["errors"].values())
+    if errors:
+        parts.append(f"errors {errors}")
+    eta = format_duration(snapshot["eta_seconds"])
+    parts.append(f"ETA {eta}" if snapshot["expected_final"] else f"ETA >{eta}")
+    return " | ".join(parts)
+
+
+class ProgressDisplay:
+    """Keep a live status line below the per-URL output of a terminal."""
+
+    def __init__(self, metrics: Metrics, stream: Optional[TextIO] = None):
+        """Initialize the display.
+
+        Args:
+            metrics: Metrics to summarize
+            stream: Terminal to draw on (defaults to stderr)
+        """
+        self.metrics = metrics
+        self.stream = stream or sys.stderr
+        self._drawn = False
+
+    def echo(self, message: str) -> None:
+        """Print a line above the status line."""
+        self._clear()
+        click.echo(message)
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Redraw the status line."""
+        self._clear()
+        self.stream.write(format_status(self.metrics))
+        self.stream.flush()
+        self._drawn = True
+
+    def finish(self) -> None:
+        """Remove the status line."""
+        self._clear()
+        self.stream.flush()
+
+    def _clear(self) -> None:
+        if self._drawn:
+            self.stream.write("\r\033[K")
+            self._drawn = False
+
+
+class MetricsReporter:
+    """Publish metrics while a crawl runs.
+
+    Optionally refreshes a ProgressDisplay, rewrites a JSON stats file
+    every ``stats_interval`` seconds (atomically, so readers never see a
+    partial file) and serves ``/metrics`` (Prometheus text format) and
+    ``/stats`` (JSON) over HTTP.
+    """
+
+    def __init__(
+        self,
+        metrics: Metrics,
+        progress: Optional[ProgressDisplay] = None,
+        stats_file: Optional[str] = None,
+        stats_interval: float = DEFAULT_STATS_INTERVAL,
+        port: Optional[int] = None,
+        host: str = METRICS_HOST,
+    ):
+        """Initialize the reporter.
+
+        Args:
+            metrics: Metrics to publish
+            progress: Optional live progress display
+            stats_file: Optional path of a JSON stats file
+            stats_interval: Seconds between stats file updates
+            port: Optional port for the HTTP metrics endpoint (0 picks one)
+            host: Interface the metrics endpoint listens on
+        """
+        self.metrics = metrics
+        self.progress = progress
+        self.stats_file = stats_file
+        self.stats_interval = stats_interval
+        self.port = port
+        self.host = host
+        self._tasks = []
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def address(self) -> Optional[Tuple[str, int]]:
+        """Host and port the metrics endpoint listens on, once started."""
+        if self._server is None:
+            return None
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def start(self) -> None:
+        """Start refreshing, writing and serving metrics."""
+        if self.progress is not None:
+            self._tasks.append(
+                asyncio.ensure_future(
+                    self._every(PROGRESS_INTERVAL, self.progress.refresh)
+                )
+            )
+        if self.stats_file:
+            self._tasks.append(
+                asyncio.ensure_future(
+                    self._every(self.stats_interval, self.write_stats)
+                )
+            )
+        if self.port is not None:
+            self._server = await asyncio.start_server(self._serve, self.host, self.port)
+
+    async def close(self) -> None:
+        """Stop reporting, after a last stats file update."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self.stats_file:
+            await self.write_stats()
+        if self.progress is not None:
+            self.progress.finish()
+
+    async def __aenter__(self) -> "MetricsReporter":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def write_stats(self) -> None:
+        """Replace the stats file with the current snapshot."""
+        data = json.dumps(self.metrics.snapshot(), indent=2)
+        await asyncio.get_running_loop().run_in_executor(
+            None, _replace_file, self.stats_file, data
+        )
+
+    async def _every(self, interval: float, action) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            result = action()
+            if asyncio.iscoroutine(result):
+                await result
+
+    async def _serve(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()).strip():
+                pass
+            parts = request_line.decode("latin-1").split()
+            path = parts[1].split("?")[0] if len(parts) > 1 else ""
+            if path == "/metrics":
+                status = "200 OK"
+                content_type = "text/plain; version=0.0.4"
+                body = self.metrics.prometheus()
+            elif path == "/stats":
+                status = "200 OK"
+                content_type = "application/json"
+                body = json.dumps(self.metrics.snapshot())
+            else:
+                status, content_type, body = "404 Not Found", "text/plain", ""
+            payload = body.encode("utf-8")
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode(
+                    "latin-1"
+                )
+                + payload
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+def _replace_file(path: str, data: str) -> None:
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(data)
+    os.replace(temp_path, path)
@@ -0,0 +1,146 @@
+"""Per-stage profiling module: wall/CPU timers, run breakdown and cProfile."""
+
+import cProfile
+import glob
+import os
+import pstats
+import time
+from contextlib import contextmanager
+from multiprocessing.util import Finalize
+from typing import Dict, Iterator, List, Optional
+
+from crawl2md.metrics import PHASES
+
+
+CPU_SUFFIX = "_cpu"
+TIMING_KEYS = [f"{phase}{suffix}" for phase in PHASES for suffix in ("", CPU_SUFFIX)]
+# Result CSV columns added by --profile, in milliseconds
+TIMING_COLUMNS = [f"{key}_ms" for key in TIMING_KEYS]
+
+
+@contextmanager
+def timed(timings: Dict[str, float], stage: str) -> Iterator[None]:
+    """Add the wall and CPU seconds of the block to ``timings``.
+
+    Wall time goes under ``stage`` and CPU time of the current thread under
+    ``stage + "_cpu"``; repeated blocks of one stage add up.
+
+    Args:
+        timings: Dict of seconds by stage, updated in place
+        stage: Stage name, e.g. "clean"
+    """
+    wall, cpu = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - wall
+        cpu_key = stage + CPU_SUFFIX
+        timings[cpu_key] = timings.get(cpu_key, 0.0) + time.thread_time() - cpu
+
+
+def timing_row(timings: Dict[str, float]) -> List[str]:
+    """Format timings as TIMING_COLUMNS values, blank where not measured."""
+    return [
+        f"{timings[key] * 1000:.1f}" if key in timings else "" for key in TIMING_KEYS
+    ]
+
+
+class StageProfile:
+    """Aggregate per-URL stage timings into a run breakdown."""
+
+    def __init__(self):
+        """Initialize an empty profile."""
+        self.counts: Dict[str, int] = dict.fromkeys(PHASES, 0)
+        self.wall: Dict[str, float] = dict.fromkeys(PHASES, 0.0)
+        self.cpu: Dict[str, Optional[float]] = dict.fromkeys(PHASES, None)
+        self.max: Dict[str, float] = dict.fromkeys(PHASES, 0.0)
+
+    def record(self, timings: Dict[str, float]) -> None:
+        """Add one URL's timings (as produced by ``timed``)."""
+        for stage in PHASES:
+            if stage not in timings:
+                continue
+            seconds = timings[stage]
+            self.counts[stage] += 1
+            self.wall[stage] += seconds
+            self.max[stage] = max(self.max[stage], seconds)
+            cpu = timings.get(stage + CPU_SUFFIX)
+            if cpu is not None:
+                self.cpu[stage] = (self.cpu[stage] or 0.0) + cpu
+
+    def report(self) -> List[str]:
+        """Return the breakdown as aligned text lines.
+
+        Wall time is summed over URLs, so stages that run concurrently can
+        add up to more than the run time; the share column compares stages
+        with each other. CPU/wall near 100% means a stage is CPU bound, far
+        below means it waits (network, browser, disk).
+        """
+        total = sum(self.wall.values()) or 1.0
+        lines = [
+            f"{'stage':<9}{'pages':>7}{'wall':>11}{'avg':>10}{'max':>10}"
+            f"{'cpu':>11}{'cpu/wall':>10}{'share':>8}"
+        ]
+        for stage in PHASES:
+            count = self.counts[stage]
+            if not count:
+                continue
+            wall, cpu = self.wall[stage], self.cpu[stage]
+            lines.append(
+                f"{stage:<9}{count:>7}{wall:>10.2f}s"
+                f"{wall / count * 1000:>8.1f}ms{self.max[stage] * 1000:>8.1f}ms"
+                + (
+                    f"{cpu:>10.2f}s{cpu / wall if wall else 0:>10.0%}"
+                    if cpu is not None
+                    else f"{'-':>11}{'-':>10}"
+                )
+                + f"{wall / total:>8.0%}"
+            )
+        return lines
+
+
+def start_worker_profile(prefix: str) -> None:
+    """Profile the current process until it exits, into ``<prefix>.<pid>.prof``.
+
+    Meant as a ProcessPoolExecutor initializer: the stats are written by a
+    multiprocessing finalizer when the worker shuts down.
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    Finalize(
+        None,
+        _dump_profile,
+        args=(profiler, f"{prefix}.{os.getpid()}.prof"),
+        exitpriority=0,
+    )
+
+
+def merge_profiles(
+    path: str, prefix: str, main: Optional[cProfile.Profile] = None
+) -> int:
+    """Merge worker profiles (and the main process's) into one pstats file.
+
+    Worker files are removed once merged.
+
+    Args:
+        path: Output pstats file
+        prefix: Prefix given to start_worker_profile
+        main: Optional profiler of the main process
+
+    Returns:
+        Number of processes merged
+    """
+    files = sorted(glob.glob(f"{glob.escape(prefix)}.*.prof"))
+    sources = ([main] if main is not None else []) + files
+    if not sources:
+        return 0
+    stats = pstats.Stats(*sources)
+    stats.dump_stats(path)
+    for file in files:
+        os.unlink(file)
+    return len(sources)
+
+
+def _dump_profile(profiler: cProfile.Profile, path: str) -> None:
+    profiler.disable()
+    profiler.dump_stats(path)
@@ -0,0 +1,59 @@
+"""Rate limiting module."""
+
+import asyncio
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """Async token bucket allowing ``rate`` requests per second.
+
+    Up to ``burst`` requests may start back to back after an idle period;
+    after that requests are spaced out to the configured rate.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        """Initialize the bucket.
+
+        Args:
+            rate: Sustained requests per second (must be positive)
+            burst: Maximum number of tokens that can accumulate
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        if burst < 1:
+            raise ValueError("burst must be at least 1")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> float:
+        """Take a token if one is available, without waiting.
+
+        Returns:
+            0.0 if a token was taken, otherwise the seconds until one is
+            available
+        """
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                wait = self.try_acquire()
+                if not wait:
+                    return
+                await asyncio.sleep(wait)
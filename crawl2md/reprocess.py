@@ -0,0 +1,111 @@
+"""Reprocess module: rebuild markdown files from the raw HTML cache.
+
+Runs HTML cleaning, markdown conversion, MarkdownCleaner and FileHandler
+over cached pages in a process pool, without any network traffic, so
+selector changes can be tried on a whole site in seconds.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from crawl2md.cleaner import MarkdownCleaner
+from crawl2md.converter import clean_and_convert_timed
+from crawl2md.dedup import normalize_url
+from crawl2md.file_handler import FileHandler
+from crawl2md.html_cache import CachedPage, read_blob
+
+
+# Pages sent to a worker process at a time
+REPROCESS_CHUNK_SIZE = 16
+
+# Per-process pipeline, set up once by _start_worker
+_html_cleaner = None
+_markdown_cleaner: Optional[MarkdownCleaner] = None
+_file_handler: Optional[FileHandler] = None
+
+
+def _start_worker(html_cleaner, output_dir: str) -> None:
+    """Set up a worker process's pipeline (ProcessPoolExecutor initializer)."""
+    global _html_cleaner, _markdown_cleaner, _file_handler
+    _html_cleaner = html_cleaner
+    _markdown_cleaner = MarkdownCleaner()
+    _file_handler = FileHandler("", output_dir)
+
+
+def reprocess_page(
+    url: str, path: str, file_path: str
+) -> Tuple[str, Optional[str], Dict[str, float]]:
+    """Rebuild one page's markdown file from its cached HTML.
+
+    Args:
+        url: Page URL
+        path: Cache file holding the page's HTML
+        file_path: Output path planned for the page, relative to the
+            output directory
+
+    Returns:
+        Tuple of (url, error message or None, seconds by phase)
+    """
+    try:
+        _file_handler.assign(url, file_path)
+        markdown, timings = clean_and_convert_timed(read_blob(path), _html_cleaner)
+        markdown = _markdown_cleaner.clean(markdown, url)
+        _file_handler.save_markdown(url, markdown, _markdown_cleaner.frontmatter(url))
+    except Exception as e:
+        return url, str(e), {}
+    return url, None, timings
+
+
+def reprocess(
+    pages: Iterable[CachedPage],
+    output_dir: str,
+    html_cleaner=None,
+    workers: Optional[int] = None,
+    saved_paths: Iterable[Tuple[str, str]] = (),
+) -> Iterator[Tuple[str, Optional[str], Dict[str, float]]]:
+    """Rebuild the markdown files of cached pages.
+
+    Pages crawled into ``output_dir`` are written to the files the crawl
+    gave them, under the URL they were crawled as; other pages get new
+    paths that do not collide with those.
+
+    Args:
+        pages: Cached pages, e.g. HtmlCache.pages()
+        output_dir: Directory to write markdown files to
+        html_cleaner: Optional HtmlCleaner applied before conversion
+        workers: Processes to use (defaults to one per CPU core); 1 runs
+            in this process
+        saved_paths: (url, path) pairs of the crawl of ``output_dir``,
+            e.g. CrawlState.saved_paths()
+
+    Yields:
+        (url, error message or None, seconds by phase) per page, in order
+    """
+    # Paths are planned here, since each worker only sees some of the URLs
+    # that could share a file, and the whole tree is created at once
+    planner = FileHandler("", output_dir)
+    crawled = {}
+    for url, path in saved_paths:
+        planner.assign(url, path)
+        crawled[normalize_url(url)] = url
+    pages = list(pages)
+    # The cache is keyed by normalized URL
+    urls = [crawled.get(page.url, page.url) for page in pages]
+    paths = [page.path for page in pages]
+    planner.plan(urls)
+    planner.make_directories()
+    file_paths = [planner.url_to_path(url) for url in urls]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        _start_worker(html_cleaner, output_dir)
+        yield from map(reprocess_page, urls, paths, file_paths)
+        return
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_start_worker,
+        initargs=(html_cleaner, output_dir),
+    ) as executor:
+        yield from executor.map(
+            reprocess_page, urls, paths, file_paths, chunksize=REPROCESS_CHUNK_SIZE
+        )
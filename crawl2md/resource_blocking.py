@@ -0,0 +1,167 @@
+"""Resource blocking module: keep the browser from loading what we discard.
+
+Rendered pages only need their DOM, but a browser also downloads images,
+fonts, media, analytics scripts and chat widgets, and runs them. A
+ResourceBlocker intercepts each page's requests and aborts those of
+blocked resource types or matching blocked URL patterns, counting what it
+blocked and the bytes the browser still received.
+"""
+
+import fnmatch
+import re
+from collections import Counter
+from typing import Iterable, Optional
+
+# Playwright's request.resource_type values
+RESOURCE_TYPES = (
+    "document",
+    "stylesheet",
+    "image",
+    "media",
+    "font",
+    "script",
+    "texttrack",
+    "xhr",
+    "fetch",
+    "eventsource",
+    "websocket",
+    "manifest",
+    "other",
+)
+# Types --lean-browser blocks: nothing the DOM, and so the markdown, needs
+LEAN_BLOCKED_TYPES = ("image", "media", "font", "stylesheet")
+# Third-party analytics, ads and widgets --lean-browser blocks
+LEAN_BLOCKED_PATTERNS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "connect.facebook.net",
+    "static.hotjar.com",
+    "js.hs-scripts.com",
+    "widget.intercom.io",
+    "docsbot.ai",
+)
+# Page-load events the browser waits for before the HTML is read
+WAIT_UNTIL = ("commit", "domcontentloaded", "load", "networkidle")
+DEFAULT_WAIT_UNTIL = "domcontentloaded"
+DEFAULT_PAGE_TIMEOUT = 60.0
+
+
+def parse_resource_types(value: str) -> tuple:
+    """Parse a comma-separated list of resource types.
+
+    Raises:
+        ValueError: If a type is not one of RESOURCE_TYPES
+    """
+    types = tuple(t.strip().lower() for t in value.split(",") if t.strip())
+    _check_types(types)
+    return types
+
+
+def _check_types(types: Iterable[str]) -> None:
+    unknown = [t for t in types if t not in RESOURCE_TYPES]
+    if unknown:
+        raise ValueError(
+            f"Unknown resource type(s) {', '.join(unknown)}, "
+            f"expected some of {', '.join(RESOURCE_TYPES)}"
+        )
+
+
+def _pattern_regex(patterns: Iterable[str]) -> Optional[re.Pattern]:
+    """Compile URL patterns into one regex.
+
+    Patterns with glob characters (``*``, ``?``, ``[``) must match the
+    whole URL; others match anywhere in it, so a bare host name works.
+    """
+    parts = [
+        fnmatch.translate(p) if any(c in p for c in "*?[") else re.escape(p)
+        for p in patterns
+    ]
+    return re.compile("|".join(parts), re.IGNORECASE) if parts else None
+
+
+class ResourceBlocker:
+    """Abort a browser page's requests by resource type and URL pattern.
+
+    ``install`` is a crawl4ai ``on_page_context_created`` hook; the main
+    document is never blocked. Counters cover every page the hook was
+    installed on.
+    """
+
+    def __init__(
+        self,
+        block_types: Iterable[str] = (),
+        block_patterns: Iterable[str] = (),
+    ):
+        """Initialize the blocker.
+
+        Args:
+            block_types: Resource types to abort (see RESOURCE_TYPES)
+            block_patterns: URL substrings or glob patterns to abort
+
+        Raises:
+            ValueError: If a resource type is unknown
+        """
+        self.block_types = frozenset(block_types)
+        _check_types(self.block_types)
+        self.block_patterns = tuple(block_patterns)
+        self._regex = _pattern_regex(self.block_patterns)
+        self.blocked: Counter = Counter()
+        self.allowed = 0
+        self.bytes_received = 0
+
+    @property
+    def active(self) -> bool:
+        """Whether anything is blocked at all."""
+        return bool(self.block_types or self._regex)
+
+    def should_block(self, url: str, resource_type: str) -> bool:
+        """Return whether a request is blocked."""
+        if resource_type == "document":
+            return False
+        if resource_type in self.block_types:
+            return True
+        return bool(self._regex and self._regex.search(url))
+
+    async def handle(self, route) -> None:
+        """Playwright route handler: abort blocked requests, pass the rest."""
+        request = route.request
+        if self.should_block(request.url, request.resource_type):
+            self.blocked[request.resource_type] += 1
+            await route.abort("blockedbyclient")
+            return
+        self.allowed += 1
+        # Fall back rather than continue, so crawl4ai's own routes still run
+        await route.fallback()
+
+    def record_response(self, response) -> None:
+        """Count a response's size, as announced by its Content-Length."""
+        try:
+            self.bytes_received += int(response.headers.get("content-length", 0))
+        except ValueError:
+            pass
+
+    async def install(self, page, **kwargs):
+        """Intercept a new page's requests (crawl4ai hook)."""
+        # crawl4ai may hand out the same page again; route it only once
+        if getattr(page, "_crawl2md_blocker", False):
+            return page
+        page._crawl2md_blocker = True
+        if self.active:
+            # Routing turns off the browser's HTTP cache, so only when needed
+            await page.route("**/*", self.handle)
+        page.on("response", self.record_response)
+        return page
+
+    def stats(self) -> dict:
+        """Return blocked requests, requests let through and bytes received.
+
+        'allowed' only counts while something is blocked, since requests
+        are not intercepted otherwise.
+        """
+        return {
+            "blocked": sum(self.blocked.values()),
+            "blocked_by_type": dict(self.blocked),
+            "allowed": self.allowed,
+            "bytes_received": self.bytes_received,
+        }
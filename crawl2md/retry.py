@@ -0,0 +1,133 @@
+"""Retry policy module: failure classification, backoff and retry budget."""
+
+import random
+from typing import Optional
+
+
+ERROR_TRANSIENT = "transient"
+ERROR_PERMANENT = "permanent"
+
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 60.0
+# Retries allowed per first attempt, on top of MIN_RETRY_BUDGET
+DEFAULT_RETRY_BUDGET = 0.2
+MIN_RETRY_BUDGET = 10
+
+TRANSIENT_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+# Lowercase fragments of timeout, network and browser crash errors
+TRANSIENT_ERROR_MARKERS = (
+    "timeout",
+    "timed out",
+    "net::err_",
+    "connection",
+    "temporarily",
+    "target closed",
+    "target page, context or browser has been closed",
+    "browser has been closed",
+    "browser has disconnected",
+    "crash",
+)
+
+
+def classify_failure(result: dict) -> str:
+    """Classify a failed crawl result as transient or permanent.
+
+    Timeouts, network errors, browser crashes, 429 and 5xx answers are
+    transient; anything else (404, unsupported content, parse errors) is
+    permanent.
+
+    Args:
+        result: Failed result dict with 'error' and optionally 'status_code'
+
+    Returns:
+        ERROR_TRANSIENT or ERROR_PERMANENT
+    """
+    status = result.get("status_code")
+    if status is not None:
+        if status in TRANSIENT_STATUSES:
+            return ERROR_TRANSIENT
+        if 400 <= status < 600:
+            return ERROR_PERMANENT
+    error = str(result.get("error") or "").lower()
+    if any(marker in error for marker in TRANSIENT_ERROR_MARKERS):
+        return ERROR_TRANSIENT
+    return ERROR_PERMANENT
+
+
+class RetryPolicy:
+    """Decide whether and when to retry a failed URL.
+
+    Delays grow exponentially with "full jitter" (a random delay between 0
+    and the exponential cap) so retries of many URLs do not synchronize.
+    Retries across the whole run are limited by a budget that grows with
+    the number of first attempts, so a failing site cannot multiply the run
+    time.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        base_delay: float = DEFAULT_BASE_DELAY,
+        max_delay: float = DEFAULT_MAX_DELAY,
+        budget: float = DEFAULT_RETRY_BUDGET,
+        min_budget: int = MIN_RETRY_BUDGET,
+    ):
+        """Initialize the policy.
+
+        Args:
+            max_attempts: Attempts per URL, including the first (1 disables
+                retries)
+            base_delay: Backoff cap of the first retry in seconds, doubled
+                for each further retry
+            max_delay: Upper bound of the backoff cap
+            budget: Retries allowed per first attempt across the run
+            min_budget: Retries always allowed, however few URLs were tried
+        """
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.min_budget = min_budget
+        self.first_attempts = 0
+        self.retries = 0
+        self.budget_exhausted = 0
+
+    def record_attempt(self, attempt: int) -> None:
+        """Count an attempt; first attempts replenish the retry budget."""
+        if attempt == 1:
+            self.first_attempts += 1
+
+    def next_delay(self, result: dict, attempt: int) -> Optional[float]:
+        """Return the delay before retrying a failed result, or None.
+
+        A retry is granted only for transient failures, below max_attempts,
+        while the retry budget lasts. Granting it spends from the budget.
+
+        Args:
+            result: Failed result dict
+            attempt: Attempts made so far for this URL (1 after the first)
+
+        Returns:
+            Seconds to wait before re-queueing the URL, or None to give up
+        """
+        if attempt >= self.max_attempts:
+            return None
+        if classify_failure(result) != ERROR_TRANSIENT:
+            return None
+        if self.retries >= self.min_budget + self.budget * self.first_attempts:
+            self.budget_exhausted += 1
+            return None
+        self.retries += 1
+        cap = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        delay = random.uniform(0, cap)
+        retry_after = result.get("retry_after")
+        if retry_after:
+            delay = max(delay, min(float(retry_after), self.max_delay))
+        return delay
+
+    def stats(self) -> dict:
+        """Return retries granted and retries refused for lack of budget."""
+        return {"retries": self.retries, "budget_exhausted": self.budget_exhausted}
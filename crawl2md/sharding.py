@@ -0,0 +1,245 @@
+"""Process sharding module: one crawl spread over processes on this host.
+
+The URLs are split by a stable hash of the URL across N worker processes.
+Each process runs its own Crawler, with its own event loop and browser
+pool, and writes its pages into the shared output directory; a URL always
+maps to the same process, so no two processes write the same file. The
+parent runs the usual Coordinator over a ProcessShards queue, which keeps
+the state store, result file and progress in one place.
+"""
+
+import asyncio
+import hashlib
+import multiprocessing
+import queue as queue_module
+from typing import Callable, Dict, List, Optional, Tuple
+
+from crawl2md.crawler import Crawler
+from crawl2md.distributed import Worker
+from crawl2md.file_handler import FileHandler
+from crawl2md.work_queue import OUTCOME_ERROR, WorkItem, WorkQueue
+
+
+# Seconds between checks of a shard's inbox while it is empty
+SHARD_POLL_INTERVAL = 0.05
+# Work items sent to a shard and not reported back before the sitemap is
+# read further: the one crawled, the next one and some to spare
+SHARD_ITEMS_AHEAD = 4
+# Seconds to wait for a shard process to exit once its work is done
+SHUTDOWN_TIMEOUT = 30.0
+
+
+def shard_of(url: str, shards: int) -> int:
+    """Return the shard (0 to shards - 1) of a URL.
+
+    Stable across processes and runs, unlike ``hash()``, which is salted
+    per interpreter.
+    """
+    digest = hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % shards
+
+
+class ShardInbox(WorkQueue):
+    """Child side of a shard: items from the parent, outcomes back to it.
+
+    Lets a distributed Worker run unchanged inside a shard process. Each
+    item goes to exactly one shard, so leases never expire and renewals
+    always succeed.
+    """
+
+    def __init__(self, inbox, outbox):
+        self.inbox = inbox
+        self.outbox = outbox
+        self._closed = False
+
+    def lease(self, worker: str, lease_seconds: float) -> Optional[WorkItem]:
+        if self._closed:
+            return None
+        try:
+            message = self.inbox.get_nowait()
+        except queue_module.Empty:
+            return None
+        if message is None:
+            self._closed = True
+            return None
+        item_id, tasks = message
+        return WorkItem(item_id, tasks)
+
+    def renew(self, item_id: int, worker: str, lease_seconds: float) -> bool:
+        return True
+
+    def complete(self, item_id: int, worker: str, outcomes: List[dict]) -> bool:
+        self.outbox.put((item_id, outcomes))
+        return True
+
+    def finished(self) -> bool:
+        return self._closed
+
+
+def run_shard(
+    index: int,
+    inbox,
+    outbox,
+    make_crawler: Callable[[], Crawler],
+    base_url: str,
+    output_dir: str,
+) -> None:
+    """Entry point of a shard process: crawl items until the inbox closes.
+
+    Args:
+        index: Shard number, used as the worker id
+        inbox: Queue of (item id, tasks) from the parent, then None
+        outbox: Queue of (item id, outcomes) to the parent
+        make_crawler: Picklable factory building this shard's Crawler
+        base_url: Base URL of the site, for the FileHandler
+        output_dir: Shared output directory
+    """
+    worker = Worker(
+        ShardInbox(inbox, outbox),
+        make_crawler(),
+        FileHandler(base_url, output_dir),
+        worker_id=f"shard-{index}",
+        poll_interval=SHARD_POLL_INTERVAL,
+        log=lambda line: None,
+    )
+    asyncio.run(worker.run())
+
+
+class ProcessShards(WorkQueue):
+    """Parent side: route work items to shard processes by URL hash.
+
+    Implements the WorkQueue interface the Coordinator uses. ``put``
+    splits a batch by ``shard_of`` and sends each part to its process;
+    ``pop_results`` collects the outcomes. If a process dies, its
+    unfinished URLs are reported as failed instead of stalling the crawl.
+    """
+
+    def __init__(
+        self,
+        processes: int,
+        make_crawler: Callable[[], Crawler],
+        base_url: str,
+        output_dir: str,
+    ):
+        """Initialize the shards; ``start`` launches the processes.
+
+        Args:
+            processes: Number of shard processes
+            make_crawler: Picklable factory building each shard's Crawler
+                (e.g. a functools.partial of a module-level function)
+            base_url: Base URL of the site
+            output_dir: Output directory shared by the shards
+        """
+        # Spawned rather than forked: the parent runs threads (writer,
+        # sitemap) and forking those is unsafe
+        context = multiprocessing.get_context("spawn")
+        self.processes = processes
+        self._outbox = context.Queue()
+        self._inboxes = [context.Queue() for _ in range(processes)]
+        self._workers = [
+            context.Process(
+                target=run_shard,
+                args=(
+                    index,
+                    self._inboxes[index],
+                    self._outbox,
+                    make_crawler,
+                    base_url,
+                    output_dir,
+                ),
+                name=f"crawl2md-shard-{index}",
+                daemon=True,
+            )
+            for index in range(processes)
+        ]
+        self._next_id = 0
+        self._closed = False
+        # Items sent but not reported back, by id: (shard, tasks)
+        self._pending: Dict[int, Tuple[int, List[dict]]] = {}
+        self.urls_per_shard = [0] * processes
+
+    def start(self) -> None:
+        """Launch the shard processes."""
+        for process in self._workers:
+            process.start()
+
+    def clear(self) -> None:
+        """Nothing to clear: the shards live for one run only."""
+
+    def put(self, tasks: List[dict]) -> int:
+        parts: Dict[int, List[dict]] = {}
+        for task in tasks:
+            parts.setdefault(shard_of(task["url"], self.processes), []).append(task)
+        for shard, part in parts.items():
+            self._next_id += 1
+            self._pending[self._next_id] = (shard, part)
+            self.urls_per_shard[shard] += len(part)
+            self._inboxes[shard].put((self._next_id, part))
+        return self._next_id
+
+    def close_input(self) -> None:
+        self._closed = True
+        for inbox in self._inboxes:
+            inbox.put(None)
+
+    def pop_results(self) -> List[Tuple[int, List[dict]]]:
+        results = self._drain()
+        for shard, process in enumerate(self._workers):
+            if process.exitcode is None:
+                continue
+            lost = [
+                item_id
+                for item_id, (item_shard, _) in self._pending.items()
+                if item_shard == shard
+            ]
+            if not lost:
+                continue
+            # Outcomes sent just before the exit may still be in the pipe
+            results += self._drain()
+            for item_id in lost:
+                if item_id in self._pending:
+                    _, tasks = self._pending.pop(item_id)
+                    results.append((item_id, self._lost_outcomes(tasks, process)))
+        return results
+
+    def _drain(self) -> List[Tuple[int, List[dict]]]:
+        results = []
+        while True:
+            try:
+                item_id, outcomes = self._outbox.get_nowait()
+            except queue_module.Empty:
+                return results
+            if self._pending.pop(item_id, None) is not None:
+                results.append((item_id, outcomes))
+
+    @staticmethod
+    def _lost_outcomes(tasks: List[dict], process) -> List[dict]:
+        error = f"Shard process {process.name} exited with code {process.exitcode}"
+        return [
+            {
+                "url": task["url"],
+                "status": OUTCOME_ERROR,
+                "error": error,
+                "error_class": "permanent",
+                "attempts": 0,
+            }
+            for task in tasks
+        ]
+
+    def finished(self) -> bool:
+        return self._closed and not self._pending
+
+    def counts(self) -> dict:
+        return {"pending": len(self._pending), "leased": 0, "done": self._next_id}
+
+    def close(self) -> None:
+        """Wait for the shard processes to exit; stop those that hang."""
+        if not self._closed:
+            self.close_input()
+        for process in self._workers:
+            if process.pid is None:
+                continue
+            process.join(SHUTDOWN_TIMEOUT if not self._pending else 0)
+            if process.is_alive():
+                process.terminate()
+                process.join()
@@ -1,27 +1,240 @@
 """Sitemap parser module."""
 
+import asyncio
+import hashlib
 import xml.etree.ElementTree as ET
-from typing import List
+import zlib
+from typing import AsyncIterator, Callable, List, NamedTuple, Optional, Set, Tuple
 
+import httpx
 import requests
 
 
+SITEMAP_NAMESPACE = {"ns": "http://www.sitemaps.org/schemas/sitemap/0.9"}
+MAX_CONCURRENT_SITEMAPS = 4
+ENTRY_QUEUE_SIZE = 1000
+SITEMAP_TIMEOUT = 30.0
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+class SitemapEntry(NamedTuple):
+    """A <url> entry of a sitemap with its optional metadata."""
+
+    loc: str
+    lastmod: Optional[str] = None
+    changefreq: Optional[str] = None
+    priority: Optional[float] = None
+
+
+def _child_text(element: ET.Element, tag: str) -> Optional[str]:
+    child = element.find(f"ns:{tag}", SITEMAP_NAMESPACE)
+    if child is None or not child.text:
+        return None
+    return child.text.strip() or None
+
+
+def _parse_priority(value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _entry_from_element(element: ET.Element) -> Optional[SitemapEntry]:
+    fields = {_local_name(child.tag): (child.text or "").strip() for child in element}
+    if not fields.get("loc"):
+        return None
+    return SitemapEntry(
+        loc=fields["loc"],
+        lastmod=fields.get("lastmod") or None,
+        changefreq=fields.get("changefreq") or None,
+        priority=_parse_priority(fields.get("priority") or None),
+    )
+
+
+def _read_entries(parser: ET.XMLPullParser, roots: List[ET.Element]) -> list:
+    """Collect parsed <url>/<sitemap> entries, discarding their elements."""
+    items = []
+    for event, element in parser.read_events():
+        if event == "start":
+            if not roots:
+                roots.append(element)
+            continue
+        kind = _local_name(element.tag)
+        if kind in ("url", "sitemap"):
+            entry = _entry_from_element(element)
+            # Drop parsed elements so the tree never grows
+            roots[0].clear()
+            if entry is not None:
+                items.append((kind, entry))
+    return items
+
+
+def _url_key(url: str) -> int:
+    # 8-byte digests keep the seen-set small on sitemaps with millions of URLs
+    return int.from_bytes(
+        hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "big"
+    )
+
+
 class SitemapParser:
     """Parse sitemap.xml files to extract URLs."""
 
-    def __init__(self, sitemap_url: str):
+    def __init__(
+        self,
+        sitemap_url: str,
+        max_concurrent_sitemaps: int = MAX_CONCURRENT_SITEMAPS,
+        url_normalizer: Optional[Callable[[str], str]] = None,
+    ):
         """Initialize the sitemap parser.
 
         Args:
-            sitemap_url: URL of the sitemap.xml file
+            sitemap_url: URL of the sitemap.xml file (or sitemap index)
+            max_concurrent_sitemaps: Child sitemaps of an index fetched at once
+            url_normalizer: Optional function mapping each <loc> to a
+                normalized URL (e.g. dedup.normalize_url); iter_entries
+                drops URLs normalizing to one already yielded, but yields
+                each kept <loc> as written
         """
         self.sitemap_url = sitemap_url
+        self.max_concurrent_sitemaps = max_concurrent_sitemaps
+        self.url_normalizer = url_normalizer
+        self.duplicates = 0
+        # (URL, error) of child sitemaps that could not be read
+        self.failed_sitemaps: List[Tuple[str, Exception]] = []
 
-    def get_urls(self) -> List[str]:
-        """Extract all URLs from the sitemap.
+    async def iter_entries(self) -> AsyncIterator[SitemapEntry]:
+        """Stream entries from the sitemap as they are parsed.
+
+        The body is read incrementally (gunzipping ``.xml.gz`` sitemaps on
+        the fly) and parsed with a pull parser, so memory stays flat on
+        very large sitemaps. Sitemap indexes are followed, with up to
+        ``max_concurrent_sitemaps`` child sitemaps fetched at once, and
+        duplicate URLs (after normalization, when a ``url_normalizer`` is
+        set) are dropped and counted in ``duplicates``. Entries are yielded
+        while parsing is still in progress, so crawling can start right
+        away. A child sitemap that cannot be read is recorded in
+        ``failed_sitemaps`` and the other children are still read.
+
+        Yields:
+            SitemapEntry tuples, each URL (or normalized URL) at most once
+
+        Raises:
+            httpx.HTTPError: If fetching the top-level sitemap fails
+            ET.ParseError: If parsing the top-level sitemap fails
+        """
+        # Unbounded queue plus a semaphore, so end-of-stream and error markers
+        # can always be posted without waiting while entries apply backpressure
+        queue: asyncio.Queue = asyncio.Queue()
+        space = asyncio.Semaphore(ENTRY_QUEUE_SIZE)
+        semaphore = asyncio.Semaphore(self.max_concurrent_sitemaps)
+        seen_urls: Set[int] = set()
+        seen_sitemaps = {self.sitemap_url}
+        tasks: Set[asyncio.Task] = set()
+        done = object()
+        active = 0
+
+        async with httpx.AsyncClient(
+            timeout=SITEMAP_TIMEOUT, follow_redirects=True
+        ) as client:
+
+            async def parse(sitemap_url: str) -> None:
+                nonlocal active
+                try:
+                    async with semaphore:
+                        async for kind, entry in self._stream(client, sitemap_url):
+                            if kind == "sitemap":
+                                if entry.loc not in seen_sitemaps:
+                                    seen_sitemaps.add(entry.loc)
+                                    spawn(entry.loc)
+                                continue
+                            key = _url_key(
+                                entry.loc
+                                if self.url_normalizer is None
+                                else self.url_normalizer(entry.loc)
+                            )
+                            if key in seen_urls:
+                                self.duplicates += 1
+                                continue
+                            seen_urls.add(key)
+                            await space.acquire()
+                            queue.put_nowait(entry)
+                except Exception as e:
+                    if sitemap_url == self.sitemap_url:
+                        queue.put_nowait(e)
+                    else:
+                        self.failed_sitemaps.append((sitemap_url, e))
+                finally:
+                    active -= 1
+                    if active == 0:
+                        queue.put_nowait(done)
+
+            def spawn(sitemap_url: str) -> None:
+                nonlocal active
+                active += 1
+                task = asyncio.ensure_future(parse(sitemap_url))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            spawn(self.sitemap_url)
+            try:
+                while True:
+                    item = await queue.get()
+                    if item is done:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    space.release()
+                    yield item
+            finally:
+                for task in list(tasks):
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _stream(self, client: httpx.AsyncClient, sitemap_url: str):
+        """Yield ("url" | "sitemap", SitemapEntry) pairs from one sitemap."""
+        parser = ET.XMLPullParser(events=("start", "end"))
+        roots: List[ET.Element] = []
+        decompressor = None
+        head = b""
+
+        async with client.stream("GET", sitemap_url) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes():
+                if head is not None:
+                    # Sniff the gzip magic, since .xml.gz files are usually
+                    # served without a Content-Encoding header
+                    head += chunk
+                    if len(head) < len(GZIP_MAGIC):
+                        continue
+                    chunk, head = head, None
+                    if chunk.startswith(GZIP_MAGIC):
+                        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                if decompressor is not None:
+                    chunk = decompressor.decompress(chunk)
+                parser.feed(chunk)
+                for item in _read_entries(parser, roots):
+                    yield item
+
+        tail = head or b""
+        if decompressor is not None:
+            tail = decompressor.flush()
+        parser.feed(tail)
+        parser.close()
+        for item in _read_entries(parser, roots):
+            yield item
+
+    def get_entries(self) -> List[SitemapEntry]:
+        """Extract all entries, with lastmod, changefreq and priority.
 
         Returns:
-            List of absolute URLs found in the sitemap
+            List of SitemapEntry tuples in sitemap order
 
         Raises:
             requests.RequestException: If fetching the sitemap fails
@@ -32,11 +245,29 @@ class SitemapParser:
 
         root = ET.fromstring(response.content)
 
-        urls = []
-        namespace = {"ns": "http://www.sitemaps.org/schemas/sitemap/0.9"}
+        entries = []
+        for url_element in root.findall(".//ns:url", SITEMAP_NAMESPACE):
+            loc = _child_text(url_element, "loc")
+            if loc:
+                entries.append(
+                    SitemapEntry(
+                        loc=loc,
+                        lastmod=_child_text(url_element, "lastmod"),
+                        changefreq=_child_text(url_element, "changefreq"),
+                        priority=_parse_priority(_child_text(url_element, "priority")),
+                    )
+                )
 
-        for url_element in root.findall(".//ns:url/ns:loc", namespace):
-            if url_element.text:
-                urls.append(url_element.text.strip())
+        return entries
 
-        return urls
+    def get_urls(self) -> List[str]:
+        """Extract all URLs from the sitemap.
+
+        Returns:
+            List of absolute URLs found in the sitemap
+
+        Raises:
+            requests.RequestException: If fetching the sitemap fails
+            ET.ParseError: If parsing the XML fails
+        """
+        return [entry.loc for entry in self.get_entries()]
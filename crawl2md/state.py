@@ -0,0 +1,291 @@
+"""Persistent crawl state module backed by SQLite."""
+
+import os
+import sqlite3
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from crawl2md.sitemap import SitemapEntry
+
+
+STATE_FILENAME = ".crawl2md-state.sqlite"
+
+STATUS_PENDING = "pending"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+_RECORD_KEYS = (
+    "url",
+    "status",
+    "attempts",
+    "content_hash",
+    "error",
+    "updated_at",
+    "lastmod",
+    "etag",
+    "last_modified",
+    "error_class",
+    "duplicate_of",
+    "path",
+)
+
+
+class CrawlState:
+    """Record the status of every URL so interrupted crawls can resume.
+
+    Each update is committed in its own transaction, so the store stays
+    consistent if the process is interrupted at any point.
+    """
+
+    def __init__(self, path: str):
+        """Open (or create) the state store.
+
+        Args:
+            path: Path of the SQLite database file
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS urls (
+                url TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                content_hash TEXT,
+                error TEXT,
+                updated_at TEXT,
+                lastmod TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                error_class TEXT,
+                duplicate_of TEXT,
+                path TEXT
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS urls_content_hash ON urls (content_hash)"
+        )
+        self._conn.commit()
+
+    @classmethod
+    def in_directory(cls, output_dir: str) -> "CrawlState":
+        """Open the state store kept in an output directory."""
+        return cls(os.path.join(output_dir, STATE_FILENAME))
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        self._conn.close()
+
+    def __enter__(self) -> "CrawlState":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def add_urls(self, urls: Iterable[str]) -> None:
+        """Register URLs as pending, keeping the state of known URLs."""
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO urls (url, status) VALUES (?, ?)",
+                ((url, STATUS_PENDING) for url in urls),
+            )
+
+    def save_paths(self, paths: Iterable[Tuple[str, str]]) -> None:
+        """Record the output path assigned to each URL.
+
+        A URL keeps the first path recorded for it, so later runs can give
+        it the same file whatever order the URLs come in (see saved_paths).
+
+        Args:
+            paths: (url, path relative to the output directory) pairs
+        """
+        with self._conn:
+            self._conn.executemany(
+                """
+                INSERT INTO urls (url, status, path) VALUES (?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    path = COALESCE(urls.path, excluded.path)
+                """,
+                ((url, STATUS_PENDING, path) for url, path in paths),
+            )
+
+    def saved_paths(self) -> Iterator[Tuple[str, str]]:
+        """Yield (url, path) for every URL with a recorded output path."""
+        yield from self._conn.execute(
+            "SELECT url, path FROM urls WHERE path IS NOT NULL"
+        )
+
+    def mark_done(
+        self,
+        url: str,
+        content_hash: Optional[str] = None,
+        lastmod: Optional[str] = None,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        attempts: int = 1,
+        duplicate_of: Optional[str] = None,
+    ) -> None:
+        """Record a successful crawl of a URL.
+
+        Args:
+            url: Crawled URL
+            content_hash: Hash of the saved markdown
+            lastmod: Sitemap <lastmod> of the URL at crawl time
+            etag: ETag response header, for conditional re-crawls
+            last_modified: Last-Modified response header
+            attempts: Fetch attempts made for the URL, retries included
+            duplicate_of: URL whose file holds the same content, when only
+                a pointer was saved for this URL
+        """
+        self._record(
+            url,
+            STATUS_DONE,
+            content_hash=content_hash,
+            lastmod=lastmod,
+            validators=(etag, last_modified),
+            attempts=attempts,
+            duplicate_of=duplicate_of,
+        )
+
+    def mark_not_modified(
+        self, url: str, lastmod: Optional[str] = None, attempts: int = 1
+    ) -> None:
+        """Record that the server answered 304 Not Modified for a URL."""
+        self._record(url, STATUS_DONE, lastmod=lastmod, attempts=attempts)
+
+    def mark_failed(
+        self,
+        url: str,
+        error: Optional[str] = None,
+        error_class: Optional[str] = None,
+        attempts: int = 1,
+    ) -> None:
+        """Record a failed crawl of a URL.
+
+        Args:
+            url: URL that failed
+            error: Error message of the last attempt
+            error_class: "transient" or "permanent"
+            attempts: Fetch attempts made for the URL, retries included
+        """
+        self._record(
+            url, STATUS_FAILED, error=error, error_class=error_class, attempts=attempts
+        )
+
+    def _record(
+        self,
+        url: str,
+        status: str,
+        content_hash: Optional[str] = None,
+        error: Optional[str] = None,
+        lastmod: Optional[str] = None,
+        validators: Optional[Tuple[Optional[str], Optional[str]]] = None,
+        error_class: Optional[str] = None,
+        attempts: int = 1,
+        duplicate_of: Optional[str] = None,
+    ) -> None:
+        now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        with self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO urls
+                    (url, status, attempts, content_hash, error, updated_at, lastmod,
+                     error_class, duplicate_of)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    status = excluded.status,
+                    attempts = urls.attempts + excluded.attempts,
+                    content_hash = COALESCE(excluded.content_hash, urls.content_hash),
+                    error = excluded.error,
+                    updated_at = excluded.updated_at,
+                    lastmod = COALESCE(excluded.lastmod, urls.lastmod),
+                    error_class = excluded.error_class,
+                    duplicate_of = CASE WHEN excluded.content_hash IS NULL
+                        THEN urls.duplicate_of ELSE excluded.duplicate_of END
+                """,
+                (
+                    url,
+                    status,
+                    attempts,
+                    content_hash,
+                    error,
+                    now,
+                    lastmod,
+                    error_class,
+                    duplicate_of,
+                ),
+            )
+            if validators is not None:
+                self._conn.execute(
+                    "UPDATE urls SET etag = ?, last_modified = ? WHERE url = ?",
+                    (*validators, url),
+                )
+
+    def get(self, url: str) -> Optional[dict]:
+        """Return the stored record for a URL, or None if unknown."""
+        row = self._conn.execute(
+            f"SELECT {', '.join(_RECORD_KEYS)} FROM urls WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(_RECORD_KEYS, row))
+
+    def find_content(self, content_hash: str) -> Optional[str]:
+        """Return a done URL whose saved file holds this content, if any."""
+        row = self._conn.execute(
+            """
+            SELECT url FROM urls
+            WHERE content_hash = ? AND status = ? AND duplicate_of IS NULL
+            LIMIT 1
+            """,
+            (content_hash, STATUS_DONE),
+        ).fetchone()
+        return row[0] if row else None
+
+    def is_done(self, url: str) -> bool:
+        """Return whether a URL was already crawled successfully."""
+        row = self._conn.execute(
+            "SELECT 1 FROM urls WHERE url = ? AND status = ?", (url, STATUS_DONE)
+        ).fetchone()
+        return row is not None
+
+    def plan_entry(self, entry: SitemapEntry) -> Tuple[bool, Optional[dict]]:
+        """Decide whether a sitemap entry needs crawling in an incremental run.
+
+        URLs crawled before whose sitemap <lastmod> has not moved are
+        skipped. The rest are crawled, with the validators saved from the
+        previous run so the crawler can send a conditional request.
+
+        Args:
+            entry: Sitemap entry of the current run
+
+        Returns:
+            Tuple of (whether to crawl, validator dict with 'etag' and
+            'last_modified' keys or None)
+        """
+        record = self.get(entry.loc)
+        if record is None or record["status"] != STATUS_DONE:
+            return True, None
+        if entry.lastmod and entry.lastmod == record["lastmod"]:
+            return False, None
+        if record["etag"] or record["last_modified"]:
+            return True, {
+                "etag": record["etag"],
+                "last_modified": record["last_modified"],
+            }
+        return True, None
+
+    def counts(self) -> Dict[str, int]:
+        """Return the number of URLs in each status."""
+        counts = {STATUS_PENDING: 0, STATUS_DONE: 0, STATUS_FAILED: 0}
+        for status, count in self._conn.execute(
+            "SELECT status, COUNT(*) FROM urls GROUP BY status"
+        ):
+            counts[status] = count
+        return counts
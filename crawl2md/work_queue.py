@@ -0,0 +1,446 @@
+"""Shared work queue module for distributed crawls: leased batches of URLs.
+
+The coordinator splits the sitemap into work items (batches of URLs) and
+puts them on a queue; workers on any number of machines lease items, crawl
+them and report one outcome per URL back through the queue, where the
+coordinator merges them into its state store and result file.
+
+A lease expires unless the worker renews it, so the items of a worker that
+died are handed to another worker. An item leased ``max_leases`` times
+without being completed is given up, with its URLs reported as failed, so a
+page that crashes every worker cannot stall the crawl.
+
+Two backends implement the same interface: SqliteWorkQueue, for workers on
+one host or sharing a local filesystem, and RedisWorkQueue for several
+machines.
+"""
+
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlparse
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - optional dependency
+    redis = None
+
+
+QUEUE_FILENAME = ".crawl2md-queue.sqlite"
+DEFAULT_QUEUE_NAME = "crawl2md"
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_LEASE_SECONDS = 300.0
+DEFAULT_MAX_LEASES = 3
+# Random pending items a Redis worker tries to lease in one call
+LEASE_CANDIDATES = 20
+REDIS_SCHEMES = ("redis", "rediss", "unix")
+
+# Result statuses reported per URL, as in the result CSV
+OUTCOME_OK = "OK"
+OUTCOME_NOT_MODIFIED = "NOT_MODIFIED"
+OUTCOME_ERROR = "ERROR"
+
+
+class WorkItem(NamedTuple):
+    """A leased batch of URLs.
+
+    ``tasks`` holds one dict per URL with 'url', and optionally a
+    'validator' (see Crawler.crawl_single) for incremental runs.
+    """
+
+    id: int
+    tasks: List[dict]
+    leases: int = 1
+
+
+def abandoned_outcomes(tasks: List[dict], leases: int) -> List[dict]:
+    """Return failure outcomes for the URLs of an item that was given up."""
+    error = f"Work item lease expired {leases} times without completing"
+    return [
+        {
+            "url": task["url"],
+            "status": OUTCOME_ERROR,
+            "error": error,
+            "error_class": "permanent",
+            "attempts": 0,
+        }
+        for task in tasks
+    ]
+
+
+class WorkQueue:
+    """Interface shared by the queue backends.
+
+    All methods are synchronous and short, like the state store's, so they
+    are called straight from the event loop.
+    """
+
+    def clear(self) -> None:
+        """Remove all items and results, for a new run."""
+        raise NotImplementedError
+
+    def put(self, tasks: List[dict]) -> int:
+        """Add a work item and return its id."""
+        raise NotImplementedError
+
+    def close_input(self) -> None:
+        """Mark that no more items will be added."""
+        raise NotImplementedError
+
+    def lease(self, worker: str, lease_seconds: float) -> Optional[WorkItem]:
+        """Lease an item that is not done and not leased, or None."""
+        raise NotImplementedError
+
+    def renew(self, item_id: int, worker: str, lease_seconds: float) -> bool:
+        """Extend a lease; False if the worker no longer holds it."""
+        raise NotImplementedError
+
+    def complete(self, item_id: int, worker: str, outcomes: List[dict]) -> bool:
+        """Mark an item done with one outcome per URL.
+
+        The first completion wins; False if the item was already done (by
+        a worker that took it over after this worker's lease expired).
+        """
+        raise NotImplementedError
+
+    def pop_results(self) -> List[Tuple[int, List[dict]]]:
+        """Remove and return (item id, outcomes) of completed items."""
+        raise NotImplementedError
+
+    def finished(self) -> bool:
+        """Whether the input is closed and every item is done."""
+        raise NotImplementedError
+
+    def counts(self) -> dict:
+        """Return the number of items pending, leased and done."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release the backend connection."""
+
+
+class SqliteWorkQueue(WorkQueue):
+    """Work queue in an SQLite file, locked with SQLite's own file locking.
+
+    Suited to workers on one machine. SQLite's locking is unreliable on
+    network filesystems, so use RedisWorkQueue across machines.
+    """
+
+    def __init__(self, path: str, max_leases: int = DEFAULT_MAX_LEASES):
+        """Open (or create) the queue.
+
+        Args:
+            path: Path of the SQLite database file
+            max_leases: Leases after which an unfinished item is given up
+        """
+        self.path = path
+        self.max_leases = max_leases
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Autocommit mode; transactions are opened explicitly with
+        # BEGIN IMMEDIATE so two workers cannot lease the same item
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS items (
+                id INTEGER PRIMARY KEY,
+                tasks TEXT NOT NULL,
+                done INTEGER NOT NULL DEFAULT 0,
+                worker TEXT,
+                lease_expires REAL,
+                leases INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS results (
+                id INTEGER PRIMARY KEY,
+                item_id INTEGER NOT NULL,
+                outcomes TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            CREATE INDEX IF NOT EXISTS items_pending ON items (done, lease_expires);
+            """
+        )
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self._conn
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def clear(self) -> None:
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM items")
+            conn.execute("DELETE FROM results")
+            conn.execute("DELETE FROM meta")
+
+    def put(self, tasks: List[dict]) -> int:
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "INSERT INTO items (tasks) VALUES (?)", (json.dumps(tasks),)
+            )
+        return cursor.lastrowid
+
+    def close_input(self) -> None:
+        with self._transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('closed', '1')")
+
+    def lease(self, worker: str, lease_seconds: float) -> Optional[WorkItem]:
+        now = time.time()
+        with self._transaction() as conn:
+            while True:
+                row = conn.execute(
+                    """
+                    SELECT id, tasks, leases FROM items
+                    WHERE done = 0 AND (lease_expires IS NULL OR lease_expires <= ?)
+                    ORDER BY id LIMIT 1
+                    """,
+                    (now,),
+                ).fetchone()
+                if row is None:
+                    return None
+                item_id, tasks, leases = row[0], json.loads(row[1]), row[2]
+                if leases < self.max_leases:
+                    break
+                self._finish(conn, item_id, abandoned_outcomes(tasks, leases))
+            conn.execute(
+                """
+                UPDATE items SET worker = ?, lease_expires = ?, leases = leases + 1
+                WHERE id = ?
+                """,
+                (worker, now + lease_seconds, item_id),
+            )
+        return WorkItem(item_id, tasks, leases + 1)
+
+    def renew(self, item_id: int, worker: str, lease_seconds: float) -> bool:
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                """
+                UPDATE items SET lease_expires = ?
+                WHERE id = ? AND worker = ? AND done = 0
+                """,
+                (time.time() + lease_seconds, item_id, worker),
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, item_id: int, worker: str, outcomes: List[dict]) -> bool:
+        with self._transaction() as conn:
+            return self._finish(conn, item_id, outcomes)
+
+    def _finish(
+        self, conn: sqlite3.Connection, item_id: int, outcomes: List[dict]
+    ) -> bool:
+        cursor = conn.execute(
+            "UPDATE items SET done = 1 WHERE id = ? AND done = 0", (item_id,)
+        )
+        if cursor.rowcount != 1:
+            return False
+        conn.execute(
+            "INSERT INTO results (item_id, outcomes) VALUES (?, ?)",
+            (item_id, json.dumps(outcomes)),
+        )
+        return True
+
+    def pop_results(self) -> List[Tuple[int, List[dict]]]:
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT id, item_id, outcomes FROM results ORDER BY id"
+            ).fetchall()
+            if rows:
+                conn.execute("DELETE FROM results WHERE id <= ?", (rows[-1][0],))
+        return [(item_id, json.loads(outcomes)) for _, item_id, outcomes in rows]
+
+    def finished(self) -> bool:
+        closed = self._conn.execute(
+            "SELECT 1 FROM meta WHERE key = 'closed'"
+        ).fetchone()
+        if closed is None:
+            return False
+        pending = self._conn.execute("SELECT 1 FROM items WHERE done = 0 LIMIT 1")
+        return pending.fetchone() is None
+
+    def counts(self) -> dict:
+        pending, leased, done = self._conn.execute(
+            """
+            SELECT
+                COALESCE(SUM(done = 0 AND (lease_expires IS NULL
+                    OR lease_expires <= ?)), 0),
+                COALESCE(SUM(done = 0 AND lease_expires > ?), 0),
+                COALESCE(SUM(done = 1), 0)
+            FROM items
+            """,
+            (time.time(), time.time()),
+        ).fetchone()
+        return {"pending": pending, "leased": leased, "done": done}
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class RedisWorkQueue(WorkQueue):
+    """Work queue in Redis, shared by workers on any number of machines.
+
+    A lease is a key set with ``SET NX PX``: Redis expires it on its own
+    when the worker stops renewing it, and the item, still in the pending
+    set, can be leased again. Completion removes the item from the pending
+    set (``SREM``), which succeeds for exactly one worker. Only plain
+    commands are used, no scripts, so any client with the redis-py
+    interface (created with ``decode_responses=True``) works.
+    """
+
+    def __init__(
+        self,
+        client,
+        name: str = DEFAULT_QUEUE_NAME,
+        max_leases: int = DEFAULT_MAX_LEASES,
+    ):
+        """Initialize the queue.
+
+        Args:
+            client: redis.Redis client with decode_responses=True
+            name: Prefix of the queue's keys, so crawls can share a server
+            max_leases: Leases after which an unfinished item is given up
+        """
+        self.client = client
+        self.name = name
+        self.max_leases = max_leases
+
+    def _key(self, *parts) -> str:
+        return ":".join([self.name, *map(str, parts)])
+
+    def clear(self) -> None:
+        for item_id in self.client.smembers(self._key("pending")):
+            self._delete_item(item_id)
+        self.client.delete(
+            self._key("pending"),
+            self._key("results"),
+            self._key("closed"),
+            self._key("next_id"),
+            self._key("done"),
+        )
+
+    def _delete_item(self, item_id) -> None:
+        self.client.delete(
+            self._key("item", item_id),
+            self._key("lease", item_id),
+            self._key("leases", item_id),
+        )
+
+    def put(self, tasks: List[dict]) -> int:
+        item_id = self.client.incr(self._key("next_id"))
+        self.client.set(self._key("item", item_id), json.dumps(tasks))
+        self.client.sadd(self._key("pending"), item_id)
+        return item_id
+
+    def close_input(self) -> None:
+        self.client.set(self._key("closed"), "1")
+
+    def lease(self, worker: str, lease_seconds: float) -> Optional[WorkItem]:
+        candidates = self.client.srandmember(self._key("pending"), LEASE_CANDIDATES)
+        for item_id in candidates or []:
+            if not self.client.set(
+                self._key("lease", item_id),
+                worker,
+                nx=True,
+                px=int(lease_seconds * 1000),
+            ):
+                continue
+            data = self.client.get(self._key("item", item_id))
+            if data is None:
+                # Completed between SRANDMEMBER and SET
+                self.client.delete(self._key("lease", item_id))
+                continue
+            tasks = json.loads(data)
+            leases = self.client.incr(self._key("leases", item_id))
+            if leases > self.max_leases:
+                self._finish(int(item_id), abandoned_outcomes(tasks, leases - 1))
+                continue
+            return WorkItem(int(item_id), tasks, leases)
+        return None
+
+    def renew(self, item_id: int, worker: str, lease_seconds: float) -> bool:
+        key = self._key("lease", item_id)
+        if self.client.get(key) != worker:
+            return False
+        return bool(self.client.pexpire(key, int(lease_seconds * 1000)))
+
+    def complete(self, item_id: int, worker: str, outcomes: List[dict]) -> bool:
+        return self._finish(item_id, outcomes)
+
+    def _finish(self, item_id: int, outcomes: List[dict]) -> bool:
+        if not self.client.srem(self._key("pending"), item_id):
+            return False
+        self.client.rpush(
+            self._key("results"), json.dumps({"item": item_id, "outcomes": outcomes})
+        )
+        self.client.incr(self._key("done"))
+        self._delete_item(item_id)
+        return True
+
+    def pop_results(self) -> List[Tuple[int, List[dict]]]:
+        results = []
+        while True:
+            data = self.client.lpop(self._key("results"))
+            if data is None:
+                return results
+            result = json.loads(data)
+            results.append((result["item"], result["outcomes"]))
+
+    def finished(self) -> bool:
+        return bool(self.client.exists(self._key("closed"))) and not self.client.scard(
+            self._key("pending")
+        )
+
+    def counts(self) -> dict:
+        pending = self.client.smembers(self._key("pending"))
+        leased = sum(
+            1 for item_id in pending if self.client.exists(self._key("lease", item_id))
+        )
+        return {
+            "pending": len(pending) - leased,
+            "leased": leased,
+            "done": int(self.client.get(self._key("done")) or 0),
+        }
+
+    def close(self) -> None:
+        self.client.close()
+
+
+def open_queue(
+    spec: str,
+    name: str = DEFAULT_QUEUE_NAME,
+    max_leases: int = DEFAULT_MAX_LEASES,
+) -> WorkQueue:
+    """Open a work queue from a path or a Redis URL.
+
+    Args:
+        spec: Path of an SQLite queue file, or a redis://, rediss:// or
+            unix:// URL
+        name: Key prefix in Redis (ignored for SQLite)
+        max_leases: Leases after which an unfinished item is given up
+
+    Returns:
+        SqliteWorkQueue or RedisWorkQueue
+
+    Raises:
+        RuntimeError: If a Redis URL is given without the redis package
+    """
+    if urlparse(spec).scheme in REDIS_SCHEMES:
+        if redis is None:
+            raise RuntimeError(
+                "A Redis work queue requires the redis package "
+                "(pip install 'crawl2md[redis]')"
+            )
+        client = redis.Redis.from_url(spec, decode_responses=True)
+        return RedisWorkQueue(client, name=name, max_leases=max_leases)
+    return SqliteWorkQueue(spec, max_leases=max_leases)
@@ -0,0 +1,268 @@
+"""Asynchronous output writer module for markdown files and the result CSV."""
+
+import asyncio
+import csv
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Set
+
+from crawl2md.file_handler import FileHandler
+from crawl2md.profiling import timed
+
+
+DEFAULT_WRITER_THREADS = 4
+DEFAULT_WRITER_QUEUE = 100
+CSV_FLUSH_ROWS = 100
+CSV_FLUSH_INTERVAL = 1.0
+RESULT_HEADER = ["status", "url"]
+
+
+class OutputWriter:
+    """Write markdown files and result rows off the event loop.
+
+    Markdown files go through a bounded queue drained by a thread pool, so
+    slow (e.g. network) filesystems never stall in-flight crawls; once the
+    queue is full, ``write_markdown`` waits, which slows result processing
+    instead of buffering without limit. Result rows are buffered and
+    appended to the CSV in batches, at least every ``csv_flush_interval``
+    seconds. With a ``memory_budget``, queued pages also count against the
+    crawler's in-flight byte budget until they are written.
+    """
+
+    def __init__(
+        self,
+        file_handler: FileHandler,
+        result_file: Optional[str],
+        append: bool = False,
+        threads: int = DEFAULT_WRITER_THREADS,
+        max_queue: int = DEFAULT_WRITER_QUEUE,
+        csv_flush_rows: int = CSV_FLUSH_ROWS,
+        csv_flush_interval: float = CSV_FLUSH_INTERVAL,
+        metrics=None,
+        extra_columns: Sequence[str] = (),
+        memory_budget=None,
+    ):
+        """Initialize the writer.
+
+        Args:
+            file_handler: FileHandler, or an archive writer with the same
+                save_markdown/close interface
+            result_file: Path of the result CSV, or None to only write
+                markdown files (rows passed to write_row are dropped)
+            append: Append to an existing result file instead of replacing it
+            threads: Threads writing markdown files
+            max_queue: Markdown files waiting to be written before
+                write_markdown blocks
+            csv_flush_rows: Buffered rows that trigger a CSV flush
+            csv_flush_interval: Maximum seconds a row stays buffered
+            metrics: Optional Metrics recording each write's duration
+            extra_columns: Columns after status and url in the result CSV,
+                filled from write_row's ``extra`` values
+            memory_budget: Optional ByteBudget charged with each queued
+                page's size until it is written; charging never waits, so
+                the crawler's fetches slow down instead of the writer
+        """
+        self.file_handler = file_handler
+        self.result_file = result_file
+        self.append = append
+        self.threads = threads
+        self.max_queue = max_queue
+        self.csv_flush_rows = csv_flush_rows
+        self.csv_flush_interval = csv_flush_interval
+        self.metrics = metrics
+        self.memory_budget = memory_budget
+        self.header = RESULT_HEADER + list(extra_columns)
+        self.files_written = 0
+        self.write_errors = 0
+        self.peak_queue_depth = 0
+        self._write_seconds = 0.0
+        self._max_write_seconds = 0.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._workers: List[asyncio.Task] = []
+        self._flusher: Optional[asyncio.Task] = None
+        self._csv_file = None
+        self._csv_writer = None
+        self._rows: List[List[str]] = []
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._flushes: Set[asyncio.Task] = set()
+        self._error: Optional[Exception] = None
+
+    async def start(self) -> None:
+        """Open the result file and start the writer threads."""
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.threads + 1, thread_name_prefix="crawl2md-writer"
+        )
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._flush_lock = asyncio.Lock()
+        self._workers = [
+            asyncio.ensure_future(self._write_files()) for _ in range(self.threads)
+        ]
+        if self.result_file is None:
+            return
+        self._csv_file = await self._run(
+            open, self.result_file, "a" if self.append else "w", newline=""
+        )
+        self._csv_writer = csv.writer(self._csv_file)
+        if not self.append:
+            self._rows.append(self.header)
+        self._flusher = asyncio.ensure_future(self._flush_periodically())
+
+    async def close(self) -> None:
+        """Write everything still queued, flush the CSV and stop the threads."""
+        try:
+            if self._queue is not None:
+                await self._queue.join()
+            if self._flushes:
+                await asyncio.gather(*self._flushes)
+            if self._executor is not None:
+                await self._run(self.file_handler.close)
+        finally:
+            for task in [*self._workers, self._flusher]:
+                if task is not None:
+                    task.cancel()
+            await asyncio.gather(
+                *self._workers, *filter(None, [self._flusher]), return_exceptions=True
+            )
+            self._workers, self._flusher = [], None
+            if self._csv_file is not None:
+                await self.flush()
+                await self._run(self._csv_file.close)
+                self._csv_file = None
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    async def __aenter__(self) -> "OutputWriter":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def write_markdown(
+        self,
+        url: str,
+        markdown: str,
+        on_saved: Optional[Callable[[str], None]] = None,
+        on_error: Optional[Callable[[Exception], None]] = None,
+        timings: Optional[Dict[str, float]] = None,
+        frontmatter: str = "",
+    ) -> None:
+        """Queue a markdown file for writing, waiting while the queue is full.
+
+        Args:
+            url: Source URL, mapped to a path by the FileHandler
+            markdown: File content
+            on_saved: Called on the event loop with the path once written
+            on_error: Called on the event loop with the exception if the
+                write fails; without it the first error is raised by close,
+                as is the first error raised by a callback
+            timings: Optional dict that receives the wall and CPU seconds
+                of the write ('write', 'write_cpu') before on_saved runs
+            frontmatter: Optional header written before ``markdown``
+        """
+        if self.memory_budget is not None:
+            self.memory_budget.charge(len(frontmatter) + len(markdown))
+        await self._queue.put((url, markdown, frontmatter, on_saved, on_error, timings))
+        self.peak_queue_depth = max(self.peak_queue_depth, self._queue.qsize())
+
+    def write_row(self, status: str, url: str, extra: Sequence[str] = ()) -> None:
+        """Buffer a result row; it is written with the next CSV flush."""
+        self._rows.append([status, url, *extra])
+        if len(self._rows) >= self.csv_flush_rows:
+            task = asyncio.ensure_future(self.flush())
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def flush(self) -> None:
+        """Append buffered result rows to the CSV file."""
+        async with self._flush_lock:
+            rows, self._rows = self._rows, []
+            if rows and self._csv_writer is not None:
+                await self._run(self._write_rows, rows)
+
+    def stats(self) -> dict:
+        """Return writer queue depth and write latency counters."""
+        return {
+            "files": self.files_written,
+            "errors": self.write_errors,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "peak_queue_depth": self.peak_queue_depth,
+            "max_queue": self.max_queue,
+            "avg_write_ms": (
+                self._write_seconds / self.files_written * 1000
+                if self.files_written
+                else 0.0
+            ),
+            "max_write_ms": self._max_write_seconds * 1000,
+        }
+
+    def _write_rows(self, rows: List[List[str]]) -> None:
+        self._csv_writer.writerows(rows)
+        self._csv_file.flush()
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: func(*args, **kwargs))
+
+    async def _write_files(self) -> None:
+        while True:
+            item = await self._queue.get()
+            url, markdown, frontmatter, on_saved, on_error, timings = item
+            # The queue item is the only other reference to the page
+            del item
+            timings = timings if timings is not None else {}
+            try:
+                try:
+                    path = await self._run(
+                        self._save, url, markdown, frontmatter, timings
+                    )
+                except Exception as e:
+                    self.write_errors += 1
+                    if on_error is not None:
+                        self._call(on_error, e)
+                    else:
+                        self._keep_error(e)
+                    continue
+                elapsed = timings["write"]
+                self.files_written += 1
+                self._write_seconds += elapsed
+                self._max_write_seconds = max(self._max_write_seconds, elapsed)
+                if self.metrics is not None:
+                    self.metrics.observe("write", elapsed)
+                if on_saved is not None:
+                    self._call(on_saved, path)
+            finally:
+                if self.memory_budget is not None:
+                    self.memory_budget.release(len(frontmatter) + len(markdown))
+                del markdown
+                self._queue.task_done()
+
+    def _call(self, callback: Callable, arg) -> None:
+        # A worker that died here would leave its queue items undone, so
+        # write_markdown and close would wait forever
+        try:
+            callback(arg)
+        except Exception as e:
+            self._keep_error(e)
+
+    def _keep_error(self, error: Exception) -> None:
+        if self._error is None:
+            self._error = error
+
+    def _save(
+        self, url: str, markdown: str, frontmatter: str, timings: Dict[str, float]
+    ) -> str:
+        # Timed in the writer thread, so the CPU time is the write's own
+        timings.pop("write", None)
+        timings.pop("write_cpu", None)
+        with timed(timings, "write"):
+            return self.file_handler.save_markdown(url, markdown, frontmatter)
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.csv_flush_interval)
+            await self.flush()
@@ -0,0 +1,189 @@
+"""Tests for sharded archive output."""
+
+import csv
+import json
+import os
+import tarfile
+
+import pytest
+
+from crawl2md.archive import (
+    INDEX_FILENAME,
+    ArchiveReader,
+    ShardWriter,
+    TarShardWriter,
+    ZstdShardWriter,
+    open_output,
+)
+from crawl2md.cleaner import MarkdownCleaner
+from crawl2md.file_handler import FileHandler
+from crawl2md.writer import OutputWriter
+
+
+def page(url, text="# Title\n\nSome content.\n"):
+    return MarkdownCleaner().add_metadata(text, url)
+
+
+def read_index(output_dir):
+    with open(os.path.join(output_dir, INDEX_FILENAME), newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def test_open_output_formats(tmp_path):
+    """Test that each format maps to its backend."""
+    output = str(tmp_path)
+    assert isinstance(open_output("files", "https://example.com", output), FileHandler)
+    assert type(open_output("jsonl", "https://example.com", output)) is ShardWriter
+    assert isinstance(open_output("tar", "https://example.com", output), TarShardWriter)
+    with pytest.raises(ValueError):
+        open_output("zip", "https://example.com", output)
+
+
+def test_jsonl_records_and_index(tmp_path):
+    """Test that pages become JSONL records with metadata and an index entry."""
+    writer = ShardWriter("https://example.com", str(tmp_path))
+    writer.save_markdown(
+        "https://example.com/docs/a", page("https://example.com/docs/a")
+    )
+    writer.save_markdown("https://example.com/b", page("https://example.com/b", "B"))
+    writer.close()
+
+    with open(tmp_path / "pages-00000.jsonl", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert records[0]["url"] == "https://example.com/docs/a"
+    assert records[0]["path"] == "docs/a.md"
+    assert records[0]["metadata"]["source"] == "https://example.com/docs/a"
+    assert records[0]["markdown"] == "# Title\n\nSome content.\n"
+    assert records[1]["markdown"] == "B"
+
+    index = read_index(str(tmp_path))
+    assert [row["url"] for row in index] == [
+        "https://example.com/docs/a",
+        "https://example.com/b",
+    ]
+    assert index[1]["offset"] == str(
+        os.path.getsize(tmp_path / "pages-00000.jsonl") - int(index[1]["length"])
+    )
+
+
+def test_shards_rotate_by_size(tmp_path):
+    """Test that a new shard is started once the size limit is reached."""
+    writer = ShardWriter("https://example.com", str(tmp_path), shard_size_mb=0.001)
+    for i in range(5):
+        writer.save_markdown(f"https://example.com/p{i}", page("u", "x" * 400))
+    writer.close()
+
+    shards = sorted(name for name in os.listdir(tmp_path) if name.startswith("pages"))
+    assert len(shards) == 5
+    assert writer.shards_written == 5
+
+
+def test_new_run_continues_after_existing_shards(tmp_path):
+    """Test that a second run starts a new shard and the latest entry wins."""
+    for text in ("old", "new"):
+        writer = ShardWriter("https://example.com", str(tmp_path))
+        writer.save_markdown(
+            "https://example.com/a", page("https://example.com/a", text)
+        )
+        writer.close()
+
+    assert sorted(os.listdir(tmp_path)) == [
+        INDEX_FILENAME,
+        "pages-00000.jsonl",
+        "pages-00001.jsonl",
+    ]
+    reader = ArchiveReader(str(tmp_path))
+    assert len(reader) == 1
+    assert reader.get("https://example.com/a")["markdown"] == "new"
+
+
+def test_zstd_frames_are_randomly_accessible(tmp_path):
+    """Test that zstd shards decompress whole and per indexed frame."""
+    zstandard = pytest.importorskip("zstandard")
+    writer = ZstdShardWriter("https://example.com", str(tmp_path))
+    urls = [f"https://example.com/p{i}" for i in range(3)]
+    for url in urls:
+        writer.save_markdown(url, page(url, f"content of {url}"))
+    writer.close()
+
+    with open(tmp_path / "pages-00000.jsonl.zst", "rb") as f:
+        reader = zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True)
+        lines = reader.read().decode("utf-8").splitlines()
+    assert [json.loads(line)["url"] for line in lines] == urls
+
+    archive = ArchiveReader(str(tmp_path))
+    assert archive.get(urls[1])["markdown"] == f"content of {urls[1]}"
+    assert archive.get("https://example.com/missing") is None
+
+
+def test_tar_members_match_file_tree(tmp_path):
+    """Test that tar shards extract to the per-file layout."""
+    writer = TarShardWriter("https://example.com", str(tmp_path))
+    markdown = page("https://example.com/docs/a")
+    writer.save_markdown("https://example.com/docs/a", markdown)
+    writer.save_markdown("https://example.com/", page("https://example.com/", "Home"))
+    writer.close()
+
+    with tarfile.open(tmp_path / "pages-00000.tar") as tar:
+        assert tar.getnames() == ["docs/a.md", "index.md"]
+        member = tar.getmember("docs/a.md")
+        assert member.pax_headers["crawl2md.url"] == "https://example.com/docs/a"
+        assert tar.extractfile(member).read().decode("utf-8") == markdown
+
+    record = ArchiveReader(str(tmp_path)).get("https://example.com/")
+    assert record["path"] == "index.md"
+    assert record["markdown"] == "Home"
+
+
+def test_colliding_urls_keep_separate_tar_members(tmp_path):
+    """Test that URLs sharing a file name get distinct, indexed paths."""
+    writer = TarShardWriter("https://example.com", str(tmp_path))
+    writer.plan(["https://example.com/docs", "https://example.com/docs/"])
+    writer.save_markdown("https://example.com/docs/", page("https://example.com/docs/"))
+    writer.save_markdown("https://example.com/docs", page("https://example.com/docs"))
+    writer.close()
+
+    reader = ArchiveReader(str(tmp_path))
+    with tarfile.open(tmp_path / "pages-00000.tar") as tar:
+        names = tar.getnames()
+    assert names[1] == "docs.md"
+    assert names[0].startswith("docs-")
+    assert reader.get("https://example.com/docs/")["path"] == names[0]
+    assert writer.renamed == 1
+
+
+@pytest.mark.parametrize("writer_class", [ShardWriter, TarShardWriter])
+def test_separate_frontmatter_matches_combined(tmp_path, writer_class):
+    """Test that passing the frontmatter separately stores the same page."""
+    cleaner = MarkdownCleaner()
+    writer = writer_class("https://example.com", str(tmp_path))
+    writer.save_markdown(
+        "https://example.com/a", "# A\n", cleaner.frontmatter("https://example.com/a")
+    )
+    writer.save_markdown(
+        "https://example.com/b", page("https://example.com/b", "# B\n")
+    )
+    writer.close()
+
+    reader = ArchiveReader(str(tmp_path))
+    a, b = reader.get("https://example.com/a"), reader.get("https://example.com/b")
+    assert a["markdown"] == "# A\n"
+    assert a["metadata"]["source"] == "https://example.com/a"
+    assert b["markdown"] == "# B\n"
+    assert b["metadata"]["source"] == "https://example.com/b"
+
+
+@pytest.mark.asyncio
+async def test_output_writer_closes_archive(tmp_path):
+    """Test that OutputWriter writes through an archive backend and closes it."""
+    writer = TarShardWriter("https://example.com", str(tmp_path / "out"))
+    saved = []
+    async with OutputWriter(writer, str(tmp_path / "result.csv")) as output:
+        for i in range(10):
+            url = f"https://example.com/p{i}"
+            await output.write_markdown(url, page(url), on_saved=saved.append)
+
+    assert len(saved) == 10
+    assert all(location.startswith("pages-00000.tar@") for location in saved)
+    with tarfile.open(tmp_path / "out" / "pages-00000.tar") as tar:
+        assert len(tar.getnames()) == 10
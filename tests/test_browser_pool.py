@@ -0,0 +1,146 @@
+"""Tests for browser pool."""
+
+import asyncio
+import subprocess
+import sys
+
+import psutil
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from crawl2md.browser_pool import BrowserPool, browser_memory_mb
+
+
+def make_factory():
+    """Return a factory producing mock AsyncWebCrawler context managers."""
+    browsers = []
+
+    def factory():
+        context = MagicMock()
+        browser = AsyncMock()
+        context.__aenter__.return_value = browser
+        browsers.append(browser)
+        return context
+
+    return factory, browsers
+
+
+@pytest.mark.asyncio
+async def test_pool_launches_each_browser_once():
+    """Test that pages reuse the browsers launched at start."""
+    factory, browsers = make_factory()
+    pool = BrowserPool(browsers=2, pages_per_browser=2, crawler_factory=factory)
+
+    async with pool:
+        for _ in range(10):
+            async with pool.page() as browser:
+                assert browser in browsers
+
+    assert pool.stats() == {"browsers": 2, "launches": 2, "pages": 10}
+
+
+@pytest.mark.asyncio
+async def test_pool_limits_pages_per_browser():
+    """Test that no browser serves more than pages_per_browser at once."""
+    factory, _ = make_factory()
+    pool = BrowserPool(browsers=2, pages_per_browser=1, crawler_factory=factory)
+    in_use = []
+    peak = 0
+
+    async def borrow():
+        nonlocal peak
+        async with pool.page() as browser:
+            in_use.append(browser)
+            peak = max(peak, len(in_use))
+            assert in_use.count(browser) == 1
+            await asyncio.sleep(0.01)
+            in_use.remove(browser)
+
+    async with pool:
+        await asyncio.gather(*(borrow() for _ in range(6)))
+
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_pool_recycles_after_max_pages():
+    """Test that a browser is restarted after max_pages_per_browser."""
+    factory, browsers = make_factory()
+    pool = BrowserPool(
+        browsers=1,
+        pages_per_browser=1,
+        max_pages_per_browser=3,
+        crawler_factory=factory,
+    )
+
+    async with pool:
+        for _ in range(7):
+            async with pool.page():
+                pass
+
+    assert pool.launches == 3
+    assert len(browsers) == 3
+
+
+@pytest.mark.asyncio
+async def test_pool_measures_only_browser_processes():
+    """Test that conversion workers starting alongside a browser are not counted."""
+    started = []
+
+    def factory():
+        context = MagicMock()
+
+        async def launch(*args):
+            # A stand-in for the Playwright driver, and a Python worker
+            started.append(subprocess.Popen(["sleep", "30"]))
+            started.append(
+                subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+            )
+            return AsyncMock()
+
+        context.__aenter__.side_effect = launch
+        return context
+
+    pool = BrowserPool(browsers=1, max_memory_mb=100, crawler_factory=factory)
+    try:
+        async with pool:
+            [slot] = pool._slots
+            browser, worker = started
+            assert slot.pids == {browser.pid}
+            assert browser_memory_mb(slot.pids) == pytest.approx(
+                psutil.Process(browser.pid).memory_info().rss / 2**20
+            )
+        assert slot.pids == set()
+    finally:
+        for process in started:
+            process.kill()
+            process.wait()
+
+
+@pytest.mark.asyncio
+async def test_pool_recycles_on_memory_limit():
+    """Test that a browser is restarted when memory grows too large."""
+    factory, _ = make_factory()
+    pool = BrowserPool(
+        browsers=1,
+        max_pages_per_browser=None,
+        max_memory_mb=100,
+        crawler_factory=factory,
+    )
+
+    with patch("crawl2md.browser_pool.browser_memory_mb", return_value=500):
+        async with pool, pool.page():
+            pass
+
+    assert pool.launches == 2
+
+
+@pytest.mark.asyncio
+async def test_pool_page_requires_start():
+    """Test that borrowing from a pool that is not started fails."""
+    factory, _ = make_factory()
+    pool = BrowserPool(crawler_factory=factory)
+
+    with pytest.raises(RuntimeError):
+        async with pool.page():
+            pass
@@ -73,6 +73,50 @@ class TestAddMetadata:
         assert "source: https://example.com/empty" in result
         assert "scrape_date:" in result
 
+    def test_add_metadata_duplicate_of(self):
+        """Test that pointer files name the URL holding the content."""
+        cleaner = MarkdownCleaner()
+
+        result = cleaner.add_metadata(
+            "Duplicate of [a](a.md)\n",
+            "https://example.com/b",
+            duplicate_of="https://example.com/a",
+        )
+
+        frontmatter = result.split("---")[1]
+        assert "duplicate_of: https://example.com/a" in frontmatter
+        assert "duplicate_of" not in cleaner.add_metadata("x", "https://example.com/a")
+
+    def test_frontmatter_matches_add_metadata(self):
+        """Test that the separate frontmatter is what add_metadata prepends."""
+        cleaner = MarkdownCleaner()
+
+        frontmatter = cleaner.frontmatter("https://example.com/a")
+
+        assert cleaner.add_metadata("# A", "https://example.com/a") == (
+            frontmatter + "# A"
+        )
+        assert frontmatter.endswith("---\n\n")
+
+
+class TestSplitMetadata:
+    """Tests for split_metadata method."""
+
+    def test_split_metadata_round_trip(self):
+        """Test that frontmatter written by add_metadata is split back off."""
+        cleaner = MarkdownCleaner()
+        markdown = cleaner.add_metadata("# Title\n\nBody", "https://example.com/a?x=1")
+
+        metadata, content = cleaner.split_metadata(markdown)
+
+        assert metadata["source"] == "https://example.com/a?x=1"
+        assert "scrape_date" in metadata
+        assert content == "# Title\n\nBody"
+
+    def test_split_metadata_without_frontmatter(self):
+        """Test that markdown without frontmatter is returned unchanged."""
+        assert MarkdownCleaner().split_metadata("# Title") == ({}, "# Title")
+
 
 class TestClean:
     """Tests for clean method."""
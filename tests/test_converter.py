@@ -0,0 +1,75 @@
+"""Tests for in-process markdown conversion."""
+
+from pathlib import Path
+
+import pytest
+
+from crawl2md.converter import (
+    clean_and_convert,
+    clean_and_convert_timed,
+    convert_in_worker,
+    html_to_markdown,
+    start_worker,
+)
+from crawl2md.html_cleaner import PARSERS, HtmlCleaner
+
+
+GOLDEN_DIR = Path(__file__).parent / "fixtures" / "golden"
+
+
+@pytest.mark.parametrize("parser", PARSERS)
+@pytest.mark.parametrize(
+    "html_path", sorted(GOLDEN_DIR.glob("*.html")), ids=lambda p: p.stem
+)
+def test_matches_golden_output(html_path, parser):
+    """Test output matches the former "raw:" arun round-trip byte for byte."""
+    cleaner = HtmlCleaner.from_file(str(GOLDEN_DIR / "selectors.txt"), parser=parser)
+    expected = html_path.with_suffix(".md").read_text()
+
+    result = html_to_markdown(cleaner.clean(html_path.read_text()))
+
+    assert result == expected
+
+
+def test_keeps_relative_links_by_default():
+    """Test relative links stay relative without a base URL."""
+    result = html_to_markdown('<p><a href="/docs/a">A</a></p>')
+    assert "[A](/docs/a)" in result
+
+
+def test_resolves_links_against_base_url():
+    """Test relative links are resolved when a base URL is given."""
+    result = html_to_markdown(
+        '<p><a href="/docs/a">A</a></p>', base_url="https://example.com/page"
+    )
+    assert "[A](https://example.com/docs/a)" in result
+
+
+def test_clean_and_convert():
+    """Test cleaning and conversion in one step."""
+    result = clean_and_convert("<nav>Menu</nav><h1>Title</h1>", HtmlCleaner(["nav"]))
+    assert "# Title" in result
+    assert "Menu" not in result
+
+
+def test_clean_and_convert_timed():
+    """Test that the timed variant returns the same markdown and timings."""
+    html = "<nav>Menu</nav><h1>Title</h1>"
+    markdown, timings = clean_and_convert_timed(html, HtmlCleaner(["nav"]))
+
+    assert markdown == clean_and_convert(html, HtmlCleaner(["nav"]))
+    assert set(timings) == {"clean", "clean_cpu", "convert", "convert_cpu"}
+    assert all(seconds >= 0 for seconds in timings.values())
+
+
+def test_convert_in_worker_uses_cleaner_from_start_worker():
+    """Test that worker conversions use the cleaner set up once per process."""
+    html = "<nav>Menu</nav><h1>Title</h1>"
+    try:
+        start_worker(HtmlCleaner(["nav"]))
+        markdown, timings = convert_in_worker(html)
+    finally:
+        start_worker(None)
+
+    assert markdown == clean_and_convert(html, HtmlCleaner(["nav"]))
+    assert "clean" in timings
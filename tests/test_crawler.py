@@ -1,9 +1,20 @@
 """Tests for crawler."""
 
+import asyncio
+import os
+import time
+import uuid
+
+import httpx
 import pytest
 from unittest.mock import AsyncMock, Mock, patch
 
 from crawl2md.crawler import Crawler, MAX_CONCURRENT_CRAWLS
+from crawl2md.html_cache import HtmlCache
+from crawl2md.html_cleaner import HtmlCleaner
+from crawl2md.http_fetcher import HttpFetcher
+from crawl2md.resource_blocking import ResourceBlocker
+from crawl2md.retry import RetryPolicy
 
 
 @pytest.mark.asyncio
@@ -79,6 +90,501 @@ async def test_crawl_many():
         assert all(r["success"] for r in results)
 
 
+@pytest.mark.asyncio
+async def test_crawl_many_reuses_browser():
+    """Test that crawl_many launches one browser for the whole run."""
+    with patch("crawl2md.crawler.AsyncWebCrawler") as mock_crawler_class:
+        mock_crawler = AsyncMock()
+        mock_crawler_class.return_value.__aenter__.return_value = mock_crawler
+
+        mock_result = Mock()
+        mock_result.success = True
+        mock_result.markdown = "# Page"
+        mock_crawler.arun.return_value = mock_result
+
+        urls = [f"https://example.com/page{i}" for i in range(5)]
+
+        crawler = Crawler(max_concurrent=5)
+        results = [r async for r in crawler.crawl_many(urls)]
+
+        assert len(results) == 5
+        assert mock_crawler_class.call_count == 1
+        assert crawler.browser_stats()["launches"] == 1
+        assert crawler.browser_stats()["pages"] == 5
+
+
+@pytest.mark.asyncio
+async def test_crawl_many_from_async_iterable():
+    """Test that crawling starts while the URL source is still producing."""
+    with patch("crawl2md.crawler.AsyncWebCrawler") as mock_crawler_class:
+        mock_crawler = AsyncMock()
+        mock_crawler_class.return_value.__aenter__.return_value = mock_crawler
+
+        mock_result = Mock()
+        mock_result.success = True
+        mock_result.markdown = "# Page"
+        mock_crawler.arun.return_value = mock_result
+
+        produced = []
+
+        async def urls():
+            for i in range(20):
+                produced.append(i)
+                yield f"https://example.com/page{i}"
+                await asyncio.sleep(0)
+
+        crawler = Crawler(max_concurrent=2, rate_limit=None)
+        first_result_after = None
+        results = []
+        async for result in crawler.crawl_many(urls()):
+            if first_result_after is None:
+                first_result_after = len(produced)
+            results.append(result)
+
+        assert len(results) == 20
+        assert first_result_after < 20
+
+
+@pytest.mark.asyncio
+async def test_crawl_many_does_not_wait_for_slow_page():
+    """Test that a slow page does not stall the other slots."""
+    with patch("crawl2md.crawler.AsyncWebCrawler") as mock_crawler_class:
+        mock_crawler = AsyncMock()
+        mock_crawler_class.return_value.__aenter__.return_value = mock_crawler
+
+        async def arun(url, config):
+            await asyncio.sleep(0.5 if url.endswith("slow") else 0.01)
+            mock_result = Mock()
+            mock_result.success = True
+            mock_result.markdown = url
+            return mock_result
+
+        mock_crawler.arun.side_effect = arun
+
+        urls = ["https://example.com/slow"] + [
+            f"https://example.com/page{i}" for i in range(10)
+        ]
+
+        crawler = Crawler(max_concurrent=2, rate_limit=None)
+        start = time.monotonic()
+        results = [r async for r in crawler.crawl_many(urls)]
+        elapsed = time.monotonic() - start
+
+        assert len(results) == 11
+        assert results[-1]["url"] == "https://example.com/slow"
+        assert elapsed < 0.8
+
+
+@pytest.mark.asyncio
+async def test_crawl_many_stops_at_deadline():
+    """Test that no crawl starts after the deadline and started ones finish."""
+    with patch("crawl2md.crawler.AsyncWebCrawler") as mock_crawler_class:
+        mock_crawler = AsyncMock()
+        mock_crawler_class.return_value.__aenter__.return_value = mock_crawler
+
+        async def arun(url, config):
+            await asyncio.sleep(0.1)
+            mock_result = Mock()
+            mock_result.success = True
+            mock_result.markdown = url
+            return mock_result
+
+        mock_crawler.arun.side_effect = arun
+
+        async def urls():
+            for i in range(100):
+                yield f"https://example.com/page{i}"
+
+        crawler = Crawler(max_concurrent=2, rate_limit=None)
+        start = time.monotonic()
+        results = [r async for r in crawler.crawl_many(urls(), deadline=start + 0.25)]
+        elapsed = time.monotonic() - start
+
+        # At most three 0.1 s crawls per worker start before the deadline
+        assert 2 <= len(results) <= 6
+        assert all(r["success"] for r in results)
+        assert elapsed < 0.5
+        assert crawler.queue_stats()["queued"] == 0
+
+
+@pytest.mark.asyncio
+async def test_crawl_single_with_html_cleaner_renders_once():
+    """Test that cleaned HTML is converted without a second browser run."""
+    with patch("crawl2md.crawler.AsyncWebCrawler") as mock_crawler_class:
+        mock_crawler = AsyncMock()
+        mock_crawler_class.return_value.__aenter__.return_value = mock_crawler
+
+        mock_result = Mock()
+        mock_result.success = True
+        mock_result.html = "<nav>Menu</nav><h1>Title</h1><p>Body</p>"
+        mock_result.markdown = "Menu\n# Title\nBody"
+        mock_crawler.arun.return_value = mock_result
+
+        crawler = Crawler(html_cleaner=HtmlCleaner(["nav"]))
+        result = await crawler.crawl_single("https://example.com/about")
+
+        assert result["success"] is True
+        assert "# Title" in result["markdown"]
+        assert "Menu" not in result["markdown"]
+        assert mock_crawler.arun.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_crawl_many_converts_in_process_pool():
+    """Test that cleaning and conversion run in worker processes."""
+    with patch("crawl2md.crawler.AsyncWebCrawler") as mock_crawler_class:
+        mock_crawler = AsyncMock()
+        mock_crawler_class.return_value.__aenter__.return_value = mock_crawler
+
+        mock_result = Mock()
+        mock_result.success = True
+        mock_result.html = "<nav>Menu</nav><h1>Title</h1><p>Body</p>"
+        mock_crawler.arun.return_value = mock_result
+
+        urls = [f"https://example.com/page{i}" for i in range(6)]
+
+        crawler = Crawler(
+            max_concurrent=3,
+            html_cleaner=HtmlCleaner(["nav"]),
+            rate_limit=None,
+            cpu_workers=2,
+        )
+        results = [r async for r in crawler.crawl_many(urls)]
+
+        assert len(results) == 6
+        assert all(r["success"] for r in results)
+        assert all("# Title" in r["markdown"] for r in results)
+        assert all("Menu" not in r["markdown"] for r in results)
+        assert not crawler.started
+
+
+class CountingCleaner(HtmlCleaner):
+    """HtmlCleaner that leaves a file in ``directory`` each time it is unpickled."""
+
+    def __init__(self, selectors, directory):
+        super().__init__(selectors)
+        self.directory = directory
+
+    def __getstate__(self) -> dict:
+        return {**super().__getstate__(), "directory": self.directory}
+
+    def __setstate__(self, state: dict) -> None:
+        super().__setstate__(state)
+        self.directory = state["directory"]
+        open(os.path.join(self.directory, uuid.uuid4().hex), "w").close()
+
+
+@pytest.mark.asyncio
+async def test_process_pool_receives_cleaner_once(tmp_path):
+    """Test that the cleaner is not sent (and recompiled) with every page."""
+    with patch("crawl2md.crawler.AsyncWebCrawler") as mock_crawler_class:
+        mock_crawler = AsyncMock()
+        mock_crawler_class.return_value.__aenter__.return_value = mock_crawler
+
+        mock_result = Mock()
+        mock_result.success = True
+        mock_result.html = "<nav>Menu</nav><h1>Title</h1><p>Body</p>"
+        mock_crawler.arun.return_value = mock_result
+
+        urls = [f"https://example.com/page{i}" for i in range(10)]
+        crawler = Crawler(
+            max_concurrent=3,
+            html_cleaner=CountingCleaner(["nav"], str(tmp_path)),
+            rate_limit=None,
+            cpu_workers=2,
+        )
+        results = [r async for r in crawler.crawl_many(urls)]
+
+        assert all("Menu" not in r["markdown"] for r in results)
+        # At most once per worker process (not at all when forked)
+        assert len(os.listdir(tmp_path)) <= 2
+
+
+@pytest.mark.asyncio
+async def test_crawl_many_conditional_requests():
+    """Test that unchanged pages return 304 without a browser render."""
+    with patch("crawl2md.crawler.AsyncWebCrawler") as mock_crawler_class:
+        mock_crawler = AsyncMock()
+        mock_crawler_class.return_value.__aenter__.return_value = mock_crawler
+
+        mock_result = Mock()
+        mock_result.success = True
+        mock_result.markdown = "# Changed"
+        mock_result.response_headers = {"ETag": '"v2"', "Last-Modified": "Thu"}
+        mock_crawler.arun.return_value = mock_result
+
+        seen_headers = {}
+
+        def handler(request):
+            seen_headers[str(request.url)] = request.headers
+            if request.headers.get("if-none-match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200)
+
+        crawler = Crawler(rate_limit=None)
+        crawler._http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        validators = {
+            "https://example.com/same": {"etag": '"v1"', "last_modified": None},
+            "https://example.com/changed": {"etag": '"v0"', "last_modified": "Mon"},
+        }
+        urls = list(validators) + ["https://example.com/new"]
+
+        results = {r["url"]: r async for r in crawler.crawl_many(urls, validators)}
+
+        assert results["https://example.com/same"]["not_modified"] is True
+        assert results["https://example.com/same"]["markdown"] is None
+        assert results["https://example.com/changed"]["markdown"] == "# Changed"
+        assert results["https://example.com/changed"]["etag"] == '"v2"'
+        assert results["https://example.com/changed"]["last_modified"] == "Thu"
+        assert "https://example.com/new" not in seen_headers
+        assert seen_headers["https://example.com/changed"]["if-modified-since"] == "Mon"
+        assert mock_crawler.arun.call_count == 2
+
+
+def mock_http_fetcher(pages):
+    """Return an HttpFetcher serving ``pages`` (URL to HTML) over a mock client."""
+
+    def handler(request):
+        html = pages.get(str(request.url))
+        if html is None:
+            return httpx.Response(404)
+        return httpx.Response(
+            200,
+            html=html,
+            headers={"ETag": '"v1"', "Content-Type": "text/html; charset=utf-8"},
+        )
+
+    fetcher = HttpFetcher()
+    fetcher._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return fetcher
+
+
+STATIC_PAGE = (
+    "<html><body><h1>Docs</h1><p>" + "Static text. " * 30 + "</p></body></html>"
+)
+SPA_PAGE = "<html><body><div id='root'></div></body></html>"
+
+
+@pytest.mark.asyncio
+async def test_http_fetcher_skips_browser():
+    """Test that the http fetcher converts pages without launching a browser."""
+    with patch("crawl2md.crawler.AsyncWebCrawler") as mock_crawler_class:
+        fetcher = mock_http_fetcher({"https://example.com/docs": STATIC_PAGE})
+        crawler = Crawler(rate_limit=None, fetcher="http", http_fetcher=fetcher)
+        urls = ["https://example.com/docs", "https://example.com/missing"]
+
+        results = {r["url"]: r async for r in crawler.crawl_many(urls)}
+
+        docs = results["https://example.com/docs"]
+        assert docs["success"] is True
+        assert "# Docs" in docs["markdown"]
+        assert docs["etag"] == '"v1"'
+        assert docs["bytes"] == len(STATIC_PAGE)
+        assert {"fetch", "clean", "convert", "convert_cpu"} <= set(docs["timings"])
+        assert results["https://example.com/missing"]["success"] is False
+        assert results["https://example.com/missing"]["error"] == "HTTP 404"
+        mock_crawler_class.assert_not_called()
+        assert crawler.fetch_stats() == {"http": 1, "browser": 0}
+
+
+@pytest.mark.asyncio
+async def test_html_cache_serves_pages_without_fetching(tmp_path):
+    """Test that fetched pages are cached and served from the cache next run."""
+    pages = {"https://example.com/docs": STATIC_PAGE}
+    cache = HtmlCache(str(tmp_path))
+    crawler = Crawler(
+        rate_limit=None,
+        fetcher="http",
+        http_fetcher=mock_http_fetcher(pages),
+        html_cache=cache,
+    )
+    [fetched] = [r async for r in crawler.crawl_many(list(pages))]
+    assert crawler.fetch_stats()["http"] == 1
+    assert cache.stats()["stores"] == 1
+
+    crawler = Crawler(
+        rate_limit=None,
+        fetcher="http",
+        http_fetcher=mock_http_fetcher({}),
+        html_cache=cache,
+    )
+    [cached] = [r async for r in crawler.crawl_many(list(pages))]
+
+    assert cached["cached"] is True
+    assert cached["markdown"] == fetched["markdown"]
+    assert crawler.fetch_stats()["http"] == 0
+    assert crawler.cache_stats()["hits"] == 1
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_crawl_many_caps_inflight_bytes():
+    """Test that fetched pages wait for the byte budget until results are consumed."""
+    pages = {f"https://example.com/{i}": STATIC_PAGE for i in range(8)}
+    fetcher = mock_http_fetcher(pages)
+    page_mb = len(STATIC_PAGE) / (1024 * 1024)
+    crawler = Crawler(
+        max_concurrent=5,
+        rate_limit=None,
+        fetcher="http",
+        http_fetcher=fetcher,
+        max_inflight_mb=2 * page_mb,
+    )
+    budget = crawler.memory_budget
+    held = []
+
+    async for result in crawler.crawl_many(pages):
+        assert result["success"] is True
+        held.append(budget.in_use)
+        await asyncio.sleep(0.01)
+
+    assert len(held) == 8
+    assert max(held) <= budget.limit
+    assert budget.in_use == 0
+    assert budget.waits > 0
+
+
+@pytest.mark.asyncio
+async def test_auto_fetcher_falls_back_to_browser():
+    """Test that auto mode renders only JavaScript pages in the browser.
+
+    Failed GETs are not retried in the browser.
+    """
+    with patch("crawl2md.crawler.AsyncWebCrawler") as mock_crawler_class:
+        mock_crawler = AsyncMock()
+        mock_crawler_class.return_value.__aenter__.return_value = mock_crawler
+        mock_result = Mock()
+        mock_result.success = True
+        mock_result.markdown = "# Rendered"
+        mock_result.response_headers = {}
+        mock_crawler.arun.return_value = mock_result
+
+        fetcher = mock_http_fetcher(
+            {
+                "https://example.com/static": STATIC_PAGE,
+                "https://example.com/app": SPA_PAGE,
+            }
+        )
+        crawler = Crawler(rate_limit=None, fetcher="auto", http_fetcher=fetcher)
+        urls = [
+            "https://example.com/static",
+            "https://example.com/app",
+            "https://example.com/missing",
+        ]
+
+        results = {r["url"]: r async for r in crawler.crawl_many(urls)}
+
+        assert "# Docs" in results["https://example.com/static"]["markdown"]
+        assert results["https://example.com/app"]["markdown"] == "# Rendered"
+        assert results["https://example.com/missing"]["error"] == "HTTP 404"
+        mock_crawler.arun.assert_called_once()
+        assert crawler.fetch_stats() == {"http": 1, "browser": 1}
+
+
+@pytest.mark.asyncio
+async def test_crawl_many_caps_concurrency_per_host():
+    """Test that one host never gets more than per_host_concurrency requests."""
+    with patch("crawl2md.crawler.AsyncWebCrawler") as mock_crawler_class:
+        mock_crawler = AsyncMock()
+        mock_crawler_class.return_value.__aenter__.return_value = mock_crawler
+        in_flight = {}
+        peak = {}
+
+        async def arun(url, config=None):
+            host = url.split("/")[2]
+            in_flight[host] = in_flight.get(host, 0) + 1
+            peak[host] = max(peak.get(host, 0), in_flight[host])
+            await asyncio.sleep(0.01)
+            in_flight[host] -= 1
+            result = Mock()
+            result.success = True
+            result.markdown = "# Page"
+            result.status_code = 200
+            return result
+
+        mock_crawler.arun.side_effect = arun
+        urls = [f"https://a.com/{i}" for i in range(10)]
+        urls += [f"https://b.com/{i}" for i in range(10)]
+
+        crawler = Crawler(max_concurrent=6, rate_limit=None, per_host_concurrency=2)
+        results = [r async for r in crawler.crawl_many(urls)]
+
+        assert len(results) == 20
+        assert peak == {"a.com": 2, "b.com": 2}
+        assert set(crawler.host_stats()) == {"a.com", "b.com"}
+
+
+@pytest.mark.asyncio
+async def test_crawl_many_retries_transient_failures():
+    """Test that transient failures are re-queued and permanent ones are not."""
+    with patch("crawl2md.crawler.AsyncWebCrawler") as mock_crawler_class:
+        mock_crawler = AsyncMock()
+        mock_crawler_class.return_value.__aenter__.return_value = mock_crawler
+        calls = {}
+
+        async def arun(url, config=None):
+            calls[url] = calls.get(url, 0) + 1
+            result = Mock()
+            result.markdown = "# Page"
+            result.status_code = 200
+            result.success = True
+            if url.endswith("flaky") and calls[url] < 3:
+                result.success = False
+                result.status_code = 503
+                result.error_message = "Service Unavailable"
+            elif url.endswith("missing"):
+                result.success = False
+                result.status_code = 404
+                result.error_message = "Not Found"
+            elif url.endswith("down"):
+                result.success = False
+                result.error_message = "Timeout 30000ms exceeded"
+            return result
+
+        mock_crawler.arun.side_effect = arun
+        crawler = Crawler(
+            rate_limit=None, retry_policy=RetryPolicy(max_attempts=3, base_delay=0.01)
+        )
+        urls = [f"https://example.com/{name}" for name in ("flaky", "missing", "down")]
+
+        results = {r["url"]: r async for r in crawler.crawl_many(urls)}
+
+        flaky = results["https://example.com/flaky"]
+        assert flaky["success"] is True
+        assert flaky["attempts"] == 3
+        missing = results["https://example.com/missing"]
+        assert missing["attempts"] == 1
+        assert missing["error_class"] == "permanent"
+        down = results["https://example.com/down"]
+        assert down["success"] is False
+        assert down["attempts"] == 3
+        assert down["error_class"] == "transient"
+        assert crawler.retry_stats() == {"retries": 4, "budget_exhausted": 0}
+
+
+def test_resource_blocker_is_installed_on_browsers():
+    """Test that browsers get the blocking hook and the page-load settings."""
+    blocker = ResourceBlocker(["image"])
+    with patch("crawl2md.crawler.AsyncWebCrawler") as mock_crawler_class:
+        crawler = Crawler(
+            resource_blocker=blocker, wait_until="networkidle", page_timeout=15
+        )
+        crawler._new_browser()
+
+    mock_crawler_class.return_value.crawler_strategy.set_hook.assert_called_once_with(
+        "on_page_context_created", blocker.install
+    )
+    assert crawler.run_config.wait_until == "networkidle"
+    assert crawler.run_config.page_timeout == 15000
+    assert crawler.resource_stats()["blocked"] == 0
+
+
+def test_unknown_fetcher():
+    """Test that an unknown fetcher mode is rejected."""
+    with pytest.raises(ValueError):
+        Crawler(fetcher="curl")
+
+
 def test_default_max_concurrent():
     """Test default max concurrent value."""
     crawler = Crawler()
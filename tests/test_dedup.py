@@ -0,0 +1,78 @@
+"""Tests for URL normalization and content deduplication."""
+
+import pytest
+
+from crawl2md.dedup import ContentIndex, extract_canonical, normalize_url
+from crawl2md.state import CrawlState
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        ("HTTPS://Example.COM/Docs/", "https://example.com/Docs"),
+        ("https://example.com:443/a", "https://example.com/a"),
+        ("http://example.com:8080/a", "http://example.com:8080/a"),
+        ("https://example.com/a#section", "https://example.com/a"),
+        ("https://example.com/docs/index.html", "https://example.com/docs"),
+        ("https://example.com", "https://example.com/"),
+        ("https://example.com/a?b=2&a=1", "https://example.com/a?a=1&b=2"),
+        (
+            "https://example.com/a?utm_source=x&id=3&gclid=y&UTM_Medium=z",
+            "https://example.com/a?id=3",
+        ),
+    ],
+)
+def test_normalize_url(url, expected):
+    """Test that URL variants of a page map to one form."""
+    assert normalize_url(url) == expected
+
+
+def test_normalize_url_custom_params():
+    """Test that extra ignored parameters are dropped."""
+    assert (
+        normalize_url("https://example.com/a?sid=1&page=2", ignored_params=["sid"])
+        == "https://example.com/a?page=2"
+    )
+
+
+def test_extract_canonical_resolves_relative_href():
+    """Test that a relative canonical link is made absolute."""
+    html = (
+        '<html><head><link href="/docs/a" rel="canonical"></head><body></body></html>'
+    )
+    assert (
+        extract_canonical(html, "https://example.com/docs/a?print=1")
+        == "https://example.com/docs/a"
+    )
+
+
+def test_extract_canonical_ignores_body_and_other_links():
+    """Test that only canonical links in the head are used."""
+    html = (
+        "<html><head><link rel='stylesheet' href='/s.css'></head>"
+        '<body><link rel="canonical" href="/other"></body></html>'
+    )
+    assert extract_canonical(html, "https://example.com/a") is None
+
+
+def test_content_index_claims_first_url():
+    """Test that the first URL owns the content and later ones point to it."""
+    index = ContentIndex()
+
+    assert index.claim("hash", "https://example.com/a") is None
+    assert index.claim("hash", "https://example.com/a") is None
+    assert index.claim("hash", "https://example.com/b") == "https://example.com/a"
+    assert index.claim("other", "https://example.com/b") is None
+    assert index.duplicates == 1
+
+
+def test_content_index_uses_earlier_runs(tmp_path):
+    """Test that content saved by an earlier run is found in the state store."""
+    with CrawlState.in_directory(str(tmp_path)) as state:
+        state.mark_done("https://example.com/a", "hash")
+        state.mark_done(
+            "https://example.com/b", "hash", duplicate_of="https://example.com/a"
+        )
+        index = ContentIndex(state)
+
+        assert index.claim("hash", "https://example.com/c") == "https://example.com/a"
@@ -0,0 +1,213 @@
+"""Tests for link discovery."""
+
+import functools
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from click.testing import CliRunner
+
+from crawl2md.cli import main
+from crawl2md.crawler import Crawler
+from crawl2md.discovery import (
+    LinkDiscovery,
+    LinkQueue,
+    SeenSet,
+    extract_links,
+    page_links,
+)
+from crawl2md.sitemap import SitemapEntry
+from tests.test_crawler import STATIC_PAGE, mock_http_fetcher
+
+BASE = "https://example.com"
+
+
+def test_extract_links_resolves_and_filters():
+    """Test that links are made absolute and non-page links are skipped."""
+    html = """
+        <a href="guide.html#install">Guide</a>
+        <A HREF='/about'>About</A>
+        <a href="https://other.example/x">Other</a>
+        <a href="mailto:team@example.com">Mail</a>
+        <a href="javascript:void(0)">Menu</a>
+        <a href="manual.PDF">Manual</a>
+        <a rel="nofollow" href="/login">Log in</a>
+        <a name="anchor">No href</a>
+        <a href="guide.html">Guide again</a>
+    """
+
+    assert extract_links(html, f"{BASE}/docs/index.html") == [
+        f"{BASE}/docs/guide.html",
+        f"{BASE}/about",
+        "https://other.example/x",
+    ]
+
+
+def test_page_links_skips_empty_hrefs():
+    """Test that crawl4ai-style href lists are cleaned the same way."""
+    assert page_links([None, "", " next.html "], f"{BASE}/docs/a") == [
+        f"{BASE}/docs/next.html"
+    ]
+
+
+def test_seen_set_adds_once_across_merges():
+    """Test that URLs are recognised before and after a merge."""
+    seen = SeenSet(merge_every=4)
+    urls = [f"{BASE}/page{i}" for i in range(10)]
+
+    assert [seen.add(url) for url in urls] == [True] * 10
+    assert [seen.add(url) for url in urls] == [False] * 10
+    assert len(seen) == 10
+    assert f"{BASE}/page3" in seen
+    assert f"{BASE}/page10" not in seen
+    assert list(seen._sorted) == sorted(seen._sorted)
+    assert seen.nbytes < 10 * 64
+
+
+def test_link_queue_is_fifo_and_unique(tmp_path):
+    """Test that URLs come out in order, once, with their depth."""
+    queue = LinkQueue.in_directory(str(tmp_path))
+
+    assert queue.add([(f"{BASE}/a", 0, "2026-01-01"), (f"{BASE}/b", 1, None)]) == 2
+    assert queue.add([(f"{BASE}/a", 3, None), (f"{BASE}/c", 2, None)]) == 1
+
+    assert queue.next_batch(2) == [
+        SitemapEntry(f"{BASE}/a", "2026-01-01"),
+        SitemapEntry(f"{BASE}/b"),
+    ]
+    assert len(queue) == 1
+    assert queue.next_batch(2) == [SitemapEntry(f"{BASE}/c")]
+    assert queue.next_batch(2) == []
+    assert queue.depth(f"{BASE}/a") == 0
+    assert queue.depth(f"{BASE}/c") == 2
+    assert queue.depth(f"{BASE}/unknown") is None
+    queue.close()
+
+
+def test_link_queue_resume_replays(tmp_path):
+    """Test that a resumed queue starts over, and a new run starts empty."""
+    queue = LinkQueue.in_directory(str(tmp_path))
+    queue.add([(f"{BASE}/a", 0, None), (f"{BASE}/b", 1, None)])
+    queue.next_batch(10)
+    queue.close()
+
+    resumed = LinkQueue.in_directory(str(tmp_path), resume=True)
+    assert sorted(resumed.urls()) == [f"{BASE}/a", f"{BASE}/b"]
+    assert [e.loc for e in resumed.next_batch(10)] == [f"{BASE}/a", f"{BASE}/b"]
+    resumed.close()
+
+    fresh = LinkQueue.in_directory(str(tmp_path))
+    assert list(fresh.urls()) == []
+    fresh.close()
+
+
+@pytest.mark.asyncio
+async def test_link_discovery_follows_links_within_hosts_and_depth(tmp_path):
+    """Test that seeds come first, then their links, until none are left."""
+    queue = LinkQueue.in_directory(str(tmp_path))
+    discovery = LinkDiscovery(queue, url_key=str.lower, max_depth=1, batch_size=2)
+
+    async def sitemap():
+        yield SitemapEntry(f"{BASE}/a", "2026-01-01")
+        yield SitemapEntry(f"{BASE}/b")
+        yield SitemapEntry(f"{BASE}/A")
+
+    links = {
+        f"{BASE}/a": [f"{BASE}/C", "https://other.example/x", f"{BASE}/b"],
+        f"{BASE}/C": [f"{BASE}/d"],
+    }
+    crawled = []
+    # Each page is crawled before the next URL is asked for
+    async for entry in discovery.entries(lambda: False, sitemap=sitemap()):
+        crawled.append(entry)
+        discovery.follow(entry.loc, links.get(entry.loc))
+
+    assert crawled == [
+        SitemapEntry(f"{BASE}/a", "2026-01-01"),
+        SitemapEntry(f"{BASE}/b"),
+        SitemapEntry(f"{BASE}/C"),
+    ]
+    assert discovery.discovered == 1
+    assert queue.depth(f"{BASE}/C") == 1
+    assert len(discovery.seen) == 3
+    queue.close()
+
+
+@pytest.mark.asyncio
+async def test_crawler_returns_links():
+    """Test that pages come with their links when discovery is on."""
+    page = STATIC_PAGE.replace("</p>", '</p><a href="/docs/next">Next</a>')
+    pages = {f"{BASE}/docs/start": page}
+
+    crawler = Crawler(
+        rate_limit=None,
+        fetcher="http",
+        http_fetcher=mock_http_fetcher(pages),
+        discover_links=True,
+    )
+    results = [r async for r in crawler.crawl_many(list(pages))]
+
+    assert results[0]["links"] == [f"{BASE}/docs/next"]
+
+
+def linked_page(title: str, *links: str) -> str:
+    anchors = "".join(f'<a href="{link}">{link}</a>' for link in links)
+    return STATIC_PAGE.replace("Docs", title).replace("</p>", f"</p>{anchors}")
+
+
+@pytest.fixture
+def linked_site(tmp_path):
+    """Serve pages linking to each other over HTTP."""
+    site = tmp_path / "site"
+    (site / "docs").mkdir(parents=True)
+    (site / "index.html").write_text(
+        linked_page("Home", "docs/a.html", "/docs/b.html#top", "https://other.example/")
+    )
+    (site / "docs" / "a.html").write_text(linked_page("A", "c.html", "../"))
+    (site / "docs" / "b.html").write_text(linked_page("B", "a.html"))
+    (site / "docs" / "c.html").write_text(linked_page("C", "d.html"))
+    (site / "docs" / "d.html").write_text(linked_page("D"))
+    handler = functools.partial(SimpleHTTPRequestHandler, directory=str(site))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address[:2]
+    yield f"http://{host}:{port}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("max_depth, pages", [(0, 5), (2, 4)])
+def test_discover_crawls_linked_pages(tmp_path, linked_site, max_depth, pages):
+    """Test that --discover follows links from a start page, within depth."""
+    output = tmp_path / "output"
+
+    result = CliRunner().invoke(
+        main,
+        [
+            "crawl",
+            f"{linked_site}/index.html",
+            "--discover",
+            "--max-depth",
+            str(max_depth),
+            "--fetcher",
+            "http",
+            "--rate-limit",
+            "0",
+            "--output",
+            str(output),
+            "--result-file",
+            str(tmp_path / "result.csv"),
+            "--no-progress",
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert f"Success: {pages}, Failed: 0" in result.output
+    saved = sorted(p.relative_to(output).as_posix() for p in output.rglob("*.md"))
+    expected = ["docs/a.md", "docs/b.md", "docs/c.md", "docs/d.md", "index.md"]
+    assert saved == (expected if max_depth == 0 else expected[:3] + expected[4:])
+    # URLs are fetched and reported as linked, not in their normalized form
+    rows = (tmp_path / "result.csv").read_text()
+    assert f"{linked_site}/index.html" in rows
+    assert f"{linked_site}/docs/a.html" in rows
@@ -0,0 +1,217 @@
+"""Tests for distributed crawls over a shared work queue."""
+
+import asyncio
+import csv
+import time
+
+import pytest
+from click.testing import CliRunner
+from unittest.mock import AsyncMock, patch
+
+from crawl2md.cli import main
+from crawl2md.crawler import Crawler
+from crawl2md.distributed import Coordinator, Worker
+from crawl2md.file_handler import FileHandler
+from crawl2md.sitemap import SitemapEntry
+from crawl2md.state import CrawlState
+from crawl2md.work_queue import OUTCOME_OK, SqliteWorkQueue
+from crawl2md.writer import OutputWriter
+from tests.test_crawler import STATIC_PAGE, mock_http_fetcher
+
+BASE = "https://example.com"
+PAGES = {f"{BASE}/docs/page{i}": STATIC_PAGE for i in range(7)}
+
+
+def make_worker(queue, output, worker_id):
+    crawler = Crawler(
+        rate_limit=None, fetcher="http", http_fetcher=mock_http_fetcher(PAGES)
+    )
+    return Worker(
+        queue,
+        crawler,
+        FileHandler(BASE, output),
+        worker_id=worker_id,
+        lease_seconds=5,
+        poll_interval=0.01,
+        log=lambda line: None,
+    )
+
+
+async def entries(urls):
+    for url in urls:
+        yield SitemapEntry(url)
+
+
+@pytest.mark.asyncio
+async def test_coordinator_merges_results_of_two_workers(tmp_path):
+    """Test that two workers crawl every URL once into one state store and CSV."""
+    output = str(tmp_path / "output")
+    result_file = str(tmp_path / "result.csv")
+    queue_path = str(tmp_path / "queue.sqlite")
+    urls = list(PAGES) + [f"{BASE}/missing"]
+    queues = [SqliteWorkQueue(queue_path) for _ in range(3)]
+    state = CrawlState.in_directory(output)
+
+    async with OutputWriter(FileHandler(BASE, output), result_file) as writer:
+        coordinator = Coordinator(
+            queues[0],
+            state,
+            writer,
+            batch_size=3,
+            poll_interval=0.01,
+            log=lambda line: None,
+        )
+        coordinator_task = asyncio.ensure_future(coordinator.run(entries(urls)))
+        await asyncio.sleep(0.05)
+        worker_counts = await asyncio.gather(
+            make_worker(queues[1], output, "w1").run(),
+            make_worker(queues[2], output, "w2").run(),
+        )
+        counts = await coordinator_task
+
+    assert counts["found"] == 8
+    assert counts["items"] == 3
+    assert counts["OK"] == 7
+    assert counts["ERROR"] == 1
+    assert sum(c["items"] for c in worker_counts) == 3
+    assert all(c["items"] for c in worker_counts)
+    assert state.counts() == {"pending": 0, "done": 7, "failed": 1}
+    assert state.get(f"{BASE}/missing")["error"] == "HTTP 404"
+    assert state.get(f"{BASE}/docs/page0")["etag"] == '"v1"'
+    with open(result_file, newline="") as f:
+        rows = list(csv.reader(f))[1:]
+    assert sorted(url for _, url in rows) == sorted(urls)
+    assert (tmp_path / "output" / "docs" / "page6.md").read_text().startswith("---")
+    for queue in queues:
+        queue.close()
+    state.close()
+
+
+@pytest.mark.asyncio
+async def test_worker_takes_over_expired_lease(tmp_path):
+    """Test that the item of a worker that died is crawled by another."""
+    queue = SqliteWorkQueue(str(tmp_path / "queue.sqlite"))
+    abandoned = queue.put([{"url": url} for url in list(PAGES)[:3]])
+    queue.put([{"url": url} for url in list(PAGES)[3:]])
+    queue.close_input()
+    assert queue.lease("dead", 0.05).id == abandoned
+    time.sleep(0.1)
+
+    counts = await make_worker(queue, str(tmp_path / "output"), "w1").run()
+
+    results = dict(queue.pop_results())
+    assert counts["items"] == 2
+    assert [o["status"] for o in results[abandoned]] == [OUTCOME_OK] * 3
+    assert {o["worker"] for o in results[abandoned]} == {"w1"}
+    assert queue.finished() is True
+    queue.close()
+
+
+@pytest.mark.asyncio
+async def test_coordinator_plans_paths_for_workers(tmp_path):
+    """Test that URLs sharing a file name on different workers stay apart."""
+    output = str(tmp_path / "output")
+    queue = SqliteWorkQueue(str(tmp_path / "queue.sqlite"))
+    urls = [f"{BASE}/docs/page0", f"{BASE}/docs/page0/"]
+    state = CrawlState.in_directory(output)
+
+    async with OutputWriter(FileHandler(BASE, output), None) as writer:
+        await Coordinator(
+            queue,
+            state,
+            writer,
+            batch_size=1,
+            poll_interval=0.01,
+            log=lambda line: None,
+        )._feed(entries(urls))
+
+    items = [queue.lease(worker, 5) for worker in ("w1", "w2")]
+    assert items[0].tasks[0]["path"] == "docs/page0.md"
+    assert items[1].tasks[0]["path"].startswith("docs/page0-")
+    worker = make_worker(queue, output, "w2")
+    worker._hold(items[1])
+    assert worker.file_handler.url_to_path(urls[1]) == items[1].tasks[0]["path"]
+    queue.close()
+    state.close()
+
+
+class PeakQueue(SqliteWorkQueue):
+    """Work queue recording the most items outstanding after a put."""
+
+    peak = 0
+
+    def put(self, tasks):
+        item_id = super().put(tasks)
+        counts = self.counts()
+        self.peak = max(self.peak, counts["pending"] + counts["leased"])
+        return item_id
+
+
+@pytest.mark.asyncio
+async def test_coordinator_waits_for_room_in_the_queue(tmp_path):
+    """Test that the sitemap is read no faster than the items are done."""
+    output = str(tmp_path / "output")
+    queue = PeakQueue(str(tmp_path / "queue.sqlite"))
+    urls = [f"{BASE}/docs/page{i}" for i in range(20)]
+    state = CrawlState.in_directory(output)
+
+    async def consume():
+        while not queue.finished():
+            item = queue.lease("w1", 5)
+            if item is not None:
+                queue.complete(
+                    item.id,
+                    "w1",
+                    [{"url": t["url"], "status": OUTCOME_OK} for t in item.tasks],
+                )
+            await asyncio.sleep(0.01)
+
+    async with OutputWriter(FileHandler(BASE, output), None) as writer:
+        coordinator = Coordinator(
+            queue,
+            state,
+            writer,
+            batch_size=1,
+            poll_interval=0.005,
+            log=lambda line: None,
+            max_outstanding=3,
+        )
+        counts, _ = await asyncio.wait_for(
+            asyncio.gather(coordinator.run(entries(urls)), consume()), timeout=30
+        )
+
+    assert counts["OK"] == 20
+    assert queue.peak == 3
+    assert not coordinator._lastmods
+    queue.close()
+    state.close()
+
+
+def test_worker_command_takes_crawl_options(tmp_path):
+    """Test that workers are as polite as a local crawl, with its options."""
+    with (
+        patch("crawl2md.cli.Crawler") as crawler_class,
+        patch("crawl2md.cli.Worker") as worker_class,
+    ):
+        worker_class.return_value.run = AsyncMock(
+            return_value={"items": 0, "lost": 0, "OK": 0, "NOT_MODIFIED": 0, "ERROR": 0}
+        )
+        result = CliRunner().invoke(
+            main,
+            [
+                "worker",
+                "--output",
+                str(tmp_path),
+                "--per-host-rate",
+                "2",
+                "--ignore-crawl-delay",
+                "--lean-browser",
+            ],
+        )
+
+    assert result.exit_code == 0, result.output
+    options = crawler_class.call_args.kwargs
+    assert options["adaptive_concurrency"] is True
+    assert options["respect_crawl_delay"] is False
+    assert options["per_host_rate"] == 2
+    assert options["resource_blocker"] is not None
@@ -3,6 +3,7 @@
 import os
 import tempfile
 import shutil
+import tracemalloc
 
 import pytest
 
@@ -90,3 +91,152 @@ def test_save_markdown_creates_directories(temp_dir):
 
     expected_path = os.path.join(temp_dir, "blog", "post-1.md")
     assert os.path.exists(expected_path)
+
+
+def test_save_markdown_replaces_atomically(temp_dir):
+    """Test that saving overwrites in place and leaves no temporary files."""
+    handler = FileHandler("https://example.com", temp_dir)
+
+    handler.save_markdown("https://example.com/docs/a", "old")
+    path = handler.save_markdown("https://example.com/docs/a", "new")
+
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == "new"
+    assert os.listdir(os.path.join(temp_dir, "docs")) == ["a.md"]
+
+
+def test_save_markdown_writes_frontmatter_first(temp_dir):
+    """Test that a separately passed frontmatter precedes the content."""
+    handler = FileHandler("https://example.com", temp_dir)
+
+    path = handler.save_markdown(
+        "https://example.com/a", "# Body", "---\nx: 1\n---\n\n"
+    )
+
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == "---\nx: 1\n---\n\n# Body"
+
+
+def test_save_markdown_peak_memory(temp_dir):
+    """Regression test: saving a large page must not copy it whole.
+
+    Prepending frontmatter by concatenation and encoding the page in one
+    piece each cost a full copy; both together used to add more than twice
+    the page size at peak.
+    """
+    handler = FileHandler("https://example.com", temp_dir)
+    markdown = "Lorem ipsum dolor sit amet. " * 300_000  # 8 MB
+    frontmatter = "---\nsource: https://example.com/big\n---\n\n"
+
+    tracemalloc.start()
+    try:
+        path = handler.save_markdown("https://example.com/big", markdown, frontmatter)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert peak < len(markdown) / 2
+    assert os.path.getsize(path) == len(frontmatter) + len(markdown)
+
+
+def test_relative_link():
+    """Test links between saved files are relative to the linking file."""
+    handler = FileHandler("https://example.com", "/tmp/output")
+
+    assert (
+        handler.relative_link(
+            "https://example.com/docs/a", "https://example.com/blog/b"
+        )
+        == "../blog/b.md"
+    )
+    assert (
+        handler.relative_link("https://example.com/docs/a", "https://example.com/")
+        == "../index.md"
+    )
+
+
+def test_colliding_urls_get_distinct_paths(temp_dir):
+    """Test that URLs mapping to one file keep separate, stable files."""
+    urls = [
+        "https://example.com/a",
+        "https://example.com/a/",
+        "https://example.com/a.html",
+        "https://example.com/a?page=2",
+    ]
+    handler = FileHandler("https://example.com", temp_dir)
+
+    handler.plan(urls)
+
+    paths = [handler.url_to_path(url) for url in urls]
+    assert paths[0] == "a.md"
+    assert len(set(paths)) == 4
+    assert all(p.startswith("a-") and len(p) == len("a-12345678.md") for p in paths[1:])
+    assert handler.renamed == 3
+    rerun = FileHandler("https://example.com", temp_dir)
+    rerun.plan(urls)
+    assert [rerun.url_to_path(url) for url in urls] == paths
+    for url in urls:
+        handler.save_markdown(url, url)
+    assert len(os.listdir(temp_dir)) == 4
+
+
+def test_unplanned_urls_are_assigned_on_first_use():
+    """Test that URLs not planned ahead still never share a path."""
+    handler = FileHandler("https://example.com")
+
+    first = handler.url_to_path("https://example.com/docs/")
+    second = handler.url_to_path("https://example.com/docs")
+
+    assert first == "docs.md"
+    assert second != first
+    assert handler.url_to_path("https://example.com/docs") == second
+
+
+def test_make_directories_creates_planned_tree(temp_dir):
+    """Test that the directories of planned paths are created in one pass."""
+    handler = FileHandler("https://example.com", temp_dir)
+    handler.plan(
+        [
+            "https://example.com/docs/guide/intro",
+            "https://example.com/docs/guide/setup",
+            "https://example.com/blog/post",
+        ]
+    )
+
+    handler.make_directories()
+
+    assert os.path.isdir(os.path.join(temp_dir, "docs", "guide"))
+    assert os.path.isdir(os.path.join(temp_dir, "blog"))
+    assert {"docs", "docs/guide", "blog"} <= handler._created_dirs
+
+
+def test_assign_pins_a_planned_path(temp_dir):
+    """Test that a path planned elsewhere is used as given."""
+    handler = FileHandler("https://example.com", temp_dir)
+
+    handler.assign("https://example.com/a/", "a-0123abcd.md")
+    saved = handler.save_markdown("https://example.com/a/", "# A")
+
+    assert saved == os.path.join(temp_dir, "a-0123abcd.md")
+    assert handler.url_to_path("https://example.com/a") == "a.md"
+
+
+def test_saved_paths_survive_a_new_order(temp_dir):
+    """Test that paths taken from one run keep URLs' files in the next."""
+    urls = ["https://example.com/a/", "https://example.com/a"]
+    first = FileHandler("https://example.com", temp_dir)
+    first.plan(urls)
+    first.assign("https://example.com/elsewhere", "elsewhere.md")
+    saved = first.take_assigned()
+    assert [url for url, _ in saved] == urls
+    assert first.take_assigned() == []
+
+    rerun = FileHandler("https://example.com", temp_dir)
+    for url, path in saved:
+        rerun.assign(url, path)
+    rerun.plan(reversed(urls))
+
+    assert [rerun.url_to_path(url) for url in urls] == [
+        first.url_to_path(url) for url in urls
+    ]
+    assert rerun.take_assigned() == []
@@ -0,0 +1,161 @@
+"""Tests for the crawl frontier."""
+
+import re
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from crawl2md.frontier import (
+    Frontier,
+    UrlFilter,
+    prioritize,
+    score_entry,
+    staleness,
+)
+from crawl2md.sitemap import SitemapEntry
+
+NOW = datetime(2026, 1, 15, tzinfo=timezone.utc)
+
+
+def crawled(days_ago: float, status: str = "done", lastmod=None) -> dict:
+    """Return a CrawlState record of a URL crawled some days before NOW."""
+    return {
+        "status": status,
+        "lastmod": lastmod,
+        "updated_at": (NOW - timedelta(days=days_ago)).isoformat(timespec="seconds"),
+    }
+
+
+def test_staleness_by_changefreq():
+    """Test that staleness grows with age relative to the changefreq period."""
+    daily = SitemapEntry("https://example.com/a", changefreq="daily")
+    weekly = SitemapEntry("https://example.com/a", changefreq="weekly")
+
+    assert staleness(daily, crawled(0.5), NOW) == pytest.approx(0.5)
+    assert staleness(daily, crawled(3), NOW) == 1.0
+    assert staleness(weekly, crawled(3.5), NOW) == pytest.approx(0.5)
+    assert staleness(SitemapEntry("https://example.com/a"), crawled(3.5), NOW) == (
+        pytest.approx(0.5)
+    )
+    never = SitemapEntry("https://example.com/a", changefreq="never")
+    assert staleness(never, crawled(1000), NOW) == 0.0
+
+
+def test_staleness_of_new_failed_and_changed_pages():
+    """Test that uncrawled, failed and changed pages are fully stale."""
+    entry = SitemapEntry(
+        "https://example.com/a", lastmod="2026-01-10", changefreq="yearly"
+    )
+
+    assert staleness(entry, None, NOW) == 1.0
+    assert staleness(entry, crawled(1, status="failed"), NOW) == 1.0
+    assert staleness(entry, crawled(1, lastmod="2026-01-01"), NOW) == 1.0
+    assert staleness(entry, crawled(1, lastmod="2026-01-10"), NOW) < 0.01
+
+
+def test_score_adds_priority_and_staleness():
+    """Test that priority defaults to 0.5 and staleness is added to it."""
+    important = SitemapEntry("https://example.com/a", priority=0.9)
+    plain = SitemapEntry("https://example.com/b")
+
+    assert score_entry(important, None, NOW) == pytest.approx(1.9)
+    assert score_entry(plain, None, NOW) == pytest.approx(1.5)
+    # A fresh important page comes after a page never crawled
+    assert score_entry(important, crawled(0), NOW) < score_entry(plain, None, NOW)
+
+
+def test_frontier_pops_best_score_first():
+    """Test that URLs of one host come out by score, ties in push order."""
+    frontier = Frontier()
+    for url, score in [("/low", 0.1), ("/high", 0.9), ("/mid", 0.5), ("/mid2", 0.5)]:
+        frontier.push(f"https://example.com{url}", score)
+
+    assert len(frontier) == 4
+    assert [url.rsplit("/", 1)[1] for url in frontier] == [
+        "high",
+        "mid",
+        "mid2",
+        "low",
+    ]
+    assert frontier.pop() is None
+
+
+def test_frontier_takes_turns_between_hosts():
+    """Test that a host with many high scores does not starve the others."""
+    frontier = Frontier()
+    for i in range(4):
+        frontier.push(f"https://big.example/{i}", 1.0)
+    frontier.push("https://small.example/a", 0.2)
+    frontier.push("https://small.example/b", 0.1)
+
+    order = list(frontier)
+
+    assert order[:4] == [
+        "https://big.example/0",
+        "https://small.example/a",
+        "https://big.example/1",
+        "https://small.example/b",
+    ]
+    assert order[4:] == ["https://big.example/2", "https://big.example/3"]
+
+
+def test_url_filter_globs_and_regexes():
+    """Test include and exclude patterns, as globs or re: regexes."""
+    url_filter = UrlFilter(
+        include=["*/docs/*", r"re:/blog/\d{4}/"],
+        exclude=["*/docs/internal/*"],
+    )
+
+    assert url_filter("https://example.com/docs/guide")
+    assert url_filter("https://example.com/blog/2024/post")
+    assert not url_filter("https://example.com/blog/latest")
+    assert not url_filter("https://example.com/docs/internal/notes")
+    assert url_filter.excluded == 2
+    assert url_filter.active
+    assert not UrlFilter().active
+    assert UrlFilter()("https://example.com/anything")
+
+
+def test_url_filter_rejects_invalid_regex():
+    """Test that an invalid regular expression raises re.error."""
+    with pytest.raises(re.error):
+        UrlFilter(exclude=["re:("])
+
+
+@pytest.mark.asyncio
+async def test_url_filter_entries():
+    """Test that sitemap entries are filtered by URL."""
+
+    async def entries():
+        for path in ("docs/a", "blog/b", "docs/c"):
+            yield SitemapEntry(f"https://example.com/{path}")
+
+    kept = [e.loc async for e in UrlFilter(exclude=["*/blog/*"]).entries(entries())]
+
+    assert kept == ["https://example.com/docs/a", "https://example.com/docs/c"]
+
+
+@pytest.mark.asyncio
+async def test_prioritize_orders_entries():
+    """Test that entries come out by priority and staleness, not sitemap order."""
+    records = {"https://example.com/fresh": crawled(0.1)}
+    sitemap = [
+        SitemapEntry("https://example.com/low", priority=0.1),
+        SitemapEntry("https://example.com/fresh", priority=1.0, changefreq="daily"),
+        SitemapEntry("https://example.com/high", priority=0.8),
+        SitemapEntry("https://example.com/default"),
+    ]
+
+    async def entries():
+        for entry in sitemap:
+            yield entry
+
+    ordered = [e async for e in prioritize(entries(), records.get, now=NOW)]
+
+    assert [e.loc.rsplit("/", 1)[1] for e in ordered] == [
+        "high",
+        "default",
+        "low",
+        "fresh",
+    ]
+    assert ordered[0] is sitemap[2]
@@ -0,0 +1,142 @@
+"""Tests for the per-host scheduler."""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from crawl2md.host_scheduler import HostScheduler, host_of, parse_crawl_delay
+
+
+def test_host_of():
+    """Test that hosts are compared case-insensitively, with their port."""
+    assert host_of("https://Example.com/a") == "example.com"
+    assert host_of("http://localhost:8000/a") == "localhost:8000"
+
+
+@pytest.mark.asyncio
+async def test_get_respects_per_host_cap():
+    """Test that a saturated host does not block URLs of other hosts."""
+    scheduler = HostScheduler(max_per_host=1)
+    for url in ["https://a.com/1", "https://a.com/2", "https://b.com/1"]:
+        scheduler.put_nowait(url)
+    scheduler.close()
+
+    first = await scheduler.get()
+    second = await scheduler.get()
+    assert {host_of(first), host_of(second)} == {"a.com", "b.com"}
+    assert scheduler.stats()["a.com"]["in_flight"] == 1
+
+    blocked = asyncio.ensure_future(scheduler.get())
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+
+    scheduler.done("https://a.com/1")
+    assert await asyncio.wait_for(blocked, 1) == "https://a.com/2"
+    scheduler.done("https://a.com/2")
+    scheduler.done("https://b.com/1")
+    assert await scheduler.get() is None
+
+
+@pytest.mark.asyncio
+async def test_per_host_rate_limit():
+    """Test that requests to one host are spaced out to its rate."""
+    scheduler = HostScheduler(rate=20)
+    for i in range(4):
+        scheduler.put_nowait(f"https://a.com/{i}")
+    scheduler.close()
+
+    start = time.monotonic()
+    while (url := await scheduler.get()) is not None:
+        scheduler.done(url)
+
+    assert time.monotonic() - start >= 0.14
+
+
+@pytest.mark.asyncio
+async def test_adaptive_concurrency_aimd():
+    """Test additive increase on success and halving on 429."""
+    scheduler = HostScheduler(max_per_host=8, adaptive=True)
+    scheduler.put_nowait("https://a.com/")
+    assert scheduler.stats()["a.com"]["limit"] == 2
+
+    for _ in range(20):
+        url = await scheduler.get()
+        scheduler.done(url, 200, 0.01)
+        scheduler.put_nowait(url)
+    assert scheduler.stats()["a.com"]["limit"] == 6
+
+    url = await scheduler.get()
+    scheduler.done(url, 429, 0.01)
+    assert scheduler.stats()["a.com"]["limit"] == 3
+    assert scheduler.stats()["a.com"]["backoffs"] == 1
+
+
+@pytest.mark.asyncio
+async def test_adaptive_concurrency_backs_off_on_latency():
+    """Test that rising latency halves the host's concurrency."""
+    scheduler = HostScheduler(max_per_host=4, adaptive=True)
+    scheduler.put_nowait("https://a.com/")
+    for latency in [0.01] * 10 + [0.2] * 3:
+        url = await scheduler.get()
+        scheduler.done(url, 200, latency)
+        scheduler.put_nowait(url)
+
+    assert scheduler.stats()["a.com"]["backoffs"] >= 1
+    assert scheduler.stats()["a.com"]["limit"] < 4
+
+
+@pytest.mark.asyncio
+async def test_put_waits_for_buffer_space():
+    """Test that put applies backpressure once max_queued URLs are buffered."""
+    scheduler = HostScheduler(max_queued=2)
+    await scheduler.put("https://a.com/1")
+    await scheduler.put("https://a.com/2")
+
+    waiting = asyncio.ensure_future(scheduler.put("https://a.com/3"))
+    await asyncio.sleep(0.01)
+    assert not waiting.done()
+
+    await scheduler.get()
+    await asyncio.wait_for(waiting, 1)
+
+
+@pytest.mark.asyncio
+async def test_crawl_delay_from_robots():
+    """Test that robots.txt Crawl-delay becomes the host's rate limit."""
+
+    def handler(request):
+        if request.url.path == "/robots.txt":
+            return httpx.Response(200, text="User-agent: *\nCrawl-delay: 2\n")
+        return httpx.Response(404)
+
+    scheduler = HostScheduler(rate=5, respect_crawl_delay=True)
+    scheduler._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    scheduler.put_nowait("https://a.com/1")
+    scheduler.put_nowait("https://a.com/2")
+
+    assert await scheduler.get() == "https://a.com/1"
+    stats = scheduler.stats()["a.com"]
+    assert stats["crawl_delay"] == 2.0
+    assert stats["rate_limit"] == 0.5
+
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(scheduler.get(), 0.1)
+    await scheduler.aclose()
+
+
+@pytest.mark.parametrize(
+    "robots_txt, delay",
+    [
+        ("User-agent: *\nCrawl-delay: 0.5\n", 0.5),
+        ("User-agent: *\nRequest-rate: 1/5s\nCrawl-delay: 2\n", 5.0),
+        ("User-agent: *\nRequest-rate: 6/1m\n", 10.0),
+        ("User-agent: bot\nCrawl-delay: 9\n\nUser-agent: *\nDisallow: /x\n", None),
+        ("User-agent: a\nUser-agent: *\nCrawl-delay: 3 # slow\n", 3.0),
+        ("Crawl-delay: soon\n", None),
+    ],
+)
+def test_parse_crawl_delay(robots_txt, delay):
+    """Test Crawl-delay and Request-rate parsing for the * group."""
+    assert parse_crawl_delay(robots_txt) == delay
@@ -0,0 +1,122 @@
+"""Tests for the raw HTML cache."""
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+from crawl2md.html_cache import HtmlCache, read_blob
+
+PAGE = "<html><body><h1>Docs</h1><p>" + "Cached text. " * 50 + "</p></body></html>"
+
+
+@pytest.fixture
+def clock():
+    """Patch the cache's clock with a controllable one."""
+    now = [1000.0]
+    with patch("crawl2md.html_cache.time.time", side_effect=lambda: now[0]):
+        yield now
+
+
+def test_put_and_get(tmp_path):
+    """Test that a stored page comes back, compressed on disk."""
+    cache = HtmlCache(str(tmp_path))
+
+    cache.put("https://example.com/docs", PAGE)
+
+    assert cache.get("https://example.com/docs") == PAGE
+    assert cache.get("https://example.com/other") is None
+    page = next(cache.pages())
+    assert read_blob(page.path) == PAGE
+    assert os.path.getsize(page.path) < len(PAGE)
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    cache.close()
+
+
+def test_urls_are_normalized(tmp_path):
+    """Test that URL variants share one cache entry."""
+    cache = HtmlCache(str(tmp_path))
+
+    cache.put("https://Example.com/docs/?utm_source=x", PAGE)
+
+    assert cache.get("https://example.com/docs") == PAGE
+    assert cache.stats()["pages"] == 1
+    cache.close()
+
+
+def test_identical_pages_share_content(tmp_path):
+    """Test that pages with the same HTML are stored once."""
+    cache = HtmlCache(str(tmp_path))
+
+    cache.put("https://example.com/a", PAGE)
+    cache.put("https://example.com/b", PAGE)
+    cache.put("https://example.com/a", PAGE + "<!-- changed -->")
+
+    stats = cache.stats()
+    assert stats["pages"] == 2
+    assert stats["contents"] == 2
+    cache.put("https://example.com/b", PAGE + "<!-- changed -->")
+    assert cache.stats()["contents"] == 1
+    assert len(list((tmp_path / "blobs").rglob("*.html.gz"))) == 1
+    cache.close()
+
+
+def test_expired_pages_are_not_served(tmp_path, clock):
+    """Test that pages older than the TTL are refetched but kept for reprocess."""
+    cache = HtmlCache(str(tmp_path), ttl_seconds=60)
+    cache.put("https://example.com/docs", PAGE)
+
+    clock[0] += 59
+    assert cache.get("https://example.com/docs") == PAGE
+    clock[0] += 1
+    assert cache.get("https://example.com/docs") is None
+    assert [page.url for page in cache.pages()] == ["https://example.com/docs"]
+    cache.close()
+
+
+def test_zero_ttl_never_serves(tmp_path):
+    """Test that a TTL of 0 always fetches but still fills the cache."""
+    cache = HtmlCache(str(tmp_path), ttl_seconds=0)
+    cache.put("https://example.com/docs", PAGE)
+
+    assert cache.get("https://example.com/docs") is None
+    assert cache.stats()["pages"] == 1
+    cache.close()
+
+
+def test_least_recently_used_pages_are_evicted(tmp_path, clock):
+    """Test that the cache evicts the pages read longest ago when full."""
+    pages = {f"https://example.com/page{i}": os.urandom(2000).hex() for i in range(10)}
+    cache = HtmlCache(str(tmp_path), max_size_mb=None)
+    for url, html in pages.items():
+        clock[0] += 1
+        cache.put(url, html)
+    size = cache.stats()["bytes"]
+    cache.close()
+    cache = HtmlCache(str(tmp_path), max_size_mb=size / 1024 / 1024)
+    clock[0] += 1
+    cache.get("https://example.com/page0")
+
+    clock[0] += 1
+    cache.put("https://example.com/page10", os.urandom(2000).hex())
+
+    stats = cache.stats()
+    assert stats["bytes"] <= size
+    assert stats["evicted"] >= 1
+    assert cache.get("https://example.com/page0") is not None
+    assert cache.get("https://example.com/page1") is None
+    assert cache.get("https://example.com/page10") is not None
+    assert len(list((tmp_path / "blobs").rglob("*.html.gz"))) == stats["contents"]
+    cache.close()
+
+
+def test_missing_blob_is_a_miss(tmp_path):
+    """Test that a page whose file was deleted is forgotten instead of failing."""
+    cache = HtmlCache(str(tmp_path))
+    cache.put("https://example.com/docs", PAGE)
+    os.remove(next(cache.pages()).path)
+
+    assert cache.get("https://example.com/docs") is None
+    assert cache.stats()["pages"] == 0
+    cache.close()
@@ -0,0 +1,107 @@
+"""Tests for HtmlCleaner."""
+
+import gc
+import pickle
+import tracemalloc
+from unittest.mock import patch
+
+import pytest
+
+from crawl2md.html_cleaner import HtmlCleaner
+
+
+def test_clean_removes_matching_elements():
+    """Test that elements matching any selector are removed."""
+    cleaner = HtmlCleaner(["nav", ".sidebar", "#footer"])
+    html = (
+        "<nav>Menu</nav><div class='sidebar'>Side</div>"
+        "<p>Content</p><div id='footer'>Foot</div>"
+    )
+
+    result = cleaner.clean(html)
+
+    assert result == "<p>Content</p>"
+
+
+def test_clean_handles_nested_matches():
+    """Test that matches inside removed elements do not break cleaning."""
+    cleaner = HtmlCleaner(["div.outer", "span"])
+    html = "<div class='outer'><span>a</span><div><span>b</span></div></div><p>c</p>"
+
+    assert cleaner.clean(html) == "<p>c</p>"
+
+
+def test_clean_without_selectors_returns_input():
+    """Test that HTML is returned untouched when there are no selectors."""
+    html = "<html><body><p>Content</p></body></html>"
+    assert HtmlCleaner().clean(html) == html
+
+
+def test_invalid_selectors_are_reported_and_skipped():
+    """Test that invalid selectors are collected once and others still apply."""
+    cleaner = HtmlCleaner(["nav", "div >> p", "footer # comment"])
+
+    assert cleaner.invalid_selectors == ["div >> p", "footer # comment"]
+    assert cleaner.clean("<nav>x</nav><p>y</p>") == "<p>y</p>"
+
+
+def test_from_file_skips_comments(tmp_path):
+    """Test loading selectors from a file with comment lines."""
+    selectors_file = tmp_path / "selectors.txt"
+    selectors_file.write_text("-- header\n#header\n\n// footer\nfooter\n")
+
+    cleaner = HtmlCleaner.from_file(str(selectors_file))
+
+    assert cleaner.selectors == ["#header", "footer"]
+
+
+def test_lxml_parser():
+    """Test cleaning with the lxml parser backend."""
+    cleaner = HtmlCleaner(["nav"], parser="lxml")
+
+    result = cleaner.clean("<html><body><nav>x</nav><p>y</p></body></html>")
+
+    assert "<nav>" not in result
+    assert "<p>y</p>" in result
+
+
+def test_lxml_parser_without_lxml():
+    """Test that the lxml parser asks for the extra when lxml is missing."""
+    with patch("crawl2md.html_cleaner.lxml", None):
+        with pytest.raises(RuntimeError, match=r"crawl2md\[lxml\]"):
+            HtmlCleaner(["nav"], parser="lxml")
+        assert HtmlCleaner(["nav"]).clean("<nav>x</nav><p>y</p>") == "<p>y</p>"
+
+
+def test_unknown_parser():
+    """Test that an unknown parser is rejected."""
+    with pytest.raises(ValueError):
+        HtmlCleaner(["nav"], parser="html5lib-typo")
+
+
+def test_cleaner_is_picklable():
+    """Test that a cleaner can be sent to worker processes."""
+    cleaner = pickle.loads(pickle.dumps(HtmlCleaner(["nav"])))
+    assert cleaner.clean("<nav>x</nav><p>y</p>") == "<p>y</p>"
+
+
+def test_clean_frees_the_parse_tree_without_gc():
+    """Regression test: the BeautifulSoup tree must not wait for the cyclic GC.
+
+    A dropped tree is many times the size of its HTML and used to stay
+    allocated until the next full collection.
+    """
+    cleaner = HtmlCleaner(["nav"])
+    html = "<nav>Menu</nav>" + "<div><p>Some <b>text</b></p></div>" * 2_000
+
+    gc.disable()
+    tracemalloc.start()
+    try:
+        cleaned = cleaner.clean(html)
+        retained, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        gc.enable()
+
+    assert "Menu" not in cleaned
+    assert retained < 3 * len(cleaned)
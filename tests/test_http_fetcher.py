@@ -0,0 +1,80 @@
+"""Tests for the plain HTTP fetcher."""
+
+import httpx
+import pytest
+
+from crawl2md.http_fetcher import (
+    HttpFetcher,
+    conditional_headers,
+    looks_js_rendered,
+    visible_text_length,
+)
+
+
+ARTICLE = "<p>" + "Server-rendered documentation text. " * 20 + "</p>"
+
+
+def test_visible_text_ignores_scripts_and_tags():
+    """Test that only visible body text is counted."""
+    html = (
+        "<html><head><title>Title</title></head><body>"
+        "<script>var x = 1;</script><style>p {}</style>"
+        "<p>ab c</p></body></html>"
+    )
+    assert visible_text_length(html) == 3
+
+
+def test_static_page_is_not_js_rendered():
+    """Test that a page with content is fetched over HTTP."""
+    html = f"<html><body><noscript><img src='pixel'></noscript>{ARTICLE}</body></html>"
+    assert not looks_js_rendered(html)
+
+
+@pytest.mark.parametrize(
+    "html",
+    [
+        "<html><body></body></html>",
+        "<html><body><div id='root'></div><script src='app.js'></script></body></html>",
+        f'<html><body><div id="__next"></div>{ARTICLE}</body></html>',
+        f"<html><body><noscript>Please enable JavaScript.</noscript>{ARTICLE}"
+        "</body></html>",
+    ],
+)
+def test_js_rendered_pages_are_detected(html):
+    """Test empty bodies, empty app roots and noscript markers."""
+    assert looks_js_rendered(html)
+
+
+def test_js_heuristics_are_configurable():
+    """Test custom text thresholds and noscript markers."""
+    html = "<html><body><noscript>Turn on scripts</noscript><p>Short</p></body></html>"
+    assert not looks_js_rendered(html, min_text_length=1)
+    assert looks_js_rendered(html, min_text_length=1, js_markers=["turn on scripts"])
+
+
+def test_conditional_headers():
+    """Test building conditional request headers from a validator."""
+    assert conditional_headers(None) == {}
+    assert conditional_headers({"etag": '"v1"', "last_modified": "Mon"}) == {
+        "If-None-Match": '"v1"',
+        "If-Modified-Since": "Mon",
+    }
+
+
+@pytest.mark.asyncio
+async def test_get_sends_conditional_request():
+    """Test that a validator turns the GET into a conditional request."""
+
+    def handler(request):
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, text="<html></html>")
+
+    fetcher = HttpFetcher()
+    fetcher._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    response = await fetcher.get("https://example.com/", {"etag": '"v1"'})
+    assert response.status_code == 304
+    response = await fetcher.get("https://example.com/")
+    assert response.status_code == 200
+    await fetcher.close()
@@ -0,0 +1,107 @@
+"""Tests for the in-flight byte budget."""
+
+import asyncio
+
+import pytest
+
+from crawl2md.memory import ByteBudget, peak_rss_mb
+
+
+@pytest.mark.asyncio
+async def test_acquire_waits_until_bytes_are_released():
+    """Test that acquire blocks while the bytes would exceed the limit."""
+    budget = ByteBudget(100)
+    await budget.acquire(60)
+
+    waiter = asyncio.ensure_future(budget.acquire(60))
+    await asyncio.sleep(0)
+    assert not waiter.done()
+
+    budget.release(60)
+    await waiter
+    assert budget.stats() == {"in_use": 60, "peak": 60, "limit": 100, "waits": 1}
+
+
+@pytest.mark.asyncio
+async def test_oversized_request_passes_when_budget_is_empty():
+    """Test that a page larger than the whole budget cannot block forever."""
+    budget = ByteBudget(100)
+
+    await asyncio.wait_for(budget.acquire(500), timeout=1)
+
+    assert budget.in_use == 500
+
+
+@pytest.mark.asyncio
+async def test_waiters_are_served_in_order():
+    """Test that small requests do not overtake a waiting large one."""
+    budget = ByteBudget(100)
+    await budget.acquire(50)
+    order = []
+
+    async def take(name, size):
+        await budget.acquire(size)
+        order.append(name)
+
+    large = asyncio.ensure_future(take("large", 100))
+    await asyncio.sleep(0)
+    small = asyncio.ensure_future(take("small", 10))
+    await asyncio.sleep(0)
+    assert order == []
+
+    budget.release(50)
+    await large
+    budget.release(100)
+    await small
+    assert order == ["large", "small"]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_leaves_the_queue():
+    """Test that cancelling a waiting acquire lets the next waiter through."""
+    budget = ByteBudget(100)
+    await budget.acquire(100)
+    first = asyncio.ensure_future(budget.acquire(100))
+    second = asyncio.ensure_future(budget.acquire(10))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    await asyncio.gather(first, return_exceptions=True)
+    budget.release(100)
+    await second
+
+    assert budget.in_use == 10
+
+
+@pytest.mark.asyncio
+async def test_waiter_cancelled_during_release():
+    """Test that a release before the cancelled waiter resumes is harmless."""
+    budget = ByteBudget(100)
+    await budget.acquire(100)
+    waiter = asyncio.ensure_future(budget.acquire(100))
+    await asyncio.sleep(0)
+
+    # The release drops the cancelled entry before the waiter runs again
+    waiter.cancel()
+    budget.release(100)
+    results = await asyncio.gather(waiter, return_exceptions=True)
+
+    assert isinstance(results[0], asyncio.CancelledError)
+    assert budget.in_use == 0
+    assert not budget._waiters
+
+
+def test_charge_never_waits_and_counts_towards_the_peak():
+    """Test that charge may exceed the limit and is tracked in the peak."""
+    budget = ByteBudget(100)
+
+    budget.charge(150)
+    budget.release(150)
+
+    assert budget.in_use == 0
+    assert budget.peak == 150
+
+
+def test_peak_rss_is_reported():
+    """Test that the process's peak RSS is available in MB."""
+    assert peak_rss_mb() > 1
@@ -0,0 +1,160 @@
+"""Tests for crawl metrics and their exporters."""
+
+import asyncio
+import io
+import json
+
+import pytest
+
+from crawl2md.metrics import (
+    Histogram,
+    Metrics,
+    MetricsReporter,
+    ProgressDisplay,
+    format_bytes,
+    format_duration,
+    format_status,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_histogram_quantiles():
+    """Test that quantiles are estimated from bucket bounds."""
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.05, 0.5, 3.0):
+        histogram.observe(seconds)
+
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.75) == 1.0
+    assert histogram.quantile(1.0) == 3.0
+    assert histogram.snapshot()["max_ms"] == 3000.0
+
+
+def test_record_result_counts_outcomes_bytes_and_phases():
+    """Test that results update outcome, error, byte and phase metrics."""
+    metrics = Metrics()
+    metrics.record_result(
+        {
+            "url": "a",
+            "success": True,
+            "bytes": 1000,
+            "timings": {"fetch": 0.2, "clean": 0.01, "convert": 0.03},
+        }
+    )
+    metrics.record_result({"url": "b", "success": True, "not_modified": True})
+    metrics.record_result({"url": "c", "success": False, "error_class": "transient"})
+
+    assert metrics.completed == 3
+    assert dict(metrics.outcomes) == {"ok": 1, "not_modified": 1, "failed": 1}
+    assert dict(metrics.errors) == {"transient": 1}
+    assert metrics.bytes == 1000
+    assert metrics.phases["fetch"].count == 1
+    assert metrics.phases["write"].count == 0
+
+
+def test_rates_and_eta_use_recent_window():
+    """Test that rates cover the last window and drive the ETA."""
+    clock = FakeClock()
+    metrics = Metrics(clock=clock)
+    metrics.expect(100, final=True)
+    assert metrics.eta() is None
+
+    for _ in range(20):
+        clock.now += 0.5
+        metrics.record_result({"url": "u", "success": True, "bytes": 100})
+
+    pages_per_second, bytes_per_second = metrics.rates()
+    assert pages_per_second == pytest.approx(2.0, rel=0.1)
+    assert bytes_per_second == pytest.approx(200.0, rel=0.1)
+    assert metrics.eta() == pytest.approx(40.0, rel=0.1)
+
+    clock.now += 60
+    assert metrics.rates() == (0.0, 0.0)
+
+
+def test_prometheus_output():
+    """Test the Prometheus text format of counters, gauges and histograms."""
+    metrics = Metrics()
+    metrics.gauge("in_flight", lambda: 3)
+    metrics.record_result({"url": "a", "success": True, "timings": {"fetch": 0.02}})
+    metrics.record_error("write")
+
+    text = metrics.prometheus()
+
+    assert 'crawl2md_pages_total{outcome="ok"} 1' in text
+    assert 'crawl2md_errors_total{class="write"} 1' in text
+    assert "crawl2md_in_flight 3" in text
+    assert 'crawl2md_phase_seconds_bucket{phase="fetch",le="0.01"} 0' in text
+    assert 'crawl2md_phase_seconds_bucket{phase="fetch",le="0.025"} 1' in text
+    assert 'crawl2md_phase_seconds_count{phase="fetch"} 1' in text
+
+
+def test_format_helpers():
+    """Test duration, size and status line formatting."""
+    assert format_duration(None) == "?"
+    assert format_duration(42.7) == "42s"
+    assert format_duration(304) == "5m04s"
+    assert format_duration(3720) == "1h02m"
+    assert format_bytes(512) == "512 B"
+    assert format_bytes(1536) == "1.5 KB"
+    assert format_bytes(3 * 1024**3) == "3.0 GB"
+
+    metrics = Metrics()
+    metrics.expect(4)
+    metrics.gauge("in_flight", lambda: 2)
+    metrics.record_result({"url": "a", "success": False, "error_class": "permanent"})
+    status = format_status(metrics)
+    assert status.startswith("1/4+")
+    assert "in flight 2" in status
+    assert "errors 1" in status
+    assert "ETA >" in status
+
+
+def test_progress_display_keeps_status_below_output(capsys):
+    """Test that echoed lines clear the status line and redraw it."""
+    stream = io.StringIO()
+    display = ProgressDisplay(Metrics(), stream=stream)
+
+    display.refresh()
+    display.echo("✓ https://example.com/a")
+    display.finish()
+
+    assert capsys.readouterr().out == "✓ https://example.com/a\n"
+    assert stream.getvalue().count("\r\033[K") == 2
+    assert stream.getvalue().endswith("\r\033[K")
+
+
+@pytest.mark.asyncio
+async def test_reporter_writes_stats_file_and_serves_metrics(tmp_path):
+    """Test the JSON stats file and the HTTP metrics endpoint."""
+    metrics = Metrics()
+    metrics.record_result({"url": "a", "success": True})
+    stats_file = str(tmp_path / "stats.json")
+
+    async with MetricsReporter(
+        metrics, stats_file=stats_file, stats_interval=0.01, port=0
+    ) as reporter:
+        await asyncio.sleep(0.05)
+        with open(stats_file) as f:
+            assert json.load(f)["completed"] == 1
+
+        host, port = reporter.address
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n")
+        response = (await reader.read()).decode()
+        writer.close()
+        assert response.startswith("HTTP/1.1 200 OK")
+        assert 'crawl2md_pages_total{outcome="ok"} 1' in response
+
+        metrics.record_result({"url": "b", "success": True})
+
+    with open(stats_file) as f:
+        assert json.load(f)["completed"] == 2
@@ -0,0 +1,87 @@
+"""Tests for per-stage profiling."""
+
+import os
+import pstats
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from crawl2md.profiling import (
+    TIMING_COLUMNS,
+    StageProfile,
+    merge_profiles,
+    start_worker_profile,
+    timed,
+    timing_row,
+)
+
+
+def busy(n):
+    return sum(i * i for i in range(n))
+
+
+def test_timed_records_wall_and_cpu():
+    """Test that wall and CPU time are recorded and repeated blocks add up."""
+    timings = {}
+    with timed(timings, "clean"):
+        busy(100_000)
+    first = timings["clean"]
+    with timed(timings, "clean"):
+        time.sleep(0.02)
+
+    assert timings["clean"] >= first + 0.02
+    assert 0 < timings["clean_cpu"] < timings["clean"]
+
+
+def test_timing_row_matches_columns():
+    """Test that rows follow TIMING_COLUMNS and leave gaps blank."""
+    row = timing_row({"fetch": 0.25, "convert": 0.0105, "convert_cpu": 0.01})
+
+    assert len(row) == len(TIMING_COLUMNS)
+    columns = dict(zip(TIMING_COLUMNS, row))
+    assert columns["fetch_ms"] == "250.0"
+    assert columns["fetch_cpu_ms"] == ""
+    assert columns["convert_ms"] == "10.5"
+    assert columns["convert_cpu_ms"] == "10.0"
+
+
+def test_stage_profile_report():
+    """Test that the breakdown sums stages over pages."""
+    profile = StageProfile()
+    profile.record({"fetch": 0.3, "convert": 0.1, "convert_cpu": 0.1})
+    profile.record({"fetch": 0.5, "convert": 0.1, "convert_cpu": 0.05})
+
+    assert profile.counts["fetch"] == 2
+    assert profile.cpu["fetch"] is None
+    assert profile.cpu["convert"] == pytest.approx(0.15)
+    lines = profile.report()
+    assert lines[0].split() == [
+        "stage",
+        "pages",
+        "wall",
+        "avg",
+        "max",
+        "cpu",
+        "cpu/wall",
+        "share",
+    ]
+    fetch, convert = lines[1].split(), lines[2].split()
+    assert fetch == ["fetch", "2", "0.80s", "400.0ms", "500.0ms", "-", "-", "80%"]
+    assert convert[-2:] == ["75%", "20%"]
+    assert len(lines) == 3
+
+
+def test_worker_profiles_are_merged(tmp_path):
+    """Test that pool workers dump their profiles on exit for merging."""
+    prefix = str(tmp_path / "run.pstats.worker")
+    with ProcessPoolExecutor(
+        max_workers=2, initializer=start_worker_profile, initargs=(prefix,)
+    ) as executor:
+        assert list(executor.map(busy, [1000] * 4)) == [busy(1000)] * 4
+
+    output = str(tmp_path / "run.pstats")
+    assert merge_profiles(output, prefix) == 2
+    assert os.listdir(tmp_path) == ["run.pstats"]
+    functions = {name for _, _, name in pstats.Stats(output).stats}
+    assert "busy" in functions
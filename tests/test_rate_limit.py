@@ -0,0 +1,40 @@
+"""Tests for rate limiting."""
+
+import time
+
+import pytest
+
+from crawl2md.rate_limit import TokenBucket
+
+
+@pytest.mark.asyncio
+async def test_burst_is_immediate():
+    """Test that up to burst tokens are available without waiting."""
+    bucket = TokenBucket(rate=1, burst=5)
+
+    start = time.monotonic()
+    for _ in range(5):
+        await bucket.acquire()
+
+    assert time.monotonic() - start < 0.1
+
+
+@pytest.mark.asyncio
+async def test_rate_is_enforced_after_burst():
+    """Test that tokens beyond the burst are spaced out to the rate."""
+    bucket = TokenBucket(rate=20, burst=1)
+
+    start = time.monotonic()
+    for _ in range(5):
+        await bucket.acquire()
+
+    # 4 tokens after the first one at 20/s take at least 0.2s
+    assert time.monotonic() - start >= 0.19
+
+
+def test_invalid_arguments():
+    """Test that a non-positive rate or burst is rejected."""
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+    with pytest.raises(ValueError):
+        TokenBucket(rate=1, burst=0)
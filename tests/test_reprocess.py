@@ -0,0 +1,86 @@
+"""Tests for rebuilding markdown from the HTML cache."""
+
+import pytest
+
+from crawl2md.html_cache import HtmlCache
+from crawl2md.html_cleaner import HtmlCleaner
+from crawl2md.reprocess import reprocess
+
+PAGE = "<html><body><nav>Menu</nav><h1>Docs</h1><p>Reprocessed text.</p></body></html>"
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_reprocess_writes_cleaned_pages(tmp_path, workers):
+    """Test that every cached page is converted again with the new selectors."""
+    cache = HtmlCache(str(tmp_path / "cache"))
+    urls = [f"https://example.com/docs/page{i}" for i in range(3)]
+    for url in urls:
+        cache.put(url, PAGE)
+    output = tmp_path / "output"
+
+    results = list(
+        reprocess(
+            cache.pages(),
+            str(output),
+            html_cleaner=HtmlCleaner(["nav"]),
+            workers=workers,
+        )
+    )
+
+    assert [url for url, _, _ in results] == urls
+    assert [error for _, error, _ in results] == [None] * 3
+    assert "convert" in results[0][2]
+    markdown = (output / "docs" / "page0.md").read_text()
+    assert markdown.startswith("---")
+    assert "# Docs" in markdown
+    assert "Menu" not in markdown
+    cache.close()
+
+
+def test_reprocess_reports_unreadable_pages(tmp_path):
+    """Test that a page whose cache file is gone is reported, not raised."""
+    cache = HtmlCache(str(tmp_path / "cache"))
+    cache.put("https://example.com/docs", PAGE)
+    page = next(cache.pages())
+    (tmp_path / "cache" / "blobs" / page.digest[:2] / f"{page.digest}.html.gz").unlink()
+
+    [(url, error, timings)] = reprocess([page], str(tmp_path / "output"), workers=1)
+
+    assert url == "https://example.com/docs"
+    assert error
+    assert timings == {}
+    cache.close()
+
+
+def test_reprocess_keeps_crawled_paths(tmp_path):
+    """Test that pages are written to the files their crawl gave them."""
+    cache = HtmlCache(str(tmp_path / "cache"))
+    # Cached as https://example.com/a, which would be planned a.md first
+    cache.put("https://example.com/b", PAGE)
+    cache.put("https://example.com/a/", PAGE)
+    cache.put("https://example.com/a.html", PAGE)
+    output = tmp_path / "output"
+
+    results = list(
+        reprocess(
+            cache.pages(),
+            str(output),
+            workers=1,
+            saved_paths=[
+                ("https://example.com/a.html", "a.md"),
+                ("https://example.com/a/", "a-0123abcd.md"),
+            ],
+        )
+    )
+
+    assert sorted(url for url, _, _ in results) == [
+        "https://example.com/a.html",
+        "https://example.com/a/",
+        "https://example.com/b",
+    ]
+    assert sorted(p.name for p in output.glob("*.md")) == [
+        "a-0123abcd.md",
+        "a.md",
+        "b.md",
+    ]
+    cache.close()
@@ -0,0 +1,99 @@
+"""Tests for browser resource blocking."""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from crawl2md.resource_blocking import (
+    LEAN_BLOCKED_PATTERNS,
+    ResourceBlocker,
+    parse_resource_types,
+)
+
+
+def make_route(url, resource_type):
+    return SimpleNamespace(
+        request=SimpleNamespace(url=url, resource_type=resource_type),
+        abort=AsyncMock(),
+        fallback=AsyncMock(),
+    )
+
+
+class FakePage:
+    def __init__(self):
+        self.route = AsyncMock()
+        self.on = Mock()
+
+
+def test_parse_resource_types():
+    """Test that a comma-separated list is parsed and checked."""
+    assert parse_resource_types(" Image, font ,") == ("image", "font")
+    assert parse_resource_types("") == ()
+    with pytest.raises(ValueError, match="pictures"):
+        parse_resource_types("image,pictures")
+
+
+def test_should_block_by_type_and_pattern():
+    """Test that types, substrings and globs block, and documents never do."""
+    blocker = ResourceBlocker(
+        ["image", "font"], ["docsbot.ai", "https://cdn.example.com/*.js"]
+    )
+
+    assert blocker.should_block("https://example.com/logo.png", "image")
+    assert blocker.should_block("https://widget.DocsBot.ai/chat.js", "script")
+    assert blocker.should_block("https://cdn.example.com/lib/app.js", "script")
+    assert not blocker.should_block("https://cdn.example.com/app.css", "stylesheet")
+    assert not blocker.should_block("https://example.com/app.js", "script")
+    assert not blocker.should_block("https://docsbot.ai/page", "document")
+
+
+@pytest.mark.asyncio
+async def test_handle_aborts_blocked_requests_and_counts():
+    """Test that blocked requests are aborted and the rest fall through."""
+    blocker = ResourceBlocker(["image"], LEAN_BLOCKED_PATTERNS)
+    routes = [
+        make_route("https://example.com/a.png", "image"),
+        make_route("https://example.com/b.png", "image"),
+        make_route("https://www.googletagmanager.com/gtm.js", "script"),
+        make_route("https://example.com/app.js", "script"),
+    ]
+
+    for route in routes:
+        await blocker.handle(route)
+
+    assert [r.abort.await_count for r in routes] == [1, 1, 1, 0]
+    routes[3].fallback.assert_awaited_once()
+    assert blocker.stats() == {
+        "blocked": 3,
+        "blocked_by_type": {"image": 2, "script": 1},
+        "allowed": 1,
+        "bytes_received": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_install_routes_each_page_once():
+    """Test that the hook routes a page once and counts response bytes."""
+    blocker = ResourceBlocker(["font"])
+    page = FakePage()
+
+    assert await blocker.install(page, context=None, config=None) is page
+    await blocker.install(page)
+
+    page.route.assert_awaited_once_with("**/*", blocker.handle)
+    page.on.assert_called_once_with("response", blocker.record_response)
+    blocker.record_response(SimpleNamespace(headers={"content-length": "2048"}))
+    blocker.record_response(SimpleNamespace(headers={}))
+    assert blocker.stats()["bytes_received"] == 2048
+
+
+@pytest.mark.asyncio
+async def test_install_without_rules_only_counts_bytes():
+    """Test that nothing is intercepted when nothing is blocked."""
+    page = FakePage()
+
+    await ResourceBlocker().install(page)
+
+    page.route.assert_not_awaited()
+    page.on.assert_called_once()
@@ -0,0 +1,67 @@
+"""Tests for the retry policy."""
+
+import pytest
+
+from crawl2md.retry import (
+    ERROR_PERMANENT,
+    ERROR_TRANSIENT,
+    RetryPolicy,
+    classify_failure,
+)
+
+
+@pytest.mark.parametrize(
+    "result, error_class",
+    [
+        ({"error": "HTTP 503", "status_code": 503}, ERROR_TRANSIENT),
+        ({"error": "HTTP 429", "status_code": 429}, ERROR_TRANSIENT),
+        ({"error": "HTTP 404", "status_code": 404}, ERROR_PERMANENT),
+        ({"error": "Page.goto: Timeout 30000ms exceeded"}, ERROR_TRANSIENT),
+        ({"error": "net::ERR_CONNECTION_RESET"}, ERROR_TRANSIENT),
+        ({"error": "Target page, context or browser has been closed"}, ERROR_TRANSIENT),
+        ({"error": "Unsupported content type 'application/pdf'"}, ERROR_PERMANENT),
+        ({"error": "Document is empty"}, ERROR_PERMANENT),
+    ],
+)
+def test_classify_failure(result, error_class):
+    """Test transient versus permanent classification."""
+    assert classify_failure(result) == error_class
+
+
+def test_next_delay_backs_off_with_jitter():
+    """Test that delays stay under the doubling cap."""
+    policy = RetryPolicy(max_attempts=5, base_delay=1.0, max_delay=3.0)
+    policy.record_attempt(1)
+    failure = {"error": "timeout"}
+
+    for attempt, cap in [(1, 1.0), (2, 2.0), (3, 3.0), (4, 3.0)]:
+        delay = policy.next_delay(failure, attempt)
+        assert 0 <= delay <= cap
+
+    assert policy.next_delay(failure, 5) is None
+
+
+def test_next_delay_skips_permanent_failures():
+    """Test that permanent failures are never retried."""
+    policy = RetryPolicy()
+    assert policy.next_delay({"error": "HTTP 404", "status_code": 404}, 1) is None
+    assert policy.stats() == {"retries": 0, "budget_exhausted": 0}
+
+
+def test_next_delay_honors_retry_after():
+    """Test that Retry-After sets a lower bound on the delay."""
+    policy = RetryPolicy(base_delay=0.1)
+    failure = {"error": "HTTP 429", "status_code": 429, "retry_after": 5}
+    assert policy.next_delay(failure, 1) == 5
+
+
+def test_retry_budget():
+    """Test that retries are capped by the budget earned by first attempts."""
+    policy = RetryPolicy(max_attempts=10, budget=0.5, min_budget=1)
+    for _ in range(4):
+        policy.record_attempt(1)
+
+    granted = [policy.next_delay({"error": "timeout"}, 1) for _ in range(5)]
+
+    assert sum(delay is not None for delay in granted) == 3
+    assert policy.stats() == {"retries": 3, "budget_exhausted": 2}
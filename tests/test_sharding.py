@@ -0,0 +1,177 @@
+"""Tests for crawls sharded over processes."""
+
+import asyncio
+import csv
+import functools
+import queue
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import Mock
+
+import pytest
+
+from crawl2md.cli import _build_crawler
+from crawl2md.crawler import Crawler
+from crawl2md.distributed import Coordinator, Worker
+from crawl2md.file_handler import FileHandler
+from crawl2md.sharding import ProcessShards, ShardInbox, shard_of
+from crawl2md.sitemap import SitemapEntry
+from crawl2md.state import CrawlState
+from crawl2md.work_queue import OUTCOME_ERROR, OUTCOME_OK
+from crawl2md.writer import OutputWriter
+from tests.test_crawler import STATIC_PAGE, mock_http_fetcher
+
+BASE = "https://example.com"
+
+
+def make_crawler(**options):
+    return functools.partial(
+        _build_crawler,
+        max_concurrent=2,
+        fetcher="http",
+        max_attempts=1,
+        retry_base_delay=0.0,
+        retry_budget=0.0,
+        min_text_length=0,
+        js_markers=(),
+        rate_limit=None,
+        **options,
+    )
+
+
+def test_shard_of_is_stable_and_spread():
+    """Test that a URL always maps to the same shard and shards are used evenly."""
+    urls = [f"{BASE}/docs/page{i}" for i in range(1000)]
+
+    shards = [shard_of(url, 4) for url in urls]
+
+    assert shards == [shard_of(url, 4) for url in urls]
+    # Pinned, so a change of hash (which would reshuffle resumed runs) shows
+    assert shard_of(urls[0], 4) == 3
+    for shard in range(4):
+        assert 200 < shards.count(shard) < 300
+
+
+def test_put_routes_tasks_to_their_shard():
+    """Test that a batch is split into one item per shard."""
+    shards = ProcessShards(3, make_crawler(), BASE, "unused")
+    tasks = [{"url": f"{BASE}/page{i}"} for i in range(12)]
+
+    shards.put(tasks)
+
+    routed = {}
+    for index, inbox in enumerate(shards._inboxes):
+        while True:
+            try:
+                item_id, part = inbox.get(timeout=0.5)
+            except queue.Empty:
+                break
+            assert {shard_of(t["url"], 3) for t in part} == {index}
+            routed[item_id] = part
+    assert sorted(t["url"] for part in routed.values() for t in part) == sorted(
+        t["url"] for t in tasks
+    )
+    assert sum(shards.urls_per_shard) == 12
+    assert shards.counts()["pending"] == len(routed)
+
+
+def test_dead_process_fails_its_urls():
+    """Test that the unfinished URLs of a crashed shard are reported as failed."""
+    shards = ProcessShards(2, make_crawler(), BASE, "unused")
+    shards._workers = [Mock(exitcode=-9), Mock(exitcode=None)]
+    shards._workers[0].name = "crawl2md-shard-0"
+    tasks = [{"url": f"{BASE}/page{i}"} for i in range(8)]
+    shards.put(tasks)
+    shards.close_input()
+
+    results = shards.pop_results()
+
+    lost = [o for _, outcomes in results for o in outcomes]
+    assert {o["url"] for o in lost} == {
+        t["url"] for t in tasks if shard_of(t["url"], 2) == 0
+    }
+    assert {o["status"] for o in lost} == {OUTCOME_ERROR}
+    assert "crawl2md-shard-0 exited with code -9" in lost[0]["error"]
+    assert shards.finished() is False
+
+
+@pytest.mark.asyncio
+async def test_worker_runs_on_shard_inbox(tmp_path):
+    """Test that a Worker crawls items from a shard inbox until it closes."""
+    pages = {f"{BASE}/docs/page{i}": STATIC_PAGE for i in range(4)}
+    inbox, outbox = queue.Queue(), queue.Queue()
+    inbox.put((1, [{"url": url} for url in list(pages)[:2]]))
+    inbox.put((2, [{"url": url} for url in list(pages)[2:]]))
+    inbox.put(None)
+    crawler = Crawler(
+        rate_limit=None, fetcher="http", http_fetcher=mock_http_fetcher(pages)
+    )
+
+    counts = await Worker(
+        ShardInbox(inbox, outbox),
+        crawler,
+        FileHandler(BASE, str(tmp_path)),
+        poll_interval=0.01,
+        log=lambda line: None,
+    ).run()
+
+    results = dict(outbox.get_nowait() for _ in range(2))
+    assert counts["items"] == 2
+    assert [o["status"] for o in results[1] + results[2]] == [OUTCOME_OK] * 4
+    assert results[1][0]["bytes"] == len(STATIC_PAGE)
+    assert "process" in results[1][0]["timings"]
+    assert (tmp_path / "docs" / "page3.md").exists()
+
+
+@pytest.fixture
+def static_site(tmp_path):
+    """Serve a few static pages over HTTP from a temporary directory."""
+    site = tmp_path / "site"
+    (site / "docs").mkdir(parents=True)
+    for i in range(6):
+        (site / "docs" / f"page{i}.html").write_text(STATIC_PAGE)
+    handler = functools.partial(SimpleHTTPRequestHandler, directory=str(site))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address[:2]
+    yield f"http://{host}:{port}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.asyncio
+async def test_processes_crawl_into_one_result_file(tmp_path, static_site):
+    """Test that shard processes crawl every URL and results are merged here."""
+    output = str(tmp_path / "output")
+    result_file = str(tmp_path / "result.csv")
+    urls = [f"{static_site}/docs/page{i}.html" for i in range(6)]
+    urls.append(f"{static_site}/docs/missing.html")
+    shards = ProcessShards(2, make_crawler(), static_site, output)
+    state = CrawlState.in_directory(output)
+
+    async def entries():
+        for url in urls:
+            yield SitemapEntry(url)
+
+    shards.start()
+    try:
+        async with OutputWriter(FileHandler(static_site, output), result_file) as w:
+            counts = await asyncio.wait_for(
+                Coordinator(
+                    shards, state, w, poll_interval=0.05, log=lambda line: None
+                ).run(entries()),
+                timeout=60,
+            )
+    finally:
+        shards.close()
+
+    assert counts["OK"] == 6
+    assert counts["ERROR"] == 1
+    assert state.counts() == {"pending": 0, "done": 6, "failed": 1}
+    with open(result_file, newline="") as f:
+        assert sorted(url for _, url in list(csv.reader(f))[1:]) == sorted(urls)
+    for i in range(6):
+        assert (tmp_path / "output" / "docs" / f"page{i}.md").exists()
+    assert all(process.exitcode == 0 for process in shards._workers)
+    state.close()
@@ -1,9 +1,13 @@
 """Tests for sitemap parser."""
 
+import gzip
+
+import httpx
 import pytest
 from unittest.mock import Mock, patch
 
-from crawl2md.sitemap import SitemapParser
+from crawl2md.dedup import normalize_url
+from crawl2md.sitemap import SitemapEntry, SitemapParser
 
 
 @pytest.fixture
@@ -64,3 +68,167 @@ def test_get_urls_empty_sitemap():
         urls = parser.get_urls()
 
         assert len(urls) == 0
+
+
+def test_get_entries_with_metadata():
+    """Test extracting lastmod, changefreq and priority."""
+    with patch("crawl2md.sitemap.requests.get") as mock_get:
+        mock_response = Mock()
+        mock_response.content = b"""<?xml version="1.0" encoding="UTF-8"?>
+        <urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+            <url>
+                <loc>https://example.com/a</loc>
+                <lastmod>2025-01-22</lastmod>
+                <changefreq>weekly</changefreq>
+                <priority>0.8</priority>
+            </url>
+            <url>
+                <loc>https://example.com/b</loc>
+            </url>
+        </urlset>"""
+        mock_get.return_value = mock_response
+
+        parser = SitemapParser("https://example.com/sitemap.xml")
+        entries = parser.get_entries()
+
+        assert entries == [
+            SitemapEntry("https://example.com/a", "2025-01-22", "weekly", 0.8),
+            SitemapEntry("https://example.com/b"),
+        ]
+
+
+def serve_sitemaps(pages):
+    """Patch the parser's HTTP client to serve ``pages`` by URL."""
+    real_client = httpx.AsyncClient
+    requested = []
+
+    def handler(request):
+        url = str(request.url)
+        requested.append(url)
+        if url not in pages:
+            return httpx.Response(404)
+        return httpx.Response(200, content=pages[url])
+
+    def make_client(**kwargs):
+        return real_client(transport=httpx.MockTransport(handler), **kwargs)
+
+    return patch("crawl2md.sitemap.httpx.AsyncClient", make_client), requested
+
+
+async def collect(parser):
+    return [entry async for entry in parser.iter_entries()]
+
+
+@pytest.mark.asyncio
+async def test_iter_entries_urlset():
+    """Test streaming entries with metadata from a plain sitemap."""
+    pages = {
+        "https://example.com/sitemap.xml": b"""<?xml version="1.0"?>
+        <urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+            <url><loc>https://example.com/a</loc><lastmod>2025-01-22</lastmod></url>
+            <url><loc>https://example.com/b</loc><priority>0.5</priority></url>
+            <url><loc>https://example.com/a</loc></url>
+        </urlset>"""
+    }
+    patcher, _ = serve_sitemaps(pages)
+    with patcher:
+        entries = await collect(SitemapParser("https://example.com/sitemap.xml"))
+
+    assert entries == [
+        SitemapEntry("https://example.com/a", "2025-01-22"),
+        SitemapEntry("https://example.com/b", priority=0.5),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_iter_entries_follows_index_and_gzip():
+    """Test that sitemap indexes are followed, including gzipped children."""
+    pages = {
+        "https://example.com/sitemap.xml": b"""<?xml version="1.0"?>
+        <sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+            <sitemap><loc>https://example.com/pages.xml</loc></sitemap>
+            <sitemap><loc>https://example.com/posts.xml.gz</loc></sitemap>
+            <sitemap><loc>https://example.com/pages.xml</loc></sitemap>
+        </sitemapindex>""",
+        "https://example.com/pages.xml": b"""<urlset>
+            <url><loc>https://example.com/</loc></url>
+            <url><loc>https://example.com/shared</loc></url>
+        </urlset>""",
+        "https://example.com/posts.xml.gz": gzip.compress(
+            b"""<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+            <url><loc>https://example.com/post-1</loc></url>
+            <url><loc>https://example.com/shared</loc></url>
+            </urlset>"""
+        ),
+    }
+    patcher, requested = serve_sitemaps(pages)
+    with patcher:
+        entries = await collect(SitemapParser("https://example.com/sitemap.xml"))
+
+    assert sorted(entry.loc for entry in entries) == [
+        "https://example.com/",
+        "https://example.com/post-1",
+        "https://example.com/shared",
+    ]
+    assert requested.count("https://example.com/pages.xml") == 1
+
+
+@pytest.mark.asyncio
+async def test_iter_entries_merges_normalized_variants():
+    """Test that URL variants are yielded once, as first written."""
+    pages = {
+        "https://example.com/sitemap.xml": b"""<urlset>
+            <url><loc>https://example.com/a/</loc></url>
+            <url><loc>https://example.com/a?utm_source=feed</loc></url>
+            <url><loc>https://EXAMPLE.com/a#top</loc></url>
+            <url><loc>https://example.com/b</loc></url>
+        </urlset>"""
+    }
+    patcher, _ = serve_sitemaps(pages)
+    with patcher:
+        parser = SitemapParser(
+            "https://example.com/sitemap.xml", url_normalizer=normalize_url
+        )
+        entries = await collect(parser)
+
+    assert [entry.loc for entry in entries] == [
+        "https://example.com/a/",
+        "https://example.com/b",
+    ]
+    assert parser.duplicates == 2
+
+
+@pytest.mark.asyncio
+async def test_iter_entries_skips_failing_child_sitemaps():
+    """Test that a bad child sitemap is recorded and the others still read."""
+    pages = {
+        "https://example.com/sitemap.xml": b"""<sitemapindex>
+            <sitemap><loc>https://example.com/missing.xml</loc></sitemap>
+            <sitemap><loc>https://example.com/broken.xml</loc></sitemap>
+            <sitemap><loc>https://example.com/pages.xml</loc></sitemap>
+        </sitemapindex>""",
+        "https://example.com/broken.xml": b"<urlset><url><loc>",
+        "https://example.com/pages.xml": b"""<urlset>
+            <url><loc>https://example.com/a</loc></url>
+        </urlset>""",
+    }
+    parser = SitemapParser("https://example.com/sitemap.xml")
+    patcher, _ = serve_sitemaps(pages)
+    with patcher:
+        entries = await collect(parser)
+
+    assert entries == [SitemapEntry("https://example.com/a")]
+    failed = dict(parser.failed_sitemaps)
+    assert sorted(failed) == [
+        "https://example.com/broken.xml",
+        "https://example.com/missing.xml",
+    ]
+    assert isinstance(failed["https://example.com/missing.xml"], httpx.HTTPStatusError)
+
+
+@pytest.mark.asyncio
+async def test_iter_entries_raises_on_http_error():
+    """Test that a top-level sitemap that cannot be fetched aborts the stream."""
+    patcher, _ = serve_sitemaps({})
+    with patcher, pytest.raises(httpx.HTTPStatusError):
+        await collect(SitemapParser("https://example.com/sitemap.xml"))
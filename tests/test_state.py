@@ -0,0 +1,175 @@
+"""Tests for crawl state store."""
+
+import os
+
+import pytest
+
+from crawl2md.sitemap import SitemapEntry
+from crawl2md.state import STATE_FILENAME, CrawlState
+
+
+@pytest.fixture
+def state(tmp_path):
+    """Open a state store in a temporary directory."""
+    with CrawlState.in_directory(str(tmp_path)) as state:
+        yield state
+
+
+def test_in_directory_creates_file(tmp_path):
+    """Test that the store is created inside the output directory."""
+    output = tmp_path / "output"
+    CrawlState.in_directory(str(output)).close()
+    assert os.path.exists(output / STATE_FILENAME)
+
+
+def test_add_urls_starts_pending(state):
+    """Test that new URLs are registered as pending."""
+    state.add_urls(["https://example.com/a", "https://example.com/b"])
+
+    assert state.counts() == {"pending": 2, "done": 0, "failed": 0}
+    assert state.get("https://example.com/a")["attempts"] == 0
+
+
+def test_is_done_only_for_done_urls(state):
+    """Test that pending, failed and unknown URLs are not done."""
+    urls = ["https://example.com/a", "https://example.com/b", "https://example.com/c"]
+    state.add_urls(urls)
+    state.mark_done("https://example.com/b", "abc123")
+    state.mark_failed("https://example.com/c", "timeout")
+
+    assert [state.is_done(url) for url in urls] == [False, True, False]
+    assert not state.is_done("https://example.com/unknown")
+
+
+def test_record_tracks_attempts_hash_and_error(state):
+    """Test that each record increments attempts and keeps details."""
+    url = "https://example.com/a"
+    state.add_urls([url])
+    state.mark_failed(url, "timeout")
+    state.mark_done(url, "abc123")
+
+    record = state.get(url)
+    assert record["status"] == "done"
+    assert record["attempts"] == 2
+    assert record["content_hash"] == "abc123"
+    assert record["error"] is None
+    assert record["updated_at"]
+
+
+def test_record_counts_retries_and_error_class(state):
+    """Test that retried attempts and the final error class are stored."""
+    url = "https://example.com/a"
+    state.mark_failed(url, "Timeout", error_class="transient", attempts=3)
+
+    record = state.get(url)
+    assert record["attempts"] == 3
+    assert record["error_class"] == "transient"
+
+    state.mark_done(url, "abc123", attempts=2)
+    record = state.get(url)
+    assert record["attempts"] == 5
+    assert record["error_class"] is None
+
+
+def test_add_urls_keeps_existing_status(state):
+    """Test that re-adding URLs does not reset their state."""
+    url = "https://example.com/a"
+    state.add_urls([url])
+    state.mark_done(url, "abc123")
+    state.add_urls([url])
+
+    assert state.get(url)["status"] == "done"
+
+
+def test_state_persists_across_reopen(tmp_path):
+    """Test that records survive closing and reopening the store."""
+    url = "https://example.com/a"
+    with CrawlState.in_directory(str(tmp_path)) as state:
+        state.add_urls([url])
+        state.mark_done(url, "abc123")
+
+    with CrawlState.in_directory(str(tmp_path)) as state:
+        assert state.is_done(url)
+
+
+def test_get_unknown_url(state):
+    """Test that unknown URLs return None."""
+    assert state.get("https://example.com/missing") is None
+
+
+def test_mark_done_stores_validators(state):
+    """Test that lastmod, ETag and Last-Modified are kept."""
+    url = "https://example.com/a"
+    state.mark_done(url, "abc", lastmod="2025-01-01", etag='"v1"', last_modified="Wed")
+
+    record = state.get(url)
+    assert record["lastmod"] == "2025-01-01"
+    assert record["etag"] == '"v1"'
+    assert record["last_modified"] == "Wed"
+
+
+def test_mark_not_modified_keeps_hash_and_validators(state):
+    """Test that a 304 keeps the stored content hash and validators."""
+    url = "https://example.com/a"
+    state.mark_done(url, "abc", lastmod="2025-01-01", etag='"v1"')
+    state.mark_not_modified(url, lastmod="2025-02-01")
+
+    record = state.get(url)
+    assert record["attempts"] == 2
+    assert record["content_hash"] == "abc"
+    assert record["etag"] == '"v1"'
+    assert record["lastmod"] == "2025-02-01"
+
+
+def test_plan_entry(state):
+    """Test skipping unchanged lastmod and revalidating the rest."""
+    state.mark_done("https://example.com/same", "h", lastmod="2025-01-01")
+    state.mark_done("https://example.com/moved", "h", lastmod="2025-01-01", etag="e")
+    state.mark_done("https://example.com/nolastmod", "h", last_modified="Wed")
+    state.mark_failed("https://example.com/failed", "timeout")
+
+    entries = [
+        SitemapEntry("https://example.com/same", lastmod="2025-01-01"),
+        SitemapEntry("https://example.com/moved", lastmod="2025-03-01"),
+        SitemapEntry("https://example.com/nolastmod"),
+        SitemapEntry("https://example.com/failed", lastmod="2025-01-01"),
+        SitemapEntry("https://example.com/new", lastmod="2025-01-01"),
+    ]
+
+    assert [state.plan_entry(entry) for entry in entries] == [
+        (False, None),
+        (True, {"etag": "e", "last_modified": None}),
+        (True, {"etag": None, "last_modified": "Wed"}),
+        (True, None),
+        (True, None),
+    ]
+
+
+def test_find_content_skips_duplicates(state):
+    """Test that only URLs holding the content themselves are returned."""
+    state.mark_done(
+        "https://example.com/b", "abc", duplicate_of="https://example.com/a"
+    )
+    assert state.find_content("abc") is None
+
+    state.mark_done("https://example.com/a", "abc")
+    assert state.find_content("abc") == "https://example.com/a"
+    assert state.get("https://example.com/b")["duplicate_of"] == (
+        "https://example.com/a"
+    )
+
+
+def test_saved_paths_keep_the_first_path(state):
+    """Test that a URL keeps the path first recorded for it."""
+    state.mark_done("https://example.com/a", "abc")
+    state.save_paths(
+        [("https://example.com/a", "a.md"), ("https://example.com/b", "b.md")]
+    )
+    state.save_paths([("https://example.com/a", "a-0123abcd.md")])
+
+    assert sorted(state.saved_paths()) == [
+        ("https://example.com/a", "a.md"),
+        ("https://example.com/b", "b.md"),
+    ]
+    assert state.get("https://example.com/a")["status"] == "done"
+    assert state.get("https://example.com/b")["status"] == "pending"
@@ -0,0 +1,247 @@
+"""Tests for the shared work queue."""
+
+import random
+from unittest.mock import patch
+
+import pytest
+
+from crawl2md.work_queue import (
+    OUTCOME_ERROR,
+    OUTCOME_OK,
+    RedisWorkQueue,
+    SqliteWorkQueue,
+    open_queue,
+)
+
+
+class FakeRedis:
+    """In-memory stand-in for the redis-py client commands the queue uses.
+
+    Keys with a PX expiry disappear once ``clock()`` passes it, like in
+    Redis; values are stored as strings (decode_responses=True).
+    """
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.data = {}
+        self.expires = {}
+
+    def _get(self, key):
+        if key in self.expires and self.expires[key] <= self.clock():
+            self.data.pop(key, None)
+            del self.expires[key]
+        return self.data.get(key)
+
+    def incr(self, key):
+        value = int(self._get(key) or 0) + 1
+        self.data[key] = str(value)
+        return value
+
+    def set(self, key, value, nx=False, xx=False, px=None):
+        exists = self._get(key) is not None
+        if (nx and exists) or (xx and not exists):
+            return None
+        self.data[key] = str(value)
+        self.expires.pop(key, None)
+        if px is not None:
+            self.expires[key] = self.clock() + px / 1000
+        return True
+
+    def get(self, key):
+        return self._get(key)
+
+    def pexpire(self, key, px):
+        if self._get(key) is None:
+            return False
+        self.expires[key] = self.clock() + px / 1000
+        return True
+
+    def exists(self, *keys):
+        return sum(self._get(key) is not None for key in keys)
+
+    def delete(self, *keys):
+        removed = 0
+        for key in keys:
+            removed += self._get(key) is not None
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return removed
+
+    def sadd(self, key, *members):
+        members = {str(m) for m in members}
+        current = self.data.setdefault(key, set())
+        added = len(members - current)
+        current |= members
+        return added
+
+    def srem(self, key, *members):
+        current = self.data.get(key, set())
+        members = {str(m) for m in members}
+        removed = len(members & current)
+        current -= members
+        return removed
+
+    def scard(self, key):
+        return len(self.data.get(key, set()))
+
+    def smembers(self, key):
+        return set(self.data.get(key, set()))
+
+    def srandmember(self, key, count):
+        members = sorted(self.data.get(key, set()))
+        return random.sample(members, min(count, len(members)))
+
+    def rpush(self, key, *values):
+        self.data.setdefault(key, []).extend(values)
+        return len(self.data[key])
+
+    def lpop(self, key):
+        values = self.data.get(key)
+        return values.pop(0) if values else None
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def clock():
+    """Controllable time for lease expiry; advance with ``clock.now += s``."""
+
+    class Clock:
+        now = 1_000.0
+
+        def __call__(self):
+            return self.now
+
+    clock = Clock()
+    with patch("crawl2md.work_queue.time.time", clock):
+        yield clock
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def queue(request, tmp_path, clock):
+    """Open each queue backend with a max of two leases per item."""
+    if request.param == "sqlite":
+        queue = SqliteWorkQueue(str(tmp_path / "queue.sqlite"), max_leases=2)
+    else:
+        queue = RedisWorkQueue(FakeRedis(clock), name="test", max_leases=2)
+    yield queue
+    queue.close()
+
+
+def tasks(*paths):
+    return [{"url": f"https://example.com/{path}"} for path in paths]
+
+
+def ok(item):
+    return [{"url": task["url"], "status": OUTCOME_OK} for task in item.tasks]
+
+
+def test_lease_hands_each_item_to_one_worker(queue):
+    """Test that a leased item is not leased again while the lease holds."""
+    queue.put(tasks("a", "b"))
+    queue.put(tasks("c"))
+
+    first = queue.lease("w1", 60)
+    second = queue.lease("w2", 60)
+
+    assert {first.id, second.id} == {1, 2}
+    assert first.leases == 1
+    assert queue.lease("w3", 60) is None
+    assert queue.counts() == {"pending": 0, "leased": 2, "done": 0}
+
+
+def test_expired_lease_is_reclaimed(queue, clock):
+    """Test that a worker that stops renewing loses its item to another."""
+    item_id = queue.put(tasks("a"))
+    item = queue.lease("dead", 60)
+
+    clock.now += 61
+    reclaimed = queue.lease("w2", 60)
+
+    assert reclaimed.id == item_id
+    assert reclaimed.tasks == item.tasks
+    assert reclaimed.leases == 2
+    assert queue.renew(item_id, "dead", 60) is False
+    assert queue.renew(item_id, "w2", 60) is True
+
+
+def test_renew_keeps_the_lease(queue, clock):
+    """Test that a renewed lease does not expire at its original deadline."""
+    queue.put(tasks("a"))
+    item = queue.lease("w1", 60)
+
+    clock.now += 50
+    assert queue.renew(item.id, "w1", 60) is True
+    clock.now += 50
+
+    assert queue.lease("w2", 60) is None
+
+
+def test_first_completion_wins(queue, clock):
+    """Test that a late report from a presumed dead worker is dropped."""
+    queue.put(tasks("a"))
+    stale = queue.lease("slow", 60)
+    clock.now += 61
+    fresh = queue.lease("w2", 60)
+
+    assert queue.complete(fresh.id, "w2", ok(fresh)) is True
+    assert queue.complete(stale.id, "slow", ok(stale)) is False
+    assert queue.pop_results() == [(fresh.id, ok(fresh))]
+    assert queue.pop_results() == []
+
+
+def test_item_is_given_up_after_max_leases(queue, clock):
+    """Test that an item no worker finishes is reported as failed."""
+    item_id = queue.put(tasks("crash"))
+    leased = []
+    for _ in range(3):
+        item = queue.lease("w", 60)
+        leased.append(item and item.id)
+        clock.now += 61
+
+    assert leased == [item_id, item_id, None]
+    (result,) = queue.pop_results()
+    assert result[1][0]["url"] == "https://example.com/crash"
+    assert result[1][0]["status"] == OUTCOME_ERROR
+    assert "2 times" in result[1][0]["error"]
+
+
+def test_finished_waits_for_closed_input(queue):
+    """Test that the queue is only finished once closed and drained."""
+    queue.put(tasks("a"))
+    item = queue.lease("w1", 60)
+    queue.complete(item.id, "w1", ok(item))
+
+    assert queue.finished() is False
+    queue.close_input()
+    assert queue.finished() is True
+    assert queue.counts()["done"] == 1
+
+
+def test_clear_starts_a_new_run(queue):
+    """Test that clear drops items, results and the closed marker."""
+    queue.put(tasks("a"))
+    item = queue.lease("w1", 60)
+    queue.complete(item.id, "w1", ok(item))
+    queue.put(tasks("b"))
+    queue.close_input()
+
+    queue.clear()
+
+    assert queue.pop_results() == []
+    assert queue.lease("w1", 60) is None
+    assert queue.finished() is False
+
+
+def test_open_queue_picks_backend(tmp_path):
+    """Test that paths open SQLite and Redis URLs need the redis package."""
+    queue = open_queue(str(tmp_path / "q.sqlite"))
+    assert isinstance(queue, SqliteWorkQueue)
+    queue.close()
+
+    with (
+        patch("crawl2md.work_queue.redis", None),
+        pytest.raises(RuntimeError, match="crawl2md\\[redis\\]"),
+    ):
+        open_queue("redis://localhost:6379/0")
@@ -0,0 +1,181 @@
+"""Tests for the asynchronous output writer."""
+
+import asyncio
+import csv
+import os
+import sqlite3
+
+import pytest
+
+from crawl2md.file_handler import FileHandler
+from crawl2md.memory import ByteBudget
+from crawl2md.writer import OutputWriter
+
+
+def read_rows(path):
+    with open(path, newline="") as f:
+        return list(csv.reader(f))
+
+
+@pytest.mark.asyncio
+async def test_writer_saves_files_and_rows(tmp_path):
+    """Test that files are written before on_saved and rows are flushed."""
+    handler = FileHandler("https://example.com", str(tmp_path / "out"))
+    result_file = str(tmp_path / "result.csv")
+    saved = []
+
+    async with OutputWriter(handler, result_file) as writer:
+        for i in range(5):
+            url = f"https://example.com/docs/page{i}"
+            await writer.write_markdown(
+                url, f"# Page {i}", on_saved=lambda path, url=url: saved.append(url)
+            )
+        writer.write_row("ERROR", "https://example.com/broken")
+
+    assert len(saved) == 5
+    assert (tmp_path / "out" / "docs" / "page3.md").read_text() == "# Page 3"
+    assert read_rows(result_file) == [
+        ["status", "url"],
+        ["ERROR", "https://example.com/broken"],
+    ]
+    stats = writer.stats()
+    assert stats["files"] == 5
+    assert stats["errors"] == 0
+    assert stats["max_write_ms"] >= stats["avg_write_ms"] > 0
+
+
+@pytest.mark.asyncio
+async def test_writer_flushes_rows_periodically(tmp_path):
+    """Test that buffered rows reach the CSV without waiting for close."""
+    handler = FileHandler("https://example.com", str(tmp_path))
+    result_file = str(tmp_path / "result.csv")
+
+    async with OutputWriter(handler, result_file, csv_flush_interval=0.01) as writer:
+        writer.write_row("OK", "https://example.com/a")
+        await asyncio.sleep(0.1)
+        assert read_rows(result_file)[-1] == ["OK", "https://example.com/a"]
+
+
+@pytest.mark.asyncio
+async def test_writer_appends_without_header(tmp_path):
+    """Test that append mode keeps existing rows and skips the header."""
+    handler = FileHandler("https://example.com", str(tmp_path))
+    result_file = tmp_path / "result.csv"
+    result_file.write_text("status,url\r\nOK,https://example.com/a\r\n")
+
+    async with OutputWriter(handler, str(result_file), append=True) as writer:
+        writer.write_row("OK", "https://example.com/b")
+
+    assert read_rows(str(result_file)) == [
+        ["status", "url"],
+        ["OK", "https://example.com/a"],
+        ["OK", "https://example.com/b"],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_writer_reports_write_errors(tmp_path):
+    """Test that a failed write calls on_error instead of on_saved."""
+    blocker = tmp_path / "out"
+    blocker.write_text("not a directory")
+    handler = FileHandler("https://example.com", str(blocker))
+    errors = []
+
+    async with OutputWriter(handler, str(tmp_path / "result.csv")) as writer:
+        await writer.write_markdown(
+            "https://example.com/a",
+            "# A",
+            on_saved=lambda path: pytest.fail("should not be saved"),
+            on_error=errors.append,
+        )
+
+    assert len(errors) == 1
+    assert isinstance(errors[0], OSError)
+    assert writer.stats()["errors"] == 1
+    assert os.path.isfile(blocker)
+
+
+@pytest.mark.asyncio
+async def test_writer_survives_failing_callbacks(tmp_path):
+    """Test that a raising callback neither stops the writer nor is lost."""
+    handler = FileHandler("https://example.com", str(tmp_path / "out"))
+
+    def on_saved(path):
+        raise sqlite3.OperationalError("database is locked")
+
+    writer = OutputWriter(handler, None, threads=2, max_queue=2)
+    await writer.start()
+    for i in range(6):
+        await asyncio.wait_for(
+            writer.write_markdown(
+                f"https://example.com/page{i}", f"# Page {i}", on_saved=on_saved
+            ),
+            timeout=5,
+        )
+    with pytest.raises(sqlite3.OperationalError):
+        await asyncio.wait_for(writer.close(), timeout=5)
+
+    assert writer.stats()["files"] == 6
+    assert len(os.listdir(tmp_path / "out")) == 6
+
+
+@pytest.mark.asyncio
+async def test_writer_records_write_timings_and_extra_columns(tmp_path):
+    """Test that write timings reach the caller and extra columns the CSV."""
+    handler = FileHandler("https://example.com", str(tmp_path / "out"))
+    result_file = str(tmp_path / "result.csv")
+    timings = {"fetch": 0.5}
+    seen = []
+
+    async with OutputWriter(handler, result_file, extra_columns=["write_ms"]) as writer:
+        await writer.write_markdown(
+            "https://example.com/a",
+            "# A",
+            on_saved=lambda path: seen.append(dict(timings)),
+            timings=timings,
+        )
+        await writer.write_markdown("https://example.com/b", "# B")
+        await writer._queue.join()
+        writer.write_row("OK", "https://example.com/a", ["1.5"])
+        writer.write_row("SKIPPED", "https://example.com/c")
+
+    assert {"fetch", "write", "write_cpu"} <= set(seen[0])
+    assert read_rows(result_file) == [
+        ["status", "url", "write_ms"],
+        ["OK", "https://example.com/a", "1.5"],
+        ["SKIPPED", "https://example.com/c"],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_writer_charges_queued_pages_to_the_memory_budget(tmp_path):
+    """Test that queued pages hold budget bytes until they are written."""
+    handler = FileHandler("https://example.com", str(tmp_path / "out"))
+    budget = ByteBudget(1024)
+
+    async with OutputWriter(
+        handler, str(tmp_path / "result.csv"), memory_budget=budget
+    ) as writer:
+        await writer.write_markdown(
+            "https://example.com/a",
+            "# A",
+            frontmatter="---\n---\n\n",
+        )
+        assert budget.in_use in (0, 12)
+
+    assert (tmp_path / "out" / "a.md").read_text() == "---\n---\n\n# A"
+    assert budget.peak == 12
+    assert budget.in_use == 0
+
+
+@pytest.mark.asyncio
+async def test_writer_without_result_file(tmp_path):
+    """Test that rows are dropped and no CSV is created without a result file."""
+    handler = FileHandler("https://example.com", str(tmp_path))
+
+    async with OutputWriter(handler, None) as writer:
+        await writer.write_markdown("https://example.com/a", "# A")
+        writer.write_row("OK", "https://example.com/a")
+        await writer.flush()
+
+    assert os.listdir(tmp_path) == ["a.md"]